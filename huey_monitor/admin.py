@@ -1,17 +1,39 @@
+import datetime
+
+from bx_django_utils.humanize.time import human_timedelta
 from bx_django_utils.templatetags.humanize_time import human_duration
 from django.conf import settings
 from django.contrib import admin, messages
-from django.contrib.admin.views.main import ChangeList
-from django.db.models import OuterRef, Prefetch
-from django.shortcuts import redirect
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Prefetch
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
 from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from huey.contrib.djhuey import HUEY
-from huey.signals import SIGNAL_EXECUTING
 
-from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.constants import LIVE_MAX_WAIT, SUB_TASKS_PREVIEW
+from huey_monitor.huey_counts import get_huey_counts
+from huey_monitor.humanize import format_sizeof, percentage
+from huey_monitor.live import decode_cursor, get_changes, get_etag, wait_for_change
+from huey_monitor.models import (
+    ExceptionGroupModel,
+    QueueSampleModel,
+    SignalInfoModel,
+    TaskModel,
+    TaskStatisticsModel,
+    WorkerIdentityModel,
+    WorkerModel,
+)
+from huey_monitor.pagination import KeysetChangeList, KeysetPaginationMixin
+from huey_monitor.queue_samples import QueueSummary, per_minute, queue_history, svg_chart
+from huey_monitor.statistics import get_day, merge_statistics
+from huey_monitor.sub_task_counts import sub_tasks_progress_subquery
+from huey_monitor.workers import heartbeat_cutoff
 
 
 class FixLookupAllowedMixin:
@@ -34,40 +56,103 @@ class FixLookupAllowedMixin:
         return self._get_list_filter()
 
 
-class TaskModelChangeList(ChangeList):
+class TaskModelChangeList(KeysetChangeList):
     def get_queryset(self, request):
         """
-        List only the main-tasks (sub-tasks will be inlined)
+        List only the main-tasks (the newest sub-tasks will be inlined)
         """
         qs = super().get_queryset(request)
-        executing_dt = SignalInfoModel.objects.filter(
-            task_id=OuterRef('task_id'), signal_name=SIGNAL_EXECUTING
-        ).values('create_dt')[:1]
-        qs = (
-            qs.filter(parent_task__isnull=True)
-            .prefetch_related(
-                Prefetch(
-                    'sub_tasks',
-                    queryset=TaskModel.objects.select_related('state')
-                    .annotate(executing_dt=executing_dt)
-                    .order_by('-create_dt'),
-                )
+        qs = qs.filter(parent_task__isnull=True).annotate(sub_tasks_progress=sub_tasks_progress_subquery())
+        qs = qs.prefetch_related(
+            Prefetch(
+                'sub_tasks',
+                # Sliced via a window function: Only the newest sub tasks of every main task are loaded
+                queryset=TaskModel.objects.select_related('state').order_by('-create_dt')[:SUB_TASKS_PREVIEW],
+                to_attr='newest_sub_tasks',
             )
-            .annotate(executing_dt=executing_dt)
         )
         return qs
 
 
+class DurationListFilter(admin.SimpleListFilter):
+    title = _('Duration')
+    parameter_name = 'duration'
+
+    ranges = {
+        'lt1s': (_('< 1 second'), None, datetime.timedelta(seconds=1)),
+        'lt1m': (_('1 second - 1 minute'), datetime.timedelta(seconds=1), datetime.timedelta(minutes=1)),
+        'lt1h': (_('1 minute - 1 hour'), datetime.timedelta(minutes=1), datetime.timedelta(hours=1)),
+        'gte1h': (_('>= 1 hour'), datetime.timedelta(hours=1), None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, start, end) in self.ranges.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.ranges:
+            label, start, end = self.ranges[self.value()]
+            if start is not None:
+                queryset = queryset.filter(duration__gte=start)
+            if end is not None:
+                queryset = queryset.filter(duration__lt=end)
+        return queryset
+
+
+class WorkerIdentityListFilter(admin.SimpleListFilter):
+    """
+    Filter by a field of the signal worker identity:
+    The choices are selected from the small WorkerIdentityModel table, not from the signals.
+    """
+
+    field_name = None
+    lookup_prefix = ''  # e.g.: "state__" to filter tasks by their current signal
+
+    def lookups(self, request, model_admin):
+        values = (
+            WorkerIdentityModel.objects.order_by(self.field_name).values_list(self.field_name, flat=True).distinct()
+        )
+        return [(value, value) for value in values]
+
+    def has_output(self):
+        return True  # Like the default field list filters: Display the filter without choices, too.
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            queryset = queryset.filter(**{f'{self.lookup_prefix}worker__{self.field_name}': self.value()})
+        return queryset
+
+
+class HostnameListFilter(WorkerIdentityListFilter):
+    title = _('Hostname')
+    parameter_name = 'hostname'
+    field_name = 'hostname'
+
+
+class ThreadListFilter(WorkerIdentityListFilter):
+    title = _('Thread Name')
+    parameter_name = 'thread'
+    field_name = 'thread'
+
+
+class StateHostnameListFilter(HostnameListFilter):
+    parameter_name = 'state_hostname'
+    lookup_prefix = 'state__'
+
+
+class StateThreadListFilter(ThreadListFilter):
+    parameter_name = 'state_thread'
+    lookup_prefix = 'state__'
+
+
 @admin.register(TaskModel)
-class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
+class TaskModelAdmin(KeysetPaginationMixin, FixLookupAllowedMixin, admin.ModelAdmin):
     def get_changelist(self, request, **kwargs):
         return TaskModelChangeList
 
     def column_name(self, obj):
-        qs = obj.sub_tasks.all()
         context = {
             'main_task': obj,
-            'sub_tasks': qs,
+            'sub_tasks': obj.newest_sub_tasks,
         }
         return render_to_string(
             template_name='admin/huey_monitor/taskmodel/column_name.html',
@@ -84,7 +169,9 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
             }
         else:
             # This is a main Task
-            qs = TaskModel.objects.filter(parent_task_id=obj.pk)
+            qs = TaskModel.objects.filter(parent_task_id=obj.pk).select_related(
+                'state__worker', 'state__exception_group'
+            )
             context = {
                 'sub_tasks': qs,
             }
@@ -100,23 +187,72 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
         return False
 
     def signals(self, obj):
-        signals = SignalInfoModel.objects.filter(task_id=obj.pk).order_by('-create_dt')
+        signals = (
+            SignalInfoModel.objects.filter(task_id=obj.pk)
+            .select_related('worker', 'exception_group')
+            .order_by('-create_dt')
+        )
         context = {
             'task': obj,
             'signals': signals,
         }
         return render_to_string('admin/huey_monitor/taskmodel/field_signals.html', context)
 
-    def duration(self, obj):
-        if not obj.state:
+    def human_duration(self, obj):
+        if obj.duration is not None:
+            return human_timedelta(obj.duration)
+
+        if obj.executing_dt is not None and obj.ended_dt is None:
+            # Still running
+            return human_duration(obj.executing_dt, timezone.now())
+
+        return '-'
+
+    human_duration.short_description = _('Duration')
+    human_duration.admin_order_field = 'duration'
+
+    def human_queue_latency(self, obj):
+        if obj.queue_latency is not None:
+            return human_timedelta(obj.queue_latency)
+        return '-'
+
+    human_queue_latency.short_description = _('Queue latency')
+    human_queue_latency.admin_order_field = 'queue_latency'
+
+    def human_cpu_time(self, obj):
+        if obj.cpu_user_time is None:
             return '-'
+        cpu_time = obj.cpu_user_time + obj.cpu_system_time
+        text = _('%(total)s (user: %(user)s, system: %(system)s)') % {
+            'total': human_timedelta(cpu_time),
+            'user': human_timedelta(obj.cpu_user_time),
+            'system': human_timedelta(obj.cpu_system_time),
+        }
+        if obj.duration:
+            # Low values: The task waits, e.g. for I/O
+            share = percentage(num=cpu_time, total=obj.duration.total_seconds())
+            text = f'{text} - {share} {_("of the duration")}'
+        return text
 
-        if obj.state.signal_name == 'executing':
-            end_dt = timezone.now()
-        else:
-            end_dt = obj.state.create_dt
+    human_cpu_time.short_description = _('CPU time')
 
-        return human_duration(obj.create_dt, end_dt)
+    def human_max_rss(self, obj):
+        if obj.max_rss is None:
+            return '-'
+        return format_sizeof(obj.max_rss, suffix='B', divisor=1024)
+
+    human_max_rss.short_description = _('Peak RSS')
+    human_max_rss.admin_order_field = 'max_rss'
+
+    def human_io(self, obj):
+        if obj.io_read_bytes is None:
+            return '-'
+        return _('read: %(read)s, written: %(write)s') % {
+            'read': format_sizeof(obj.io_read_bytes, suffix='B', divisor=1024),
+            'write': format_sizeof(obj.io_write_bytes, suffix='B', divisor=1024),
+        }
+
+    human_io.short_description = _('I/O')
 
     def changelist_url(self):
         info = (self.admin_site.name, self.model._meta.app_label, self.model._meta.model_name)
@@ -131,6 +267,150 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
             messages.success(request, f'Flush task locks: {", ".join(sorted(flushed))}')
         return redirect(self.changelist_url())
 
+    def huey_counts_view(self, request):
+        """
+        The cached Huey counts as JSON, e.g. for dashboards.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        counts = get_huey_counts()
+        return JsonResponse(counts)
+
+    def live_view(self, request):
+        """
+        Dashboard page, that updates the last changed tasks in place via live_changes_view()
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': _('Live tasks'),
+            'max_wait': getattr(settings, 'HUEY_MONITOR_LIVE_MAX_WAIT', LIVE_MAX_WAIT),
+        }
+        return render(request, 'admin/huey_monitor/taskmodel/live.html', context)
+
+    def live_changes_view(self, request):
+        """
+        JSON with the main tasks changed after the "cursor" parameter (and in the safety window before it).
+        Returns "304 Not Modified" if the If-None-Match ETag is current.
+        With the "wait" parameter: Wait max. this number of seconds for changes after the cursor (long-polling).
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        try:
+            cursor = request.GET.get('cursor')
+            cursor = None if cursor is None else decode_cursor(cursor)
+        except ValidationError as err:
+            return HttpResponseBadRequest(err.message)
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            return HttpResponseBadRequest('Invalid wait value')
+
+        if wait > 0 and cursor is not None:
+            wait_for_change(cursor, wait)
+
+        data = get_changes(cursor)
+        etag = get_etag(data)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(data)
+        response['ETag'] = etag  # The admin_view() adds the "never cache" headers
+        return response
+
+    statistics_periods = (1, 7, 30, 365)  # Selectable number of days in the statistics view
+
+    def statistics_view(self, request):
+        """
+        Statistics per task name, using only the hourly TaskStatisticsModel entries.
+        With a task name: The statistics of this task per hour (last day) or per day.
+        The queue latencies are also listed per worker host.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        try:
+            days = int(request.GET.get('days', 7))
+        except ValueError:
+            days = 7
+        if days not in self.statistics_periods:
+            days = 7
+        name = request.GET.get('name')
+
+        start = timezone.now() - datetime.timedelta(days=days)
+        qs = TaskStatisticsModel.objects.filter(hour__gte=start).order_by()
+        if name:
+            qs = qs.filter(name=name)
+            if days == 1:
+                statistics = merge_statistics(qs, get_start=timezone.localtime)
+            else:
+                statistics = merge_statistics(qs, get_start=get_day)
+        else:
+            statistics = merge_statistics(qs)
+        host_statistics = merge_statistics(qs, key_field='hostname')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': _('Task statistics'),
+            'days': days,
+            'periods': self.statistics_periods,
+            'name': name,
+            'statistics': statistics,
+            'host_statistics': host_statistics,
+        }
+        return render(request, 'admin/huey_monitor/taskmodel/statistics.html', context)
+
+    queue_periods = (1, 6, 24, 24 * 7, 24 * 30)  # Selectable number of hours in the queues view
+
+    def queues_view(self, request):
+        """
+        Charts of the queue depths and the enqueue/execution rates, see: huey_monitor.queue_samples
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        try:
+            hours = int(request.GET.get('hours', 6))
+        except ValueError:
+            hours = 6
+        if hours not in self.queue_periods:
+            hours = 6
+
+        resolution, samples = queue_history(hours)
+        backlog_chart = svg_chart(
+            samples,
+            series=[
+                (_('Pending'), 'pending', lambda sample: sample.pending),
+                (_('Pending max.'), 'pending-max', lambda sample: sample.pending_max),
+                (_('Scheduled'), 'scheduled', lambda sample: sample.scheduled),
+            ],
+        )
+        rate_chart = svg_chart(
+            samples,
+            series=[
+                (_('Enqueued per minute'), 'enqueued', lambda s: per_minute(s.enqueued_count, s.duration)),
+                (_('Executed per minute'), 'executed', lambda s: per_minute(s.executed_count, s.duration)),
+            ],
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': _('Queues'),
+            'hours': hours,
+            'periods': self.queue_periods,
+            'resolution_label': dict(QueueSampleModel.resolution.field.choices)[resolution],
+            'samples': samples,
+            'last_sample': samples[-1] if samples else None,
+            'summary': QueueSummary(samples),
+            'charts': (backlog_chart, rate_chart),
+        }
+        return render(request, 'admin/huey_monitor/taskmodel/queues.html', context)
+
     def get_urls(self):
         urls = [
             path(
@@ -138,6 +418,31 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
                 self.admin_site.admin_view(self.flush_locks_view),
                 name='flush_locks',
             ),
+            path(
+                'statistics/',
+                self.admin_site.admin_view(self.statistics_view),
+                name='huey_monitor_statistics',
+            ),
+            path(
+                'queues/',
+                self.admin_site.admin_view(self.queues_view),
+                name='huey_monitor_queues',
+            ),
+            path(
+                'live/',
+                self.admin_site.admin_view(self.live_view),
+                name='huey_monitor_live',
+            ),
+            path(
+                'live/changes/',
+                self.admin_site.admin_view(self.live_changes_view),
+                name='huey_monitor_live_changes',
+            ),
+            path(
+                'huey_counts/',
+                self.admin_site.admin_view(self.huey_counts_view),
+                name='huey_monitor_huey_counts',
+            ),
         ] + super().get_urls()
         return urls
 
@@ -150,24 +455,62 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
         'human_percentage',
         'human_progress',
         'human_throughput',
-        'duration',
+        'human_eta',
+        'progress_sparkline',
+        'human_duration',
     )
     readonly_fields = (
         'task_id',
         'signals',
         'create_dt',
         'update_dt',
+        'executing_dt',
+        'enqueued_dt',
+        'human_queue_latency',
+        'ended_dt',
+        'human_duration',
+        'human_cpu_time',
+        'human_max_rss',
+        'human_io',
         'human_percentage',
         'human_progress',
         'human_throughput',
+        'human_current_throughput',
+        'human_eta',
+        'progress_sparkline',
     )
     ordering = ('-update_dt',)
+    keyset_ordering = ('-update_dt', '-task_id')
     list_display_links = None
     list_select_related = ('state',)
     date_hierarchy = 'create_dt'
-    search_fields = ('name', 'state__exception_line', 'state__exception')
+    search_fields = ('name', 'state__exception_line', 'state__exception_group__exception_type')
     fieldsets = (
-        (_('Meta'), {'fields': ('task_id', 'create_dt', 'update_dt')}),
+        (
+            _('Meta'),
+            {
+                'fields': (
+                    'task_id',
+                    'create_dt',
+                    'update_dt',
+                    'enqueued_dt',
+                    'human_queue_latency',
+                    'executing_dt',
+                    'ended_dt',
+                    'human_duration',
+                )
+            },
+        ),
+        (
+            _('Resource usage'),
+            {
+                'fields': (
+                    'human_cpu_time',
+                    'human_max_rss',
+                    'human_io',
+                )
+            },
+        ),
         (
             _('Task Information'),
             {
@@ -178,6 +521,9 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
                     'progress_count',
                     'cumulate_progress',
                     'human_progress_string',
+                    'human_current_throughput',
+                    'human_eta',
+                    'progress_sparkline',
                     'signals',
                 )
             },
@@ -190,8 +536,9 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
         return getattr(settings, 'HUEY_MONITOR_TASK_MODEL_LIST_FILTER', None) or (
             'name',
             'state__signal_name',
-            'state__thread',
-            'state__hostname',
+            DurationListFilter,
+            StateThreadListFilter,
+            StateHostnameListFilter,
         )
 
     def get_list_filter(self, request):
@@ -204,10 +551,28 @@ class TaskModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
 
 
 @admin.register(SignalInfoModel)
-class SignalInfoModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
+class SignalInfoModelAdmin(KeysetPaginationMixin, FixLookupAllowedMixin, admin.ModelAdmin):
     def task_name(self, obj):
         return obj.task.name
 
+    def hostname(self, obj):
+        return obj.worker.hostname
+
+    hostname.short_description = _('Hostname')
+    hostname.admin_order_field = 'worker__hostname'
+
+    def pid(self, obj):
+        return obj.worker.pid
+
+    pid.short_description = _('PID')
+    pid.admin_order_field = 'worker__pid'
+
+    def thread(self, obj):
+        return obj.worker.thread
+
+    thread.short_description = _('Thread Name')
+    thread.admin_order_field = 'worker__thread'
+
     list_display = (
         'create_dt',
         'task_name',
@@ -217,19 +582,20 @@ class SignalInfoModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
         'pid',
         'thread',
     )
-    readonly_fields = ('create_dt',)
+    readonly_fields = ('create_dt', 'traceback')
     list_display_links = ('task_name',)
     ordering = ('-create_dt',)
+    keyset_ordering = ('-create_dt', '-id')
     date_hierarchy = 'create_dt'
-    search_fields = ('task__name', 'exception_line', 'exception')
+    search_fields = ('task__name', 'exception_line', 'exception_group__exception_type')
 
     def _get_list_filter(self):
         """return list_filter without `request` object."""
         return getattr(settings, 'HUEY_MONITOR_SIGNAL_INFO_MODEL_LIST_FILTER', None) or (
             'task__name',
             'signal_name',
-            'thread',
-            'hostname',
+            ThreadListFilter,
+            HostnameListFilter,
         )
 
     def get_list_filter(self, request):
@@ -239,4 +605,56 @@ class SignalInfoModelAdmin(FixLookupAllowedMixin, admin.ModelAdmin):
         return False
 
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('task')
+        return super().get_queryset(request).select_related('worker').prefetch_related('task')
+
+
+@admin.register(ExceptionGroupModel)
+class ExceptionGroupModelAdmin(admin.ModelAdmin):
+    """
+    The top errors: All grouped exceptions without scanning the signals.
+    """
+
+    def signals_link(self, obj):
+        url = reverse('admin:huey_monitor_signalinfomodel_changelist')
+        return format_html('<a href="{}?exception_group={}">{}</a>', url, obj.pk, _('Signals'))
+
+    signals_link.short_description = _('Signals')
+
+    list_display = (
+        'exception_type',
+        'exception_line',
+        'task_name',
+        'occurrence_count',
+        'first_seen_dt',
+        'last_seen_dt',
+        'signals_link',
+    )
+    list_filter = ('task_name', 'exception_type')
+    search_fields = ('exception_type', 'exception_line', 'task_name')
+    ordering = ('-last_seen_dt',)
+    date_hierarchy = 'last_seen_dt'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WorkerModel)
+class WorkerModelAdmin(admin.ModelAdmin):
+    def alive(self, obj):
+        return obj.stopped_dt is None and obj.heartbeat_dt >= heartbeat_cutoff(timezone.now())
+
+    alive.boolean = True
+    alive.short_description = _('Alive')
+
+    list_display = ('hostname', 'pid', 'alive', 'started_dt', 'heartbeat_dt', 'stopped_dt')
+    list_filter = ('hostname',)
+    ordering = ('-heartbeat_dt',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,218 @@
+import base64
+import datetime
+import json
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from huey.contrib.djhuey import HUEY
+from huey.storage import MemoryStorage
+
+from huey_monitor.models import TaskModel
+from huey_monitor.signal_store import store_signal_batch
+
+
+logger = logging.getLogger(__name__)
+
+# The event types:
+EVENT_SIGNAL = 'signal'  # A Huey signal, see: signal_store.get_signal_info()
+EVENT_UPDATE = 'update'  # Update TaskModel fields, e.g. the progress info
+EVENT_PARENT = 'parent'  # TaskModel.objects.set_parent_task()
+
+
+def collector_enabled() -> bool:
+    """
+    Should the workers only push events that the "huey_monitor_collector" will store?
+    """
+    return getattr(settings, 'HUEY_MONITOR_SIGNAL_COLLECTOR', False)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_collector_storage():
+    """
+    Returns the Huey storage with the queue of the monitor events.
+    It's the storage of the configured Huey instance, but with a different queue name.
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            name = f'{HUEY.name}_monitor'
+            if HUEY.immediate and HUEY.immediate_use_memory:
+                _storage = MemoryStorage(name)
+            else:
+                _storage = HUEY.storage_class(name, **HUEY.storage_kwargs)
+        return _storage
+
+
+def _json_default(obj):
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    if isinstance(obj, bytes):
+        # e.g.: TaskModel.progress_samples -> The BinaryField expects base64
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def encode_event(event) -> bytes:
+    """
+    >>> encode_event({'event': 'parent', 'task_id': uuid.UUID(int=1)})
+    b'{"event":"parent","task_id":"00000000-0000-0000-0000-000000000001"}'
+    """
+    return json.dumps(event, separators=(',', ':'), default=_json_default).encode()
+
+
+def decode_event(data) -> dict:
+    """
+    >>> event = decode_event(b'{"event":"signal","task_id":"00000000-0000-0000-0000-000000000001",'
+    ...     b'"create_dt":"2000-01-02T03:04:05.000006+00:00"}')
+    >>> event['task_id']
+    UUID('00000000-0000-0000-0000-000000000001')
+    >>> event['create_dt']
+    datetime.datetime(2000, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc)
+
+    Note: The field values of "update" events are stored as JSON types:
+    They will be converted by the model fields, see: EventWriter.flush_update()
+    """
+    event = json.loads(data)
+    for key in ('task_id', 'parent_task_id'):
+        if key in event:
+            event[key] = uuid.UUID(event[key])
+    if 'create_dt' in event:
+        event['create_dt'] = datetime.datetime.fromisoformat(event['create_dt'])
+    return event
+
+
+def push_event(event):
+    get_collector_storage().enqueue(encode_event(event))
+
+
+def push_signal(signal_info):
+    push_event({'event': EVENT_SIGNAL, **signal_info})
+
+
+def task_update_event(task_id, parent_task_id=None, **values) -> dict:
+    event = {'event': EVENT_UPDATE, 'task_id': task_id, 'values': values}
+    if parent_task_id is not None:
+        # Progress changes of sub tasks are added to their main task, see: TaskModel.objects.update_task()
+        event['parent_task_id'] = parent_task_id
+    return event
+
+
+def push_task_update(task_id, parent_task_id=None, **values):
+    push_event(task_update_event(task_id, parent_task_id=parent_task_id, **values))
+
+
+def push_parent_task(main_task_id, sub_task_id):
+    push_event({'event': EVENT_PARENT, 'task_id': sub_task_id, 'parent_task_id': main_task_id})
+
+
+def pop_events(max_count) -> list:
+    """
+    Fetch up to "max_count" events from the queue.
+    """
+    storage = get_collector_storage()
+    events = []
+    while len(events) < max_count:
+        data = storage.dequeue()
+        if data is None:
+            break
+        try:
+            events.append(decode_event(data))
+        except ValueError as err:
+            logger.error('Skip invalid monitor event %r: %s', data, err)
+    return events
+
+
+def queue_size() -> int:
+    return get_collector_storage().queue_size()
+
+
+class EventWriter:
+    """
+    Store a list of events in the order in which they occurred, with as few queries as possible:
+
+     * The signals are stored together via store_signal_batch()
+     * Consecutive updates of the same task will be merged into one update.
+
+    The signals are only stored in between, if a following event affects the same task.
+    """
+
+    def __init__(self):
+        self.signal_infos = []
+        self.signal_task_ids = set()
+        self.task_updates = {}
+        self.parent_task_ids = {}
+
+    def flush_signals(self):
+        store_signal_batch(self.signal_infos)
+        self.signal_infos = []
+        self.signal_task_ids = set()
+
+    def flush_update(self, task_id):
+        values = self.task_updates.pop(task_id, None)
+        if values:
+            values = {name: TaskModel._meta.get_field(name).to_python(value) for name, value in values.items()}
+            TaskModel.objects.update_task(task_id, parent_task_id=self.parent_task_ids.pop(task_id, None), **values)
+
+    def add_signal(self, signal_info):
+        # The pending updates happened before this signal:
+        self.flush_update(signal_info['task_id'])
+        self.signal_infos.append(signal_info)
+        self.signal_task_ids.add(signal_info['task_id'])
+
+    def add_update(self, task_id, values, parent_task_id=None):
+        if task_id in self.signal_task_ids:
+            # The task entry may not exist, yet.
+            self.flush_signals()
+        self.task_updates.setdefault(task_id, {}).update(values)
+        if parent_task_id is not None:
+            self.parent_task_ids[task_id] = parent_task_id
+
+    def add_parent(self, main_task_id, sub_task_id):
+        if self.signal_task_ids & {main_task_id, sub_task_id}:
+            self.flush_signals()
+        self.flush_update(main_task_id)
+        self.flush_update(sub_task_id)
+        TaskModel.objects.store_parent_task(main_task_id=main_task_id, sub_task_id=sub_task_id)
+
+    def write(self, events):
+        with transaction.atomic():
+            for event in events:
+                event_type = event.get('event')
+                if event_type == EVENT_SIGNAL:
+                    self.add_signal(event)
+                elif event_type == EVENT_UPDATE:
+                    self.add_update(event['task_id'], event['values'], parent_task_id=event.get('parent_task_id'))
+                elif event_type == EVENT_PARENT:
+                    self.add_parent(main_task_id=event['parent_task_id'], sub_task_id=event['task_id'])
+                else:
+                    logger.error('Skip unknown monitor event type %r', event_type)
+
+            self.flush_signals()
+            for task_id in list(self.task_updates):
+                self.flush_update(task_id)
+
+
+def connection_lost() -> bool:
+    """
+    Tell database connection problems apart from errors of the statements.
+    """
+    try:
+        return connection.connection is None or not connection.is_usable()
+    except Exception:
+        return True
+
+
+def store_events(events):
+    """
+    Store the given events in the database.
+    """
+    EventWriter().write(events)
+    logger.debug('Stored %i monitor events', len(events))
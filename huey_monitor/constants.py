@@ -16,3 +16,85 @@ ENDED_HUEY_SIGNALS = (
 )
 
 TASK_MODEL_DESC_MAX_LENGTH = 128
+
+# The signal names are stored as small integers (see: SignalInfoModel.signal_name)
+# Never change an existing code, only add new ones!
+SIGNAL_CODES = {
+    'enqueued': 1,
+    'executing': 2,
+    'complete': 3,
+    'error': 4,
+    'retrying': 5,
+    'revoked': 6,
+    'expired': 7,
+    'locked': 8,
+    'canceled': 9,
+    'interrupted': 10,
+    'scheduled': 11,
+    'timeout': 12,
+    'rate-limited': 13,
+    'unknown': 14,  # Pseudo signal for "executing" tasks of dead workers
+}
+
+# Defaults for the optional buffered signal storage (see README):
+SIGNAL_BUFFER_SIZE = 500  # Store the buffered signals if this number is reached
+SIGNAL_BUFFER_INTERVAL = 1.0  # ...or after this number of seconds
+SIGNAL_BUFFER_RETRIES = 3  # Retries of failing signals, if the database connection is still usable
+
+# Out-of-process collector (see README):
+COLLECTOR_RETRIES = 3  # Retries of failing events, if the database connection is still usable
+
+# Defaults for the ProcessInfo progress update throttling (see README):
+PROGRESS_MININTERVAL = 0  # Minimum seconds between two progress updates
+PROGRESS_MINITERS = 1  # Minimum iterations between two progress updates
+PROGRESS_WRITES_PER_SECOND = None  # Adjust the iterations dynamically to reach this update rate
+
+# Progress history of a task, stored by ProcessInfo:
+PROGRESS_SAMPLES_MAX = 60  # Maximum number of samples
+PROGRESS_SAMPLE_INTERVAL = 1.0  # Minimum seconds between two samples
+
+# Defaults for pruning old monitor data (see README):
+PRUNE_CHUNK_SIZE = 500  # Number of tasks deleted in one transaction
+PRUNE_CRONTAB = {'minute': '30', 'hour': '3'}  # Schedule of the optional periodic prune task
+
+# Time-ordered signal primary keys (see README):
+REKEY_CHUNK_SIZE = 1000  # Number of signals changed in one transaction by "huey_monitor_rekey_signals"
+
+# Hourly task statistics (see README):
+STATISTICS_CHUNK_SIZE = 1000  # Number of signals processed in one transaction by "huey_monitor_rebuild_statistics"
+
+# Admin change list pagination (see: huey_monitor.pagination):
+ESTIMATED_COUNT_THRESHOLD = 10_000  # Smaller numbers of entries are always counted exactly
+COUNT_CACHE_TIMEOUT = 60  # Seconds to cache the number of entries (if not estimated by PostgreSQL)
+SUB_TASKS_PREVIEW = 5  # The newest sub tasks displayed per main task (see: huey_monitor.sub_task_counts)
+SUB_TASK_PROGRESS_SHARDS = 16  # Number of rows per main task for the live progress of its sub tasks
+SUB_TASKS_RECOUNT_CHUNK_SIZE = 500  # Number of main tasks checked in one transaction by the recount command
+
+# Worker registry (see: huey_monitor.workers):
+WORKER_HEARTBEAT_INTERVAL = 15  # Seconds between two heartbeats of a worker process
+WORKER_TIMEOUT = 120  # A worker without heartbeat for this number of seconds is dead
+WORKER_RETENTION_DAYS = 7  # Delete the entries of dead workers after this number of days
+WORKER_REAP_CHUNK_SIZE = 500  # Number of tasks of dead workers updated in one query
+WATCHDOG_CRONTAB = {'minute': '*'}  # Schedule of the watchdog task, that marks tasks of dead workers
+WORKER_IDENTITY_CACHE_SIZE = 1000  # Maximum number of worker identity IDs cached per process
+
+# Cached counts of the Huey storage (see: huey_monitor.huey_counts):
+HUEY_COUNTS_TTL = 10  # Refresh the counts in the background, if they are older than this number of seconds
+HUEY_COUNTS_TIMEOUT = 2  # Maximum seconds to wait for the counts, if none are cached yet
+
+# Queue depth samples (see README):
+QUEUE_SAMPLER_CRONTAB = {'minute': '*'}  # Schedule of the sampler task
+QUEUE_SAMPLES_RAW_HOURS = 2  # Keep the raw samples this number of hours
+QUEUE_SAMPLES_MINUTE_DAYS = 2  # Keep the samples per minute this number of days
+QUEUE_SAMPLES_HOUR_DAYS = 365  # Keep the samples per hour this number of days
+
+# Live dashboard (see: huey_monitor.live):
+LIVE_PAGE_SIZE = 100  # Maximum number of changed tasks in one response
+LIVE_MAX_WAIT = 25  # Maximum seconds a long-polling request waits for changes
+LIVE_POLL_INTERVAL = 1.0  # Seconds between two checks while a long-polling request waits
+LIVE_SAFETY_WINDOW = 10  # Seconds before the cursor, that are read again to get changes committed late
+
+# Overhead of the monitor itself (see: huey_monitor.instrumentation):
+OVERHEAD_WARNING_FRACTION = 0.1  # Warn if the monitor needs more than this fraction of the task runtime
+OVERHEAD_WARNING_MIN_RUNTIME = 1  # Seconds: No warnings for shorter tasks
+OVERHEAD_LOG_INTERVAL = 3600  # Seconds between two overhead summaries in the log of a worker process
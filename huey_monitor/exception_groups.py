@@ -0,0 +1,270 @@
+"""
+Group equal exceptions by a fingerprint of the exception types and the normalized stack frames.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Case, F, Q, Value, When
+
+from huey_monitor.models import ExceptionGroupModel
+
+
+FRAME_RE = re.compile(r'^\s*File "(?P<filename>[^"]+)", line \d+, in (?P<name>.+)$')
+EXCEPTION_RE = re.compile(r'^(?P<type>[A-Za-z_][\w.]*)(:|$)')
+CHAIN_PREFIXES = (
+    'Traceback (most recent call last):',
+    'During handling of the above exception',
+    'The above exception was the direct cause',
+)
+PACKAGE_MARKERS = ('site-packages/', 'dist-packages/')
+
+# Inserted with the values of a new group, but only the occurrences are added up for existing groups:
+INSERT_FIELDS = (
+    'fingerprint',
+    'exception_type',
+    'exception_line',
+    'traceback',
+    'task_name',
+    'occurrence_count',
+    'first_seen_dt',
+    'last_seen_dt',
+)
+# Set by the last occurrence:
+LAST_SEEN_FIELDS = ('last_seen_dt', 'exception_line', 'task_name')
+
+
+def normalize_filename(filename) -> str:
+    """
+    Remove the installation specific parts of a path.
+
+    >>> normalize_filename('/venv/lib/python3.12/site-packages/huey/api.py')
+    'huey/api.py'
+    >>> normalize_filename('/srv/release-123/my_project/tasks.py')
+    'my_project/tasks.py'
+    """
+    filename = filename.replace('\\', '/')
+    for marker in PACKAGE_MARKERS:
+        if marker in filename:
+            return filename.rsplit(marker, 1)[1]
+    return '/'.join(filename.rsplit('/', 2)[-2:])
+
+
+def parse_traceback(text) -> tuple:
+    """
+    Returns the exception types and the normalized stack frames (without line numbers and messages).
+
+    >>> types, frames = parse_traceback(
+    ...     'Traceback (most recent call last):\\n'
+    ...     '  File "/app/foo/tasks.py", line 12, in my_task\\n'
+    ...     '    raise ValueError(f"Bad {value}")\\n'
+    ...     '    ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^\\n'
+    ...     'ValueError: Bad 123\\n'
+    ...     'Details: foo\\n'
+    ... )
+    >>> types
+    ['ValueError']
+    >>> frames
+    ['foo/tasks.py in my_task: raise ValueError(f"Bad {value}")']
+    """
+    types = []
+    frames = []
+    expect_source = False
+    in_message = False
+    for line in text.splitlines():
+        match = FRAME_RE.match(line)
+        if match:
+            frames.append(f'{normalize_filename(match["filename"])} in {match["name"]}')
+            expect_source = True
+            in_message = False
+            continue
+
+        stripped = line.strip()
+        if expect_source:
+            expect_source = False
+            if line[:1].isspace() and stripped:
+                frames[-1] += f': {stripped}'
+                continue
+
+        if not stripped or line[:1].isspace():
+            # e.g.: "^^^^" marker lines or indented messages
+            continue
+
+        if stripped.startswith(CHAIN_PREFIXES):
+            in_message = False
+        elif not in_message:
+            match = EXCEPTION_RE.match(stripped)
+            if match:
+                types.append(match['type'])
+                # The next lines may be a part of a multi line message:
+                in_message = True
+    return types, frames
+
+
+@lru_cache(maxsize=256)
+def get_fingerprint(text) -> tuple:
+    """
+    Returns the fingerprint and the (last) exception type of a formatted traceback.
+
+    The line numbers and the messages are ignored:
+
+    >>> fingerprint1, exception_type = get_fingerprint(
+    ...     'Traceback (most recent call last):\\n  File "a.py", line 1, in f\\n    x()\\nKeyError: 1'
+    ... )
+    >>> fingerprint2, exception_type = get_fingerprint(
+    ...     'Traceback (most recent call last):\\n  File "a.py", line 5, in f\\n    x()\\nKeyError: 2'
+    ... )
+    >>> fingerprint1 == fingerprint2, len(fingerprint1), exception_type
+    (True, 64, 'KeyError')
+    """
+    types, frames = parse_traceback(text)
+    exception_type = types[-1] if types else ''
+    data = '\n'.join(types + frames) or text
+    return hashlib.sha256(data.encode()).hexdigest(), exception_type
+
+
+def signal_fingerprint(signal_info):
+    """
+    Returns the fingerprint of the exception of a signal info or None
+    """
+    if signal_info.get('exception'):
+        return get_fingerprint(signal_info['exception'])[0]
+
+
+def _build_group_upsert_sql(row_count) -> str:
+    """
+    Build the SQL for: Create the exception groups or add the occurrences to the existing ones.
+    Returns the ID and the fingerprint of all groups.
+    """
+    qn = connection.ops.quote_name
+    opts = ExceptionGroupModel._meta
+    table = qn(opts.db_table)
+
+    def column(name):
+        return qn(opts.get_field(name).column)
+
+    # All expressions use the stored values, so the "last seen" condition is the same for all fields:
+    is_last = f'EXCLUDED.{column("last_seen_dt")} >= {table}.{column("last_seen_dt")}'
+    updates = [
+        f'{column("occurrence_count")} = {table}.{column("occurrence_count")} + EXCLUDED.{column("occurrence_count")}',
+        f'{column("first_seen_dt")} = CASE'
+        f' WHEN EXCLUDED.{column("first_seen_dt")} < {table}.{column("first_seen_dt")}'
+        f' THEN EXCLUDED.{column("first_seen_dt")} ELSE {table}.{column("first_seen_dt")} END',
+    ]
+    for name in LAST_SEEN_FIELDS:
+        updates.append(
+            f'{column(name)} = CASE WHEN {is_last} THEN EXCLUDED.{column(name)} ELSE {table}.{column(name)} END'
+        )
+
+    columns = [column(name) for name in INSERT_FIELDS]
+    placeholders = f'({", ".join(["%s"] * len(columns))})'
+    values = ', '.join([placeholders] * row_count)
+    return (
+        f'INSERT INTO {table} ({", ".join(columns)}) VALUES {values}'
+        f' ON CONFLICT ({column("fingerprint")}) DO UPDATE SET {", ".join(updates)}'
+        f' RETURNING {column("id")}, {column("fingerprint")}'
+    )
+
+
+class ExceptionGroupUpdate:
+    """
+    Collect the exceptions of signals and add them to the exception groups with one query:
+    The occurrences are added up by the database, so parallel workers don't lock the groups before.
+    (Without "upsert" support: Two queries plus one per group)
+    save() must be called in a transaction.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, signal_info, task_name):
+        text = signal_info.get('exception')
+        if not text:
+            return
+        fingerprint, exception_type = get_fingerprint(text)
+        create_dt = signal_info['create_dt']
+        group = self.groups.get(fingerprint)
+        if group is None:
+            self.groups[fingerprint] = ExceptionGroupModel(
+                fingerprint=fingerprint,
+                exception_type=exception_type[:255],
+                exception_line=signal_info.get('exception_line', ''),
+                traceback=text,
+                task_name=task_name,
+                occurrence_count=1,
+                first_seen_dt=create_dt,
+                last_seen_dt=create_dt,
+            )
+        else:
+            group.occurrence_count += 1
+            group.first_seen_dt = min(group.first_seen_dt, create_dt)
+            if create_dt >= group.last_seen_dt:
+                group.last_seen_dt = create_dt
+                group.exception_line = signal_info.get('exception_line', '')
+                group.task_name = task_name
+
+    def save(self) -> dict:
+        """
+        Returns the primary keys of the groups by fingerprint.
+        """
+        from huey_monitor.signal_store import upsert_supported
+
+        if not self.groups:
+            return {}
+
+        fingerprints = sorted(self.groups)  # Change the groups in a stable order, to avoid dead locks
+        if upsert_supported():
+            group_ids = self._upsert_groups(fingerprints)
+        else:
+            group_ids = self._update_groups(fingerprints)
+        self.groups = {}
+        return group_ids
+
+    def _upsert_groups(self, fingerprints) -> dict:
+        fields = [ExceptionGroupModel._meta.get_field(name) for name in INSERT_FIELDS]
+        params = []
+        for fingerprint in fingerprints:
+            group = self.groups[fingerprint]
+            params += (field.get_db_prep_save(getattr(group, field.attname), connection) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(_build_group_upsert_sql(row_count=len(fingerprints)), params)
+            return {fingerprint: group_id for group_id, fingerprint in cursor.fetchall()}
+
+    def _update_groups(self, fingerprints) -> dict:
+        # New groups will be created with all values, existing groups are updated below:
+        ExceptionGroupModel.objects.bulk_create(
+            [
+                ExceptionGroupModel(
+                    fingerprint=group.fingerprint,
+                    exception_type=group.exception_type,
+                    exception_line=group.exception_line,
+                    traceback=group.traceback,
+                    task_name=group.task_name,
+                    first_seen_dt=group.first_seen_dt,
+                    last_seen_dt=group.first_seen_dt,
+                )
+                for group in map(self.groups.get, fingerprints)
+            ],
+            ignore_conflicts=True,
+        )
+        for fingerprint in fingerprints:
+            group = self.groups[fingerprint]
+            is_last = Q(last_seen_dt__lte=group.last_seen_dt)
+            ExceptionGroupModel.objects.filter(fingerprint=fingerprint).update(
+                occurrence_count=F('occurrence_count') + group.occurrence_count,
+                first_seen_dt=Case(
+                    When(first_seen_dt__gt=group.first_seen_dt, then=Value(group.first_seen_dt)),
+                    default=F('first_seen_dt'),
+                ),
+                **{
+                    name: Case(
+                        When(is_last, then=Value(getattr(group, name))),
+                        default=F(name),
+                        output_field=ExceptionGroupModel._meta.get_field(name),
+                    )
+                    for name in LAST_SEEN_FIELDS
+                },
+            )
+        return dict(ExceptionGroupModel.objects.filter(fingerprint__in=fingerprints).values_list('fingerprint', 'pk'))
@@ -0,0 +1,90 @@
+"""
+Mergeable histograms of task durations with fixed, logarithmic buckets.
+
+Every bucket has the same relative width, so percentiles of e.g. a whole day
+can be calculated by adding up the hourly histograms, without the raw data.
+A histogram is a dict: {bucket index: count}
+"""
+
+from __future__ import annotations
+
+import math
+
+
+MIN_VALUE = 0.001  # Upper bound (in seconds) of the first bucket
+BUCKETS_PER_DOUBLING = 4  # The width of a bucket is ~19% -> ~9% max. error of the percentiles
+BUCKET_COUNT = 128  # The last bucket starts at ~35 days
+
+
+def bucket_index(value) -> int:
+    """
+    >>> bucket_index(0), bucket_index(0.0009), bucket_index(0.001), bucket_index(1), bucket_index(1.1)
+    (0, 0, 1, 40, 41)
+    >>> bucket_index(10**9)
+    127
+    """
+    if value < MIN_VALUE:
+        return 0
+    index = int(math.log2(value / MIN_VALUE) * BUCKETS_PER_DOUBLING) + 1
+    return min(index, BUCKET_COUNT - 1)
+
+
+def bucket_value(index) -> float:
+    """
+    The value that represents all values of the bucket: The geometric middle of its bounds.
+
+    >>> round(bucket_value(40), 3)
+    0.939
+    >>> bucket_value(0)
+    0.0
+    """
+    if index == 0:
+        return 0.0
+    return MIN_VALUE * 2 ** ((index - 0.5) / BUCKETS_PER_DOUBLING)
+
+
+def add_value(histogram, value, count=1):
+    """
+    >>> histogram = {}
+    >>> add_value(histogram, 1)
+    >>> add_value(histogram, 1.01, count=2)
+    >>> histogram
+    {40: 3}
+    """
+    index = bucket_index(value)
+    histogram[index] = histogram.get(index, 0) + count
+
+
+def merge_histograms(*histograms) -> dict:
+    """
+    >>> merge_histograms({1: 2, 5: 1}, {5: 3}, {})
+    {1: 2, 5: 4}
+    """
+    result = {}
+    for histogram in histograms:
+        for index, count in histogram.items():
+            result[index] = result.get(index, 0) + count
+    return result
+
+
+def percentile(histogram, fraction) -> float | None:
+    """
+    Returns the approximated value, that is greater or equal than "fraction" of all values.
+
+    >>> histogram = {}
+    >>> for value in range(1, 101):
+    ...     add_value(histogram, value)
+    >>> [round(percentile(histogram, fraction), 1) for fraction in (0.5, 0.95, 0.99)]
+    [50.5, 101.1, 101.1]
+    >>> percentile({}, 0.5) is None
+    True
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = max(math.ceil(fraction * total), 1)
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return bucket_value(index)
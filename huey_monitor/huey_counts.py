@@ -0,0 +1,115 @@
+"""
+The number of pending, scheduled tasks and results in the Huey storage:
+
+The counts are cached and refreshed in a background thread, if they are older than
+settings.HUEY_MONITOR_HUEY_COUNTS_TTL seconds (stale-while-revalidate).
+So a slow Huey storage (e.g.: Redis) never blocks the rendering of admin pages.
+"""
+
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from huey.contrib.djhuey import HUEY
+
+from huey_monitor.constants import HUEY_COUNTS_TIMEOUT, HUEY_COUNTS_TTL
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'huey_monitor_huey_counts'
+LOCK_CACHE_KEY = 'huey_monitor_huey_counts_lock'
+
+
+def fetch_huey_counts() -> dict:
+    """
+    Get the counts from the Huey storage (may be slow!)
+    """
+    counts = dict(pending=None, scheduled=None, result=None, error=None, timestamp=time.time())
+    try:
+        counts.update(
+            pending=HUEY.pending_count(),
+            scheduled=HUEY.scheduled_count(),
+            result=HUEY.result_count(),
+        )
+    except OSError as err:
+        # e.g.: Redis down or other setup used see #127
+        logger.exception('Failed to get counts from HUEY: %s', err)
+        counts['error'] = f'{type(err).__name__}: {err}'
+    return counts
+
+
+def refresh_huey_counts() -> dict:
+    """
+    Fetch the counts and store them in the cache.
+    """
+    counts = fetch_huey_counts()
+    # The cached counts never expire: Old counts are better than waiting for new ones.
+    cache.set(CACHE_KEY, counts, timeout=None)
+    cache.delete(LOCK_CACHE_KEY)
+    return counts
+
+
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+
+
+def _run_refresh():
+    try:
+        refresh_huey_counts()
+    except Exception as err:
+        logger.exception('Refresh huey counts failed: %s', err)
+
+
+def start_refresh(force=False):
+    """
+    Refresh the counts in a background thread. Returns the thread or None,
+    if another process refreshes the counts.
+    Only one refresh thread runs per process, even if the Huey storage hangs.
+    """
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return _refresh_thread
+
+        timeout = getattr(settings, 'HUEY_MONITOR_HUEY_COUNTS_TIMEOUT', HUEY_COUNTS_TIMEOUT)
+        if not cache.add(LOCK_CACHE_KEY, True, timeout=max(int(timeout), 1)) and not force:
+            # Another process refreshes the counts
+            return None
+
+        _refresh_thread = threading.Thread(target=_run_refresh, name='huey_monitor_huey_counts', daemon=True)
+        _refresh_thread.start()
+        return _refresh_thread
+
+
+def get_huey_counts() -> dict:
+    """
+    Returns the cached counts and starts a refresh, if they are stale.
+    Waits at most settings.HUEY_MONITOR_HUEY_COUNTS_TIMEOUT seconds if no counts are cached yet.
+
+    The result contains: pending, scheduled, result, error, update_dt and stale
+    """
+    ttl = getattr(settings, 'HUEY_MONITOR_HUEY_COUNTS_TTL', HUEY_COUNTS_TTL)
+
+    counts = cache.get(CACHE_KEY)
+    if counts is None:
+        thread = start_refresh(force=True)
+        thread.join(timeout=getattr(settings, 'HUEY_MONITOR_HUEY_COUNTS_TIMEOUT', HUEY_COUNTS_TIMEOUT))
+        counts = cache.get(CACHE_KEY)
+        if counts is None:
+            logger.warning('Timeout while getting counts from HUEY')
+            return dict(pending=None, scheduled=None, result=None, error='Timeout', update_dt=None, stale=True)
+
+    age = time.time() - counts['timestamp']
+    stale = age > ttl
+    if stale:
+        start_refresh()
+
+    counts = dict(counts)
+    timestamp = counts.pop('timestamp')
+    counts['update_dt'] = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    counts['stale'] = stale
+    return counts
@@ -0,0 +1,231 @@
+"""
+The overhead of the monitor itself: Count, total and max. time and the number of queries
+of the monitor database writes, per worker process.
+
+The values are stored with the worker heartbeat (see: huey_monitor.workers) and can be displayed
+via the "huey_monitor_overhead" command or the optional metrics endpoint in admin.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from huey_monitor.constants import OVERHEAD_WARNING_FRACTION, OVERHEAD_WARNING_MIN_RUNTIME
+
+
+logger = logging.getLogger(__name__)
+
+# The measured operations:
+OVERHEAD_SIGNAL = 'signal'  # Handle one Huey signal, see: huey_monitor.tasks.store_signals()
+OVERHEAD_SIGNAL_BATCH = 'signal_batch'  # Store buffered signals, see: huey_monitor.signal_buffer
+OVERHEAD_PROGRESS = 'progress'  # Store the progress, see: huey_monitor.tqdm.ProcessInfo
+OVERHEAD_PARENT_TASK = 'parent_task'  # Link a sub task, see: TaskModel.objects.set_parent_task()
+
+
+def instrumentation_enabled() -> bool:
+    return getattr(settings, 'HUEY_MONITOR_INSTRUMENTATION', True)
+
+
+class QueryCounter:
+    """
+    Database execute wrapper, that counts the queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Instrumentation:
+    """
+    The overhead of all operations and the monitor time of the running tasks in this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {}
+        # [start, monitor time] of the running tasks by task ID:
+        self.tasks = {}
+
+    def record(self, name, duration, queries, task_id=None):
+        with self.lock:
+            entry = self.operations.get(name)
+            if entry is None:
+                entry = self.operations[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'queries': 0}
+            entry['count'] += 1
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            entry['queries'] += queries
+            if task_id in self.tasks:
+                self.tasks[task_id][1] += duration
+
+    def start_task(self, task_id):
+        with self.lock:
+            self.tasks[task_id] = [time.perf_counter(), 0.0]
+
+    def end_task(self, task_id):
+        """
+        Returns the runtime and the monitor time of the task or None, if the start is unknown.
+        """
+        with self.lock:
+            start, monitor_time = self.tasks.pop(task_id, (None, None))
+        if start is not None:
+            return time.perf_counter() - start, monitor_time
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {name: dict(entry) for name, entry in self.operations.items()}
+
+    def reset(self):
+        with self.lock:
+            self.operations.clear()
+            self.tasks.clear()
+
+
+instrumentation = Instrumentation()
+_local = threading.local()
+
+
+@contextmanager
+def measure(name, task_id=None):
+    """
+    Measure the time and count the queries of a monitor operation.
+    The time is added to the monitor time of the given task, if it runs.
+    A nested operation (e.g.: the progress is stored by the "complete" signal) is counted
+    as own operation, but not added to the monitor time of the task twice.
+    """
+    if not instrumentation_enabled():
+        yield
+        return
+
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    counter = QueryCounter()
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(counter):
+            yield
+    finally:
+        _local.depth = depth
+        instrumentation.record(name, time.perf_counter() - start, counter.count, task_id=None if depth else task_id)
+
+
+def start_task_timer(task_id):
+    """
+    Called by the "executing" signal: Sum the monitor time of the task until it ends.
+    """
+    if instrumentation_enabled():
+        instrumentation.start_task(task_id)
+
+
+def check_task_overhead(task_id, task_name):
+    """
+    Warn, if the monitor time is more than settings.HUEY_MONITOR_OVERHEAD_WARNING_FRACTION
+    of the task runtime. Returns the runtime and the monitor time or None.
+    """
+    result = instrumentation.end_task(task_id)
+    if result is None:
+        return None
+
+    runtime, monitor_time = result
+    fraction = getattr(settings, 'HUEY_MONITOR_OVERHEAD_WARNING_FRACTION', OVERHEAD_WARNING_FRACTION)
+    min_runtime = getattr(settings, 'HUEY_MONITOR_OVERHEAD_WARNING_MIN_RUNTIME', OVERHEAD_WARNING_MIN_RUNTIME)
+    if fraction and runtime >= min_runtime and monitor_time > runtime * fraction:
+        logger.warning(
+            'Monitor overhead of task %s %s: %.3f sec. (%.1f%% of the runtime %.3f sec.)',
+            task_name,
+            task_id,
+            monitor_time,
+            monitor_time * 100 / runtime,
+            runtime,
+        )
+    return result
+
+
+def format_overhead(operations) -> list:
+    """
+    >>> format_overhead({'signal': {'count': 4, 'total': 0.1, 'max': 0.04, 'queries': 10}})
+    ['signal: 4 calls, total 0.100 sec., avg 25.0 ms, max 40.0 ms, 2.5 queries/call']
+    """
+    lines = []
+    for name, entry in sorted(operations.items()):
+        count = entry['count']
+        lines.append(
+            f'{name}: {count} calls, total {entry["total"]:.3f} sec.,'
+            f' avg {entry["total"] * 1000 / count:.1f} ms, max {entry["max"] * 1000:.1f} ms,'
+            f' {entry["queries"] / count:.1f} queries/call'
+        )
+    return lines
+
+
+def log_summary():
+    operations = instrumentation.snapshot()
+    if operations:
+        logger.info('Monitor overhead of this process:\n%s', '\n'.join(format_overhead(operations)))
+
+
+def merge_overhead(operations_list) -> dict:
+    """
+    >>> merge_overhead([
+    ...     {'signal': {'count': 1, 'total': 0.5, 'max': 0.5, 'queries': 2}},
+    ...     {'signal': {'count': 2, 'total': 0.5, 'max': 0.3, 'queries': 4}},
+    ... ])
+    {'signal': {'count': 3, 'total': 1.0, 'max': 0.5, 'queries': 6}}
+    """
+    merged = {}
+    for operations in operations_list:
+        for name, entry in operations.items():
+            total = merged.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'queries': 0})
+            total['count'] += entry['count']
+            total['total'] += entry['total']
+            total['max'] = max(total['max'], entry['max'])
+            total['queries'] += entry['queries']
+    return merged
+
+
+METRICS = (
+    ('count', 'huey_monitor_overhead_calls_total', 'counter', 'Number of monitor operations'),
+    ('total', 'huey_monitor_overhead_seconds_total', 'counter', 'Total time of the monitor operations'),
+    ('max', 'huey_monitor_overhead_max_seconds', 'gauge', 'Longest monitor operation'),
+    ('queries', 'huey_monitor_overhead_queries_total', 'counter', 'Number of queries of the monitor operations'),
+)
+
+
+def prometheus_metrics(workers) -> str:
+    """
+    The overhead of the workers in the Prometheus text format.
+
+    >>> from huey_monitor.models import WorkerModel
+    >>> worker = WorkerModel(hostname='host', pid=1, overhead={
+    ...     'signal': {'count': 1, 'total': 0.5, 'max': 0.5, 'queries': 2}
+    ... })
+    >>> print(prometheus_metrics([worker]), end='')
+    # HELP huey_monitor_overhead_calls_total Number of monitor operations
+    # TYPE huey_monitor_overhead_calls_total counter
+    huey_monitor_overhead_calls_total{hostname="host",pid="1",operation="signal"} 1
+    # HELP huey_monitor_overhead_seconds_total Total time of the monitor operations
+    # TYPE huey_monitor_overhead_seconds_total counter
+    huey_monitor_overhead_seconds_total{hostname="host",pid="1",operation="signal"} 0.5
+    # HELP huey_monitor_overhead_max_seconds Longest monitor operation
+    # TYPE huey_monitor_overhead_max_seconds gauge
+    huey_monitor_overhead_max_seconds{hostname="host",pid="1",operation="signal"} 0.5
+    # HELP huey_monitor_overhead_queries_total Number of queries of the monitor operations
+    # TYPE huey_monitor_overhead_queries_total counter
+    huey_monitor_overhead_queries_total{hostname="host",pid="1",operation="signal"} 2
+    """
+    lines = []
+    for key, metric, metric_type, help_text in METRICS:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {metric_type}')
+        for worker in workers:
+            hostname = worker.hostname.replace('\\', '\\\\').replace('"', '\\"')
+            for name, entry in sorted((worker.overhead or {}).items()):
+                lines.append(f'{metric}{{hostname="{hostname}",pid="{worker.pid}",operation="{name}"}} {entry[key]}')
+    return ''.join(f'{line}\n' for line in lines)
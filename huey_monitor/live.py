@@ -0,0 +1,251 @@
+"""
+Changes of the main tasks since a cursor, for the live dashboard in admin:
+
+ * The tasks are selected in "update_dt" order via the keyset index of the task change list.
+ * The progress of the sub tasks doesn't change the main task, see: huey_monitor.sub_task_counts
+   The changed progress shards are selected in their "update_dt" order, too, with their main tasks.
+   So the cursor has two parts: The keys of the last task and of the last progress shard.
+ * "update_dt" is set before the transaction commits: A change may become visible after newer changes.
+   So the changes of the last "HUEY_MONITOR_LIVE_SAFETY_WINDOW" seconds before the cursor are read again,
+   the client skips the tasks it already knows.
+ * The ETag is a hash of the returned task keys: The client gets "304 Not Modified", if nothing changed.
+ * With "wait", the request waits (long-polling) until a task changed after the cursor.
+"""
+
+import datetime
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
+
+from huey_monitor.constants import LIVE_MAX_WAIT, LIVE_PAGE_SIZE, LIVE_POLL_INTERVAL, LIVE_SAFETY_WINDOW
+from huey_monitor.models import SubTaskProgressModel, TaskModel
+from huey_monitor.sub_task_counts import sub_tasks_progress_dt_subquery, sub_tasks_progress_subquery
+
+
+CURSOR_SEPARATOR = ','
+CURSOR_PART_SEPARATOR = ';'
+
+
+def main_tasks():
+    # Uses the partial index "huey_task_main_update_idx":
+    return TaskModel.objects.filter(parent_task__isnull=True)
+
+
+def progress_shards():
+    # Uses the index "huey_sub_task_progress_dt_idx":
+    return SubTaskProgressModel.objects.all()
+
+
+def encode_cursor(cursor) -> str:
+    """
+    >>> import uuid
+    >>> dt = datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+    >>> encode_cursor(((dt, uuid.UUID(int=1)), (dt, 2)))
+    '2024-01-02T03:04:05+00:00,00000000-0000-0000-0000-000000000001;2024-01-02T03:04:05+00:00,2'
+    >>> encode_cursor(((dt, uuid.UUID(int=1)), None))
+    '2024-01-02T03:04:05+00:00,00000000-0000-0000-0000-000000000001;'
+    """
+    parts = []
+    for key in cursor:
+        if key is None:
+            parts.append('')
+        else:
+            update_dt, pk = key
+            parts.append(f'{update_dt.isoformat()}{CURSOR_SEPARATOR}{pk}')
+    return CURSOR_PART_SEPARATOR.join(parts)
+
+
+def _decode_key(value, pk_field):
+    if not value:
+        return None
+    update_dt, pk = value.split(CURSOR_SEPARATOR)
+    update_dt = datetime.datetime.fromisoformat(update_dt)
+    if update_dt.tzinfo is None:
+        raise ValueError('naive datetime')
+    return update_dt, pk_field.to_python(pk)
+
+
+def decode_cursor(cursor) -> tuple:
+    """
+    >>> task_key, progress_key = decode_cursor(
+    ...     '2024-01-02T03:04:05+00:00,00000000-0000-0000-0000-000000000001;2024-01-02T03:04:05+00:00,2'
+    ... )
+    >>> task_key[0]
+    datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+    >>> task_key[1]
+    UUID('00000000-0000-0000-0000-000000000001')
+    >>> progress_key[1]
+    2
+    >>> decode_cursor(';')
+    (None, None)
+    >>> decode_cursor('foo')
+    Traceback (most recent call last):
+      ...
+    django.core.exceptions.ValidationError: ["Invalid cursor: 'foo'"]
+    """
+    try:
+        task_key, progress_key = cursor.split(CURSOR_PART_SEPARATOR)
+        return (
+            _decode_key(task_key, pk_field=TaskModel._meta.pk),
+            _decode_key(progress_key, pk_field=SubTaskProgressModel._meta.pk),
+        )
+    except (ValueError, ValidationError):
+        raise ValidationError(f'Invalid cursor: {cursor!r}')
+
+
+def latest_task_key():
+    """
+    (update_dt, task_id) of the last changed main task or None
+    """
+    return main_tasks().order_by('-update_dt', '-task_id').values_list('update_dt', 'task_id').first()
+
+
+def latest_progress_key():
+    """
+    (update_dt, id) of the last changed progress shard or None
+    """
+    return progress_shards().order_by('-update_dt', '-id').values_list('update_dt', 'id').first()
+
+
+def latest_key():
+    """
+    The cursor of the last changes: (task key, progress key)
+    """
+    return latest_task_key(), latest_progress_key()
+
+
+def is_after(key, cursor_key) -> bool:
+    """
+    >>> is_after((2, 1), (1, 5)), is_after((1, 5), (1, 5)), is_after((1, 5), None), is_after(None, None)
+    (True, False, True, False)
+    """
+    return key is not None and (cursor_key is None or key > cursor_key)
+
+
+def get_etag(data) -> str:
+    """
+    The ETag of the changes: The cursor and the keys of all returned tasks.
+    """
+    value = ' '.join([str(data['cursor'])] + [f'{task["task_id"]}@{task["update_dt"]}' for task in data['tasks']])
+    return '"%s"' % hashlib.md5(value.encode(), usedforsecurity=False).hexdigest()
+
+
+def wait_for_change(cursor, wait):
+    """
+    Poll the last changes, until a task or a progress changed after the cursor or "wait" seconds are elapsed.
+    """
+    poll_interval = getattr(settings, 'HUEY_MONITOR_LIVE_POLL_INTERVAL', LIVE_POLL_INTERVAL)
+    wait = min(wait, getattr(settings, 'HUEY_MONITOR_LIVE_MAX_WAIT', LIVE_MAX_WAIT))
+    deadline = time.monotonic() + wait
+    task_key, progress_key = cursor
+    while True:
+        if is_after(latest_task_key(), task_key) or is_after(latest_progress_key(), progress_key):
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(poll_interval, remaining))
+
+
+def changed_dt(task):
+    """
+    The last change of the main task itself or of the progress of its sub tasks.
+    """
+    sub_tasks_progress_dt = getattr(task, 'sub_tasks_progress_dt', None)
+    if sub_tasks_progress_dt is None:
+        return task.update_dt
+    return max(task.update_dt, sub_tasks_progress_dt)
+
+
+def task_data(task) -> dict:
+    return {
+        'task_id': str(task.task_id),
+        'name': task.name,
+        'desc': task.desc,
+        'state': task.state.signal_name if task.state_id else None,
+        'finished': task.finished,
+        'progress': task.human_progress_string() or None,
+        'percentage': task.human_percentage(),
+        'throughput': task.human_throughput(),
+        'eta': task.human_eta(),
+        'update_dt': changed_dt(task).isoformat(),
+        'url': reverse('admin:huey_monitor_taskmodel_change', args=(task.task_id,)),
+    }
+
+
+def keyset_changes(qs, pk_name, cursor_key, limit):
+    """
+    The objects changed in the safety window before the cursor key and max. "limit" changed after it,
+    both in "update_dt" order. Returns: (window objects, objects after the cursor, more)
+    """
+    if cursor_key is None:
+        objects = list(qs.order_by('update_dt', pk_name)[: limit + 1])
+        return [], objects[:limit], len(objects) > limit
+
+    update_dt, pk = cursor_key
+    after_cursor = Q(update_dt__gt=update_dt) | Q(update_dt=update_dt, **{f'{pk_name}__gt': pk})
+    safety_window = getattr(settings, 'HUEY_MONITOR_LIVE_SAFETY_WINDOW', LIVE_SAFETY_WINDOW)
+    window_qs = qs.filter(update_dt__gt=update_dt - datetime.timedelta(seconds=safety_window))
+    window_objects = list(window_qs.exclude(after_cursor).order_by('-update_dt', f'-{pk_name}')[:limit])
+    window_objects.reverse()
+
+    objects = list(qs.filter(after_cursor).order_by('update_dt', pk_name)[: limit + 1])
+    return window_objects, objects[:limit], len(objects) > limit
+
+
+def get_changes(cursor=None, limit=LIVE_PAGE_SIZE) -> dict:
+    """
+    All main tasks changed after the cursor, the oldest change first,
+    after the tasks changed in the safety window before the cursor (They may be committed late).
+    Both: Changed by themselves or by the progress of their sub tasks.
+    Without a cursor: The last changed tasks.
+    """
+    # The live progress of all sub tasks with the same query:
+    qs = (
+        main_tasks()
+        .select_related('state')
+        .annotate(
+            sub_tasks_progress=sub_tasks_progress_subquery(),
+            sub_tasks_progress_dt=sub_tasks_progress_dt_subquery(),
+        )
+    )
+    if cursor is None:
+        tasks = list(qs.order_by('-update_dt', '-task_id')[:limit])
+        tasks.reverse()
+        more = False
+        task_key = (tasks[-1].update_dt, tasks[-1].task_id) if tasks else None
+        # Only the progress changes after now:
+        progress_key = latest_progress_key()
+    else:
+        task_key, progress_key = cursor
+        window_tasks, tasks, more = keyset_changes(qs, 'task_id', task_key, limit)
+        if tasks:
+            task_key = (tasks[-1].update_dt, tasks[-1].task_id)
+        # The tasks of the safety window don't move the cursor back:
+        tasks = window_tasks + tasks
+
+        shards = progress_shards().only('id', 'main_task', 'update_dt')
+        window_shards, shards, more_shards = keyset_changes(shards, 'id', progress_key, limit)
+        if shards:
+            progress_key = (shards[-1].update_dt, shards[-1].id)
+        more = more or more_shards
+
+        task_ids = {task.task_id for task in tasks}
+        main_task_ids = {shard.main_task_id for shard in window_shards + shards} - task_ids
+        if main_task_ids:
+            tasks.extend(qs.filter(task_id__in=main_task_ids))
+        tasks.sort(key=lambda task: (changed_dt(task), task.task_id))
+
+    if task_key is None and progress_key is None:
+        cursor = None
+    else:
+        cursor = encode_cursor((task_key, progress_key))
+    return {
+        'cursor': cursor,
+        'more': more,
+        'tasks': [task_data(task) for task in tasks],
+    }
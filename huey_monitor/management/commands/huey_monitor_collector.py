@@ -0,0 +1,106 @@
+import logging
+import time
+
+from django.core.management import BaseCommand
+from django.db import InterfaceError, OperationalError, close_old_connections
+
+from huey_monitor.collector import connection_lost, get_collector_storage, pop_events, store_events
+from huey_monitor.constants import COLLECTOR_RETRIES
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Store the monitor events of the Huey workers (Needs: settings.HUEY_MONITOR_SIGNAL_COLLECTOR = True)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Maximum number of events stored at once (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait if the queue is empty (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=COLLECTOR_RETRIES,
+            help=(
+                'Retries of failing events, if the database connection is still usable.'
+                ' Afterwards, the events are stored one by one (default: %(default)s)'
+            ),
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Store all waiting events and exit',
+        )
+
+    def handle(self, *args, batch_size, sleep, retries, once, **options):
+        storage = get_collector_storage()
+        self.stdout.write(f'Collect monitor events from queue {storage.name!r}...')
+
+        total_count = 0
+        try:
+            while True:
+                events = pop_events(max_count=batch_size)
+                if events:
+                    self.store(events, sleep=sleep, retries=retries)
+                    total_count += len(events)
+                elif once:
+                    break
+                elif not storage.blocking:
+                    time.sleep(sleep)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(f'{total_count} events stored.')
+
+    def store(self, events, sleep, retries):
+        """
+        Store the events. Retry on database connection problems, so that no event is lost.
+        Other database errors (e.g. a lock timeout) are retried only "retries" times.
+        If the events can't be stored, they are stored one by one:
+        Only the failing events are skipped and the collector keeps running.
+        """
+        attempts = 0
+        while True:
+            # We run outside of the request/response cycle: Take care of broken connections
+            close_old_connections()
+            try:
+                store_events(events)
+            except (InterfaceError, OperationalError) as err:
+                if connection_lost():
+                    logger.error('Failed to store %i events (retry in %s sec.): %s', len(events), sleep, err)
+                elif attempts < retries:
+                    attempts += 1
+                    logger.error(
+                        'Failed to store %i events (retry %i/%i in %s sec.): %s',
+                        len(events),
+                        attempts,
+                        retries,
+                        sleep,
+                        err,
+                    )
+                else:
+                    error = err
+                    break
+                time.sleep(sleep)
+            except Exception as err:
+                error = err
+                break
+            else:
+                return
+
+        if len(events) == 1:
+            logger.error('Skip monitor event %r', events[0], exc_info=error)
+            return
+        logger.error('Failed to store %i events: Store them one by one', len(events), exc_info=error)
+        for event in events:
+            self.store([event], sleep=sleep, retries=retries)
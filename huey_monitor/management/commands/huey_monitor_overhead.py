@@ -0,0 +1,56 @@
+import json
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from huey_monitor.instrumentation import format_overhead, merge_overhead
+from huey_monitor.models import WorkerModel
+from huey_monitor.workers import alive_workers
+
+
+class Command(BaseCommand):
+    help = 'Display the overhead of the monitor (time and queries of its database writes) per worker process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            dest='all_workers',
+            help='Include stopped and dead workers (default: only alive workers)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            dest='as_json',
+            help='Output the values as JSON',
+        )
+
+    def handle(self, *args, all_workers, as_json, **options):
+        if all_workers:
+            qs = WorkerModel.objects.all()
+        else:
+            qs = alive_workers(timezone.now())
+        workers = list(qs.filter(overhead__isnull=False).order_by('hostname', 'pid'))
+        total = merge_overhead(worker.overhead for worker in workers)
+
+        if as_json:
+            data = {
+                'workers': [
+                    {'hostname': worker.hostname, 'pid': worker.pid, 'overhead': worker.overhead} for worker in workers
+                ],
+                'total': total,
+            }
+            self.stdout.write(json.dumps(data, indent=2, sort_keys=True))
+            return
+
+        if not workers:
+            self.stdout.write('No overhead stored. (The values are stored by the heartbeat of the workers)')
+            return
+
+        for worker in workers:
+            self.stdout.write(f'{worker}:')
+            for line in format_overhead(worker.overhead):
+                self.stdout.write(f'    {line}')
+        self.stdout.write(f'Total of {len(workers)} workers:')
+        for line in format_overhead(total):
+            self.stdout.write(f'    {line}')
@@ -0,0 +1,66 @@
+from django.core.management import BaseCommand, CommandError
+
+from huey_monitor.constants import PRUNE_CHUNK_SIZE
+from huey_monitor.prune import RetentionRules, prune
+
+
+def parse_rule(value):
+    try:
+        key, days = value.rsplit('=', 1)
+        return key, int(days)
+    except ValueError:
+        raise CommandError(f'Invalid rule {value!r} (expected: "<name>=<days>")')
+
+
+class Command(BaseCommand):
+    help = 'Delete old, ended tasks with all sub tasks and signals. (Default rules: settings.HUEY_MONITOR_PRUNE_RULES)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Keep ended tasks this number of days, if no other rule matches',
+        )
+        parser.add_argument(
+            '--state',
+            action='append',
+            default=[],
+            metavar='SIGNAL_NAME=DAYS',
+            help='Retention for tasks by the last signal, e.g.: --state complete=7 (can be repeated)',
+        )
+        parser.add_argument(
+            '--task-name',
+            action='append',
+            default=[],
+            metavar='TASK_NAME=DAYS',
+            help='Retention for tasks by name, e.g.: --task-name my_task=90 (can be repeated)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=PRUNE_CHUNK_SIZE,
+            help='Number of tasks deleted in one transaction (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to wait between two chunks (default: %(default)s)',
+        )
+
+    def handle(self, *args, days, state, task_name, chunk_size, sleep, **options):
+        if days is None and not state and not task_name:
+            rules = RetentionRules.from_settings()
+        else:
+            rules = RetentionRules(
+                default_days=days,
+                state_days=dict(parse_rule(value) for value in state),
+                task_name_days=dict(parse_rule(value) for value in task_name),
+            )
+        if not rules:
+            raise CommandError('No retention rules given: Use the arguments or settings.HUEY_MONITOR_PRUNE_RULES')
+
+        self.stdout.write(f'Prune with {rules!r}...')
+        result = prune(rules, chunk_size=chunk_size, sleep=sleep)
+        self.stdout.write(str(result))
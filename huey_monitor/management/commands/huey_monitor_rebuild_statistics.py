@@ -0,0 +1,52 @@
+import argparse
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from huey_monitor.constants import STATISTICS_CHUNK_SIZE
+from huey_monitor.statistics import rebuild_statistics
+
+
+def parse_dt(value):
+    """
+    Parse a date or date with time, e.g.: "2024-01-31" or "2024-01-31 12:00"
+    """
+    dt = parse_datetime(value)
+    if dt is None:
+        raise argparse.ArgumentTypeError(f'Invalid date {value!r} (expected e.g.: "2024-01-31" or "2024-01-31 12:00")')
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the hourly task statistics from the stored signals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=parse_dt,
+            default=None,
+            help='Rebuild the statistics since this date (default: since the oldest signal)',
+        )
+        parser.add_argument(
+            '--end',
+            type=parse_dt,
+            default=None,
+            help='Rebuild the statistics until this date (default: until now)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=STATISTICS_CHUNK_SIZE,
+            help='Number of signals processed in one transaction (default: %(default)s)',
+        )
+
+    def handle(self, *args, start, end, chunk_size, **options):
+        if start is not None and end is not None and start >= end:
+            raise CommandError('The start must be before the end!')
+
+        self.stdout.write(f'Rebuild statistics from {start or "the beginning"} until {end or "now"}...')
+        count = rebuild_statistics(start=start, end=end, chunk_size=chunk_size)
+        self.stdout.write(f'{count} ended task signals processed.')
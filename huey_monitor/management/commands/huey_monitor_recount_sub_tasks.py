@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+
+from huey_monitor.constants import SUB_TASKS_RECOUNT_CHUNK_SIZE
+from huey_monitor.sub_task_counts import recount_sub_tasks
+
+
+class Command(BaseCommand):
+    help = 'Count the sub tasks of all main tasks again and correct their counters and progress.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SUB_TASKS_RECOUNT_CHUNK_SIZE,
+            help='Number of main tasks checked in one transaction (default: %(default)s)',
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        self.stdout.write('Recount sub tasks...')
+        count = recount_sub_tasks(chunk_size=chunk_size)
+        self.stdout.write(f'{count} main tasks corrected.')
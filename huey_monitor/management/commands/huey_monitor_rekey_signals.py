@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+
+from huey_monitor.constants import REKEY_CHUNK_SIZE
+from huey_monitor.rekey import rekey_signals
+
+
+class Command(BaseCommand):
+    help = 'Replace the random primary keys of old signals by time-ordered keys (UUID version 7).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=REKEY_CHUNK_SIZE,
+            help='Number of signals changed in one transaction (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to wait between two chunks (default: %(default)s)',
+        )
+
+    def handle(self, *args, chunk_size, sleep, **options):
+        self.stdout.write('Rekey signals...')
+        count = rekey_signals(chunk_size=chunk_size, sleep=sleep)
+        self.stdout.write(f'{count} signals changed.')
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('huey_monitor', '0012_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='signalinfomodel',
+            name='create_dt',
+            field=models.DateTimeField(
+                editable=False, help_text='(will be set automatically)', verbose_name='Create date'
+            ),
+        ),
+    ]
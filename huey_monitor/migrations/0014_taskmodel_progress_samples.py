@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0013_signal_create_dt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskmodel',
+            name='progress_samples',
+            field=models.BinaryField(blank=True, help_text='The last progress counts with their timestamps (packed, see: huey_monitor.progress_samples)', null=True, verbose_name='Progress Samples'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0014_taskmodel_progress_samples'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='signalinfomodel',
+            index=models.Index(fields=['task', 'signal_name', 'create_dt'], name='huey_signal_task_name_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signalinfomodel',
+            index=models.Index(fields=['-create_dt'], name='huey_signal_create_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signalinfomodel',
+            index=models.Index(fields=['signal_name'], name='huey_signal_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskmodel',
+            index=models.Index(condition=models.Q(('parent_task__isnull', True)), fields=['-update_dt'], name='huey_task_main_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskmodel',
+            index=models.Index(fields=['parent_task', '-create_dt'], name='huey_task_parent_create_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskmodel',
+            index=models.Index(fields=['name'], name='huey_task_name_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:34
+
+from django.db import migrations, models, transaction
+from django.db.models import DurationField, ExpressionWrapper, F, OuterRef, Subquery
+
+
+# huey_monitor.constants.ENDED_HUEY_SIGNALS and the pseudo signal of the startup handler:
+ENDED_SIGNAL_NAMES = ('canceled', 'complete', 'error', 'expired', 'revoked', 'interrupted', 'unknown')
+CHUNK_SIZE = 1000
+
+
+def backfill_execution_times(apps, schema_editor):
+    """
+    Set executing_dt, ended_dt and duration from the stored signals,
+    chunk by chunk in short transactions.
+    """
+    SignalInfoModel = apps.get_model('huey_monitor', 'SignalInfoModel')
+    TaskModel = apps.get_model('huey_monitor', 'TaskModel')
+
+    def last_signal_dt(signal_names):
+        return Subquery(
+            SignalInfoModel.objects.filter(task_id=OuterRef('task_id'), signal_name__in=signal_names)
+            .order_by('-create_dt')
+            .values('create_dt')[:1]
+        )
+
+    qs = TaskModel.objects.order_by('pk').values_list('pk', flat=True)
+    chunk_qs = qs
+    while True:
+        task_ids = list(chunk_qs[:CHUNK_SIZE])
+        if not task_ids:
+            break
+
+        with transaction.atomic():
+            chunk = TaskModel.objects.filter(pk__in=task_ids)
+            chunk.update(
+                executing_dt=last_signal_dt(['executing']),
+                ended_dt=last_signal_dt(ENDED_SIGNAL_NAMES),
+            )
+            # The last execution is still running:
+            chunk.filter(ended_dt__lt=F('executing_dt')).update(ended_dt=None)
+            chunk.filter(executing_dt__isnull=False, ended_dt__isnull=False).update(
+                duration=ExpressionWrapper(F('ended_dt') - F('executing_dt'), output_field=DurationField())
+            )
+
+        chunk_qs = qs.filter(pk__gt=task_ids[-1])
+
+
+class Migration(migrations.Migration):
+    """
+    Not atomic: The backfill commits every chunk, to keep the locks of large task tables short.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('huey_monitor', '0015_monitor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskmodel',
+            name='duration',
+            field=models.DurationField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text='Runtime of the last execution (will be set automatically)',
+                null=True,
+                verbose_name='Duration',
+            ),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='ended_dt',
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text='End of the last execution (will be set automatically)',
+                null=True,
+                verbose_name='End date',
+            ),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='executing_dt',
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text='Start of the last execution (will be set automatically)',
+                null=True,
+                verbose_name='Executing date',
+            ),
+        ),
+        migrations.RunPython(backfill_execution_times, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0016_taskmodel_execution_times'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatisticsModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, verbose_name='Task name')),
+                ('hour', models.DateTimeField(help_text='Start of the hour in which the tasks ended', verbose_name='Hour')),
+                ('ended_count', models.PositiveIntegerField(default=0, help_text='Number of ended tasks (complete, error, revoked, etc.) incl. retries', verbose_name='Ended')),
+                ('complete_count', models.PositiveIntegerField(default=0, verbose_name='Complete')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Errors')),
+                ('duration_count', models.PositiveIntegerField(default=0, help_text='Number of executions with a known duration', verbose_name='Duration count')),
+                ('duration_sum', models.FloatField(default=0, help_text='Sum of all durations in seconds', verbose_name='Duration sum')),
+                ('duration_max', models.FloatField(blank=True, help_text='Longest duration in seconds', null=True, verbose_name='Duration max')),
+                ('duration_histogram', models.BinaryField(blank=True, help_text='The durations as log-bucket histogram (packed, see: huey_monitor.histogram)', null=True, verbose_name='Duration histogram')),
+            ],
+            options={
+                'verbose_name': 'Task statistics',
+                'verbose_name_plural': 'Task statistics',
+                'indexes': [models.Index(fields=['hour'], name='huey_statistics_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('name', 'hour'), name='huey_statistics_name_hour_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0017_task_statistics'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='signalinfomodel',
+            name='huey_signal_create_dt_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='taskmodel',
+            name='huey_task_main_update_idx',
+        ),
+        migrations.AddIndex(
+            model_name='signalinfomodel',
+            index=models.Index(fields=['-create_dt', '-id'], name='huey_signal_create_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskmodel',
+            index=models.Index(condition=models.Q(('parent_task__isnull', True)), fields=['-update_dt', '-task_id'], name='huey_task_main_update_idx'),
+        ),
+    ]
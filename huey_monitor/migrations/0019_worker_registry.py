@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0018_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hostname', models.CharField(max_length=128, verbose_name='Hostname')),
+                ('pid', models.PositiveIntegerField(verbose_name='PID')),
+                ('started_dt', models.DateTimeField(help_text='Start of the worker process (Tasks executed before belongs to a previous process)', verbose_name='Start date')),
+                ('heartbeat_dt', models.DateTimeField(db_index=True, help_text='Last sign of life', verbose_name='Heartbeat')),
+                ('stopped_dt', models.DateTimeField(blank=True, help_text='Set if the worker process shut down properly', null=True, verbose_name='Stop date')),
+            ],
+            options={
+                'verbose_name': 'Worker',
+                'verbose_name_plural': 'Workers',
+                'constraints': [models.UniqueConstraint(fields=('hostname', 'pid'), name='huey_worker_hostname_pid_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery
+
+from huey_monitor.exception_groups import get_fingerprint
+
+
+CHUNK_SIZE = 1000
+
+
+def backfill_exception_groups(apps, schema_editor):
+    """
+    Group the exceptions of all existing signals. The stored exceptions are kept as they are.
+    """
+    SignalInfoModel = apps.get_model('huey_monitor', 'SignalInfoModel')
+    ExceptionGroupModel = apps.get_model('huey_monitor', 'ExceptionGroupModel')
+
+    qs = (
+        SignalInfoModel.objects.filter(exception__gt='', exception_group__isnull=True)
+        .select_related('task')
+        .order_by('create_dt')
+        .only('id', 'exception', 'exception_line', 'create_dt', 'task__name')
+    )
+    while True:
+        signals = list(qs[:CHUNK_SIZE])
+        if not signals:
+            break
+
+        groups = {}
+        for signal in signals:
+            fingerprint, exception_type = get_fingerprint(signal.exception)
+            groups.setdefault(
+                fingerprint,
+                ExceptionGroupModel(
+                    fingerprint=fingerprint,
+                    exception_type=exception_type[:255],
+                    exception_line=signal.exception_line,
+                    traceback=signal.exception,
+                    task_name=signal.task.name,
+                    first_seen_dt=signal.create_dt,
+                    last_seen_dt=signal.create_dt,
+                ),
+            )
+        ExceptionGroupModel.objects.bulk_create(groups.values(), ignore_conflicts=True)
+        group_ids = dict(
+            ExceptionGroupModel.objects.filter(fingerprint__in=list(groups)).values_list('fingerprint', 'pk')
+        )
+        for signal in signals:
+            signal.exception_group_id = group_ids[get_fingerprint(signal.exception)[0]]
+        SignalInfoModel.objects.bulk_update(signals, fields=('exception_group',))
+
+    # Set the counters and timestamps of all groups:
+    def aggregate(function):
+        return Subquery(
+            SignalInfoModel.objects.filter(exception_group_id=OuterRef('pk'))
+            .order_by()
+            .values('exception_group_id')
+            .annotate(value=function)
+            .values('value')[:1]
+        )
+
+    ExceptionGroupModel.objects.update(
+        occurrence_count=aggregate(Count('id', output_field=IntegerField())),
+        first_seen_dt=aggregate(Min('create_dt')),
+        last_seen_dt=aggregate(Max('create_dt')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0019_worker_registry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExceptionGroupModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(help_text='SHA256 of the exception types and the stack frames (without line numbers and messages)', max_length=64, unique=True, verbose_name='Fingerprint')),
+                ('exception_type', models.CharField(max_length=255, verbose_name='Exception type')),
+                ('exception_line', models.TextField(blank=True, help_text='The message of the last occurrence', verbose_name='Exception Line')),
+                ('traceback', models.TextField(help_text='Full information of the first occurrence', verbose_name='Traceback')),
+                ('task_name', models.CharField(help_text='The task of the last occurrence', max_length=128, verbose_name='Task name')),
+                ('occurrence_count', models.PositiveIntegerField(default=0, verbose_name='Occurrences')),
+                ('first_seen_dt', models.DateTimeField(verbose_name='First seen')),
+                ('last_seen_dt', models.DateTimeField(db_index=True, verbose_name='Last seen')),
+            ],
+            options={
+                'verbose_name': 'Exception group',
+                'verbose_name_plural': 'Exception groups',
+            },
+        ),
+        migrations.AlterField(
+            model_name='signalinfomodel',
+            name='exception',
+            field=models.TextField(blank=True, help_text='Full information of a exception (if not stored in the exception group)', null=True, verbose_name='Exception'),
+        ),
+        migrations.AddField(
+            model_name='signalinfomodel',
+            name='exception_group',
+            field=models.ForeignKey(blank=True, help_text='All equal exceptions are grouped by their fingerprint', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='signals', to='huey_monitor.exceptiongroupmodel', verbose_name='Exception group'),
+        ),
+        migrations.RunPython(backfill_exception_groups, reverse_code=migrations.RunPython.noop),
+    ]
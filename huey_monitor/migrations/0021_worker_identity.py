@@ -0,0 +1,146 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:58
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+
+# huey_monitor.constants.SIGNAL_CODES at the time of this migration:
+SIGNAL_CODES = {
+    'enqueued': 1,
+    'executing': 2,
+    'complete': 3,
+    'error': 4,
+    'retrying': 5,
+    'revoked': 6,
+    'expired': 7,
+    'locked': 8,
+    'canceled': 9,
+    'interrupted': 10,
+    'scheduled': 11,
+    'timeout': 12,
+    'rate-limited': 13,
+    'unknown': 14,
+}
+CHUNK_SIZE = 1000
+
+
+def convert_signals(apps, schema_editor):
+    """
+    Set the worker identity and the signal code of all existing signals,
+    chunk by chunk in short transactions.
+    The old columns will be removed in the next migration.
+    """
+    SignalInfoModel = apps.get_model('huey_monitor', 'SignalInfoModel')
+    WorkerIdentityModel = apps.get_model('huey_monitor', 'WorkerIdentityModel')
+
+    # There are only a few different identities:
+    identities = SignalInfoModel.objects.order_by().values_list('hostname', 'pid', 'thread').distinct()
+    with transaction.atomic():
+        WorkerIdentityModel.objects.bulk_create(
+            [WorkerIdentityModel(hostname=hostname, pid=pid, thread=thread) for hostname, pid, thread in identities],
+            ignore_conflicts=True,
+        )
+    identity_ids = {
+        (hostname, pid, thread): pk
+        for pk, hostname, pid, thread in WorkerIdentityModel.objects.values_list('pk', 'hostname', 'pid', 'thread')
+    }
+
+    def convert_chunk(signals):
+        for signal in signals:
+            identity = (signal.hostname, signal.pid, signal.thread)
+            if identity not in identity_ids:
+                worker, _ = WorkerIdentityModel.objects.get_or_create(
+                    hostname=signal.hostname, pid=signal.pid, thread=signal.thread
+                )
+                identity_ids[identity] = worker.pk
+            signal.worker_id = identity_ids[identity]
+            # Signals of Huey versions unknown to us are mapped to the "unknown" pseudo signal:
+            signal.signal_code = SIGNAL_CODES.get(signal.signal_name, SIGNAL_CODES['unknown'])
+        SignalInfoModel.objects.bulk_update(signals, fields=('worker', 'signal_code'))
+
+    qs = SignalInfoModel.objects.order_by('pk').only('pk', 'hostname', 'pid', 'thread', 'signal_name')
+    chunk_qs = qs
+    while True:
+        with transaction.atomic():
+            signals = list(chunk_qs[:CHUNK_SIZE])
+            if not signals:
+                break
+            convert_chunk(signals)
+
+        chunk_qs = qs.filter(pk__gt=signals[-1].pk)
+
+    # Signals that are stored by running workers behind the chunk cursor:
+    while True:
+        with transaction.atomic():
+            signals = list(qs.filter(worker__isnull=True)[:CHUNK_SIZE])
+            if not signals:
+                break
+            convert_chunk(signals)
+
+
+class Migration(migrations.Migration):
+    """
+    Note: The columns are removed in the next migration: PostgreSQL can't alter a table
+    with pending (deferred) foreign key checks in the same transaction.
+    Not atomic: The conversion commits every chunk, to keep the locks of large signal tables short.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('huey_monitor', '0020_exception_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerIdentityModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                (
+                    'hostname',
+                    models.CharField(
+                        help_text='Hostname of the machine that creates the Signals',
+                        max_length=128,
+                        verbose_name='Hostname',
+                    ),
+                ),
+                (
+                    'pid',
+                    models.PositiveIntegerField(help_text='Process ID that creates the Signals', verbose_name='PID'),
+                ),
+                (
+                    'thread',
+                    models.CharField(
+                        help_text='Name of the thread that creates the Signals',
+                        max_length=128,
+                        verbose_name='Thread Name',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Worker identity',
+                'verbose_name_plural': 'Worker identities',
+                'constraints': [
+                    models.UniqueConstraint(fields=('hostname', 'pid', 'thread'), name='huey_worker_identity_uniq')
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='signalinfomodel',
+            name='worker',
+            field=models.ForeignKey(
+                null=True,
+                help_text='Host, process and thread that creates this Signal',
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name='signals',
+                to='huey_monitor.workeridentitymodel',
+                verbose_name='Worker',
+            ),
+        ),
+        migrations.AddField(
+            model_name='signalinfomodel',
+            name='signal_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(convert_signals, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import huey_monitor.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0021_worker_identity'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='signalinfomodel',
+            name='huey_signal_task_name_dt_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='signalinfomodel',
+            name='huey_signal_name_idx',
+        ),
+        migrations.RemoveField(
+            model_name='signalinfomodel',
+            name='hostname',
+        ),
+        migrations.RemoveField(
+            model_name='signalinfomodel',
+            name='pid',
+        ),
+        migrations.RemoveField(
+            model_name='signalinfomodel',
+            name='thread',
+        ),
+        migrations.RemoveField(
+            model_name='signalinfomodel',
+            name='signal_name',
+        ),
+        migrations.RenameField(
+            model_name='signalinfomodel',
+            old_name='signal_code',
+            new_name='signal_name',
+        ),
+        migrations.AlterField(
+            model_name='signalinfomodel',
+            name='signal_name',
+            field=huey_monitor.models.SignalNameField(help_text='Name of the signal', verbose_name='Signal Name'),
+        ),
+        migrations.AlterField(
+            model_name='signalinfomodel',
+            name='worker',
+            field=models.ForeignKey(help_text='Host, process and thread that creates this Signal', on_delete=django.db.models.deletion.PROTECT, related_name='signals', to='huey_monitor.workeridentitymodel', verbose_name='Worker'),
+        ),
+        migrations.AddIndex(
+            model_name='signalinfomodel',
+            index=models.Index(fields=['task', 'signal_name', 'create_dt'], name='huey_signal_task_name_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signalinfomodel',
+            index=models.Index(fields=['signal_name'], name='huey_signal_name_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:01
+
+import huey_monitor.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0022_compact_signals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='signalinfomodel',
+            name='id',
+            field=models.UUIDField(default=huey_monitor.uuid7.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0023_signal_uuid7'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueSampleModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(0, 'Raw'), (60, 'Minute'), (3600, 'Hour')], default=0, help_text='Raw sample or size of the aggregated time range in seconds', verbose_name='Resolution')),
+                ('sample_dt', models.DateTimeField(help_text='Time of a raw sample or start of the aggregated time range', verbose_name='Sample date')),
+                ('sample_count', models.PositiveIntegerField(default=1, help_text='Number of aggregated raw samples', verbose_name='Sample count')),
+                ('duration', models.FloatField(default=0, help_text='Seconds covered by the enqueued/executed counts', verbose_name='Duration')),
+                ('pending', models.FloatField(help_text='(Average) number of pending tasks', verbose_name='Pending')),
+                ('pending_max', models.PositiveIntegerField(verbose_name='Pending max.')),
+                ('scheduled', models.FloatField(help_text='(Average) number of scheduled tasks', verbose_name='Scheduled')),
+                ('result', models.FloatField(help_text='(Average) number of stored results', verbose_name='Results')),
+                ('enqueued_count', models.PositiveIntegerField(default=0, help_text='Number of enqueued tasks in this time range', verbose_name='Enqueued')),
+                ('executed_count', models.PositiveIntegerField(default=0, help_text='Number of started task executions in this time range', verbose_name='Executed')),
+                ('redis_memory', models.BigIntegerField(blank=True, help_text='(Max.) used memory of the Redis server in bytes', null=True, verbose_name='Redis memory')),
+                ('redis_keys', models.BigIntegerField(blank=True, help_text='(Max.) number of keys in the Redis database', null=True, verbose_name='Redis keys')),
+            ],
+            options={
+                'verbose_name': 'Queue sample',
+                'verbose_name_plural': 'Queue samples',
+                'constraints': [models.UniqueConstraint(fields=('resolution', 'sample_dt'), name='huey_queue_sample_uniq')],
+            },
+        ),
+    ]
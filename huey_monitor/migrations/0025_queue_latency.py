@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0024_queue_samples'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='taskstatisticsmodel',
+            name='huey_statistics_name_hour_uniq',
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='enqueued_dt',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Last time the task was put into the queue (will be set automatically)', null=True, verbose_name='Enqueued date'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='queue_latency',
+            field=models.DurationField(blank=True, editable=False, help_text='Time the last execution waits in the queue (will be set automatically)', null=True, verbose_name='Queue latency'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='hostname',
+            field=models.CharField(default='', help_text='Host of the worker, that executed the tasks', max_length=128, verbose_name='Hostname'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='latency_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of executions with a known queue latency', verbose_name='Latency count'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='latency_histogram',
+            field=models.BinaryField(blank=True, help_text='The queue latencies as log-bucket histogram (packed, see: huey_monitor.histogram)', null=True, verbose_name='Latency histogram'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='latency_max',
+            field=models.FloatField(blank=True, help_text='Longest queue latency in seconds', null=True, verbose_name='Latency max'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='latency_sum',
+            field=models.FloatField(default=0, help_text='Sum of all queue latencies (enqueued -> executing) in seconds', verbose_name='Latency sum'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatisticsmodel',
+            constraint=models.UniqueConstraint(fields=('name', 'hostname', 'hour'), name='huey_statistics_name_host_hour_uniq'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0025_queue_latency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskmodel',
+            name='cpu_system_time',
+            field=models.FloatField(blank=True, editable=False, help_text='CPU time in kernel mode of the last execution in seconds (will be set automatically)', null=True, verbose_name='CPU system time'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='cpu_user_time',
+            field=models.FloatField(blank=True, editable=False, help_text='CPU time in user mode of the last execution in seconds (will be set automatically)', null=True, verbose_name='CPU user time'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='io_read_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Bytes read from the storage by the last execution (will be set automatically)', null=True, verbose_name='Read bytes'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='io_write_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Bytes written to the storage by the last execution (will be set automatically)', null=True, verbose_name='Written bytes'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='max_rss',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Peak memory (resident set size) of the worker process in bytes (will be set automatically)', null=True, verbose_name='Peak RSS'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='cpu_time_max',
+            field=models.FloatField(blank=True, help_text='Longest CPU time in seconds', null=True, verbose_name='CPU time max'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='cpu_time_sum',
+            field=models.FloatField(default=0, help_text='Sum of the CPU times (user + system) in seconds', verbose_name='CPU time sum'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='io_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of executions with known I/O bytes (Linux only)', verbose_name='I/O count'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='io_read_sum',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Read bytes sum'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='io_write_sum',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Written bytes sum'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='max_rss_max',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Highest peak RSS in bytes', null=True, verbose_name='Peak RSS max'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='max_rss_sum',
+            field=models.PositiveBigIntegerField(default=0, help_text='Sum of the peak RSS of the worker processes at the end of the executions in bytes', verbose_name='Peak RSS sum'),
+        ),
+        migrations.AddField(
+            model_name='taskstatisticsmodel',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of executions with a known resource usage', verbose_name='Resource usage count'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0026_resource_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workermodel',
+            name='overhead',
+            field=models.JSONField(blank=True, editable=False, help_text='Count, time and queries of the monitor operations, see: huey_monitor.instrumentation', null=True, verbose_name='Monitor overhead'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0027_worker_overhead'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='taskmodel',
+            name='huey_task_main_update_idx',
+        ),
+        migrations.AddIndex(
+            model_name='taskmodel',
+            index=models.Index(condition=models.Q(('parent_task__isnull', True)), fields=['parent_task', '-update_dt', '-task_id'], name='huey_task_main_update_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_sub_task_counts(apps, schema_editor):
+    """
+    Count the existing sub tasks of all main tasks.
+    (Their progress is added to the progress shards by the next migration)
+    """
+    TaskModel = apps.get_model('huey_monitor', 'TaskModel')
+
+    def sub_tasks(aggregate, **filters):
+        qs = TaskModel.objects.filter(parent_task=OuterRef('task_id'), **filters).order_by()
+        return Coalesce(Subquery(qs.values('parent_task').annotate(value=aggregate).values('value')), 0)
+
+    main_task_ids = TaskModel.objects.filter(parent_task__isnull=False).values('parent_task')
+    TaskModel.objects.filter(task_id__in=main_task_ids).update(
+        sub_tasks_total=sub_tasks(Count('*')),
+        sub_tasks_running=sub_tasks(Count('*'), state__signal_name='executing'),
+        sub_tasks_complete=sub_tasks(Count('*'), state__signal_name='complete'),
+        sub_tasks_error=sub_tasks(Count('*'), state__signal_name='error'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0028_main_task_index_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskmodel',
+            name='sub_tasks_complete',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of "complete" sub tasks (will be set automatically)', verbose_name='Completed sub tasks'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='sub_tasks_error',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of sub tasks in the "error" state (will be set automatically)', verbose_name='Failed sub tasks'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='sub_tasks_progress',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Sum of the progress counts of all sub tasks (will be set automatically)', verbose_name='Sub tasks progress'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='sub_tasks_running',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of "executing" sub tasks (will be set automatically)', verbose_name='Running sub tasks'),
+        ),
+        migrations.AddField(
+            model_name='taskmodel',
+            name='sub_tasks_total',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of sub tasks (will be set automatically)', verbose_name='Sub tasks'),
+        ),
+        migrations.RunPython(backfill_sub_task_counts, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_progress_shards(apps, schema_editor):
+    """
+    Store the progress of the existing sub tasks in the first shard of their main task:
+    Later changes of a sub task may go to another shard, but the sum of all shards stays the same.
+    """
+    TaskModel = apps.get_model('huey_monitor', 'TaskModel')
+    SubTaskProgressModel = apps.get_model('huey_monitor', 'SubTaskProgressModel')
+
+    progress_sums = (
+        TaskModel.objects.filter(parent_task__isnull=False, progress_count__isnull=False)
+        .order_by()
+        .values('parent_task')
+        .annotate(progress=Sum('progress_count'))
+        .values_list('parent_task', 'progress')
+    )
+    SubTaskProgressModel.objects.bulk_create(
+        (
+            SubTaskProgressModel(main_task_id=main_task_id, shard=0, progress=progress)
+            for main_task_id, progress in progress_sums.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huey_monitor', '0029_sub_task_counts'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='taskmodel',
+            name='sub_tasks_progress',
+        ),
+        migrations.CreateModel(
+            name='SubTaskProgressModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Shard')),
+                ('progress', models.BigIntegerField(default=0, help_text='Sum of the progress changes of the sub tasks in this shard', verbose_name='Progress')),
+                ('main_task', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='huey_monitor.taskmodel', verbose_name='Main task')),
+            ],
+            options={
+                'verbose_name': 'Sub task progress',
+                'verbose_name_plural': 'Sub task progress',
+                'constraints': [models.UniqueConstraint(fields=('main_task', 'shard'), name='huey_sub_task_progress_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_progress_shards, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:08
+
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+DURATION = 1
+LATENCY = 2
+
+# The format of the removed, packed histogram fields. One bucket: (index, count)
+BUCKET_STRUCT = struct.Struct('<HQ')
+
+
+def pack_histogram(histogram):
+    return b''.join(BUCKET_STRUCT.pack(index, count) for index, count in sorted(histogram.items()) if count)
+
+
+def unpack_histogram(data):
+    if not data:
+        return {}
+    return dict(BUCKET_STRUCT.iter_unpack(bytes(data)))
+
+
+def histograms_to_buckets(apps, schema_editor):
+    """
+    Store the packed histograms of the existing statistics entries as bucket entries.
+    """
+    TaskStatisticsModel = apps.get_model('huey_monitor', 'TaskStatisticsModel')
+    TaskStatisticsBucketModel = apps.get_model('huey_monitor', 'TaskStatisticsBucketModel')
+
+    qs = TaskStatisticsModel.objects.only('id', 'duration_histogram', 'latency_histogram')
+    buckets = []
+    for instance in qs.iterator(chunk_size=1000):
+        for histogram, data in ((DURATION, instance.duration_histogram), (LATENCY, instance.latency_histogram)):
+            for bucket, count in unpack_histogram(data).items():
+                buckets.append(
+                    TaskStatisticsBucketModel(
+                        statistics_id=instance.pk, histogram=histogram, bucket=bucket, count=count
+                    )
+                )
+        if len(buckets) >= 1000:
+            TaskStatisticsBucketModel.objects.bulk_create(buckets)
+            buckets = []
+    TaskStatisticsBucketModel.objects.bulk_create(buckets)
+
+
+def buckets_to_histograms(apps, schema_editor):
+    TaskStatisticsModel = apps.get_model('huey_monitor', 'TaskStatisticsModel')
+    TaskStatisticsBucketModel = apps.get_model('huey_monitor', 'TaskStatisticsBucketModel')
+
+    histograms = {}
+    for statistics_id, histogram, bucket, count in TaskStatisticsBucketModel.objects.values_list(
+        'statistics_id', 'histogram', 'bucket', 'count'
+    ):
+        histograms.setdefault(statistics_id, {DURATION: {}, LATENCY: {}})[histogram][bucket] = count
+    for statistics_id, values in histograms.items():
+        TaskStatisticsModel.objects.filter(pk=statistics_id).update(
+            duration_histogram=pack_histogram(values[DURATION]),
+            latency_histogram=pack_histogram(values[LATENCY]),
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('huey_monitor', '0030_sub_task_progress_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatisticsBucketModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                (
+                    'histogram',
+                    models.PositiveSmallIntegerField(
+                        choices=[(1, 'Duration'), (2, 'Latency')], verbose_name='Histogram'
+                    ),
+                ),
+                (
+                    'bucket',
+                    models.PositiveSmallIntegerField(
+                        help_text='Index of the bucket in the histogram', verbose_name='Bucket'
+                    ),
+                ),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='Count')),
+                (
+                    'statistics',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='buckets',
+                        to='huey_monitor.taskstatisticsmodel',
+                        verbose_name='Task statistics',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Task statistics bucket',
+                'verbose_name_plural': 'Task statistics buckets',
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('statistics', 'histogram', 'bucket'), name='huey_statistics_bucket_uniq'
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(histograms_to_buckets, reverse_code=buckets_to_histograms),
+        migrations.RemoveField(
+            model_name='taskstatisticsmodel',
+            name='duration_histogram',
+        ),
+        migrations.RemoveField(
+            model_name='taskstatisticsmodel',
+            name='latency_histogram',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('huey_monitor', '0031_statistics_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subtaskprogressmodel',
+            name='update_dt',
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text='Last progress change of the sub tasks in this shard (will be set automatically)',
+                verbose_name='Update date',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='subtaskprogressmodel',
+            index=models.Index(fields=['update_dt', 'id'], name='huey_sub_task_progress_dt_idx'),
+        ),
+    ]
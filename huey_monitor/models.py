@@ -1,15 +1,21 @@
 import logging
-import uuid
 
+from bx_django_utils.humanize.time import human_timedelta
 from bx_django_utils.models.timetracking import TimetrackingBaseModel
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
-from huey.signals import SIGNAL_EXECUTING
+from huey.signals import SIGNAL_ENQUEUED, SIGNAL_EXECUTING
 
-from huey_monitor.constants import TASK_MODEL_DESC_MAX_LENGTH
+from huey_monitor.constants import SIGNAL_CODES, TASK_MODEL_DESC_MAX_LENGTH
 from huey_monitor.humanize import format_sizeof, percentage, throughput
+from huey_monitor.instrumentation import OVERHEAD_PARENT_TASK, measure
+from huey_monitor.progress_samples import eta_seconds, ewma_rate, sparkline, unpack_samples
+from huey_monitor.resource_usage import RESOURCE_USAGE_FIELDS
+from huey_monitor.uuid7 import uuid7
 
 
 try:
@@ -26,10 +32,58 @@ class TaskManager(models.Manager):
         """
         Save relationship between a task that calls another task.
         """
+        from huey_monitor.collector import collector_enabled, push_parent_task
+        from huey_monitor.signal_buffer import buffer_enabled, buffer_parent_task
+
+        if collector_enabled():
+            # The "huey_monitor_collector" will store the relationship:
+            push_parent_task(main_task_id=main_task_id, sub_task_id=sub_task_id)
+            return
+
+        if buffer_enabled():
+            # Stored after the buffered signals of the main/sub task, that create their entries:
+            buffer_parent_task(main_task_id=main_task_id, sub_task_id=sub_task_id)
+            return
+
+        with measure(OVERHEAD_PARENT_TASK, task_id=sub_task_id):
+            self.store_parent_task(main_task_id=main_task_id, sub_task_id=sub_task_id)
+
+    def store_parent_task(self, main_task_id, sub_task_id):
+        """
+        Save relationship between a task that calls another task in the database.
+        The sub task is added to the counters of the main task.
+        """
+        from huey_monitor.sub_task_counts import SubTaskCountsUpdate
+
         logger.info('Set %s as sub task of %s', sub_task_id, main_task_id)
-        instance = self.get(task_id=sub_task_id)
-        instance.parent_task_id = main_task_id
-        instance.save(update_fields=('parent_task',))
+        main_task_id = self.model._meta.pk.to_python(main_task_id)  # e.g.: Huey task IDs are strings
+
+        with transaction.atomic():
+            # Lock the sub task: Its state and progress must not change until the counters are changed.
+            instance = self.select_related('state').select_for_update(of=('self',)).get(task_id=sub_task_id)
+            if instance.parent_task_id == main_task_id:
+                return
+            signal_name = instance.state.signal_name if instance.state else None
+
+            counts = SubTaskCountsUpdate()
+            progress_count = instance.progress_count
+            if instance.parent_task_id is not None:
+                counts.add_sub_task(instance.parent_task_id, sub_task_id, signal_name, progress_count, sign=-1)
+            counts.add_sub_task(main_task_id, sub_task_id, signal_name, progress_count)
+            instance.parent_task_id = main_task_id
+            instance.save(update_fields=('parent_task',))
+            counts.save()
+
+    def update_task(self, task_id, parent_task_id=None, **values):
+        """
+        Update fields of a task, e.g.: the progress information.
+        A changed "progress_count" of a sub task (with "parent_task_id") is added to a progress shard of its main task.
+        """
+        from huey_monitor.sub_task_counts import add_sub_task_progress
+
+        if parent_task_id is not None and 'progress_count' in values:
+            add_sub_task_progress(task_id, values['progress_count'])
+        self.filter(task_id=task_id).update(**values)
 
 
 class TaskModel(TimetrackingBaseModel):
@@ -68,6 +122,80 @@ class TaskModel(TimetrackingBaseModel):
             ' (It does not mean that execution was successfully completed.)'
         ),
     )
+    enqueued_dt = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Enqueued date'),
+        help_text=_('Last time the task was put into the queue (will be set automatically)'),
+    )
+    queue_latency = models.DurationField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Queue latency'),
+        help_text=_('Time the last execution waits in the queue (will be set automatically)'),
+    )
+    executing_dt = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('Executing date'),
+        help_text=_('Start of the last execution (will be set automatically)'),
+    )
+    ended_dt = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('End date'),
+        help_text=_('End of the last execution (will be set automatically)'),
+    )
+    duration = models.DurationField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('Duration'),
+        help_text=_('Runtime of the last execution (will be set automatically)'),
+    )
+
+    cpu_user_time = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('CPU user time'),
+        help_text=_('CPU time in user mode of the last execution in seconds (will be set automatically)'),
+    )
+    cpu_system_time = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('CPU system time'),
+        help_text=_('CPU time in kernel mode of the last execution in seconds (will be set automatically)'),
+    )
+    max_rss = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Peak RSS'),
+        help_text=_('Peak memory (resident set size) of the worker process in bytes (will be set automatically)'),
+    )
+    io_read_bytes = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Read bytes'),
+        help_text=_('Bytes read from the storage by the last execution (will be set automatically)'),
+    )
+    io_write_bytes = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Written bytes'),
+        help_text=_('Bytes written to the storage by the last execution (will be set automatically)'),
+    )
 
     desc = models.CharField(
         max_length=TASK_MODEL_DESC_MAX_LENGTH,
@@ -103,55 +231,185 @@ class TaskModel(TimetrackingBaseModel):
         default=1000,
         help_text=_('Used to convert the units.'),
     )
+    progress_samples = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Progress Samples'),
+        help_text=_('The last progress counts with their timestamps (packed, see: huey_monitor.progress_samples)'),
+    )
+
+    # Summary of the sub tasks of a main task, see: huey_monitor.sub_task_counts
+    sub_tasks_total = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Sub tasks'),
+        help_text=_('Number of sub tasks (will be set automatically)'),
+    )
+    sub_tasks_running = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Running sub tasks'),
+        help_text=_('Number of "executing" sub tasks (will be set automatically)'),
+    )
+    sub_tasks_complete = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Completed sub tasks'),
+        help_text=_('Number of "complete" sub tasks (will be set automatically)'),
+    )
+    sub_tasks_error = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Failed sub tasks'),
+        help_text=_('Number of sub tasks in the "error" state (will be set automatically)'),
+    )
+
+    @cached_property
+    def sub_tasks_progress(self):
+        """
+        Sum of the progress counts of all sub tasks, from the progress shards of this main task.
+        None if no sub task has made progress. (Annotated by the admin change list)
+        """
+        if self.sub_tasks_total:
+            shards = SubTaskProgressModel.objects.filter(main_task_id=self.pk)
+            return shards.aggregate(progress=Sum('progress'))['progress']
 
     @cached_property
-    def executing_dt(self):
-        executing_signal = SignalInfoModel.objects.filter(
-            task_id=self.task_id,
-            signal_name=SIGNAL_EXECUTING
-        ).only('create_dt').first()
-        if executing_signal:
-            return executing_signal.create_dt
+    def live_progress(self):
+        """
+        Is the progress of this running main task the live sum of its sub tasks?
+        (The progress of the sub tasks is saved in "progress_count" after the main task has ended)
+        """
+        return (
+            self.cumulate_progress
+            and not self.finished
+            and self.parent_task_id is None
+            and self.sub_tasks_progress is not None
+        )
+
+    @cached_property
+    def current_progress_count(self):
+        if self.live_progress:
+            return self.sub_tasks_progress
+        return self.progress_count
 
     @cached_property
     def elapsed_sec(self):
-        if self.progress_count is not None:  # tqdm is used
-            dt_diff = self.update_dt - self.executing_dt
+        if self.current_progress_count is not None:  # tqdm is used
+            # The live progress of the sub tasks is newer than the last update of the main task:
+            end_dt = timezone.now() if self.live_progress else self.update_dt
+            dt_diff = end_dt - self.executing_dt
             return dt_diff.total_seconds()
 
     def human_percentage(self):
-        if self.progress_count is not None and self.total:
-            return percentage(num=self.progress_count, total=self.total)
+        if self.current_progress_count is not None and self.total:
+            return percentage(num=self.current_progress_count, total=self.total)
     human_percentage.short_description = _('percentage')
 
     def human_progress(self):
-        if self.progress_count is not None:  # tqdm is used
+        if self.current_progress_count is not None:  # tqdm is used
             return format_sizeof(
-                num=self.progress_count, suffix=self.unit, divisor=self.unit_divisor
+                num=self.current_progress_count, suffix=self.unit, divisor=self.unit_divisor
             )
     human_progress.short_description = _('progress')
 
+    def human_sub_tasks_progress(self):
+        return format_sizeof(num=self.sub_tasks_progress or 0, suffix=self.unit, divisor=self.unit_divisor)
+    human_sub_tasks_progress.short_description = _('sub tasks progress')
+
     def human_throughput(self):
-        if self.progress_count is not None:  # tqdm is used
+        if self.current_progress_count is not None:  # tqdm is used
             return throughput(
-                num=self.progress_count,
+                num=self.current_progress_count,
                 elapsed_sec=self.elapsed_sec,
                 suffix=self.unit,
                 divisor=self.unit_divisor
             )
     human_throughput.short_description = _('throughput')
 
+    def update_times(self, signal_name, signal_dt, task_finished):
+        """
+        Update enqueued_dt, queue_latency, executing_dt, ended_dt and duration by a new signal.
+        Only the first end of an execution sets "ended_dt" and "duration".
+        Returns the names of the changed fields.
+        """
+        if signal_name == SIGNAL_ENQUEUED:
+            # Every execution (incl. retries and scheduled tasks) is enqueued before
+            self.enqueued_dt = signal_dt
+            self.queue_latency = None
+            return ('enqueued_dt', 'queue_latency')
+        elif signal_name == SIGNAL_EXECUTING:
+            # A new execution starts, e.g.: a retry
+            self.executing_dt = signal_dt
+            self.ended_dt = None
+            self.duration = None
+            if self.enqueued_dt is not None:
+                self.queue_latency = signal_dt - self.enqueued_dt
+            return ('executing_dt', 'ended_dt', 'duration', 'queue_latency')
+        elif task_finished and not self.execution_ended():
+            self.ended_dt = signal_dt
+            if self.executing_dt is not None:
+                self.duration = self.ended_dt - self.executing_dt
+            return ('ended_dt', 'duration')
+        return ()
+
+    def execution_ended(self) -> bool:
+        """
+        Has the last execution already ended? e.g.: "revoked" after "error" is not a new end.
+        (A task without execution has ended, if it has an end date)
+        """
+        return self.ended_dt is not None and (self.executing_dt is None or self.executing_dt <= self.ended_dt)
+
+    def update_resource_usage(self, signal_name, resource_usage):
+        """
+        Update the resource usage fields by a new signal, see: huey_monitor.resource_usage
+        Returns the names of the changed fields.
+        """
+        if signal_name == SIGNAL_EXECUTING:
+            # A new execution starts: Remove the values of the previous one
+            resource_usage = dict.fromkeys(RESOURCE_USAGE_FIELDS)
+        elif not resource_usage:
+            return ()
+        for field_name in RESOURCE_USAGE_FIELDS:
+            setattr(self, field_name, resource_usage[field_name])
+        return RESOURCE_USAGE_FIELDS
+
+    @cached_property
+    def progress_sample_list(self):
+        return unpack_samples(self.progress_samples)
+
+    def human_current_throughput(self):
+        """
+        Current rate, calculated from the progress samples.
+        """
+        rate = ewma_rate(self.progress_sample_list)
+        if rate is not None:
+            return throughput(num=rate, elapsed_sec=1, suffix=self.unit, divisor=self.unit_divisor)
+    human_current_throughput.short_description = _('current throughput')
+
+    def human_eta(self):
+        if not self.finished and self.total:
+            seconds = eta_seconds(self.progress_sample_list, total=self.total)
+            if seconds is not None:
+                return human_timedelta(seconds)
+    human_eta.short_description = _('ETA')
+
+    def progress_sparkline(self):
+        return sparkline(self.progress_sample_list) or None
+    progress_sparkline.short_description = _('progress history')
+
     def human_progress_string(self):
         parts = []
-        if self.progress_count is None:  # tqdm is not used
+        if self.current_progress_count is None:  # tqdm is not used
             pass
         elif self.total:
-            parts.append(f'{self.progress_count}/{self.total}{self.unit}')
+            parts.append(f'{self.current_progress_count}/{self.total}{self.unit}')
             parts.append(self.human_percentage())
             parts.append(self.human_throughput())
         else:
             # Progress info without total number
-            parts.append(f'{self.progress_count}{self.unit}')
+            parts.append(f'{self.current_progress_count}{self.unit}')
             parts.append(self.human_throughput())
 
         if self.finished:
@@ -164,7 +422,7 @@ class TaskModel(TimetrackingBaseModel):
         """
         Used in admin: Display the unit only if process info used.
         """
-        if self.progress_count is not None:  # tqdm is used
+        if self.current_progress_count is not None:  # tqdm is used
             return self.unit
     human_unit.short_description = _('Unit')
 
@@ -197,28 +455,146 @@ class TaskModel(TimetrackingBaseModel):
     class Meta:
         verbose_name = _('Task')
         verbose_name_plural = _('Tasks')
+        indexes = (
+            # Admin change list: Only main tasks, newest first (incl. the keyset pagination)
+            # (The partial index will be skipped on databases without support for it)
+            # The leading "parent_task" is always NULL, but without it SQLite prefers
+            # "huey_task_parent_create_idx" for "parent_task IS NULL" and sorts all main tasks.
+            models.Index(
+                fields=('parent_task', '-update_dt', '-task_id'),
+                condition=models.Q(parent_task__isnull=True),
+                name='huey_task_main_update_idx',
+            ),
+            # Sub tasks of a main task, newest first:
+            models.Index(fields=('parent_task', '-create_dt'), name='huey_task_parent_create_idx'),
+            # Admin "name" list filter:
+            models.Index(fields=('name',), name='huey_task_name_idx'),
+        )
 
 
-class SignalInfoModel(models.Model):
-    id = models.UUIDField(
-        primary_key=True,
-        default=uuid.uuid4,
+class SubTaskProgressModel(models.Model):
+    """
+    The progress of the sub tasks of a main task, spread over a few rows, see: huey_monitor.sub_task_counts
+    Every sub task adds its progress changes to "its" shard, so parallel sub tasks
+    don't update the same row. The sum of all shards is the progress of all sub tasks.
+    """
+
+    main_task = models.ForeignKey(
+        TaskModel,
+        related_name='+',
+        on_delete=models.CASCADE,
+        db_index=False,  # The unique constraint starts with the main task
+        verbose_name=_('Main task'),
+    )
+    shard = models.PositiveSmallIntegerField(
+        verbose_name=_('Shard'),
+    )
+    progress = models.BigIntegerField(
+        default=0,
+        verbose_name=_('Progress'),
+        help_text=_('Sum of the progress changes of the sub tasks in this shard'),
+    )
+    update_dt = models.DateTimeField(
+        default=timezone.now,
         editable=False,
+        verbose_name=_('Update date'),
+        help_text=_('Last progress change of the sub tasks in this shard (will be set automatically)'),
     )
 
+    def __str__(self):
+        return f'{self.main_task_id} #{self.shard}: {self.progress}'
+
+    class Meta:
+        verbose_name = _('Sub task progress')
+        verbose_name_plural = _('Sub task progress')
+        constraints = (models.UniqueConstraint(fields=('main_task', 'shard'), name='huey_sub_task_progress_uniq'),)
+        indexes = (
+            # The live dashboard selects the progress changes in this order, see: huey_monitor.live
+            models.Index(fields=('update_dt', 'id'), name='huey_sub_task_progress_dt_idx'),
+        )
+
+
+SIGNAL_NAMES = {code: name for name, code in SIGNAL_CODES.items()}
+
+
+class SignalNameField(models.PositiveSmallIntegerField):
+    """
+    Store the Huey signal name as small integer (see: constants.SIGNAL_CODES),
+    but use the name in Python and in all lookups, e.g.: filter(signal_name='executing')
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs['choices'] = [(name, name) for name in SIGNAL_CODES]
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs['choices']
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return SIGNAL_NAMES[value]
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return SIGNAL_NAMES[int(value)]
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return SIGNAL_CODES[value]
+        except KeyError as err:
+            raise ValueError(f'Unknown signal name: {value!r}') from err
+
+
+class WorkerIdentityModel(models.Model):
+    """
+    Host, process and thread that creates signals: Stored only once and referenced by the signals.
+    """
+
     hostname = models.CharField(
         max_length=128,
         verbose_name=_('Hostname'),
-        help_text=_('Hostname of the machine that creates this Signal'),
+        help_text=_('Hostname of the machine that creates the Signals'),
     )
     pid = models.PositiveIntegerField(
         verbose_name=_('PID'),
-        help_text=_('Process ID that creates this Signal'),
+        help_text=_('Process ID that creates the Signals'),
     )
     thread = models.CharField(
         max_length=128,
         verbose_name=_('Thread Name'),
-        help_text=_('Name of the thread that creates this Signal'),
+        help_text=_('Name of the thread that creates the Signals'),
+    )
+
+    def __str__(self):
+        return f'{self.hostname} (PID: {self.pid}, Thread: {self.thread})'
+
+    class Meta:
+        verbose_name = _('Worker identity')
+        verbose_name_plural = _('Worker identities')
+        constraints = (
+            models.UniqueConstraint(fields=('hostname', 'pid', 'thread'), name='huey_worker_identity_uniq'),
+        )
+
+
+class SignalInfoModel(models.Model):
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid7,  # Time-ordered: New signals are appended at the end of the primary key index
+        editable=False,
+    )
+
+    worker = models.ForeignKey(
+        'huey_monitor.WorkerIdentityModel',
+        on_delete=models.PROTECT,
+        related_name='signals',
+        verbose_name=_('Worker'),
+        help_text=_('Host, process and thread that creates this Signal'),
     )
 
     task = models.ForeignKey(
@@ -228,8 +604,7 @@ class SignalInfoModel(models.Model):
         verbose_name=_('Task'),
         help_text=_('The Task instance for this Signal Info entry.'),
     )
-    signal_name = models.CharField(
-        max_length=128,
+    signal_name = SignalNameField(
         verbose_name=_('Signal Name'),
         help_text=_('Name of the signal'),
     )
@@ -241,7 +616,16 @@ class SignalInfoModel(models.Model):
     exception = models.TextField(
         null=True, blank=True,
         verbose_name=_('Exception'),
-        help_text=_('Full information of a exception'),
+        help_text=_('Full information of a exception (if not stored in the exception group)'),
+    )
+    exception_group = models.ForeignKey(
+        'huey_monitor.ExceptionGroupModel',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='signals',
+        verbose_name=_('Exception group'),
+        help_text=_('All equal exceptions are grouped by their fingerprint'),
     )
     progress_count = models.PositiveIntegerField(
         null=True,
@@ -250,15 +634,43 @@ class SignalInfoModel(models.Model):
         help_text=_('Progress (if any) at the time of creation.'),
     )
     create_dt = models.DateTimeField(
-        auto_now_add=True,
+        editable=False,
         verbose_name=_('Create date'),
         help_text=_('(will be set automatically)')
     )
 
+    def save(self, **kwargs):
+        # Not "auto_now_add", because buffered signals must keep their own time:
+        if self.create_dt is None:
+            self.create_dt = timezone.now()
+        super().save(**kwargs)
+
     def admin_link(self):
         url = reverse('admin:huey_monitor_signalinfomodel_change', args=[self.pk])
         return url
 
+    @property
+    def hostname(self):
+        return self.worker.hostname
+
+    @property
+    def pid(self):
+        return self.worker.pid
+
+    @property
+    def thread(self):
+        return self.worker.thread
+
+    @property
+    def traceback(self):
+        """
+        The full exception information: Stored in the exception group, if any.
+        """
+        if self.exception:
+            return self.exception
+        if self.exception_group_id is not None:
+            return self.exception_group.traceback
+
     def __str__(self):
         if self.exception_line:
             return f'{self.signal_name} - {self.exception_line}'
@@ -267,3 +679,364 @@ class SignalInfoModel(models.Model):
     class Meta:
         verbose_name = _('Task Signal')
         verbose_name_plural = _('Task Signals')
+        indexes = (
+            # Lookup of a signal of a task, e.g.: TaskModel.executing_dt
+            models.Index(fields=('task', 'signal_name', 'create_dt'), name='huey_signal_task_name_dt_idx'),
+            # Admin change list ordering and keyset pagination:
+            models.Index(fields=('-create_dt', '-id'), name='huey_signal_create_dt_idx'),
+            # Tasks by their current state, e.g.: startup_handler() and the admin list filter
+            models.Index(fields=('signal_name',), name='huey_signal_name_idx'),
+        )
+
+
+class ExceptionGroupModel(models.Model):
+    """
+    All equal exceptions, identified by their fingerprint, see: huey_monitor.exception_groups
+    """
+
+    fingerprint = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name=_('Fingerprint'),
+        help_text=_('SHA256 of the exception types and the stack frames (without line numbers and messages)'),
+    )
+    exception_type = models.CharField(
+        max_length=255,
+        verbose_name=_('Exception type'),
+    )
+    exception_line = models.TextField(
+        blank=True,
+        verbose_name=_('Exception Line'),
+        help_text=_('The message of the last occurrence'),
+    )
+    traceback = models.TextField(
+        verbose_name=_('Traceback'),
+        help_text=_('Full information of the first occurrence'),
+    )
+    task_name = models.CharField(
+        max_length=128,
+        verbose_name=_('Task name'),
+        help_text=_('The task of the last occurrence'),
+    )
+    occurrence_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Occurrences'),
+    )
+    first_seen_dt = models.DateTimeField(
+        verbose_name=_('First seen'),
+    )
+    last_seen_dt = models.DateTimeField(
+        db_index=True,
+        verbose_name=_('Last seen'),
+    )
+
+    def __str__(self):
+        if self.exception_line:
+            return f'{self.exception_type}: {self.exception_line}'
+        return self.exception_type
+
+    class Meta:
+        verbose_name = _('Exception group')
+        verbose_name_plural = _('Exception groups')
+
+
+class TaskStatisticsModel(models.Model):
+    """
+    Statistics of all task executions that ended in one hour on one host, see: huey_monitor.statistics
+    """
+
+    name = models.CharField(
+        max_length=128,
+        verbose_name=_('Task name'),
+    )
+    hostname = models.CharField(
+        max_length=128,
+        default='',
+        verbose_name=_('Hostname'),
+        help_text=_('Host of the worker, that executed the tasks'),
+    )
+    hour = models.DateTimeField(
+        verbose_name=_('Hour'),
+        help_text=_('Start of the hour in which the tasks ended'),
+    )
+    ended_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Ended'),
+        help_text=_('Number of ended tasks (complete, error, revoked, etc.) incl. retries'),
+    )
+    complete_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Complete'),
+    )
+    error_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Errors'),
+    )
+    duration_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Duration count'),
+        help_text=_('Number of executions with a known duration'),
+    )
+    duration_sum = models.FloatField(
+        default=0,
+        verbose_name=_('Duration sum'),
+        help_text=_('Sum of all durations in seconds'),
+    )
+    duration_max = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_('Duration max'),
+        help_text=_('Longest duration in seconds'),
+    )
+    latency_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Latency count'),
+        help_text=_('Number of executions with a known queue latency'),
+    )
+    latency_sum = models.FloatField(
+        default=0,
+        verbose_name=_('Latency sum'),
+        help_text=_('Sum of all queue latencies (enqueued -> executing) in seconds'),
+    )
+    latency_max = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_('Latency max'),
+        help_text=_('Longest queue latency in seconds'),
+    )
+    usage_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Resource usage count'),
+        help_text=_('Number of executions with a known resource usage'),
+    )
+    cpu_time_sum = models.FloatField(
+        default=0,
+        verbose_name=_('CPU time sum'),
+        help_text=_('Sum of the CPU times (user + system) in seconds'),
+    )
+    cpu_time_max = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_('CPU time max'),
+        help_text=_('Longest CPU time in seconds'),
+    )
+    max_rss_sum = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Peak RSS sum'),
+        help_text=_('Sum of the peak RSS of the worker processes at the end of the executions in bytes'),
+    )
+    max_rss_max = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Peak RSS max'),
+        help_text=_('Highest peak RSS in bytes'),
+    )
+    io_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('I/O count'),
+        help_text=_('Number of executions with known I/O bytes (Linux only)'),
+    )
+    io_read_sum = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Read bytes sum'),
+    )
+    io_write_sum = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Written bytes sum'),
+    )
+
+    def get_histograms(self) -> tuple:
+        """
+        The duration and the latency histogram from the bucket entries, see: huey_monitor.histogram
+        (Use prefetch_related('buckets') for many entries)
+        """
+        histograms = {TaskStatisticsBucketModel.DURATION: {}, TaskStatisticsBucketModel.LATENCY: {}}
+        for bucket in self.buckets.all():
+            histograms[bucket.histogram][bucket.bucket] = bucket.count
+        return histograms[TaskStatisticsBucketModel.DURATION], histograms[TaskStatisticsBucketModel.LATENCY]
+
+    def __str__(self):
+        return f'{self.name} {self.hour:%Y-%m-%d %H:%M}: {self.ended_count} ended'
+
+    class Meta:
+        verbose_name = _('Task statistics')
+        verbose_name_plural = _('Task statistics')
+        constraints = (
+            models.UniqueConstraint(fields=('name', 'hostname', 'hour'), name='huey_statistics_name_host_hour_uniq'),
+        )
+        indexes = (
+            # Statistics of a time range:
+            models.Index(fields=('hour',), name='huey_statistics_hour_idx'),
+        )
+
+
+class TaskStatisticsBucketModel(models.Model):
+    """
+    One bucket of the duration or latency histogram of a TaskStatisticsModel entry, see: huey_monitor.histogram
+    The counts are incremented in the database, so the workers don't need to lock the statistics entries.
+    """
+
+    DURATION = 1
+    LATENCY = 2
+
+    statistics = models.ForeignKey(
+        TaskStatisticsModel,
+        related_name='buckets',
+        on_delete=models.CASCADE,
+        db_index=False,  # The unique constraint starts with the statistics entry
+        verbose_name=_('Task statistics'),
+    )
+    histogram = models.PositiveSmallIntegerField(
+        choices=(
+            (DURATION, _('Duration')),
+            (LATENCY, _('Latency')),
+        ),
+        verbose_name=_('Histogram'),
+    )
+    bucket = models.PositiveSmallIntegerField(
+        verbose_name=_('Bucket'),
+        help_text=_('Index of the bucket in the histogram'),
+    )
+    count = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Count'),
+    )
+
+    def __str__(self):
+        return f'{self.statistics_id} {self.get_histogram_display()} #{self.bucket}: {self.count}'
+
+    class Meta:
+        verbose_name = _('Task statistics bucket')
+        verbose_name_plural = _('Task statistics buckets')
+        constraints = (
+            models.UniqueConstraint(fields=('statistics', 'histogram', 'bucket'), name='huey_statistics_bucket_uniq'),
+        )
+
+
+class WorkerModel(models.Model):
+    """
+    A running Huey worker process, see: huey_monitor.workers
+    """
+
+    hostname = models.CharField(
+        max_length=128,
+        verbose_name=_('Hostname'),
+    )
+    pid = models.PositiveIntegerField(
+        verbose_name=_('PID'),
+    )
+    started_dt = models.DateTimeField(
+        verbose_name=_('Start date'),
+        help_text=_('Start of the worker process (Tasks executed before belongs to a previous process)'),
+    )
+    heartbeat_dt = models.DateTimeField(
+        db_index=True,
+        verbose_name=_('Heartbeat'),
+        help_text=_('Last sign of life'),
+    )
+    stopped_dt = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('Stop date'),
+        help_text=_('Set if the worker process shut down properly'),
+    )
+    overhead = models.JSONField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Monitor overhead'),
+        help_text=_('Count, time and queries of the monitor operations, see: huey_monitor.instrumentation'),
+    )
+
+    def __str__(self):
+        return f'{self.hostname} (PID: {self.pid})'
+
+    class Meta:
+        verbose_name = _('Worker')
+        verbose_name_plural = _('Workers')
+        constraints = (
+            models.UniqueConstraint(fields=('hostname', 'pid'), name='huey_worker_hostname_pid_uniq'),
+        )
+
+
+class QueueSampleModel(models.Model):
+    """
+    Queue depths of the Huey storage: Raw samples are downsampled into minutes and hours,
+    see: huey_monitor.queue_samples
+    """
+
+    RESOLUTION_RAW = 0
+    RESOLUTION_MINUTE = 60
+    RESOLUTION_HOUR = 3600
+
+    resolution = models.PositiveIntegerField(
+        choices=(
+            (RESOLUTION_RAW, _('Raw')),
+            (RESOLUTION_MINUTE, _('Minute')),
+            (RESOLUTION_HOUR, _('Hour')),
+        ),
+        default=RESOLUTION_RAW,
+        verbose_name=_('Resolution'),
+        help_text=_('Raw sample or size of the aggregated time range in seconds'),
+    )
+    sample_dt = models.DateTimeField(
+        verbose_name=_('Sample date'),
+        help_text=_('Time of a raw sample or start of the aggregated time range'),
+    )
+    sample_count = models.PositiveIntegerField(
+        default=1,
+        verbose_name=_('Sample count'),
+        help_text=_('Number of aggregated raw samples'),
+    )
+    duration = models.FloatField(
+        default=0,
+        verbose_name=_('Duration'),
+        help_text=_('Seconds covered by the enqueued/executed counts'),
+    )
+    pending = models.FloatField(
+        verbose_name=_('Pending'),
+        help_text=_('(Average) number of pending tasks'),
+    )
+    pending_max = models.PositiveIntegerField(
+        verbose_name=_('Pending max.'),
+    )
+    scheduled = models.FloatField(
+        verbose_name=_('Scheduled'),
+        help_text=_('(Average) number of scheduled tasks'),
+    )
+    result = models.FloatField(
+        verbose_name=_('Results'),
+        help_text=_('(Average) number of stored results'),
+    )
+    enqueued_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Enqueued'),
+        help_text=_('Number of enqueued tasks in this time range'),
+    )
+    executed_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Executed'),
+        help_text=_('Number of started task executions in this time range'),
+    )
+    redis_memory = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Redis memory'),
+        help_text=_('(Max.) used memory of the Redis server in bytes'),
+    )
+    redis_keys = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Redis keys'),
+        help_text=_('(Max.) number of keys in the Redis database'),
+    )
+
+    def __str__(self):
+        return f'{self.get_resolution_display()} {self.sample_dt:%Y-%m-%d %H:%M:%S}: {self.pending:.0f} pending'
+
+    class Meta:
+        verbose_name = _('Queue sample')
+        verbose_name_plural = _('Queue samples')
+        constraints = (
+            models.UniqueConstraint(fields=('resolution', 'sample_dt'), name='huey_queue_sample_uniq'),
+        )
@@ -0,0 +1,219 @@
+"""
+Admin change list pagination for big tables:
+
+ * The total number of entries is only estimated: PostgreSQL planner statistics or a cached count.
+ * The pages are selected via keyset cursors instead of OFFSET.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+
+from huey_monitor.constants import COUNT_CACHE_TIMEOUT, ESTIMATED_COUNT_THRESHOLD
+
+
+# Change list GET parameters:
+AFTER_VAR = 'after'  # Entries after this cursor
+BEFORE_VAR = 'before'  # Entries before this cursor
+EXACT_COUNT_VAR = 'exact_count'  # Count the entries exactly
+KEYSET_PARAMS = (AFTER_VAR, BEFORE_VAR, EXACT_COUNT_VAR)
+
+CURSOR_SEPARATOR = ','
+
+
+def planner_estimate(queryset) -> int:
+    """
+    Returns the number of rows, estimated by the PostgreSQL query planner.
+    """
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(queryset) -> int:
+    """
+    Count the entries. Big results are cached for settings.HUEY_MONITOR_COUNT_CACHE_TIMEOUT seconds.
+    """
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    key = hashlib.md5(f'{queryset.db}{sql}{params!r}'.encode(), usedforsecurity=False).hexdigest()
+    cache_key = f'huey_monitor_count_{key}'
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        if count >= ESTIMATED_COUNT_THRESHOLD:
+            timeout = getattr(settings, 'HUEY_MONITOR_COUNT_CACHE_TIMEOUT', COUNT_CACHE_TIMEOUT)
+            cache.set(cache_key, count, timeout)
+    return count
+
+
+def estimate_count(queryset) -> tuple:
+    """
+    Returns the (maybe estimated) number of entries and a flag, if the number is exact.
+    Small numbers are always exact.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        count = planner_estimate(queryset)
+        if count < ESTIMATED_COUNT_THRESHOLD:
+            return queryset.count(), True
+        return count, False
+
+    count = cached_count(queryset)
+    return count, count < ESTIMATED_COUNT_THRESHOLD
+
+
+class EstimatedCountPaginator(Paginator):
+    def __init__(self, *args, exact=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exact = exact
+        self.estimated = False
+
+    @property
+    def count(self):
+        if not hasattr(self, '_count'):
+            if self.exact:
+                self._count = self.object_list.count()
+            else:
+                self._count, exact = estimate_count(self.object_list)
+                self.estimated = not exact
+        return self._count
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Select the pages via keyset cursors, if the list is in the default order.
+    (Sorted by another column: The normal OFFSET pagination is used)
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.after = request.GET.get(AFTER_VAR)
+        self.before = request.GET.get(BEFORE_VAR)
+        super().__init__(request, *args, **kwargs)
+        for name in KEYSET_PARAMS:
+            self.params.pop(name, None)
+            self.filter_params.pop(name, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for name in KEYSET_PARAMS:
+            lookup_params.pop(name, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Every link starts at the first page, if not given otherwise:
+        new_params = {**{name: None for name in KEYSET_PARAMS}, **(new_params or {})}
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def keyset_ordering(self):
+        return self.model_admin.keyset_ordering
+
+    @property
+    def keyset_active(self):
+        return ORDER_VAR not in self.params and not self.show_all and not self.list_editable
+
+    def get_cursor(self, obj) -> str:
+        values = []
+        for field_name in self.keyset_ordering:
+            field = self.model._meta.get_field(field_name.lstrip('-'))
+            values.append(field.value_to_string(obj))
+        return CURSOR_SEPARATOR.join(values)
+
+    def get_keyset_filter(self, cursor, reverse=False) -> Q:
+        """
+        Filter all entries after the cursor (or before the cursor if "reverse" is True)
+        """
+        values = cursor.split(CURSOR_SEPARATOR)
+        if len(values) != len(self.keyset_ordering):
+            raise IncorrectLookupParameters(f'Invalid cursor: {cursor!r}')
+
+        conditions = []
+        for field_name, value in zip(self.keyset_ordering, values):
+            descending = field_name.startswith('-')
+            field = self.model._meta.get_field(field_name.lstrip('-'))
+            try:
+                value = field.to_python(value)
+            except ValidationError as err:
+                raise IncorrectLookupParameters(f'Invalid cursor: {cursor!r}') from err
+            lookup = 'lt' if descending != reverse else 'gt'
+            conditions.append((field.name, lookup, value))
+
+        # e.g.: (a < x) OR (a = x AND b < y)
+        q = Q(pk__in=[])
+        for index, (field_name, lookup, value) in enumerate(conditions):
+            equal = {name: value for name, _, value in conditions[:index]}
+            q |= Q(**equal, **{f'{field_name}__{lookup}': value})
+        return q
+
+    def get_results(self, request):
+        if not self.keyset_active:
+            super().get_results(request)
+            return
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        qs = self.queryset.order_by(*self.keyset_ordering)
+        if self.before:
+            qs = qs.filter(self.get_keyset_filter(self.before, reverse=True)).reverse()
+        elif self.after:
+            qs = qs.filter(self.get_keyset_filter(self.after))
+
+        result_list = list(qs[: self.list_per_page + 1])
+        has_more = len(result_list) > self.list_per_page
+        result_list = result_list[: self.list_per_page]
+        if self.before:
+            result_list.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = self.after is not None, has_more
+
+        self.previous_url = None
+        self.next_url = None
+        if result_list:
+            if has_previous:
+                self.previous_url = self.get_query_string({BEFORE_VAR: self.get_cursor(result_list[0])})
+            if has_next:
+                self.next_url = self.get_query_string({AFTER_VAR: self.get_cursor(result_list[-1])})
+        self.exact_count_url = self.get_query_string({EXACT_COUNT_VAR: 1})
+
+        self.result_count = paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = has_previous or has_next
+        self.paginator = paginator
+
+
+class KeysetPaginationMixin:
+    """
+    ModelAdmin mixin: Estimated counts and keyset pagination in the change list.
+    The "keyset_ordering" must be unique, e.g.: ('-create_dt', '-id')
+    """
+
+    keyset_ordering = None
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Avoid a second COUNT(*) of the whole table
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            exact=EXACT_COUNT_VAR in request.GET,
+        )
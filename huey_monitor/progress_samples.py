@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import struct
+
+
+# One sample: (POSIX timestamp, progress count)
+SAMPLE_STRUCT = struct.Struct('<dQ')
+
+SPARKLINE_CHARS = '▁▂▃▄▅▆▇█'
+
+
+def pack_samples(samples) -> bytes:
+    """
+    >>> pack_samples([(1.0, 2)]).hex()
+    '000000000000f03f0200000000000000'
+    """
+    return b''.join(SAMPLE_STRUCT.pack(timestamp, count) for timestamp, count in samples)
+
+
+def unpack_samples(data) -> list:
+    """
+    >>> unpack_samples(pack_samples([(1.0, 2), (2.5, 10)]))
+    [(1.0, 2), (2.5, 10)]
+    >>> unpack_samples(None)
+    []
+    """
+    if not data:
+        return []
+    return list(SAMPLE_STRUCT.iter_unpack(bytes(data)))
+
+
+def add_sample(samples, timestamp, count, max_samples, min_interval) -> list:
+    """
+    Add a new sample and drop the oldest ones, if "max_samples" is reached.
+    The samples have a distance of at least "min_interval" seconds:
+    Only the newest sample may be closer and will be replaced by the next one.
+
+    >>> samples = add_sample([], timestamp=0, count=0, max_samples=3, min_interval=1)
+    >>> samples = add_sample(samples, timestamp=1, count=5, max_samples=3, min_interval=1)
+    >>> samples = add_sample(samples, timestamp=1.5, count=7, max_samples=3, min_interval=1)
+    >>> samples
+    [(0, 0), (1, 5), (1.5, 7)]
+    >>> samples = add_sample(samples, timestamp=1.8, count=8, max_samples=3, min_interval=1)
+    >>> samples
+    [(0, 0), (1, 5), (1.8, 8)]
+    >>> samples = add_sample(samples, timestamp=2.5, count=10, max_samples=3, min_interval=1)
+    >>> samples
+    [(0, 0), (1, 5), (2.5, 10)]
+    >>> add_sample(samples, timestamp=3, count=11, max_samples=3, min_interval=1)
+    [(1, 5), (2.5, 10), (3, 11)]
+    """
+    samples = list(samples)
+    if len(samples) > 1 and samples[-1][0] - samples[-2][0] < min_interval:
+        samples[-1] = (timestamp, count)
+    else:
+        samples.append((timestamp, count))
+    return samples[-max_samples:]
+
+
+def sample_rates(samples) -> list:
+    """
+    Returns the rates (units per second) between the samples.
+
+    >>> sample_rates([(0, 0), (2, 10), (3, 20), (3, 25)])
+    [5.0, 10.0]
+    """
+    rates = []
+    for (timestamp1, count1), (timestamp2, count2) in zip(samples, samples[1:]):
+        duration = timestamp2 - timestamp1
+        if duration > 0:
+            rates.append((count2 - count1) / duration)
+    return rates
+
+
+def ewma_rate(samples, smoothing=0.3) -> float | None:
+    """
+    Current rate (units per second) as exponential weighted moving average.
+    (The "smoothing" factor is the weight of the newest rate, like tqdm)
+
+    >>> ewma_rate([(0, 0), (1, 10), (2, 20), (3, 50)])
+    16.0
+    >>> ewma_rate([(0, 0)]) is None
+    True
+    """
+    rate = None
+    for current_rate in sample_rates(samples):
+        if rate is None:
+            rate = current_rate
+        else:
+            rate = smoothing * current_rate + (1 - smoothing) * rate
+    return rate
+
+
+def eta_seconds(samples, total, smoothing=0.3) -> float | None:
+    """
+    Estimated seconds until "total" is reached, based on the current rate.
+
+    >>> eta_seconds([(0, 0), (1, 10), (2, 20)], total=100)
+    8.0
+    >>> eta_seconds([(0, 0), (1, 0)], total=100) is None
+    True
+    """
+    if not samples or not total:
+        return None
+    rate = ewma_rate(samples, smoothing=smoothing)
+    if not rate or rate < 0:
+        return None
+    remaining = max(total - samples[-1][1], 0)
+    return remaining / rate
+
+
+def sparkline(samples, width=20) -> str:
+    """
+    Returns the last rates as a small unicode graph.
+
+    >>> sparkline([(0, 0), (1, 1), (2, 5), (3, 13), (4, 13)])
+    '▂▅█▁'
+    >>> sparkline([(0, 0), (1, 0)])
+    '▁'
+    """
+    rates = sample_rates(samples)[-width:]
+    if not rates:
+        return ''
+    max_rate = max(rates)
+    if max_rate <= 0:
+        return SPARKLINE_CHARS[0] * len(rates)
+    last_index = len(SPARKLINE_CHARS) - 1
+    return ''.join(SPARKLINE_CHARS[round(max(rate, 0) / max_rate * last_index)] for rate in rates)
@@ -0,0 +1,167 @@
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from huey_monitor.constants import PRUNE_CHUNK_SIZE
+from huey_monitor.models import SignalInfoModel, SubTaskProgressModel, TaskModel
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionRules:
+    """
+    How many days should ended tasks be kept?
+
+    The rules are checked in this order: task name, last signal name, default.
+    A task without a matching rule will be kept.
+    """
+
+    def __init__(self, *, default_days=None, state_days=None, task_name_days=None):
+        self.default_days = default_days
+        self.state_days = state_days or {}
+        self.task_name_days = task_name_days or {}
+
+    @classmethod
+    def from_settings(cls):
+        """
+        e.g.: settings.HUEY_MONITOR_PRUNE_RULES = {'default': 30, 'states': {'complete': 7}, 'task_names': {...}}
+        """
+        rules = getattr(settings, 'HUEY_MONITOR_PRUNE_RULES', None) or {}
+        return cls(
+            default_days=rules.get('default'),
+            state_days=rules.get('states'),
+            task_name_days=rules.get('task_names'),
+        )
+
+    def __bool__(self):
+        return bool(self.default_days or self.state_days or self.task_name_days)
+
+    def get_filter(self, now) -> Q:
+        """
+        Returns the filter for all tasks that should be deleted.
+        """
+
+        def ended_before(days):
+            return Q(ended_dt__lt=now - datetime.timedelta(days=days))
+
+        # Nothing matches an empty Q(pk__in=[])
+        q = Q(pk__in=[])
+        for task_name, days in self.task_name_days.items():
+            q |= Q(name=task_name) & ended_before(days)
+
+        other_names = ~Q(name__in=list(self.task_name_days))
+        for signal_name, days in self.state_days.items():
+            q |= other_names & Q(state__signal_name=signal_name) & ended_before(days)
+
+        if self.default_days:
+            q |= other_names & ~Q(state__signal_name__in=list(self.state_days)) & ended_before(self.default_days)
+        return q
+
+    def __repr__(self):
+        return (
+            f'<RetentionRules default={self.default_days!r}'
+            f' states={self.state_days!r} task_names={self.task_name_days!r}>'
+        )
+
+
+class PruneResult:
+    def __init__(self):
+        self.task_count = 0
+        self.signal_count = 0
+        self.start = time.monotonic()
+
+    @property
+    def row_count(self):
+        return self.task_count + self.signal_count
+
+    @property
+    def rows_per_second(self):
+        duration = time.monotonic() - self.start
+        return self.row_count / duration if duration else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.task_count} tasks and {self.signal_count} signals deleted'
+            f' ({self.rows_per_second:.1f} rows/sec.)'
+        )
+
+
+def _in_clause(values):
+    return f'({", ".join(["%s"] * len(values))})'
+
+
+def delete_tasks(task_ids, result):
+    """
+    Delete the given tasks with all their signals and progress shards via plain SQL,
+    without Django's cascade collector. The sub tasks must be deleted before.
+    """
+    qn = connection.ops.quote_name
+    task_table = qn(TaskModel._meta.db_table)
+    signal_table = qn(SignalInfoModel._meta.db_table)
+    shard_table = qn(SubTaskProgressModel._meta.db_table)
+    main_task_column = qn(SubTaskProgressModel._meta.get_field('main_task').column)
+    pk_column = qn(TaskModel._meta.pk.column)
+    state_column = qn(TaskModel._meta.get_field('state').column)
+    task_column = qn(SignalInfoModel._meta.get_field('task').column)
+
+    params = [TaskModel._meta.pk.get_db_prep_value(task_id, connection) for task_id in task_ids]
+    in_clause = _in_clause(params)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not connection.features.can_defer_constraint_checks:
+            # Remove the reference from the task to its last signal first:
+            cursor.execute(f'UPDATE {task_table} SET {state_column} = NULL WHERE {pk_column} IN {in_clause}', params)
+        cursor.execute(f'DELETE FROM {signal_table} WHERE {task_column} IN {in_clause}', params)
+        result.signal_count += cursor.rowcount
+        cursor.execute(f'DELETE FROM {shard_table} WHERE {main_task_column} IN {in_clause}', params)
+        cursor.execute(f'DELETE FROM {task_table} WHERE {pk_column} IN {in_clause}', params)
+        result.task_count += cursor.rowcount
+
+
+def delete_task_tree(task_ids, chunk_size, result):
+    """
+    Delete the given tasks and all their sub tasks, chunk by chunk.
+    """
+    while True:
+        sub_task_ids = list(
+            TaskModel.objects.filter(parent_task_id__in=task_ids).values_list('pk', flat=True)[:chunk_size]
+        )
+        if not sub_task_ids:
+            break
+        delete_task_tree(sub_task_ids, chunk_size=chunk_size, result=result)
+
+    delete_tasks(task_ids, result)
+
+
+def prune(rules, chunk_size=PRUNE_CHUNK_SIZE, sleep=0, now=None) -> PruneResult:
+    """
+    Delete all ended main tasks (with their sub tasks and signals) matching the retention rules.
+    Every chunk is deleted in an own, short transaction.
+    """
+    result = PruneResult()
+    if not rules:
+        logger.info('No retention rules: Nothing to prune.')
+        return result
+
+    if now is None:
+        now = timezone.now()
+
+    qs = TaskModel.objects.filter(rules.get_filter(now), parent_task__isnull=True).values_list('pk', flat=True)
+    while True:
+        main_task_ids = list(qs[:chunk_size])
+        if not main_task_ids:
+            break
+
+        delete_task_tree(main_task_ids, chunk_size=chunk_size, result=result)
+        logger.info('Prune: %s', result)
+
+        if sleep:
+            # Give other database clients a chance:
+            time.sleep(sleep)
+
+    return result
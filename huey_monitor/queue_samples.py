@@ -0,0 +1,311 @@
+"""
+Time series of the Huey queue depths: A periodic task takes raw samples of the pending, scheduled
+tasks and results (and the Redis memory/keys, if available). The raw samples are downsampled
+into minutes and hours and old samples are removed.
+"""
+
+import datetime
+import logging
+
+from bx_django_utils.humanize.time import human_timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from huey.contrib.djhuey import HUEY
+from huey.signals import SIGNAL_ENQUEUED, SIGNAL_EXECUTING
+
+from huey_monitor.constants import QUEUE_SAMPLES_HOUR_DAYS, QUEUE_SAMPLES_MINUTE_DAYS, QUEUE_SAMPLES_RAW_HOURS
+from huey_monitor.models import QueueSampleModel, SignalInfoModel
+
+
+logger = logging.getLogger(__name__)
+
+# Downsample the raw samples into minutes and the minutes into hours:
+DOWNSAMPLING = (
+    (QueueSampleModel.RESOLUTION_RAW, QueueSampleModel.RESOLUTION_MINUTE),
+    (QueueSampleModel.RESOLUTION_MINUTE, QueueSampleModel.RESOLUTION_HOUR),
+)
+
+
+def truncate(dt, seconds):
+    """
+    Start of the time range with the given length in seconds (UTC)
+
+    >>> truncate(datetime.datetime(2000, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc), seconds=60)
+    datetime.datetime(2000, 1, 2, 3, 4, tzinfo=datetime.timezone.utc)
+    >>> truncate(datetime.datetime(2000, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc), seconds=3600)
+    datetime.datetime(2000, 1, 2, 3, 0, tzinfo=datetime.timezone.utc)
+    """
+    timestamp = dt.timestamp() // seconds * seconds
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def get_redis_info(huey) -> tuple:
+    """
+    Returns the used memory and the number of keys, if the Huey storage is a Redis server.
+    """
+    conn = getattr(huey.storage, 'conn', None)
+    if conn is None or not hasattr(conn, 'dbsize'):
+        return None, None
+    try:
+        return conn.info('memory')['used_memory'], conn.dbsize()
+    except Exception as err:
+        logger.warning('Failed to get the Redis info: %s', err)
+        return None, None
+
+
+def count_signals(start, end) -> dict:
+    """
+    Number of enqueued tasks and started executions in the time range.
+    """
+    qs = (
+        SignalInfoModel.objects.filter(
+            create_dt__gte=start,
+            create_dt__lt=end,
+            signal_name__in=(SIGNAL_ENQUEUED, SIGNAL_EXECUTING),
+        )
+        .order_by()
+        .values_list('signal_name')
+        .annotate(count=Count('pk'))
+    )
+    return dict(qs)
+
+
+def take_sample(huey=None, now=None):
+    """
+    Store a raw sample. Returns the new QueueSampleModel instance or None, if the Huey storage fails.
+    """
+    if huey is None:
+        huey = HUEY
+    try:
+        pending = huey.pending_count()
+        scheduled = huey.scheduled_count()
+        result = huey.result_count()
+    except OSError as err:
+        logger.exception('Failed to get counts from HUEY: %s', err)
+        return None
+    redis_memory, redis_keys = get_redis_info(huey)
+
+    if now is None:
+        now = timezone.now()
+    previous_dt = (
+        QueueSampleModel.objects.filter(resolution=QueueSampleModel.RESOLUTION_RAW, sample_dt__lt=now)
+        .order_by('-sample_dt')
+        .values_list('sample_dt', flat=True)
+        .first()
+    )
+    if previous_dt is None:
+        # The first sample: The enqueued/executed counts are unknown
+        duration = 0
+        signal_counts = {}
+    else:
+        duration = (now - previous_dt).total_seconds()
+        signal_counts = count_signals(previous_dt, now)
+
+    return QueueSampleModel.objects.create(
+        resolution=QueueSampleModel.RESOLUTION_RAW,
+        sample_dt=now,
+        duration=duration,
+        pending=pending,
+        pending_max=pending,
+        scheduled=scheduled,
+        result=result,
+        enqueued_count=signal_counts.get(SIGNAL_ENQUEUED, 0),
+        executed_count=signal_counts.get(SIGNAL_EXECUTING, 0),
+        redis_memory=redis_memory,
+        redis_keys=redis_keys,
+    )
+
+
+def merge_samples(samples, resolution, sample_dt) -> QueueSampleModel:
+    """
+    Aggregate samples into one sample of the given resolution.
+    """
+    sample_count = sum(sample.sample_count for sample in samples)
+
+    def average(attname):
+        return sum(getattr(sample, attname) * sample.sample_count for sample in samples) / sample_count
+
+    def maximum(attname):
+        values = [getattr(sample, attname) for sample in samples if getattr(sample, attname) is not None]
+        return max(values) if values else None
+
+    return QueueSampleModel(
+        resolution=resolution,
+        sample_dt=sample_dt,
+        sample_count=sample_count,
+        duration=sum(sample.duration for sample in samples),
+        pending=average('pending'),
+        pending_max=maximum('pending_max'),
+        scheduled=average('scheduled'),
+        result=average('result'),
+        enqueued_count=sum(sample.enqueued_count for sample in samples),
+        executed_count=sum(sample.executed_count for sample in samples),
+        redis_memory=maximum('redis_memory'),
+        redis_keys=maximum('redis_keys'),
+    )
+
+
+def downsample(source, target, now) -> int:
+    """
+    Aggregate all complete time ranges of the "target" resolution, that are not aggregated yet.
+    Returns the number of new samples.
+    """
+    end = truncate(now, target)
+    qs = QueueSampleModel.objects.filter(resolution=source, sample_dt__lt=end).order_by('sample_dt')
+    last_dt = (
+        QueueSampleModel.objects.filter(resolution=target)
+        .order_by('-sample_dt')
+        .values_list('sample_dt', flat=True)
+        .first()
+    )
+    if last_dt is not None:
+        qs = qs.filter(sample_dt__gte=last_dt + datetime.timedelta(seconds=target))
+
+    buckets = {}
+    for sample in qs:
+        buckets.setdefault(truncate(sample.sample_dt, target), []).append(sample)
+
+    QueueSampleModel.objects.bulk_create(
+        [merge_samples(samples, target, sample_dt) for sample_dt, samples in buckets.items()],
+        ignore_conflicts=True,  # e.g.: Two samplers run at the same time
+    )
+    return len(buckets)
+
+
+def delete_old_samples(now) -> int:
+    """
+    Delete samples older than the retention of their resolution.
+    """
+    retention = {
+        QueueSampleModel.RESOLUTION_RAW: datetime.timedelta(
+            hours=getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLES_RAW_HOURS', QUEUE_SAMPLES_RAW_HOURS)
+        ),
+        QueueSampleModel.RESOLUTION_MINUTE: datetime.timedelta(
+            days=getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLES_MINUTE_DAYS', QUEUE_SAMPLES_MINUTE_DAYS)
+        ),
+        QueueSampleModel.RESOLUTION_HOUR: datetime.timedelta(
+            days=getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLES_HOUR_DAYS', QUEUE_SAMPLES_HOUR_DAYS)
+        ),
+    }
+    deleted = 0
+    for resolution, keep in retention.items():
+        count, _ = QueueSampleModel.objects.filter(resolution=resolution, sample_dt__lt=now - keep).delete()
+        deleted += count
+    return deleted
+
+
+def sample_queues(huey=None, now=None):
+    """
+    Take a raw sample, downsample and delete old samples. Called by the periodic "queue_sampler" task.
+    """
+    sample = take_sample(huey=huey, now=now)
+    if now is None:
+        now = timezone.now()
+    with transaction.atomic():
+        created = sum(downsample(source, target, now) for source, target in DOWNSAMPLING)
+        deleted = delete_old_samples(now)
+    logger.info('Queue sample: %s (%i samples aggregated, %i old samples deleted)', sample, created, deleted)
+    return sample
+
+
+def queue_history(hours, now=None) -> tuple:
+    """
+    Returns the resolution and the samples of the last hours.
+    The finest resolution, that is kept long enough, is used.
+    """
+    if now is None:
+        now = timezone.now()
+    if hours <= getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLES_RAW_HOURS', QUEUE_SAMPLES_RAW_HOURS):
+        resolution = QueueSampleModel.RESOLUTION_RAW
+    elif hours <= getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLES_MINUTE_DAYS', QUEUE_SAMPLES_MINUTE_DAYS) * 24:
+        resolution = QueueSampleModel.RESOLUTION_MINUTE
+    else:
+        resolution = QueueSampleModel.RESOLUTION_HOUR
+    samples = list(
+        QueueSampleModel.objects.filter(
+            resolution=resolution, sample_dt__gte=now - datetime.timedelta(hours=hours)
+        ).order_by('sample_dt')
+    )
+    return resolution, samples
+
+
+def per_minute(count, duration):
+    """
+    >>> per_minute(10, 30)
+    20.0
+    >>> per_minute(10, 0) is None
+    True
+    """
+    if duration > 0:
+        return count * 60 / duration
+
+
+class QueueSummary:
+    """
+    Backlog growth and drain rate of samples, e.g.: to size the number of consumers.
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+        duration = sum(sample.duration for sample in samples)
+        self.enqueued_per_minute = per_minute(sum(sample.enqueued_count for sample in samples), duration)
+        self.executed_per_minute = per_minute(sum(sample.executed_count for sample in samples), duration)
+        self.pending = samples[-1].pending if samples else None
+
+    @property
+    def growth_per_minute(self):
+        """
+        Growth of the backlog (negative: The backlog drains)
+        """
+        if self.enqueued_per_minute is not None:
+            return self.enqueued_per_minute - self.executed_per_minute
+
+    @property
+    def drain_time(self):
+        """
+        Estimated time until the current backlog is processed, if it drains.
+        """
+        growth = self.growth_per_minute
+        if self.pending and growth is not None and growth < 0:
+            return datetime.timedelta(minutes=self.pending / -growth)
+
+    @property
+    def human_drain_time(self):
+        drain_time = self.drain_time
+        return '-' if drain_time is None else human_timedelta(drain_time)
+
+
+def svg_chart(samples, series, width=600, height=120) -> dict:
+    """
+    Context for a simple SVG line chart.
+    "series" is a list of (label, css class, function(sample) -> value or None)
+    """
+    lines = []
+    max_value = 0
+    for label, css_class, get_value in series:
+        values = [(sample.sample_dt.timestamp(), get_value(sample)) for sample in samples]
+        values = [(x, y) for x, y in values if y is not None]
+        max_value = max([max_value] + [y for _, y in values])
+        lines.append((label, css_class, values))
+
+    timestamps = [sample.sample_dt.timestamp() for sample in samples]
+    start = min(timestamps, default=0)
+    x_range = (max(timestamps, default=0) - start) or 1
+    y_range = max_value or 1
+
+    chart_lines = []
+    for label, css_class, values in lines:
+        points = ' '.join(
+            f'{(x - start) * width / x_range:.1f},{height - y * height / y_range:.1f}' for x, y in values
+        )
+        chart_lines.append({'label': label, 'css_class': css_class, 'points': points})
+    return {
+        'width': width,
+        'height': height,
+        'max_value': max_value,
+        'lines': chart_lines,
+        'start_dt': samples[0].sample_dt if samples else None,
+        'end_dt': samples[-1].sample_dt if samples else None,
+    }
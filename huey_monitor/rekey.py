@@ -0,0 +1,81 @@
+"""
+Replace the random primary keys (UUID version 4) of existing signals by time-ordered keys, see: huey_monitor.uuid7
+"""
+
+import logging
+import time
+
+from django.db import connection, transaction
+from django.db.models import Case, Q, UUIDField, Value, When
+
+from huey_monitor.constants import REKEY_CHUNK_SIZE
+from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.uuid7 import is_uuid7, uuid7
+
+
+logger = logging.getLogger(__name__)
+
+
+def rekey_chunk(signals) -> int:
+    """
+    Copy the given signals with new keys, change the task states to the copies and delete the old signals.
+    Must be called in a transaction. Returns the number of changed signals.
+    """
+    new_ids = {}
+    copies = []
+    for signal in signals:
+        if is_uuid7(signal.pk):
+            continue
+        new_ids[signal.pk] = uuid7(signal.create_dt)
+        signal.pk = new_ids[signal.pk]
+        copies.append(signal)
+    if not copies:
+        return 0
+
+    SignalInfoModel.objects.bulk_create(copies)
+    TaskModel.objects.filter(state_id__in=list(new_ids)).update(
+        state_id=Case(
+            *[When(state_id=old_id, then=Value(new_id)) for old_id, new_id in new_ids.items()],
+            output_field=UUIDField(),
+        )
+    )
+
+    # Delete via plain SQL, without Django's cascade collector (The tasks use the copies)
+    qn = connection.ops.quote_name
+    pk_field = SignalInfoModel._meta.pk
+    params = [pk_field.get_db_prep_value(old_id, connection) for old_id in new_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {qn(SignalInfoModel._meta.db_table)} WHERE {qn(pk_field.column)}'
+            f' IN ({", ".join(["%s"] * len(params))})',
+            params,
+        )
+    return len(copies)
+
+
+def rekey_signals(chunk_size=REKEY_CHUNK_SIZE, sleep=0) -> int:
+    """
+    Give all signals with a random UUID a time-ordered UUID, chunk by chunk in short transactions:
+    Can be run while the workers are storing new signals and can be interrupted at any time.
+    Returns the number of changed signals.
+    """
+    qs = SignalInfoModel.objects.order_by('create_dt', 'id')
+    chunk_qs = qs
+    count = 0
+    while True:
+        with transaction.atomic():
+            signals = list(chunk_qs.select_for_update()[:chunk_size])
+            if not signals:
+                break
+            last_create_dt, last_id = signals[-1].create_dt, signals[-1].pk
+            count += rekey_chunk(signals)
+
+        logger.info('Rekey signals: %i signals changed', count)
+        # The copies are sorted after the last signal, but will be skipped:
+        chunk_qs = qs.filter(Q(create_dt__gt=last_create_dt) | Q(create_dt=last_create_dt, id__gt=last_id))
+
+        if sleep:
+            # Give other database clients a chance:
+            time.sleep(sleep)
+
+    return count
@@ -0,0 +1,125 @@
+"""
+CPU time, peak memory and I/O of task executions:
+
+A snapshot is taken by the "executing" signal and the difference is calculated by the signal,
+that ends the execution. Both signals are sent in the worker thread, that executes the task.
+
+ * The CPU times are measured per thread via getrusage(RUSAGE_THREAD), if available (Linux)
+   otherwise per process (Note: With "greenlet" workers, the other greenlets are included)
+ * The peak RSS is the high-water mark of the worker process at the end of the execution
+ * The I/O are the bytes read from/written to the storage layer, via /proc/thread-self/io (Linux only)
+"""
+
+import logging
+import sys
+import threading
+
+from django.conf import settings
+
+
+try:
+    import resource
+except ImportError:  # e.g.: Windows
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_USAGE_FIELDS = ('cpu_user_time', 'cpu_system_time', 'max_rss', 'io_read_bytes', 'io_write_bytes')
+
+PROC_IO_PATH = '/proc/thread-self/io'
+
+# ru_maxrss is in bytes on macOS and in kilobytes on all other platforms:
+MAX_RSS_FACTOR = 1 if sys.platform == 'darwin' else 1024
+
+
+def resource_usage_enabled() -> bool:
+    return getattr(settings, 'HUEY_MONITOR_RESOURCE_USAGE', True) and resource is not None
+
+
+def parse_proc_io(content) -> tuple:
+    """
+    >>> parse_proc_io('rchar: 3980\\nwchar: 12\\nread_bytes: 4096\\nwrite_bytes: 8192\\n')
+    (4096, 8192)
+    >>> parse_proc_io('rchar: 3980\\n')
+    (None, None)
+    """
+    values = {}
+    for line in content.splitlines():
+        key, _, value = line.partition(':')
+        values[key.strip()] = value.strip()
+    try:
+        return int(values['read_bytes']), int(values['write_bytes'])
+    except (KeyError, ValueError):
+        return None, None
+
+
+def read_proc_io() -> tuple:
+    """
+    Returns the read and written bytes of the current thread or (None, None) if not available.
+    """
+    try:
+        with open(PROC_IO_PATH) as f:
+            return parse_proc_io(f.read())
+    except OSError:
+        return None, None
+
+
+def get_snapshot() -> dict:
+    who = getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF)
+    usage = resource.getrusage(who)
+    io_read_bytes, io_write_bytes = read_proc_io()
+    return {
+        'cpu_user_time': usage.ru_utime,
+        'cpu_system_time': usage.ru_stime,
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAX_RSS_FACTOR,
+        'io_read_bytes': io_read_bytes,
+        'io_write_bytes': io_write_bytes,
+    }
+
+
+def get_usage_delta(start, end) -> dict:
+    """
+    >>> start = dict(cpu_user_time=1.5, cpu_system_time=0.25, max_rss=100, io_read_bytes=10, io_write_bytes=None)
+    >>> end = dict(cpu_user_time=2.0, cpu_system_time=0.5, max_rss=200, io_read_bytes=30, io_write_bytes=None)
+    >>> get_usage_delta(start, end)
+    {'cpu_user_time': 0.5, 'cpu_system_time': 0.25, 'max_rss': 200, 'io_read_bytes': 20, 'io_write_bytes': None}
+    """
+    delta = {}
+    for key in RESOURCE_USAGE_FIELDS:
+        if key == 'max_rss':
+            # The high-water mark can't be split by executions
+            delta[key] = end[key]
+        elif start[key] is None or end[key] is None:
+            delta[key] = None
+        else:
+            delta[key] = end[key] - start[key]
+    return delta
+
+
+# Snapshots of the running executions in this process by task ID:
+_snapshots = {}
+
+
+def start_execution(task_id):
+    """
+    Called by the "executing" signal: Take the start snapshot.
+    """
+    if resource_usage_enabled():
+        _snapshots[task_id] = (threading.get_ident(), get_snapshot())
+
+
+def end_execution(task_id):
+    """
+    Called by the signals, that end an execution.
+    Returns the resource usage of the execution or None, if unknown
+    (e.g.: a revoked task, that was never executed)
+    """
+    thread_ident, start = _snapshots.pop(task_id, (None, None))
+    if start is None:
+        return None
+    if thread_ident != threading.get_ident():
+        # Should never happen: The thread CPU times are not comparable
+        logger.warning('Task %s ended in another thread: Resource usage ignored', task_id)
+        return None
+    return get_usage_delta(start, get_snapshot())
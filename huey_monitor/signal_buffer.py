@@ -0,0 +1,182 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections
+
+from huey_monitor.collector import EVENT_PARENT, EVENT_SIGNAL, connection_lost, store_events, task_update_event
+from huey_monitor.constants import SIGNAL_BUFFER_INTERVAL, SIGNAL_BUFFER_RETRIES, SIGNAL_BUFFER_SIZE
+from huey_monitor.instrumentation import OVERHEAD_SIGNAL_BATCH, measure
+
+
+logger = logging.getLogger(__name__)
+
+
+def buffer_enabled() -> bool:
+    """
+    Should the workers store the signals later, in batches?
+    """
+    return getattr(settings, 'HUEY_MONITOR_SIGNAL_BUFFER', False)
+
+
+class SignalBuffer:
+    """
+    Collect signals in memory and store them in batches.
+
+    The progress information and task relationships are collected, too:
+    They must be stored after the signals that create the task entries.
+    Uses the events of the collector, see: huey_monitor.collector.EventWriter
+
+    A background thread stores the collected events if "max_size" events are
+    waiting or "flush_interval" seconds are elapsed.
+    """
+
+    def __init__(self, *, max_size, flush_interval, retries=SIGNAL_BUFFER_RETRIES):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.pid = os.getpid()
+
+        self._events = []
+        self._attempts = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def add(self, event):
+        with self._lock:
+            self._events.append(event)
+            count = len(self._events)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='huey_monitor_signal_buffer', daemon=True)
+                self._thread.start()
+
+        if count == self.max_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Store all collected events.
+        Retry on database connection problems (and a few times on other database errors)
+        with the next flush. If the events can't be stored, they are stored one by one:
+        Only the failing events are skipped.
+        """
+        # The flush lock keeps the event order if the flusher thread
+        # and e.g. a shutdown handler flush at the same time.
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return
+
+            try:
+                with measure(OVERHEAD_SIGNAL_BATCH):
+                    store_events(events)
+            except (InterfaceError, OperationalError) as err:
+                lost = connection_lost()
+                if not self._stopped and (lost or self._attempts < self.retries):
+                    if not lost:
+                        self._attempts += 1
+                    logger.error(
+                        'Failed to store %i monitor events (retry in %s sec.): %s',
+                        len(events),
+                        self.flush_interval,
+                        err,
+                    )
+                    # Keep the order: The events are older than the events added in the meantime.
+                    with self._lock:
+                        self._events[:0] = events
+                    return
+                error = err
+            except Exception as err:
+                error = err
+            else:
+                self._attempts = 0
+                return
+
+            self._attempts = 0
+            logger.error('Failed to store %i monitor events: Store them one by one', len(events), exc_info=error)
+            for event in events:
+                try:
+                    store_events([event])
+                except Exception:
+                    logger.exception('Skip monitor event %r', event)
+
+    def stop(self):
+        """
+        Stop the background thread and store all collected events.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                # stop() will store the remaining events
+                break
+
+            # We run outside of the request/response cycle: Take care of broken connections
+            close_old_connections()
+            self.flush()
+
+
+_signal_buffer = None
+_signal_buffer_lock = threading.Lock()
+
+
+def get_signal_buffer():
+    """
+    Returns the SignalBuffer of the current process.
+    """
+    global _signal_buffer
+    with _signal_buffer_lock:
+        if _signal_buffer is None or _signal_buffer.pid != os.getpid():
+            # Note: A forked process didn't inherit the flusher thread -> create a new buffer
+            _signal_buffer = SignalBuffer(
+                max_size=getattr(settings, 'HUEY_MONITOR_SIGNAL_BUFFER_SIZE', SIGNAL_BUFFER_SIZE),
+                flush_interval=getattr(settings, 'HUEY_MONITOR_SIGNAL_BUFFER_INTERVAL', SIGNAL_BUFFER_INTERVAL),
+            )
+            atexit.register(_signal_buffer.stop)
+        return _signal_buffer
+
+
+def buffer_signal(signal_info):
+    get_signal_buffer().add({'event': EVENT_SIGNAL, **signal_info})
+
+
+def buffer_task_update(task_id, parent_task_id=None, **values):
+    get_signal_buffer().add(task_update_event(task_id, parent_task_id=parent_task_id, **values))
+
+
+def buffer_parent_task(main_task_id, sub_task_id):
+    get_signal_buffer().add({'event': EVENT_PARENT, 'task_id': sub_task_id, 'parent_task_id': main_task_id})
+
+
+def flush_signal_buffer():
+    """
+    Store all buffered events of the current process, if any.
+    """
+    if _signal_buffer is not None and _signal_buffer.pid == os.getpid():
+        _signal_buffer.flush()
+
+
+def stop_signal_buffer():
+    """
+    Stop the buffer of the current process and store all buffered events.
+    A new buffer will be created on the next event.
+    """
+    global _signal_buffer
+    with _signal_buffer_lock:
+        signal_buffer, _signal_buffer = _signal_buffer, None
+    if signal_buffer is not None and signal_buffer.pid == os.getpid():
+        atexit.unregister(signal_buffer.stop)
+        signal_buffer.stop()
@@ -0,0 +1,608 @@
+import logging
+import os
+import socket
+import sys
+import threading
+import traceback
+import uuid
+from functools import lru_cache
+
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from huey_monitor.constants import ENDED_HUEY_SIGNALS, WORKER_IDENTITY_CACHE_SIZE
+from huey_monitor.exception_groups import ExceptionGroupUpdate, signal_fingerprint
+from huey_monitor.models import SignalInfoModel, TaskModel, WorkerIdentityModel
+from huey_monitor.resource_usage import RESOURCE_USAGE_FIELDS
+from huey_monitor.statistics import StatisticsUpdate
+from huey_monitor.sub_task_counts import SubTaskCountsUpdate, get_last_signal_names
+from huey_monitor.uuid7 import uuid7
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_hostname():
+    return socket.gethostname()
+
+
+def get_signal_info(signal, task, exc=None) -> dict:
+    """
+    Collect all information about a Huey signal without touching the database.
+    The result can be stored directly via store_signal() or later in a batch
+    via store_signal_batch()
+    """
+    signal_info = {
+        'task_id': uuid.UUID(task.id),
+        'task_name': task.name,
+        'signal_name': signal,
+        'hostname': get_hostname(),
+        'pid': os.getpid(),
+        'thread': threading.current_thread().name,
+        'create_dt': timezone.now(),
+    }
+    if exc is not None:
+        signal_info['exception_line'] = str(exc)
+        signal_info['exception'] = ''.join(traceback.format_exception(*sys.exc_info()))
+    return signal_info
+
+
+# WorkerIdentityModel primary keys by (hostname, pid, thread) of this process:
+_worker_identity_ids = {}
+
+
+def _cache_worker_identity_ids(identity_ids):
+    if len(_worker_identity_ids) + len(identity_ids) > WORKER_IDENTITY_CACHE_SIZE:
+        _worker_identity_ids.clear()
+    _worker_identity_ids.update(identity_ids)
+
+
+def worker_identity_key(signal_info) -> tuple:
+    return signal_info['hostname'], signal_info['pid'], signal_info['thread']
+
+
+def get_worker_identity_ids(keys) -> dict:
+    """
+    Returns the WorkerIdentityModel primary keys by the given (hostname, pid, thread) keys.
+    Unknown identities are created with two queries. The IDs are cached in the process,
+    after the transaction is committed (A rollback may remove a new identity).
+    """
+    keys = set(keys)
+    identity_ids = {key: _worker_identity_ids[key] for key in keys if key in _worker_identity_ids}
+    missing = keys - identity_ids.keys()
+    if missing:
+        WorkerIdentityModel.objects.bulk_create(
+            [WorkerIdentityModel(hostname=hostname, pid=pid, thread=thread) for hostname, pid, thread in missing],
+            ignore_conflicts=True,
+        )
+        q = Q(pk__in=[])
+        for hostname, pid, thread in missing:
+            q |= Q(hostname=hostname, pid=pid, thread=thread)
+        new_ids = {
+            (hostname, pid, thread): pk
+            for pk, hostname, pid, thread in WorkerIdentityModel.objects.filter(q).values_list(
+                'pk', 'hostname', 'pid', 'thread'
+            )
+        }
+        identity_ids.update(new_ids)
+        transaction.on_commit(lambda: _cache_worker_identity_ids(new_ids))
+    return identity_ids
+
+
+def save_exception_groups(signal_infos) -> dict:
+    """
+    Add the exceptions of the signals to the exception groups.
+    Returns the primary keys of the groups by fingerprint. Must be called in a transaction.
+    """
+    exception_groups = ExceptionGroupUpdate()
+    for signal_info in signal_infos:
+        exception_groups.add(signal_info, task_name=signal_info['task_name'])
+    return exception_groups.save()
+
+
+def _signal_kwargs(signal_info, worker_ids, group_ids) -> dict:
+    """
+    Build the SignalInfoModel field values from a signal info dict.
+    The exception is only stored in the signal, if it's not grouped.
+    """
+    signal_kwargs = {
+        'task_id': signal_info['task_id'],
+        'signal_name': signal_info['signal_name'],
+        'worker_id': worker_ids[worker_identity_key(signal_info)],
+        'create_dt': signal_info['create_dt'],
+    }
+    if 'exception_line' in signal_info:
+        signal_kwargs['exception_line'] = signal_info['exception_line']
+        group_id = group_ids.get(signal_fingerprint(signal_info))
+        if group_id is None:
+            signal_kwargs['exception'] = signal_info['exception']
+        else:
+            signal_kwargs['exception_group_id'] = group_id
+    return signal_kwargs
+
+
+def update_task_instance(instance, last_signal, task_finished, resource_usage=None):
+    instance.state_id = last_signal.pk
+    update_fields = ['state_id']
+    update_fields += instance.update_times(last_signal.signal_name, last_signal.create_dt, task_finished)
+    update_fields += instance.update_resource_usage(last_signal.signal_name, resource_usage)
+    if task_finished:
+        instance.finished = True
+        update_fields.append('finished')
+
+        if instance.cumulate_progress:
+            # Progress of the sub tasks should be added up and saved in the parent task
+            if instance.parent_task_id is None:
+                # This is the main task -> collect process count
+                qs = TaskModel.objects.filter(parent_task_id=instance.task_id).aggregate(
+                    Sum('progress_count')
+                )
+                progress_count = qs['progress_count__sum']
+                if progress_count is not None:
+                    instance.progress_count = progress_count
+                    update_fields.append('progress_count')
+
+    instance.save(update_fields=update_fields)
+
+
+def store_signal(signal_info):
+    """
+    Store one Huey signal directly.
+    """
+    if upsert_supported():
+        upsert_signal_batch([signal_info])
+    else:
+        store_signal_orm(signal_info)
+
+
+def store_signal_orm(signal_info):
+    """
+    Store one Huey signal via the Django ORM: Used for database backends without "upsert" support.
+    """
+    # Task no longer waits or run?
+    task_finished = signal_info['signal_name'] in ENDED_HUEY_SIGNALS
+
+    with transaction.atomic():
+        worker_ids = get_worker_identity_ids([worker_identity_key(signal_info)])
+        group_ids = save_exception_groups([signal_info])
+        task_model_instance, created = TaskModel.objects.select_related('state').get_or_create(
+            task_id=signal_info['task_id'],
+            defaults={'name': signal_info['task_name']}
+        )
+        old_signal_name = task_model_instance.state.signal_name if task_model_instance.state else None
+
+        signal_kwargs = _signal_kwargs(signal_info, worker_ids, group_ids)
+        if task_model_instance.progress_count is not None:
+            signal_kwargs['progress_count'] = task_model_instance.progress_count
+
+        last_signal = SignalInfoModel.objects.create(**signal_kwargs)
+
+        # e.g.: "revoked" after "error": The execution has ended before, its times are already counted
+        new_end = task_finished and not task_model_instance.execution_ended()
+        update_task_instance(
+            instance=task_model_instance,
+            last_signal=last_signal,
+            task_finished=task_finished,
+            resource_usage=signal_info.get('resource_usage'),
+        )
+
+        if task_model_instance.parent_task_id is not None:
+            counts = SubTaskCountsUpdate()
+            counts.add_state_change(task_model_instance.parent_task_id, old_signal_name, last_signal.signal_name)
+            counts.save()
+
+        if task_finished:
+            statistics = StatisticsUpdate()
+            statistics.add_run(
+                name=task_model_instance.name,
+                signal_name=last_signal.signal_name,
+                ended_dt=last_signal.create_dt,
+                duration=task_model_instance.duration if new_end else None,
+                hostname=signal_info['hostname'],
+                latency=task_model_instance.queue_latency if new_end else None,
+                resource_usage=signal_info.get('resource_usage'),
+            )
+            statistics.save()
+
+
+def store_signal_batch(signal_infos):
+    """
+    Store many Huey signals with a constant number of queries.
+    The signals must be in the order in which they occurred.
+    """
+    if upsert_supported():
+        upsert_signal_batch(signal_infos)
+    else:
+        store_signal_batch_orm(signal_infos)
+
+
+def store_signal_batch_orm(signal_infos):
+    """
+    Store many Huey signals via the Django ORM:
+    Missing tasks and all signals are created via bulk_create() and
+    the task states are updated grouped via bulk_update().
+    The signals must be in the order in which they occurred.
+    """
+    if not signal_infos:
+        return
+
+    first_infos = {}
+    for signal_info in signal_infos:
+        first_infos.setdefault(signal_info['task_id'], signal_info)
+
+    with transaction.atomic():
+        worker_ids = get_worker_identity_ids(map(worker_identity_key, signal_infos))
+        group_ids = save_exception_groups(signal_infos)
+        TaskModel.objects.bulk_create(
+            [
+                TaskModel(
+                    task_id=task_id,
+                    name=signal_info['task_name'],
+                    create_dt=signal_info['create_dt'],
+                    update_dt=signal_info['create_dt'],
+                )
+                for task_id, signal_info in first_infos.items()
+            ],
+            ignore_conflicts=True,
+        )
+        instances = TaskModel.objects.select_related('state').in_bulk(list(first_infos))
+        old_signal_names = {
+            task_id: instance.state.signal_name if instance.state else None
+            for task_id, instance in instances.items()
+            if instance.parent_task_id is not None
+        }
+
+        signals = []
+        last_signals = {}
+        finished_task_ids = set()
+        time_fields = {}
+        statistics = StatisticsUpdate()
+        for signal_info in signal_infos:
+            task_id = signal_info['task_id']
+            signal_instance = SignalInfoModel(
+                progress_count=instances[task_id].progress_count,
+                **_signal_kwargs(signal_info, worker_ids, group_ids),
+            )
+            signals.append(signal_instance)
+            last_signals[task_id] = signal_instance
+            task_finished = signal_info['signal_name'] in ENDED_HUEY_SIGNALS
+            if task_finished:
+                finished_task_ids.add(task_id)
+            changed_fields = instances[task_id].update_times(
+                signal_info['signal_name'], signal_info['create_dt'], task_finished
+            )
+            new_end = task_finished and 'ended_dt' in changed_fields
+            changed_fields += instances[task_id].update_resource_usage(
+                signal_info['signal_name'], signal_info.get('resource_usage')
+            )
+            time_fields.setdefault(task_id, set()).update(changed_fields)
+            if task_finished:
+                statistics.add_run(
+                    name=instances[task_id].name,
+                    signal_name=signal_info['signal_name'],
+                    ended_dt=signal_info['create_dt'],
+                    duration=instances[task_id].duration if new_end else None,
+                    hostname=signal_info['hostname'],
+                    latency=instances[task_id].queue_latency if new_end else None,
+                    resource_usage=signal_info.get('resource_usage'),
+                )
+
+        SignalInfoModel.objects.bulk_create(signals)
+
+        # Collect the progress of sub tasks for all finished main tasks with one query:
+        cumulate_ids = [
+            task_id
+            for task_id in finished_task_ids
+            if instances[task_id].cumulate_progress and instances[task_id].parent_task_id is None
+        ]
+        progress_sums = {}
+        if cumulate_ids:
+            qs = (
+                TaskModel.objects.filter(parent_task_id__in=cumulate_ids)
+                .values('parent_task_id')
+                .annotate(progress_sum=Sum('progress_count'))
+                .values_list('parent_task_id', 'progress_sum')
+            )
+            progress_sums = {
+                parent_task_id: progress_sum for parent_task_id, progress_sum in qs if progress_sum is not None
+            }
+
+        # Group the task updates by the fields that must be changed:
+        now = timezone.now()
+        update_groups = {}
+        for task_id, last_signal in last_signals.items():
+            instance = instances[task_id]
+            instance.state_id = last_signal.pk
+            instance.update_dt = now
+            update_fields = ('state', 'update_dt', *sorted(time_fields[task_id]))
+            if task_id in finished_task_ids:
+                instance.finished = True
+                update_fields += ('finished',)
+                if task_id in progress_sums:
+                    instance.progress_count = progress_sums[task_id]
+                    update_fields += ('progress_count',)
+            update_groups.setdefault(update_fields, []).append(instance)
+
+        for update_fields, group in update_groups.items():
+            TaskModel.objects.bulk_update(group, fields=update_fields)
+
+        counts = SubTaskCountsUpdate()
+        for task_id, old_signal_name in old_signal_names.items():
+            new_signal_name = last_signals[task_id].signal_name
+            counts.add_state_change(instances[task_id].parent_task_id, old_signal_name, new_signal_name)
+        counts.save()
+
+        statistics.save()
+
+    logger.debug('Stored %i signals of %i tasks', len(signals), len(instances))
+
+
+def upsert_supported() -> bool:
+    """
+    Can we use "INSERT ... ON CONFLICT DO UPDATE ... RETURNING" with the current database?
+    """
+    return (
+        connection.vendor in ('postgresql', 'sqlite')
+        and connection.features.supports_update_conflicts_with_target
+        and connection.features.can_return_rows_from_bulk_insert
+    )
+
+
+def _build_task_upsert_sql(row_count) -> str:
+    """
+    Build the SQL for: Create all tasks or update the existing ones.
+
+    The "finished" flag will never be reset and a finished main task will
+    cumulate the progress of all its sub tasks.
+
+    The new row contains the execution times of the stored signals, only:
+    A new "executing_dt" resets "ended_dt" and a new "ended_dt" sets the "duration",
+    using the stored "executing_dt", if needed. A new "ended_dt" is ignored,
+    if the stored execution has already ended, e.g.: "revoked" after "error".
+    A new "executing_dt" without a new "enqueued_dt" sets the "queue_latency" via the stored "enqueued_dt".
+    The resource usage fields are set by an ended execution and removed by a new one.
+
+    Returns the task ID, the progress, the "executing_dt", the "ended_dt", the "queue_latency"
+    and the main task ID of all tasks.
+    """
+    qn = connection.ops.quote_name
+    opts = TaskModel._meta
+    table = qn(opts.db_table)
+
+    def column(name):
+        return qn(opts.get_field(name).column)
+
+    executing_dt = f'COALESCE(EXCLUDED.{column("executing_dt")}, {table}.{column("executing_dt")})'
+    duration, duration_params = connection.ops.subtract_temporals(
+        'DateTimeField', (f'EXCLUDED.{column("ended_dt")}', ()), (executing_dt, ())
+    )
+    assert not duration_params
+    queue_latency, latency_params = connection.ops.subtract_temporals(
+        'DateTimeField', (f'EXCLUDED.{column("executing_dt")}', ()), (f'{table}.{column("enqueued_dt")}', ())
+    )
+    assert not latency_params
+    # A new end of the stored execution, or the end of an execution started in this batch:
+    new_end = (
+        f'EXCLUDED.{column("ended_dt")} IS NOT NULL AND (EXCLUDED.{column("executing_dt")} IS NOT NULL'
+        f' OR {table}.{column("ended_dt")} IS NULL OR {table}.{column("executing_dt")} > {table}.{column("ended_dt")})'
+    )
+
+    resource_usage = ''.join(
+        f' {column(name)} = CASE'
+        f' WHEN EXCLUDED.{column(name)} IS NOT NULL THEN EXCLUDED.{column(name)}'
+        f' WHEN EXCLUDED.{column("executing_dt")} IS NOT NULL THEN NULL'
+        f' ELSE {table}.{column(name)} END,'
+        for name in RESOURCE_USAGE_FIELDS
+    )
+
+    columns = [field.column for field in opts.concrete_fields]
+    placeholders = f'({", ".join(["%s"] * len(columns))})'
+    values = ', '.join([placeholders] * row_count)
+    return (
+        f'INSERT INTO {table} ({", ".join(qn(name) for name in columns)}) VALUES {values}'
+        f' ON CONFLICT ({column("task_id")}) DO UPDATE SET'
+        f' {column("state")} = EXCLUDED.{column("state")},'
+        f' {column("update_dt")} = EXCLUDED.{column("update_dt")},'
+        f' {column("finished")} = ({table}.{column("finished")} OR EXCLUDED.{column("finished")}),'
+        f' {column("executing_dt")} = {executing_dt},'
+        f' {column("enqueued_dt")} = COALESCE(EXCLUDED.{column("enqueued_dt")}, {table}.{column("enqueued_dt")}),'
+        f' {column("queue_latency")} = CASE'
+        f' WHEN EXCLUDED.{column("queue_latency")} IS NOT NULL THEN EXCLUDED.{column("queue_latency")}'
+        f' WHEN EXCLUDED.{column("enqueued_dt")} IS NOT NULL THEN NULL'
+        f' WHEN EXCLUDED.{column("executing_dt")} IS NOT NULL AND {table}.{column("enqueued_dt")} IS NOT NULL'
+        f' THEN {queue_latency}'
+        f' ELSE {table}.{column("queue_latency")} END,'
+        f' {column("ended_dt")} = CASE'
+        f' WHEN {new_end} THEN EXCLUDED.{column("ended_dt")}'
+        f' WHEN EXCLUDED.{column("executing_dt")} IS NOT NULL THEN NULL'
+        f' ELSE {table}.{column("ended_dt")} END,'
+        f' {column("duration")} = CASE'
+        f' WHEN {new_end} AND {executing_dt} IS NOT NULL THEN {duration}'
+        f' WHEN EXCLUDED.{column("executing_dt")} IS NOT NULL THEN NULL'
+        f' ELSE {table}.{column("duration")} END,'
+        f'{resource_usage}'
+        f' {column("progress_count")} = CASE'
+        f' WHEN EXCLUDED.{column("finished")}'
+        f' AND {table}.{column("cumulate_progress")}'
+        f' AND {table}.{column("parent_task")} IS NULL'
+        f' THEN COALESCE('
+        f'(SELECT SUM(sub.{column("progress_count")}) FROM {table} AS sub'
+        f' WHERE sub.{column("parent_task")} = {table}.{column("task_id")}),'
+        f' {table}.{column("progress_count")})'
+        f' ELSE {table}.{column("progress_count")} END'
+        f' RETURNING {column("task_id")}, {column("progress_count")}, {column("executing_dt")},'
+        f' {column("ended_dt")}, {column("queue_latency")}, {column("parent_task")}'
+    )
+
+
+def _convert_from_db(field_name, value):
+    """
+    Convert a raw TaskModel field value, e.g.: SQLite returns datetimes as strings
+    """
+    expression = TaskModel._meta.get_field(field_name).get_col(TaskModel._meta.db_table)
+    for converter in connection.ops.get_db_converters(expression) + expression.get_db_converters(connection):
+        value = converter(value, expression, connection)
+    return value
+
+
+def upsert_signal_batch(signal_infos):
+    """
+    Store Huey signals with two statements, independent of the number of signals:
+     1. Create or update all tasks via "INSERT ... ON CONFLICT DO UPDATE ... RETURNING"
+     2. Create all signals via one bulk INSERT
+    (Plus the constant number of queries for the exception groups, statistics and sub task counters, if needed)
+    The signals must be in the order in which they occurred.
+    """
+    if not signal_infos:
+        return
+
+    with transaction.atomic():
+        worker_ids = get_worker_identity_ids(map(worker_identity_key, signal_infos))
+        group_ids = save_exception_groups(signal_infos)
+        now = timezone.now()
+
+        # Group all signals by task: The last signal is the new task state.
+        signals = []
+        task_instances = {}
+        new_signal_names = {}
+        ended_runs = []
+        ended_again = []
+        for signal_info in signal_infos:
+            task_id = signal_info['task_id']
+            signal_instance = SignalInfoModel(
+                id=uuid7(signal_info['create_dt']), **_signal_kwargs(signal_info, worker_ids, group_ids)
+            )
+            signals.append(signal_instance)
+
+            task_instance = task_instances.get(task_id)
+            if task_instance is None:
+                task_instance = task_instances[task_id] = TaskModel(
+                    task_id=task_id,
+                    name=signal_info['task_name'],
+                    create_dt=now,
+                )
+            task_instance.state_id = signal_instance.pk
+            task_instance.update_dt = now
+            new_signal_names[task_id] = signal_info['signal_name']
+            task_finished = signal_info['signal_name'] in ENDED_HUEY_SIGNALS
+            if task_finished:
+                task_instance.finished = True
+            changed_fields = task_instance.update_times(
+                signal_info['signal_name'], signal_info['create_dt'], task_finished
+            )
+            task_instance.update_resource_usage(signal_info['signal_name'], signal_info.get('resource_usage'))
+            if task_finished and 'ended_dt' in changed_fields:
+                ended_runs.append((task_instance, signal_info, task_instance.duration, task_instance.queue_latency))
+            elif task_finished:
+                # e.g.: "revoked" after "error" in this batch: The execution has ended before
+                ended_again.append(signal_info)
+
+        fields = TaskModel._meta.concrete_fields
+        batch_size = connection.ops.bulk_batch_size(fields, list(task_instances.values()))
+        task_instances = list(task_instances.values())
+
+        progress_counts = {}
+        executing_dts = {}
+        ended_dts = {}
+        queue_latencies = {}
+        main_task_ids = {}
+        # Rare case: A task ended before a new execution starts in this batch,
+        # we need the start of the previous execution, that will be overwritten:
+        retried_task_ids = {
+            task_instance.task_id
+            for task_instance, signal_info, duration, latency in ended_runs
+            if duration is None and task_instance.executing_dt is not None
+        }
+        # Rare case: A task ended before it is enqueued again in this batch,
+        # we need the stored enqueue time/latency, that will be overwritten:
+        requeued_task_ids = {
+            task_instance.task_id
+            for task_instance, signal_info, duration, latency in ended_runs
+            if latency is None and task_instance.enqueued_dt is not None
+        }
+        stored_tasks = {}
+        if retried_task_ids or requeued_task_ids:
+            stored_tasks = TaskModel.objects.in_bulk(list(retried_task_ids | requeued_task_ids))
+            executing_dts = {task_id: stored_tasks[task_id].executing_dt for task_id in retried_task_ids}
+
+        # Note: The foreign key constraints are deferred until the end of the transaction,
+        # so we can set the new "state" before the signal entry exists.
+        with connection.cursor() as cursor:
+            for start in range(0, len(task_instances), batch_size):
+                batch = task_instances[start:start + batch_size]
+                params = []
+                for task_instance in batch:
+                    for field in fields:
+                        params.append(field.get_db_prep_save(getattr(task_instance, field.attname), connection))
+                cursor.execute(_build_task_upsert_sql(row_count=len(batch)), params)
+                task_id_field = TaskModel._meta.pk
+                for task_id, progress_count, executing_dt, ended_dt, queue_latency, main_task_id in cursor.fetchall():
+                    task_id = task_id_field.to_python(task_id)
+                    progress_counts[task_id] = progress_count
+                    ended_dts[task_id] = _convert_from_db('ended_dt', ended_dt)
+                    if main_task_id is not None:
+                        main_task_ids[task_id] = task_id_field.to_python(main_task_id)
+                    if task_id not in retried_task_ids:
+                        executing_dts[task_id] = _convert_from_db('executing_dt', executing_dt)
+                    queue_latencies[task_id] = _convert_from_db('queue_latency', queue_latency)
+
+        if main_task_ids:
+            # Sub tasks changed their state: The old one is the last signal stored before this batch
+            old_signal_names = get_last_signal_names(list(main_task_ids))
+            counts = SubTaskCountsUpdate()
+            for task_id, main_task_id in main_task_ids.items():
+                counts.add_state_change(main_task_id, old_signal_names.get(task_id), new_signal_names[task_id])
+            counts.save()
+
+        for signal_instance in signals:
+            signal_instance.progress_count = progress_counts[signal_instance.task_id]
+        SignalInfoModel.objects.bulk_create(signals)
+
+        statistics = StatisticsUpdate()
+        for task_instance, signal_info, duration, latency in ended_runs:
+            executed_before = duration is None
+            if executed_before:
+                stored_task = stored_tasks.get(task_instance.task_id)
+                if stored_task is not None:
+                    ended_before = stored_task.execution_ended()
+                else:
+                    ended_before = ended_dts.get(task_instance.task_id) != task_instance.ended_dt
+                if ended_before:
+                    # e.g.: "revoked" after a stored "error": The execution has ended before
+                    ended_again.append(signal_info)
+                    continue
+                # The task was executed before this batch: Use the stored start
+                executing_dt = executing_dts.get(task_instance.task_id)
+                if executing_dt is not None:
+                    duration = signal_info['create_dt'] - executing_dt
+            if latency is None:
+                # The task was enqueued before this batch: Use the stored values
+                stored_task = stored_tasks.get(task_instance.task_id)
+                if stored_task is None:
+                    latency = queue_latencies.get(task_instance.task_id)
+                elif executed_before:
+                    latency = stored_task.queue_latency
+                elif stored_task.enqueued_dt is not None:
+                    latency = signal_info['create_dt'] - duration - stored_task.enqueued_dt
+            statistics.add_run(
+                name=task_instance.name,
+                signal_name=signal_info['signal_name'],
+                ended_dt=signal_info['create_dt'],
+                duration=duration,
+                hostname=signal_info['hostname'],
+                latency=latency,
+                resource_usage=signal_info.get('resource_usage'),
+            )
+        for signal_info in ended_again:
+            statistics.add_run(
+                name=signal_info['task_name'],
+                signal_name=signal_info['signal_name'],
+                ended_dt=signal_info['create_dt'],
+                hostname=signal_info['hostname'],
+                resource_usage=signal_info.get('resource_usage'),
+            )
+        statistics.save()
+
+    logger.debug('Stored %i signals of %i tasks', len(signals), len(task_instances))
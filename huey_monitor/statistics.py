@@ -0,0 +1,518 @@
+"""
+Hourly statistics per task name, maintained incrementally when tasks end.
+"""
+
+import datetime
+import logging
+from bisect import bisect_left, bisect_right
+
+from bx_django_utils.humanize.time import human_timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from huey.signals import SIGNAL_COMPLETE, SIGNAL_ENQUEUED, SIGNAL_ERROR, SIGNAL_EXECUTING
+
+from huey_monitor.constants import ENDED_HUEY_SIGNALS, STATISTICS_CHUNK_SIZE
+from huey_monitor.histogram import add_value, merge_histograms, percentile
+from huey_monitor.humanize import format_sizeof, percentage
+from huey_monitor.models import SignalInfoModel, TaskModel, TaskStatisticsBucketModel, TaskStatisticsModel
+from huey_monitor.resource_usage import RESOURCE_USAGE_FIELDS
+
+
+logger = logging.getLogger(__name__)
+
+COUNT_FIELDS = (
+    'ended_count',
+    'complete_count',
+    'error_count',
+    'duration_count',
+    'duration_sum',
+    'duration_max',
+    'latency_count',
+    'latency_sum',
+    'latency_max',
+    'usage_count',
+    'cpu_time_sum',
+    'cpu_time_max',
+    'max_rss_sum',
+    'max_rss_max',
+    'io_count',
+    'io_read_sum',
+    'io_write_sum',
+)
+MAX_FIELDS = ('duration_max', 'latency_max', 'cpu_time_max', 'max_rss_max')
+KEY_FIELDS = ('name', 'hostname', 'hour')
+
+
+def statistics_enabled() -> bool:
+    return getattr(settings, 'HUEY_MONITOR_STATISTICS', True)
+
+
+def truncate_hour(dt):
+    """
+    >>> truncate_hour(datetime.datetime(2000, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=2))))
+    datetime.datetime(2000, 1, 2, 1, 0, tzinfo=datetime.timezone.utc)
+    """
+    return dt.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _max(value1, value2):
+    """
+    >>> _max(None, 1), _max(2, None), _max(1, 2), _max(None, None)
+    (1, 2, 2, None)
+    """
+    if value1 is None:
+        return value2
+    if value2 is None:
+        return value1
+    return max(value1, value2)
+
+
+class TaskStatistics:
+    """
+    Statistics of many task executions, e.g.: merged TaskStatisticsModel entries of one day.
+    The "name" is the task name or the hostname, if the statistics are merged per host.
+    """
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.start = start
+        self.ended_count = 0
+        self.complete_count = 0
+        self.error_count = 0
+        self.duration_count = 0
+        self.duration_sum = 0.0
+        self.duration_max = None
+        self.histogram = {}
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = None
+        self.latency_histogram = {}
+        self.usage_count = 0
+        self.cpu_time_sum = 0.0
+        self.cpu_time_max = None
+        self.max_rss_sum = 0
+        self.max_rss_max = None
+        self.io_count = 0
+        self.io_read_sum = 0
+        self.io_write_sum = 0
+
+    def add_run(self, signal_name, duration=None, latency=None, resource_usage=None):
+        self.ended_count += 1
+        if signal_name == SIGNAL_COMPLETE:
+            self.complete_count += 1
+        elif signal_name == SIGNAL_ERROR:
+            self.error_count += 1
+
+        if duration is not None:
+            seconds = duration.total_seconds()
+            self.duration_count += 1
+            self.duration_sum += seconds
+            self.duration_max = _max(self.duration_max, seconds)
+            add_value(self.histogram, seconds)
+
+        if latency is not None:
+            # Clock differences between the hosts may result in small negative values
+            seconds = max(latency.total_seconds(), 0)
+            self.latency_count += 1
+            self.latency_sum += seconds
+            self.latency_max = _max(self.latency_max, seconds)
+            add_value(self.latency_histogram, seconds)
+
+        if resource_usage is not None:
+            cpu_time = resource_usage['cpu_user_time'] + resource_usage['cpu_system_time']
+            self.usage_count += 1
+            self.cpu_time_sum += cpu_time
+            self.cpu_time_max = _max(self.cpu_time_max, cpu_time)
+            self.max_rss_sum += resource_usage['max_rss']
+            self.max_rss_max = _max(self.max_rss_max, resource_usage['max_rss'])
+            if resource_usage['io_read_bytes'] is not None and resource_usage['io_write_bytes'] is not None:
+                self.io_count += 1
+                self.io_read_sum += resource_usage['io_read_bytes']
+                self.io_write_sum += resource_usage['io_write_bytes']
+
+    def merge(self, other):
+        """
+        Add the values of another TaskStatistics or TaskStatisticsModel instance.
+        """
+        self.ended_count += other.ended_count
+        self.complete_count += other.complete_count
+        self.error_count += other.error_count
+        self.duration_count += other.duration_count
+        self.duration_sum += other.duration_sum
+        self.duration_max = _max(self.duration_max, other.duration_max)
+        self.latency_count += other.latency_count
+        self.latency_sum += other.latency_sum
+        self.latency_max = _max(self.latency_max, other.latency_max)
+        self.usage_count += other.usage_count
+        self.cpu_time_sum += other.cpu_time_sum
+        self.cpu_time_max = _max(self.cpu_time_max, other.cpu_time_max)
+        self.max_rss_sum += other.max_rss_sum
+        self.max_rss_max = _max(self.max_rss_max, other.max_rss_max)
+        self.io_count += other.io_count
+        self.io_read_sum += other.io_read_sum
+        self.io_write_sum += other.io_write_sum
+        if isinstance(other, TaskStatisticsModel):
+            histogram, latency_histogram = other.get_histograms()
+        else:
+            histogram, latency_histogram = other.histogram, other.latency_histogram
+        self.histogram = merge_histograms(self.histogram, histogram)
+        self.latency_histogram = merge_histograms(self.latency_histogram, latency_histogram)
+
+    def error_rate(self):
+        return percentage(num=self.error_count, total=self.ended_count)
+
+    def duration_avg(self):
+        if self.duration_count:
+            return self.duration_sum / self.duration_count
+
+    def duration_percentile(self, fraction):
+        return percentile(self.histogram, fraction)
+
+    def latency_percentile(self, fraction):
+        return percentile(self.latency_histogram, fraction)
+
+    def human_durations(self):
+        """
+        avg, p50, p95, p99 and max as human readable strings.
+        """
+        values = {
+            'avg': self.duration_avg(),
+            'p50': self.duration_percentile(0.50),
+            'p95': self.duration_percentile(0.95),
+            'p99': self.duration_percentile(0.99),
+            'max': self.duration_max,
+        }
+        return {key: '-' if value is None else human_timedelta(value) for key, value in values.items()}
+
+    def human_latencies(self):
+        """
+        Queue latency avg, p50, p95, p99 and max as human readable strings.
+        """
+        values = {
+            'avg': self.latency_sum / self.latency_count if self.latency_count else None,
+            'p50': self.latency_percentile(0.50),
+            'p95': self.latency_percentile(0.95),
+            'p99': self.latency_percentile(0.99),
+            'max': self.latency_max,
+        }
+        return {key: '-' if value is None else human_timedelta(value) for key, value in values.items()}
+
+    def human_resource_usage(self):
+        """
+        Average and max. CPU time and peak RSS, average read/written bytes as human readable strings.
+        """
+
+        def human_bytes(value):
+            return format_sizeof(value, suffix='B', divisor=1024)
+
+        values = {}
+        if self.usage_count:
+            values.update(
+                cpu_avg=human_timedelta(self.cpu_time_sum / self.usage_count),
+                cpu_max=human_timedelta(self.cpu_time_max),
+                rss_avg=human_bytes(self.max_rss_sum / self.usage_count),
+                rss_max=human_bytes(self.max_rss_max),
+            )
+        if self.io_count:
+            values.update(
+                read_avg=human_bytes(self.io_read_sum / self.io_count),
+                write_avg=human_bytes(self.io_write_sum / self.io_count),
+            )
+        keys = ('cpu_avg', 'cpu_max', 'rss_avg', 'rss_max', 'read_avg', 'write_avg')
+        return {key: values.get(key, '-') for key in keys}
+
+    def __repr__(self):
+        return f'<TaskStatistics {self.name!r} {self.start} ended={self.ended_count} errors={self.error_count}>'
+
+
+def _build_statistics_upsert_sql(row_count) -> str:
+    """
+    Build the SQL for: Create the statistics entries or add the values to the existing ones.
+    Returns the ID and the key fields of all entries.
+    """
+    qn = connection.ops.quote_name
+    opts = TaskStatisticsModel._meta
+    table = qn(opts.db_table)
+
+    def column(name):
+        return qn(opts.get_field(name).column)
+
+    updates = []
+    for name in COUNT_FIELDS:
+        if name in MAX_FIELDS:
+            updates.append(
+                f'{column(name)} = CASE'
+                f' WHEN {table}.{column(name)} IS NULL OR EXCLUDED.{column(name)} > {table}.{column(name)}'
+                f' THEN EXCLUDED.{column(name)} ELSE {table}.{column(name)} END'
+            )
+        else:
+            updates.append(f'{column(name)} = {table}.{column(name)} + EXCLUDED.{column(name)}')
+
+    columns = [column(name) for name in KEY_FIELDS + COUNT_FIELDS]
+    placeholders = f'({", ".join(["%s"] * len(columns))})'
+    values = ', '.join([placeholders] * row_count)
+    return (
+        f'INSERT INTO {table} ({", ".join(columns)}) VALUES {values}'
+        f' ON CONFLICT ({", ".join(column(name) for name in KEY_FIELDS)}) DO UPDATE SET {", ".join(updates)}'
+        f' RETURNING {column("id")}, {", ".join(column(name) for name in KEY_FIELDS)}'
+    )
+
+
+def _build_bucket_upsert_sql(row_count) -> str:
+    """
+    Build the SQL for: Create the histogram buckets or add the counts to the existing ones.
+    """
+    qn = connection.ops.quote_name
+    opts = TaskStatisticsBucketModel._meta
+    table = qn(opts.db_table)
+    columns = [qn(opts.get_field(name).column) for name in ('statistics', 'histogram', 'bucket', 'count')]
+    count = columns[3]
+    values = ', '.join(['(%s, %s, %s, %s)'] * row_count)
+    return (
+        f'INSERT INTO {table} ({", ".join(columns)}) VALUES {values}'
+        f' ON CONFLICT ({", ".join(columns[:3])}) DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}'
+    )
+
+
+def _hour_from_db(value):
+    """
+    Convert a raw "hour" value, e.g.: SQLite returns datetimes as strings
+    """
+    expression = TaskStatisticsModel._meta.get_field('hour').get_col(TaskStatisticsModel._meta.db_table)
+    for converter in connection.ops.get_db_converters(expression) + expression.get_db_converters(connection):
+        value = converter(value, expression, connection)
+    return value
+
+
+class StatisticsUpdate:
+    """
+    Collect ended task executions and add them to the hourly statistics with two queries:
+    The values are added by the database, without locking the statistics entries before.
+    save() must be called in a transaction.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = statistics_enabled() if enabled is None else enabled
+        self.entries = {}
+
+    def add_run(self, name, signal_name, ended_dt, duration=None, hostname='', latency=None, resource_usage=None):
+        if not self.enabled:
+            return
+        key = (name, hostname, truncate_hour(ended_dt))
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = TaskStatistics(name=name, start=key[2])
+        entry.add_run(signal_name, duration, latency, resource_usage)
+
+    def save(self):
+        from huey_monitor.signal_store import upsert_supported
+
+        if not self.entries:
+            return
+
+        keys = sorted(self.entries)  # Change the entries in a stable order, to avoid dead locks between the workers
+        if upsert_supported():
+            statistics_ids = self._upsert_entries(keys)
+        else:
+            statistics_ids = self._update_entries(keys)
+
+        bucket_counts = {}
+        for key in keys:
+            entry = self.entries[key]
+            histograms = (
+                (TaskStatisticsBucketModel.DURATION, entry.histogram),
+                (TaskStatisticsBucketModel.LATENCY, entry.latency_histogram),
+            )
+            for histogram, buckets in histograms:
+                for bucket, count in sorted(buckets.items()):
+                    bucket_counts[(statistics_ids[key], histogram, bucket)] = count
+        if bucket_counts:
+            if upsert_supported():
+                self._upsert_buckets(bucket_counts)
+            else:
+                self._update_buckets(bucket_counts)
+
+        self.entries = {}
+
+    def _upsert_entries(self, keys) -> dict:
+        fields = [TaskStatisticsModel._meta.get_field(name) for name in KEY_FIELDS + COUNT_FIELDS]
+        params = []
+        for key in keys:
+            values = key + tuple(getattr(self.entries[key], name) for name in COUNT_FIELDS)
+            params += (field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+        with connection.cursor() as cursor:
+            cursor.execute(_build_statistics_upsert_sql(row_count=len(keys)), params)
+            return {
+                (name, hostname, _hour_from_db(hour)): statistics_id
+                for statistics_id, name, hostname, hour in cursor.fetchall()
+            }
+
+    def _update_entries(self, keys) -> dict:
+        # Create all missing entries, so we can update all of them:
+        TaskStatisticsModel.objects.bulk_create(
+            [TaskStatisticsModel(name=name, hostname=hostname, hour=hour) for name, hostname, hour in keys],
+            ignore_conflicts=True,
+        )
+        q = Q(pk__in=[])
+        for key in keys:
+            entry_filter = Q(**dict(zip(KEY_FIELDS, key)))
+            values = {}
+            for name in COUNT_FIELDS:
+                value = getattr(self.entries[key], name)
+                if name not in MAX_FIELDS:
+                    values[name] = F(name) + value
+                elif value is not None:
+                    greater = Q(**{f'{name}__isnull': True}) | Q(**{f'{name}__lt': value})
+                    values[name] = Case(When(greater, then=Value(value)), default=F(name))
+            TaskStatisticsModel.objects.filter(entry_filter).update(**values)
+            q |= entry_filter
+        return {
+            (name, hostname, hour): statistics_id
+            for statistics_id, name, hostname, hour in TaskStatisticsModel.objects.filter(q).values_list(
+                'id', *KEY_FIELDS
+            )
+        }
+
+    def _upsert_buckets(self, bucket_counts):
+        params = []
+        for (statistics_id, histogram, bucket), count in bucket_counts.items():
+            params += (statistics_id, histogram, bucket, count)
+        with connection.cursor() as cursor:
+            cursor.execute(_build_bucket_upsert_sql(row_count=len(bucket_counts)), params)
+
+    def _update_buckets(self, bucket_counts):
+        TaskStatisticsBucketModel.objects.bulk_create(
+            [
+                TaskStatisticsBucketModel(statistics_id=statistics_id, histogram=histogram, bucket=bucket)
+                for statistics_id, histogram, bucket in bucket_counts
+            ],
+            ignore_conflicts=True,
+        )
+        buckets = {}
+        for (statistics_id, histogram, bucket), count in bucket_counts.items():
+            bucket_filter = Q(statistics_id=statistics_id, histogram=histogram, bucket=bucket)
+            buckets[count] = buckets.get(count, Q(pk__in=[])) | bucket_filter
+        for count, q in buckets.items():
+            TaskStatisticsBucketModel.objects.filter(q).update(count=F('count') + count)
+
+
+def merge_statistics(qs, get_start=None, key_field='name') -> list:
+    """
+    Merge TaskStatisticsModel entries per task name (or "hostname" via "key_field")
+    or per task name and the start returned by "get_start".
+    """
+    merged = {}
+    for instance in qs.prefetch_related('buckets').iterator(chunk_size=STATISTICS_CHUNK_SIZE):
+        start = None if get_start is None else get_start(instance.hour)
+        name = getattr(instance, key_field)
+        key = (name, start)
+        entry = merged.get(key)
+        if entry is None:
+            entry = merged[key] = TaskStatistics(name=name, start=start)
+        entry.merge(instance)
+    return [merged[key] for key in sorted(merged)]
+
+
+def get_day(hour):
+    return timezone.localtime(hour).replace(hour=0, minute=0)
+
+
+def rebuild_statistics(start=None, end=None, chunk_size=STATISTICS_CHUNK_SIZE) -> int:
+    """
+    Recalculate the statistics of all hours between "start" and "end" from the stored signals.
+    The resource usage is only stored for the last execution of a task: Older executions are counted without it.
+    Every chunk of signals is stored in an own, short transaction.
+    Signals that are stored while the rebuild runs, may be counted twice.
+    Returns the number of processed signals.
+    """
+    hour_filter = Q()
+    signal_filter = Q(signal_name__in=ENDED_HUEY_SIGNALS)
+    if start is not None:
+        start = truncate_hour(start)
+        hour_filter &= Q(hour__gte=start)
+        signal_filter &= Q(create_dt__gte=start)
+    if end is not None:
+        if end != truncate_hour(end):
+            end = truncate_hour(end) + datetime.timedelta(hours=1)
+        hour_filter &= Q(hour__lt=end)
+        signal_filter &= Q(create_dt__lt=end)
+
+    deleted, _ = TaskStatisticsModel.objects.filter(hour_filter).delete()
+    logger.info('Rebuild statistics: %i entries deleted', deleted)
+
+    qs = (
+        SignalInfoModel.objects.filter(signal_filter)
+        .order_by('create_dt', 'id')
+        .values_list('id', 'task_id', 'task__name', 'worker__hostname', 'signal_name', 'create_dt')
+    )
+    count = 0
+    chunk_qs = qs
+    while True:
+        chunk = list(chunk_qs[:chunk_size])
+        if not chunk:
+            break
+
+        # The start and end of the executions and the enqueue times, to calculate the durations and latencies:
+        executing_dts = {}
+        ended_dts = {}
+        latencies = {}
+        enqueued_dts = {}
+        start_qs = SignalInfoModel.objects.filter(
+            task_id__in={task_id for _, task_id, _, _, _, _ in chunk},
+            signal_name__in=(SIGNAL_ENQUEUED, SIGNAL_EXECUTING, *ENDED_HUEY_SIGNALS),
+            create_dt__lte=chunk[-1][-1],
+        ).order_by('create_dt').values_list('task_id', 'signal_name', 'create_dt')
+        for task_id, signal_name, create_dt in start_qs:
+            if signal_name in ENDED_HUEY_SIGNALS:
+                ended_dts.setdefault(task_id, []).append(create_dt)
+            elif signal_name == SIGNAL_ENQUEUED:
+                enqueued_dts[task_id] = create_dt
+            else:
+                executing_dts.setdefault(task_id, []).append(create_dt)
+                enqueued_dt = enqueued_dts.pop(task_id, None)
+                latencies.setdefault(task_id, []).append(None if enqueued_dt is None else create_dt - enqueued_dt)
+
+        # The resource usage of the last executions:
+        usage_qs = TaskModel.objects.filter(
+            task_id__in={task_id for _, task_id, _, _, _, _ in chunk},
+            cpu_user_time__isnull=False,
+        ).values_list('task_id', 'ended_dt', *RESOURCE_USAGE_FIELDS)
+        resource_usages = {
+            (task_id, ended_dt): dict(zip(RESOURCE_USAGE_FIELDS, values))
+            for task_id, ended_dt, *values in usage_qs
+        }
+
+        update = StatisticsUpdate(enabled=True)
+        for _, task_id, name, hostname, signal_name, create_dt in chunk:
+            duration = latency = None
+            task_executing_dts = executing_dts.get(task_id, ())
+            index = bisect_right(task_executing_dts, create_dt)
+            if index:
+                executing_dt = task_executing_dts[index - 1]
+                task_ended_dts = ended_dts.get(task_id, ())
+                end_index = bisect_left(task_ended_dts, create_dt)
+                # Only the first end of an execution counts, e.g.: not "revoked" after "error"
+                if not end_index or task_ended_dts[end_index - 1] < executing_dt:
+                    duration = create_dt - executing_dt
+                    latency = latencies[task_id][index - 1]
+            update.add_run(
+                name,
+                signal_name,
+                create_dt,
+                duration,
+                hostname=hostname or '',
+                latency=latency,
+                resource_usage=resource_usages.get((task_id, create_dt)),
+            )
+        with transaction.atomic():
+            update.save()
+
+        count += len(chunk)
+        logger.info('Rebuild statistics: %i signals processed', count)
+
+        last_id, last_create_dt = chunk[-1][0], chunk[-1][-1]
+        chunk_qs = qs.filter(Q(create_dt__gt=last_create_dt) | Q(create_dt=last_create_dt, id__gt=last_id))
+
+    return count
@@ -0,0 +1,313 @@
+"""
+    Summary counters of the sub tasks, stored in their main task:
+    They are changed by deltas when a sub task is linked or changes its state,
+    so the admin change list must not load all sub tasks of a main task.
+
+    The progress of the sub tasks changes much more often, in parallel:
+    It's added to a few SubTaskProgressModel rows ("shards") of the main task,
+    every sub task always to the same one. The readers add up the shards.
+    The main task itself is not changed: The live dashboard selects the changed shards, see: huey_monitor.live
+"""
+
+import logging
+import uuid
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+from huey.signals import SIGNAL_COMPLETE, SIGNAL_ERROR, SIGNAL_EXECUTING
+
+from huey_monitor.constants import SUB_TASK_PROGRESS_SHARDS, SUB_TASKS_RECOUNT_CHUNK_SIZE
+from huey_monitor.models import SignalInfoModel, SubTaskProgressModel, TaskModel
+
+
+logger = logging.getLogger(__name__)
+
+# The counter of a sub task state (All sub tasks are counted in "sub_tasks_total"):
+STATE_COUNTERS = {
+    SIGNAL_EXECUTING: 'sub_tasks_running',
+    SIGNAL_COMPLETE: 'sub_tasks_complete',
+    SIGNAL_ERROR: 'sub_tasks_error',
+}
+COUNTER_FIELDS = ('sub_tasks_total', *STATE_COUNTERS.values())
+
+
+def sub_task_deltas(signal_name, sign=1) -> dict:
+    """
+    The changes of the main task counters, if a sub task is added (or removed if "sign" is -1)
+
+    >>> sub_task_deltas('complete')
+    {'sub_tasks_total': 1, 'sub_tasks_complete': 1}
+    >>> sub_task_deltas('enqueued', sign=-1)
+    {'sub_tasks_total': -1}
+    """
+    deltas = {'sub_tasks_total': sign}
+    if signal_name in STATE_COUNTERS:
+        deltas[STATE_COUNTERS[signal_name]] = sign
+    return deltas
+
+
+def get_progress_shard(sub_task_id) -> int:
+    """
+    The shard of the main task, that gets all progress changes of this sub task.
+
+    >>> get_progress_shard('00000000-0000-0000-0000-000000000011')
+    1
+    >>> get_progress_shard(uuid.UUID(int=SUB_TASK_PROGRESS_SHARDS * 3))
+    0
+    """
+    return uuid.UUID(str(sub_task_id)).int % SUB_TASK_PROGRESS_SHARDS
+
+
+def sub_tasks_progress_subquery():
+    """
+    The progress of all sub tasks as subquery expression, to annotate the main tasks.
+    None if no sub task has made progress.
+    """
+    shards = SubTaskProgressModel.objects.filter(main_task_id=OuterRef('task_id')).order_by()
+    return Subquery(shards.values('main_task').annotate(progress=Sum('progress')).values('progress'))
+
+
+def sub_tasks_progress_dt_subquery():
+    """
+    The last progress change of all sub tasks as subquery expression, to annotate the main tasks.
+    None if no sub task has made progress.
+    """
+    shards = SubTaskProgressModel.objects.filter(main_task_id=OuterRef('task_id')).order_by()
+    return Subquery(shards.values('main_task').annotate(update_dt=Max('update_dt')).values('update_dt'))
+
+
+def _shard_columns():
+    opts = SubTaskProgressModel._meta
+    return [
+        connection.ops.quote_name(opts.get_field(name).column)
+        for name in ('main_task', 'shard', 'progress', 'update_dt')
+    ]
+
+
+def _build_progress_upsert_sql(row_count) -> str:
+    """
+    Build the SQL for: Create the shards or add the progress to the existing ones.
+    """
+    table = connection.ops.quote_name(SubTaskProgressModel._meta.db_table)
+    columns = _shard_columns()
+    progress, update_dt = columns[2:]
+    values = ', '.join(['(%s, %s, %s, %s)'] * row_count)
+    return (
+        f'INSERT INTO {table} ({", ".join(columns)}) VALUES {values}'
+        f' ON CONFLICT ({columns[0]}, {columns[1]}) DO UPDATE SET'
+        f' {progress} = {table}.{progress} + EXCLUDED.{progress}, {update_dt} = EXCLUDED.{update_dt}'
+    )
+
+
+def _build_sub_task_progress_sql() -> str:
+    """
+    Build the SQL for: Add the difference between the new and the stored progress of a sub task to its shard.
+    Nothing will be inserted, if the task is not a sub task or the progress has not changed.
+    """
+    qn = connection.ops.quote_name
+    table = qn(SubTaskProgressModel._meta.db_table)
+    task_table = qn(TaskModel._meta.db_table)
+
+    def task_column(name):
+        return qn(TaskModel._meta.get_field(name).column)
+
+    columns = _shard_columns()
+    progress, update_dt = columns[2:]
+    stored_progress = f'COALESCE({task_column("progress_count")}, 0)'
+    return (
+        f'INSERT INTO {table} ({", ".join(columns)})'
+        f' SELECT {task_column("parent_task")}, %s, %s - {stored_progress}, %s FROM {task_table}'
+        f' WHERE {task_column("task_id")} = %s AND {task_column("parent_task")} IS NOT NULL'
+        f' AND {stored_progress} <> %s'
+        f' ON CONFLICT ({columns[0]}, {columns[1]}) DO UPDATE SET'
+        f' {progress} = {table}.{progress} + EXCLUDED.{progress}, {update_dt} = EXCLUDED.{update_dt}'
+    )
+
+
+def _db_now():
+    return SubTaskProgressModel._meta.get_field('update_dt').get_db_prep_value(timezone.now(), connection)
+
+
+def save_progress_deltas(deltas):
+    """
+    Add progress changes to the shards of the main tasks: {(main task ID, shard): delta}
+    """
+    from huey_monitor.signal_store import upsert_supported
+
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    if upsert_supported():
+        pk_field = TaskModel._meta.pk
+        now = _db_now()
+        params = []
+        for (main_task_id, shard), delta in deltas.items():
+            params += (pk_field.get_db_prep_value(main_task_id, connection), shard, delta, now)
+        with connection.cursor() as cursor:
+            cursor.execute(_build_progress_upsert_sql(row_count=len(deltas)), params)
+        return
+
+    # Create all missing shards, so we can update all of them:
+    SubTaskProgressModel.objects.bulk_create(
+        [SubTaskProgressModel(main_task_id=main_task_id, shard=shard) for main_task_id, shard in deltas],
+        ignore_conflicts=True,
+    )
+    shards = {}
+    for (main_task_id, shard), delta in deltas.items():
+        shards[delta] = shards.get(delta, Q(pk__in=[])) | Q(main_task_id=main_task_id, shard=shard)
+    now = timezone.now()
+    for delta, q in shards.items():
+        SubTaskProgressModel.objects.filter(q).update(progress=F('progress') + delta, update_dt=now)
+
+
+def add_sub_task_progress(task_id, progress_count):
+    """
+    Add the change of the progress of a sub task to the shard of its main task.
+    Must be called before the new "progress_count" of the task is stored,
+    e.g.: A retry of the sub task resets its progress and removes it from the shard.
+    """
+    from huey_monitor.signal_store import upsert_supported
+
+    shard = get_progress_shard(task_id)
+    if upsert_supported():
+        # Only one query: Nothing happens, if the progress has not changed:
+        db_task_id = TaskModel._meta.pk.get_db_prep_value(task_id, connection)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _build_sub_task_progress_sql(), (shard, progress_count, _db_now(), db_task_id, progress_count)
+            )
+        return
+
+    sub_task = TaskModel.objects.filter(task_id=task_id, parent_task__isnull=False)
+    for main_task_id, stored_progress in sub_task.values_list('parent_task_id', 'progress_count'):
+        save_progress_deltas({(main_task_id, shard): progress_count - (stored_progress or 0)})
+
+
+def get_last_signal_names(task_ids) -> dict:
+    """
+    Returns the name of the last stored signal by task ID.
+    """
+    last_signal = SignalInfoModel.objects.filter(task_id=OuterRef('task_id')).order_by('-create_dt')
+    return dict(
+        TaskModel.objects.filter(task_id__in=task_ids)
+        .annotate(last_signal_name=Subquery(last_signal.values('signal_name')[:1]))
+        .values_list('task_id', 'last_signal_name')
+    )
+
+
+class SubTaskCountsUpdate:
+    """
+    Collect the changes of the sub task counters and add them to the main tasks:
+    With one UPDATE per distinct change, e.g.: all main tasks with one more completed sub task.
+    save() must be called in a transaction.
+    """
+
+    def __init__(self):
+        self.deltas = {}
+        self.progress_deltas = Counter()
+
+    def add(self, main_task_id, deltas):
+        self.deltas.setdefault(main_task_id, Counter()).update(deltas)
+
+    def add_sub_task(self, main_task_id, sub_task_id, signal_name, progress_count, sign=1):
+        self.add(main_task_id, sub_task_deltas(signal_name, sign=sign))
+        self.progress_deltas[(main_task_id, get_progress_shard(sub_task_id))] += sign * (progress_count or 0)
+
+    def add_state_change(self, main_task_id, old_signal_name, new_signal_name):
+        deltas = Counter()
+        if old_signal_name in STATE_COUNTERS:
+            deltas[STATE_COUNTERS[old_signal_name]] -= 1
+        if new_signal_name in STATE_COUNTERS:
+            deltas[STATE_COUNTERS[new_signal_name]] += 1
+        self.add(main_task_id, deltas)
+
+    def save(self):
+        main_task_ids = {}
+        for main_task_id, deltas in self.deltas.items():
+            changes = tuple(sorted((field, delta) for field, delta in deltas.items() if delta))
+            if changes:
+                main_task_ids.setdefault(changes, []).append(main_task_id)
+
+        for changes, task_ids in main_task_ids.items():
+            TaskModel.objects.filter(task_id__in=task_ids).update(
+                **{field: F(field) + delta for field, delta in changes}
+            )
+        save_progress_deltas(self.progress_deltas)
+
+        self.deltas = {}
+        self.progress_deltas = Counter()
+
+
+def recount_chunk(main_task_ids) -> int:
+    """
+    Count the sub tasks of the given main tasks and correct their counters and progress shards.
+    Must be called in a transaction. Returns the number of corrected main tasks.
+    """
+    # Lock the main tasks and their shards: Changes of the sub tasks wait until the transaction ends.
+    stored_counts = {
+        values.pop('task_id'): values
+        for values in TaskModel.objects.filter(task_id__in=main_task_ids)
+        .select_for_update()
+        .values('task_id', *COUNTER_FIELDS)
+    }
+    shards = SubTaskProgressModel.objects.filter(main_task_id__in=main_task_ids).select_for_update()
+    stored_progress = Counter()
+    for main_task_id, progress in shards.values_list('main_task_id', 'progress'):
+        stored_progress[main_task_id] += progress
+
+    counts = {main_task_id: dict.fromkeys(values, 0) for main_task_id, values in stored_counts.items()}
+    progress = Counter()
+    sub_tasks = (
+        TaskModel.objects.filter(parent_task_id__in=main_task_ids)
+        .order_by()
+        .values('parent_task', 'state__signal_name')
+        .annotate(count=Count('*'), progress=Sum('progress_count'))
+        .values_list('parent_task', 'state__signal_name', 'count', 'progress')
+    )
+    for main_task_id, signal_name, count, progress_sum in sub_tasks:
+        for field, delta in sub_task_deltas(signal_name, sign=count).items():
+            counts[main_task_id][field] += delta
+        progress[main_task_id] += progress_sum or 0
+
+    corrected = set()
+    for main_task_id, values in counts.items():
+        if values != stored_counts[main_task_id]:
+            logger.warning(
+                'Correct the sub task counters of %s: %r -> %r', main_task_id, stored_counts[main_task_id], values
+            )
+            TaskModel.objects.filter(task_id=main_task_id).update(**values)
+            corrected.add(main_task_id)
+    progress_deltas = {}
+    for main_task_id in counts:
+        delta = progress[main_task_id] - stored_progress[main_task_id]
+        if delta:
+            logger.warning('Correct the sub task progress of %s by %i', main_task_id, delta)
+            progress_deltas[(main_task_id, 0)] = delta
+            corrected.add(main_task_id)
+    save_progress_deltas(progress_deltas)
+    return len(corrected)
+
+
+def recount_sub_tasks(chunk_size=SUB_TASKS_RECOUNT_CHUNK_SIZE) -> int:
+    """
+    Correct the sub task counters and the progress shards of all main tasks, e.g.: after a crash of a worker.
+    Every chunk of main tasks is locked and checked in an own, short transaction.
+    Returns the number of corrected main tasks.
+    """
+    qs = TaskModel.objects.filter(parent_task__isnull=True).order_by('task_id').values_list('task_id', flat=True)
+    chunk_qs = qs
+    count = 0
+    while True:
+        with transaction.atomic():
+            main_task_ids = list(chunk_qs[:chunk_size])
+            if not main_task_ids:
+                break
+            count += recount_chunk(main_task_ids)
+
+        logger.info('Recount sub tasks: %i main tasks corrected', count)
+        chunk_qs = qs.filter(task_id__gt=main_task_ids[-1])
+
+    return count
@@ -1,126 +1,145 @@
 import logging
-import os
-import socket
-import sys
-import threading
-import traceback
-import uuid
-from functools import lru_cache
 
-from django.db import transaction
-from django.db.models import Sum
-from huey.contrib.djhuey import on_startup, signal
+from django.conf import settings
+from huey import crontab
+from huey.contrib.djhuey import on_shutdown, on_startup, periodic_task, signal
+from huey.signals import SIGNAL_EXECUTING
 
-from huey_monitor.constants import ENDED_HUEY_SIGNALS
-from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.collector import collector_enabled, push_signal
+from huey_monitor.constants import ENDED_HUEY_SIGNALS, PRUNE_CRONTAB, QUEUE_SAMPLER_CRONTAB, WATCHDOG_CRONTAB
+from huey_monitor.instrumentation import OVERHEAD_SIGNAL, check_task_overhead, log_summary, measure, start_task_timer
+from huey_monitor.prune import RetentionRules, prune
+from huey_monitor.queue_samples import sample_queues
+from huey_monitor.resource_usage import end_execution, start_execution
+from huey_monitor.signal_buffer import buffer_enabled, buffer_signal, stop_signal_buffer
+from huey_monitor.signal_store import get_signal_info, store_signal
+from huey_monitor.tqdm import flush_process_info
+from huey_monitor.workers import delete_old_workers, reap_orphaned_tasks, start_heartbeat, stop_heartbeat
 
 
 logger = logging.getLogger(__name__)
 
-
-@lru_cache(maxsize=None)
-def get_hostname():
-    return socket.gethostname()
-
-
-def update_task_instance(instance, last_signal, task_finished):
-    instance.state_id = last_signal.pk
-    update_fields = ['state_id']
-    if task_finished:
-        instance.finished = True
-        update_fields.append('finished')
-
-        if instance.cumulate_progress:
-            # Progress of the sub tasks should be added up and saved in the parent task
-            if instance.parent_task_id is None:
-                # This is the main task -> collect process count
-                qs = TaskModel.objects.filter(parent_task_id=instance.task_id).aggregate(
-                    Sum('progress_count')
-                )
-                progress_count = qs['progress_count__sum']
-                if progress_count is not None:
-                    instance.progress_count = progress_count
-                    update_fields.append('progress_count')
-
-    instance.save(update_fields=update_fields)
+# The task classes of our own periodic tasks: Their signals are not stored.
+MONITOR_TASK_CLASSES = []
 
 
 @signal()
 def store_signals(signal, task, exc=None):
     """
-    Store all Huey signals.
+    Store all Huey signals, except the signals of the periodic tasks of the monitor itself:
+    They would add a few tasks every minute.
     """
-    task_id = uuid.UUID(task.id)
-
-    # Task no longer waits or run?
-    task_finished = signal in ENDED_HUEY_SIGNALS
-
-    logger.info('Store Task %s signal %r (finished: %s)', task_id, signal, task_finished)
-
-    signal_kwargs = {
-        # TODO: move parts into huey_monitor.models.SignalInfoManager
-        'hostname': get_hostname(),
-        'pid': os.getpid(),
-        'thread': threading.current_thread().name,
-        'signal_name': signal,
-    }
-
-    if exc is not None:
-        signal_kwargs['exception_line'] = str(exc)
-        signal_kwargs['exception'] = ''.join(
-            traceback.format_exception(*sys.exc_info())
-        )
-
-    with transaction.atomic():
-        task_model_instance, created = TaskModel.objects.get_or_create(
-            task_id=task_id,
-            defaults={'name': task.name}
+    if isinstance(task, tuple(MONITOR_TASK_CLASSES)):
+        return
+
+    if signal == SIGNAL_EXECUTING:
+        start_task_timer(task.id)
+
+    with measure(OVERHEAD_SIGNAL, task_id=task.id):
+        resource_usage = None
+        if signal in ENDED_HUEY_SIGNALS:
+            # Measure before our own database writes:
+            resource_usage = end_execution(task.id)
+            # Store the not yet saved progress, before the task ends:
+            flush_process_info(task.id)
+
+        signal_info = get_signal_info(signal, task, exc)
+        if resource_usage is not None:
+            signal_info['resource_usage'] = resource_usage
+
+        logger.info(
+            'Store Task %s signal %r (finished: %s)',
+            signal_info['task_id'],
+            signal,
+            signal in ENDED_HUEY_SIGNALS,  # Task no longer waits or run?
         )
 
-        signal_kwargs['task'] = task_model_instance
-        if task_model_instance.progress_count is not None:
-            signal_kwargs['progress_count'] = task_model_instance.progress_count
-
-        last_signal = SignalInfoModel.objects.create(**signal_kwargs)
+        if collector_enabled():
+            # The "huey_monitor_collector" will store the signal:
+            push_signal(signal_info)
+        elif buffer_enabled():
+            # Store the signal later, in a batch with other signals:
+            buffer_signal(signal_info)
+        else:
+            store_signal(signal_info)
 
-        update_task_instance(
-            instance=task_model_instance,
-            last_signal=last_signal,
-            task_finished=task_finished,
-        )
+    if signal == SIGNAL_EXECUTING:
+        # Measure after our own database writes:
+        start_execution(task.id)
+    elif signal in ENDED_HUEY_SIGNALS:
+        check_task_overhead(task.id, task.name)
 
 
 @on_startup()
 def startup_handler():
     """
-    "Change" task state to "unknown" on startup for every "executing" tasks.
+    Register the worker process and "change" the state of "executing" tasks
+    of dead workers to "unknown".
 
     The problem:
     We get no signal if the Huey worker died (e.g.: memory error)
     To remove the "executing" state of tasks: Just add a pseudo signal entry to it.
 
-    Note: This will add a "unknown" state to other task, that are not affected from
-    the died worker :(
-
-    See also: https://github.com/coleifer/huey/issues/569
+    Only tasks of workers without a current heartbeat are affected,
+    see: huey_monitor.workers and https://github.com/coleifer/huey/issues/569
     """
     logger.debug('startup handler called')
 
-    with transaction.atomic():
-        qs = TaskModel.objects.filter(state__signal_name='executing')
-        for task_model_instance in qs:
-            logger.warning('Mark "executing" task %s to "unknown"', task_model_instance.pk)
-            last_signal = SignalInfoModel.objects.create(
-                # TODO: move parts into huey_monitor.models.SignalInfoManager
-                hostname=get_hostname(),
-                pid=os.getpid(),
-                thread=threading.current_thread().name,
-                task_id=task_model_instance.pk,
-                signal_name='unknown',
-                progress_count=task_model_instance.progress_count,
-            )
-            update_task_instance(
-                instance=task_model_instance,
-                last_signal=last_signal,
-                task_finished=True,
-            )
+    if collector_enabled():
+        # The workers don't touch the database: No worker registry, so no tasks of dead workers can be found
+        return
+
+    if start_heartbeat():
+        # First startup call in this process (The hook is called for every worker thread)
+        reap_orphaned_tasks()
+
+
+@on_shutdown()
+def shutdown_handler():
+    """
+    Store all signals that are still buffered, before the worker exits
+    and log the overhead of the monitor.
+    """
+    logger.debug('shutdown handler called')
+    stop_signal_buffer()
+    stop_heartbeat()
+    log_summary()
+
+
+if getattr(settings, 'HUEY_MONITOR_WATCHDOG', False) and not collector_enabled():
+
+    @periodic_task(crontab(**getattr(settings, 'HUEY_MONITOR_WATCHDOG_CRONTAB', WATCHDOG_CRONTAB)))
+    def monitor_watchdog():
+        """
+        Mark "executing" tasks of dead workers as "unknown" and remove old worker entries.
+        """
+        count = reap_orphaned_tasks()
+        deleted = delete_old_workers()
+        logger.info('Watchdog: %i tasks of dead workers marked, %i old worker entries deleted', count, deleted)
+
+    MONITOR_TASK_CLASSES.append(monitor_watchdog.task_class)
+
+
+if getattr(settings, 'HUEY_MONITOR_PRUNE_RULES', None):
+
+    @periodic_task(crontab(**getattr(settings, 'HUEY_MONITOR_PRUNE_CRONTAB', PRUNE_CRONTAB)))
+    def prune_monitor_data():
+        """
+        Delete old monitor data by settings.HUEY_MONITOR_PRUNE_RULES
+        """
+        result = prune(RetentionRules.from_settings())
+        logger.info('Prune monitor data: %s', result)
+
+    MONITOR_TASK_CLASSES.append(prune_monitor_data.task_class)
+
+
+if getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLER', False) and not collector_enabled():
+
+    @periodic_task(crontab(**getattr(settings, 'HUEY_MONITOR_QUEUE_SAMPLER_CRONTAB', QUEUE_SAMPLER_CRONTAB)))
+    def queue_sampler():
+        """
+        Store the current queue depths, see: huey_monitor.queue_samples
+        """
+        sample_queues()
+
+    MONITOR_TASK_CLASSES.append(queue_sampler.task_class)
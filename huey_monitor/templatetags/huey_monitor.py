@@ -1,26 +1,27 @@
-import logging
-
 from django import template
 from django.template.loader import render_to_string
-from huey.contrib.djhuey import HUEY
+from django.utils.html import format_html
+
+from huey_monitor.huey_counts import get_huey_counts
 
 
-logger = logging.getLogger(__name__)
 register = template.Library()
 
 
 @register.simple_tag
 def huey_counts_info():
-    try:
-        context = dict(
-            huey_pending_count=HUEY.pending_count(),
-            huey_scheduled_count=HUEY.scheduled_count(),
-            huey_result_count=HUEY.result_count(),
-        )
-    except OSError as err:
-        # e.g.: Redis down or other setup used see #127
-        logger.exception('Failed to get counts from HUEY: %s', err)
+    """
+    Render the cached Huey counts: Never blocks longer than settings.HUEY_MONITOR_HUEY_COUNTS_TIMEOUT
+    """
+    counts = get_huey_counts()
+    if counts['error']:
+        return format_html('<p>Huey counts: ({})</p>', counts['error'])
 
-        return f'<p>Huey counts: ({type(err).__name__}: {err})</p>'
-    else:
-        return render_to_string('admin/huey_monitor/huey_counts_info.html', context)
+    context = dict(
+        huey_pending_count=counts['pending'],
+        huey_scheduled_count=counts['scheduled'],
+        huey_result_count=counts['result'],
+        huey_counts_update_dt=counts['update_dt'],
+        huey_counts_stale=counts['stale'],
+    )
+    return render_to_string('admin/huey_monitor/huey_counts_info.html', context)
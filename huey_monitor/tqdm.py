@@ -1,15 +1,44 @@
 import logging
+import time
 
+from django.conf import settings
 from django.utils import timezone
 from django.utils.text import Truncator
 from huey.api import Task
 
-from huey_monitor.constants import TASK_MODEL_DESC_MAX_LENGTH
+from huey_monitor.collector import collector_enabled, push_task_update
+from huey_monitor.constants import (
+    PROGRESS_MININTERVAL,
+    PROGRESS_MINITERS,
+    PROGRESS_SAMPLE_INTERVAL,
+    PROGRESS_SAMPLES_MAX,
+    PROGRESS_WRITES_PER_SECOND,
+    TASK_MODEL_DESC_MAX_LENGTH,
+)
+from huey_monitor.instrumentation import OVERHEAD_PROGRESS, measure
 from huey_monitor.models import TaskModel
+from huey_monitor.progress_samples import add_sample, pack_samples
+from huey_monitor.signal_buffer import buffer_enabled, buffer_task_update
+
 
 logger = logging.getLogger(__name__)
 
 
+# The ProcessInfo instances of the running tasks by Huey task ID:
+# Needed to store the remaining progress, if a task ends.
+# Removed by the end signal of the task, by ProcessInfo.close() or if the total is reached.
+_process_infos = {}
+
+
+def flush_process_info(task_id):
+    """
+    Store the not yet saved progress of the given (ended) task, if any.
+    """
+    process_info = _process_infos.pop(task_id, None)
+    if process_info is not None:
+        process_info.flush()
+
+
 class ProcessInfo:
     """
     Simple helper inspired by tqdm ;)
@@ -23,6 +52,9 @@ class ProcessInfo:
                  unit_divisor=1000,
                  parent_task_id=None,
                  cumulate2parents=True,  # deprecated see #57
+                 mininterval=None,
+                 miniters=None,
+                 writes_per_second=None,
                  ):
         """
         Parameters
@@ -37,6 +69,13 @@ class ProcessInfo:
             Note: parent_task_id must be provided to cumulate progress to the parent task progress
                   this option will be removed in the future, see:
                   https://github.com/boxine/django-huey-monitor/discussions/57
+        mininterval: float, optional: Minimum progress update interval in seconds.
+        miniters: int, optional: Minimum progress update interval in iterations.
+        writes_per_second: float, optional: Adjust "miniters" dynamically to reach this
+            number of progress updates per second. Overwrites "mininterval".
+
+        The progress will be stored if both "mininterval" and "miniters" are reached.
+        Not yet stored progress will be saved if the task ends, the total is reached or via flush()/close()
         """
         assert isinstance(task, Task), f'No task given: {task!r} (Hint: use "context=True")'
         self.task = task
@@ -46,6 +85,20 @@ class ProcessInfo:
         self.unit_divisor = unit_divisor
         self.parent_task_id = parent_task_id
 
+        if mininterval is None:
+            mininterval = getattr(settings, 'HUEY_MONITOR_PROGRESS_MININTERVAL', PROGRESS_MININTERVAL)
+        if miniters is None:
+            miniters = getattr(settings, 'HUEY_MONITOR_PROGRESS_MINITERS', PROGRESS_MINITERS)
+        if writes_per_second is None:
+            writes_per_second = getattr(
+                settings, 'HUEY_MONITOR_PROGRESS_WRITES_PER_SECOND', PROGRESS_WRITES_PER_SECOND
+            )
+        self.dynamic_miniters = bool(writes_per_second)
+        if self.dynamic_miniters:
+            mininterval = 1 / writes_per_second
+        self.mininterval = mininterval
+        self.miniters = max(miniters, 1)
+
         if len(self.desc) > TASK_MODEL_DESC_MAX_LENGTH:
             # We call .update() that will not validate the data, so a overlong
             # description will raise a database error and maybe a user doesn't know
@@ -57,10 +110,14 @@ class ProcessInfo:
                 TASK_MODEL_DESC_MAX_LENGTH,
             )
 
-        TaskModel.objects.filter(task_id=task.id).update(
+        # Bounded progress history, used to calculate the current rate and the ETA:
+        self.samples = [(time.time(), 0)]
+
+        self._update_task(
             desc=self.desc,
             total=self.total,
             progress_count=0,
+            progress_samples=pack_samples(self.samples),
             unit=self.unit,
             unit_divisor=self.unit_divisor,
             cumulate_progress=cumulate2parents,
@@ -73,21 +130,99 @@ class ProcessInfo:
             )
 
         self.total_progress = 0
+        self.stored_progress = 0
+        self.last_write = time.monotonic()
+        self.closed = False
+        _process_infos[task.id] = self
 
         logger.info('Init TaskModel %s', self)
 
     def update(self, n=1):
         """
         Update TaskModel progress information.
-        Note: We will not store cumulate progress information, now.
-              This will be done, if task ends in signal handler!
+        Note: The progress change of a sub task is added to a progress shard of the main task,
+              so the running main task displays the live sum of its sub tasks.
+              The signal handler saves the cumulated progress in the main task, if it ends.
         """
         self.total_progress += n
 
+        if self.closed:
+            # e.g.: The total was only estimated: The end of the task must store the remaining progress
+            _process_infos.setdefault(self.task.id, self)
+        elif self.total and self.total_progress >= self.total:
+            # Completed: Store the progress now, the end of the task doesn't need to do it
+            self.close()
+            return
+
+        iterations = self.total_progress - self.stored_progress
+        if iterations < self.miniters:
+            return
+
+        if self.mininterval:
+            now = time.monotonic()
+            elapsed = now - self.last_write
+            if elapsed < self.mininterval:
+                return
+
+            if self.dynamic_miniters:
+                # Estimate the iterations until the next write, like tqdm's "dynamic_miniters":
+                self.miniters = max(int(iterations * self.mininterval / elapsed), 1)
+
+        self.flush()
+
+    def flush(self):
+        """
+        Store the current progress, if not already done.
+        """
+        if self.total_progress == self.stored_progress:
+            return
+
+        self.samples = add_sample(
+            self.samples,
+            timestamp=time.time(),
+            count=self.total_progress,
+            max_samples=PROGRESS_SAMPLES_MAX,
+            min_interval=PROGRESS_SAMPLE_INTERVAL,
+        )
+
         # Update the last change date times:
-        TaskModel.objects.filter(task_id=self.task.id).update(
-            update_dt=timezone.now(), progress_count=self.total_progress
+        self._update_task(
+            parent_task_id=self.parent_task_id,
+            update_dt=timezone.now(),
+            progress_count=self.total_progress,
+            progress_samples=pack_samples(self.samples),
         )
+        self.stored_progress = self.total_progress
+        self.last_write = time.monotonic()
+
+    def _update_task(self, parent_task_id=None, **values):
+        """
+        Only the progress updates pass the "parent_task_id":
+        The first update is stored before the task is linked to its parent task.
+        """
+        with measure(OVERHEAD_PROGRESS, task_id=self.task.id):
+            if collector_enabled():
+                push_task_update(self.task.id, parent_task_id=parent_task_id, **values)
+            elif buffer_enabled():
+                # Stored after the buffered signals, that create the TaskModel instance:
+                buffer_task_update(self.task.id, parent_task_id=parent_task_id, **values)
+            else:
+                TaskModel.objects.update_task(self.task.id, parent_task_id=parent_task_id, **values)
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        """
+        Store the remaining progress and remove this instance from the running tasks.
+        """
+        self.closed = True
+        self.flush()
+        if _process_infos.get(self.task.id) is self:
+            del _process_infos[self.task.id]
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def __str__(self):
         return (
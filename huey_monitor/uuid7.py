@@ -0,0 +1,50 @@
+"""
+Time-ordered UUIDs (version 7, RFC 9562) for the signal primary keys:
+New entries are appended at the end of the primary key index, instead of a random position.
+"""
+
+import datetime
+import os
+import time
+import uuid
+
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+FRACTION_STEPS = 4096  # The sub-millisecond fraction is stored in 12 bits
+
+
+def uuid7(dt=None) -> uuid.UUID:
+    """
+    48 bits unix time in milliseconds, 12 bits sub-millisecond fraction and 62 random bits.
+    Create the UUID for the current time or for the given datetime.
+
+    >>> value = uuid7(datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc))
+    >>> value.version, str(value)[:18]
+    (7, '018cc820-db2e-7e6a')
+    >>> uuid7_datetime(value)
+    datetime.datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc)
+    """
+    if dt is None:
+        nanoseconds = time.time_ns()
+    else:
+        nanoseconds = (dt - EPOCH) // datetime.timedelta(microseconds=1) * 1000
+    milliseconds, rest = divmod(nanoseconds, 1_000_000)
+    fraction = rest * FRACTION_STEPS // 1_000_000
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (milliseconds << 80) | (0x7 << 76) | (fraction << 64) | (0b10 << 62) | random_bits
+    return uuid.UUID(int=value)
+
+
+def uuid7_datetime(value) -> datetime.datetime:
+    """
+    Returns the time (with millisecond precision) of a UUID created by uuid7()
+    """
+    return EPOCH + datetime.timedelta(milliseconds=value.int >> 80)
+
+
+def is_uuid7(value) -> bool:
+    """
+    >>> is_uuid7(uuid7()), is_uuid7(uuid.uuid4())
+    (True, False)
+    """
+    return value.version == 7
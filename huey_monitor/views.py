@@ -0,0 +1,14 @@
+from django.http import HttpResponse
+from django.utils import timezone
+
+from huey_monitor.instrumentation import prometheus_metrics
+from huey_monitor.workers import alive_workers
+
+
+def overhead_metrics(request):
+    """
+    The monitor overhead of all alive workers in the Prometheus text format.
+    Optional: Add this view to your urls.py (with your own access restrictions), see README.
+    """
+    workers = alive_workers(timezone.now()).filter(overhead__isnull=False).order_by('hostname', 'pid')
+    return HttpResponse(prometheus_metrics(workers), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,234 @@
+"""
+Registry of the Huey worker processes: Find "executing" tasks of dead workers.
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import DateTimeField, DurationField, Exists, ExpressionWrapper, F, OuterRef, Subquery, Value
+from django.utils import timezone
+from huey.signals import SIGNAL_EXECUTING
+
+from huey_monitor.collector import collector_enabled
+from huey_monitor.constants import (
+    OVERHEAD_LOG_INTERVAL,
+    WORKER_HEARTBEAT_INTERVAL,
+    WORKER_REAP_CHUNK_SIZE,
+    WORKER_RETENTION_DAYS,
+    WORKER_TIMEOUT,
+)
+from huey_monitor.instrumentation import instrumentation, instrumentation_enabled, log_summary
+from huey_monitor.models import SignalInfoModel, TaskModel, WorkerModel
+from huey_monitor.signal_store import get_hostname, get_worker_identity_ids
+from huey_monitor.sub_task_counts import SubTaskCountsUpdate
+from huey_monitor.uuid7 import uuid7
+
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_UNKNOWN = 'unknown'  # Pseudo signal for tasks of dead workers
+
+
+class WorkerHeartbeat:
+    """
+    Register the current worker process and update its heartbeat in a background thread.
+    The overhead of the monitor is stored with every heartbeat and logged periodically.
+    """
+
+    def __init__(self, *, interval, log_interval=None):
+        self.interval = interval
+        self.log_interval = log_interval
+        self.hostname = get_hostname()
+        self.pid = os.getpid()
+        self._last_log = time.monotonic()
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def get_values(self):
+        values = {'heartbeat_dt': timezone.now()}
+        if instrumentation_enabled():
+            values['overhead'] = instrumentation.snapshot()
+        return values
+
+    def beat(self):
+        WorkerModel.objects.filter(hostname=self.hostname, pid=self.pid).update(**self.get_values())
+        if self.log_interval and time.monotonic() - self._last_log >= self.log_interval:
+            self._last_log = time.monotonic()
+            log_summary()
+
+    def start(self):
+        now = timezone.now()
+        WorkerModel.objects.update_or_create(
+            hostname=self.hostname,
+            pid=self.pid,
+            defaults={'started_dt': now, 'heartbeat_dt': now, 'stopped_dt': None, 'overhead': None},
+        )
+        logger.info('Worker %s PID %i registered', self.hostname, self.pid)
+        self._thread = threading.Thread(target=self._run, name='huey_monitor_heartbeat', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval)
+        WorkerModel.objects.filter(hostname=self.hostname, pid=self.pid).update(
+            stopped_dt=timezone.now(), **self.get_values()
+        )
+        logger.info('Worker %s PID %i stopped', self.hostname, self.pid)
+
+    def _run(self):
+        while not self._stopped.wait(timeout=self.interval):
+            # We run outside of the request/response cycle: Take care of broken connections
+            close_old_connections()
+            try:
+                self.beat()
+            except Exception as err:
+                logger.exception('Worker heartbeat failed: %s', err)
+
+
+_heartbeat = None
+_heartbeat_lock = threading.Lock()
+
+
+def start_heartbeat() -> bool:
+    """
+    Register the current process as worker, if not done yet.
+    Returns True if the process was registered.
+    Never with the collector: The workers don't touch the database, the overhead is only logged.
+    """
+    if collector_enabled():
+        return False
+
+    global _heartbeat
+    with _heartbeat_lock:
+        if _heartbeat is not None and _heartbeat.pid == os.getpid():
+            # e.g.: The startup hook is called for every worker thread
+            return False
+
+        _heartbeat = WorkerHeartbeat(
+            interval=getattr(settings, 'HUEY_MONITOR_WORKER_HEARTBEAT_INTERVAL', WORKER_HEARTBEAT_INTERVAL),
+            log_interval=getattr(settings, 'HUEY_MONITOR_OVERHEAD_LOG_INTERVAL', OVERHEAD_LOG_INTERVAL),
+        )
+        _heartbeat.start()
+        atexit.register(_heartbeat.stop)
+        return True
+
+
+def stop_heartbeat():
+    """
+    Stop the heartbeat of the current process and mark the worker as stopped.
+    """
+    global _heartbeat
+    with _heartbeat_lock:
+        heartbeat, _heartbeat = _heartbeat, None
+    if heartbeat is not None and heartbeat.pid == os.getpid():
+        atexit.unregister(heartbeat.stop)
+        heartbeat.stop()
+
+
+def heartbeat_cutoff(now):
+    """
+    Workers without a heartbeat since this time are dead.
+    """
+    timeout = getattr(settings, 'HUEY_MONITOR_WORKER_TIMEOUT', WORKER_TIMEOUT)
+    return now - datetime.timedelta(seconds=timeout)
+
+
+def alive_workers(now):
+    """
+    Workers with a current heartbeat, that are not stopped.
+    """
+    return WorkerModel.objects.filter(heartbeat_dt__gte=heartbeat_cutoff(now), stopped_dt__isnull=True)
+
+
+def get_orphaned_tasks(now):
+    """
+    All "executing" tasks of workers that are unknown, dead or restarted since the task starts.
+    """
+    owner_alive = alive_workers(now).filter(
+        hostname=OuterRef('state__worker__hostname'),
+        pid=OuterRef('state__worker__pid'),
+        started_dt__lte=OuterRef('state__create_dt'),
+    )
+    return TaskModel.objects.filter(state__signal_name=SIGNAL_EXECUTING).exclude(Exists(owner_alive))
+
+
+def reap_orphaned_tasks(chunk_size=WORKER_REAP_CHUNK_SIZE) -> int:
+    """
+    Change the state of all "executing" tasks of dead workers to "unknown".
+    Every chunk needs a constant number of queries: The pseudo signals are created via
+    bulk_create() and all tasks are updated with one UPDATE.
+    Returns the number of changed tasks.
+    """
+    identity = (get_hostname(), os.getpid(), threading.current_thread().name)
+
+    count = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                get_orphaned_tasks(now)
+                .select_for_update()
+                .values_list('task_id', 'progress_count', 'parent_task_id')[:chunk_size]
+            )
+            if not rows:
+                break
+
+            worker_id = get_worker_identity_ids([identity])[identity]
+            SignalInfoModel.objects.bulk_create(
+                [
+                    SignalInfoModel(
+                        id=uuid7(),
+                        worker_id=worker_id,
+                        task_id=task_id,
+                        signal_name=SIGNAL_UNKNOWN,
+                        progress_count=progress_count,
+                        create_dt=now,
+                    )
+                    for task_id, progress_count, main_task_id in rows
+                ]
+            )
+            new_state = Subquery(
+                SignalInfoModel.objects.filter(
+                    task_id=OuterRef('task_id'), signal_name=SIGNAL_UNKNOWN, create_dt=now
+                ).values('pk')[:1]
+            )
+            TaskModel.objects.filter(task_id__in=[task_id for task_id, _, _ in rows]).update(
+                state_id=new_state,
+                finished=True,
+                update_dt=now,
+                ended_dt=now,
+                duration=ExpressionWrapper(
+                    Value(now, output_field=DateTimeField()) - F('executing_dt'), output_field=DurationField()
+                ),
+            )
+
+            counts = SubTaskCountsUpdate()
+            for _, _, main_task_id in rows:
+                if main_task_id is not None:
+                    counts.add_state_change(main_task_id, SIGNAL_EXECUTING, SIGNAL_UNKNOWN)
+            counts.save()
+
+        for task_id, _, _ in rows:
+            logger.warning('Mark "executing" task %s of a dead worker to "unknown"', task_id)
+        count += len(rows)
+
+    return count
+
+
+def delete_old_workers(now=None) -> int:
+    """
+    Delete the entries of workers without a heartbeat since settings.HUEY_MONITOR_WORKER_RETENTION_DAYS
+    """
+    if now is None:
+        now = timezone.now()
+    days = getattr(settings, 'HUEY_MONITOR_WORKER_RETENTION_DAYS', WORKER_RETENTION_DAYS)
+    deleted, _ = WorkerModel.objects.filter(heartbeat_dt__lt=now - datetime.timedelta(days=days)).delete()
+    return deleted
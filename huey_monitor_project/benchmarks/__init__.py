@@ -0,0 +1,6 @@
+"""
+    Benchmarks for the hot paths of huey_monitor
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Run them via: ./manage.py run_benchmarks
+"""
@@ -0,0 +1,129 @@
+import datetime
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from huey_monitor.models import SignalInfoModel, TaskModel, WorkerIdentityModel
+from huey_monitor.workers import reap_orphaned_tasks
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+
+
+SIGNALS = ('enqueued', 'executing', 'error', 'retrying', 'complete')
+SUB_TASKS = 9  # Every main task has this number of sub tasks
+EXECUTING_EVERY = 1000  # Every n-th task is still "executing"
+BATCH_SIZE = 10_000
+REPEAT = 3
+
+
+def populate(count, start=0):
+    """
+    Create the tasks "start" until "count" with 5 signals each (deterministic data, without any randomness)
+    So a populated table can be filled up, e.g.: populate(100) and then populate(1000, start=100)
+    """
+    base_dt = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    worker_ids = [
+        WorkerIdentityModel.objects.get_or_create(hostname=f'host{no % 4}', pid=1000 + no, thread='MainThread')[0].pk
+        for no in range(8)
+    ]
+    for batch_start in range(start, count, BATCH_SIZE):
+        tasks = []
+        signals = []
+        for no in range(batch_start, min(batch_start + BATCH_SIZE, count)):
+            task_id = uuid.UUID(int=no + 1)
+            group_start = no - no % (SUB_TASKS + 1)
+            parent_task_id = None if no == group_start else uuid.UUID(int=group_start + 1)
+            create_dt = base_dt + datetime.timedelta(seconds=no)
+
+            task_signals = SIGNALS[:2] if no % EXECUTING_EVERY == EXECUTING_EVERY - 1 else SIGNALS
+            for offset, signal_name in enumerate(task_signals):
+                signals.append(
+                    SignalInfoModel(
+                        id=uuid.UUID(int=(no + 1) * len(SIGNALS) + offset),
+                        task_id=task_id,
+                        signal_name=signal_name,
+                        worker_id=worker_ids[no % 8],
+                        create_dt=create_dt + datetime.timedelta(milliseconds=offset),
+                    )
+                )
+            task = TaskModel(
+                task_id=task_id,
+                parent_task_id=parent_task_id,
+                name='sub_task' if parent_task_id else 'main_task',
+                state_id=signals[-1].pk,
+                create_dt=create_dt,
+                update_dt=signals[-1].create_dt,
+            )
+            for signal in signals[-len(task_signals):]:
+                task_finished = signal.signal_name in ('error', 'complete')
+                task.finished = task.finished or task_finished
+                task.update_times(signal.signal_name, signal.create_dt, task_finished)
+            tasks.append(task)
+        # Note: The foreign key constraints are checked at the end of the transaction.
+        TaskModel.objects.bulk_create(tasks)
+        SignalInfoModel.objects.bulk_create(signals)
+
+
+def drop_indexes():
+    """
+    Drop all indexes declared in the model Meta (to compare the timings without them)
+    """
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in (TaskModel, SignalInfoModel):
+            for index in model._meta.indexes:
+                cursor.execute(f'DROP INDEX {qn(index.name)}')
+
+
+def admin_client():
+    """
+    A client with a logged in superuser (Create it in a rolled back transaction!)
+    """
+    user = get_user_model().objects.create_superuser(username='benchmark', password=str(timezone.now()))
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def measure_requests(results, label, client):
+    main_task_id = TaskModel.objects.filter(parent_task__isnull=True).order_by('-update_dt').values_list(
+        'pk', flat=True
+    )[0]
+    urls = {
+        'changelist': reverse('admin:huey_monitor_taskmodel_changelist'),
+        'changelist executing': reverse('admin:huey_monitor_taskmodel_changelist') + '?state__signal_name=executing',
+        'detail view': reverse('admin:huey_monitor_taskmodel_change', args=(main_task_id,)),
+        'signal changelist': reverse('admin:huey_monitor_signalinfomodel_changelist'),
+    }
+    for name, url in urls.items():
+        with Measurement(name=f'{name} ({label})', count=REPEAT, unit='request') as measurement:
+            for _ in range(REPEAT):
+                response = client.get(url)
+                assert response.status_code == 200, f'{url=} {response.status_code=}'
+        results.append(measurement.as_dict())
+
+    with rollback():
+        with Measurement(name=f'reap orphaned tasks ({label})', count=1, unit='call') as measurement:
+            reap_orphaned_tasks()
+        results.append(measurement.as_dict())
+
+
+def benchmark_admin_queries(count=1_000_000) -> list:
+    """
+    Populate "count" tasks with five times as many signals and measure the admin views
+    and the reaping of orphaned tasks: With and without the indexes of the monitor models.
+    """
+    results = []
+    with rollback(), override_settings(ALLOWED_HOSTS=['testserver'], INTERNAL_IPS=[]):
+        with Measurement(name='populate', count=count, unit='task') as measurement:
+            populate(count)
+        results.append(measurement.as_dict())
+
+        client = admin_client()
+        measure_requests(results, label='with indexes', client=client)
+        drop_indexes()
+        measure_requests(results, label='without indexes', client=client)
+    return results
@@ -0,0 +1,58 @@
+import datetime
+
+from django.test import override_settings
+from django.urls import reverse
+
+from huey_monitor.models import TaskModel
+from huey_monitor_project.benchmarks.admin_queries import REPEAT, admin_client
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+from huey_monitor_project.test_app.data_generator import TaskDataGenerator
+
+
+END_DT = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)  # Same data in every run
+
+
+def get_row_counts(count) -> list:
+    """
+    The table sizes for the measurements: 1%, 10% and 100% of "count"
+
+    >>> get_row_counts(1_000_000)
+    [10000, 100000, 1000000]
+    >>> get_row_counts(20)
+    [1, 2, 20]
+    """
+    return sorted({max(count // 100, 1), max(count // 10, 1), count})
+
+
+def benchmark_admin_render(count=1_000_000) -> list:
+    """
+    Measure the render time of the task change list and detail view
+    while the task table grows: With 1%, 10% and 100% of "count" generated tasks.
+    """
+    results = []
+    with rollback(), override_settings(ALLOWED_HOSTS=['testserver'], INTERNAL_IPS=[]):
+        client = admin_client()
+        changelist_url = reverse('admin:huey_monitor_taskmodel_changelist')
+
+        generator = TaskDataGenerator(end_dt=END_DT)
+        populated = 0
+        for row_count in get_row_counts(count):
+            generator.create(row_count - populated)
+            populated = row_count
+
+            # The newest main task, with sub tasks if possible:
+            main_tasks = TaskModel.objects.filter(parent_task__isnull=True).order_by('-update_dt')
+            main_task = main_tasks.filter(sub_tasks__isnull=False).first() or main_tasks.first()
+            urls = {
+                'changelist': changelist_url,
+                'detail view': reverse('admin:huey_monitor_taskmodel_change', args=(main_task.pk,)),
+            }
+            for name, url in urls.items():
+                with Measurement(name=f'{name} ({row_count} tasks)', count=REPEAT, unit='request') as measurement:
+                    for _ in range(REPEAT):
+                        response = client.get(url)
+                        assert response.status_code == 200, f'{url=} {response.status_code=}'
+                result = measurement.as_dict()
+                result['rows'] = row_count
+                results.append(result)
+    return results
@@ -0,0 +1,104 @@
+import datetime
+import uuid
+
+from django.db import DatabaseError, connection, models
+from django.utils import timezone
+
+from huey_monitor.uuid7 import uuid7
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+
+
+BATCH_SIZE = 100  # Number of rows inserted with one statement, like a batch of stored signals
+TABLE_NAME = 'huey_monitor_benchmark_keys'
+
+KEY_TYPES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+    'bigint': None,  # Generated by the database
+}
+
+
+def create_table(key_type):
+    qn = connection.ops.quote_name
+    if key_type == 'bigint':
+        suffix = connection.data_types_suffix.get('BigAutoField', '')
+        id_column = f'{connection.data_types["BigAutoField"]} PRIMARY KEY {suffix}'
+    else:
+        id_column = f'{connection.data_types["UUIDField"]} PRIMARY KEY'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {qn(TABLE_NAME)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(TABLE_NAME)} ('
+            f'{qn("id")} {id_column},'
+            f' {qn("create_dt")} {connection.data_types["DateTimeField"]} NOT NULL'
+            ')'
+        )
+
+
+def get_sizes() -> dict:
+    """
+    Returns the size in bytes of the table and of its primary key index (if the database can tell)
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT pg_relation_size(%s::regclass), SUM(pg_relation_size(indexrelid))'
+                ' FROM pg_index WHERE indrelid = %s::regclass',
+                [TABLE_NAME, TABLE_NAME],
+            )
+            table_bytes, index_bytes = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            # Note: An integer primary key is the "rowid" of the table itself, without an own index.
+            try:
+                cursor.execute(
+                    "SELECT SUM(CASE WHEN name = %s THEN pgsize ELSE 0 END), SUM(CASE WHEN name != %s THEN pgsize END)"
+                    " FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                    [TABLE_NAME, TABLE_NAME, TABLE_NAME],
+                )
+            except DatabaseError:
+                # SQLite compiled without the "dbstat" virtual table
+                return {}
+            table_bytes, index_bytes = cursor.fetchone()
+        else:
+            return {}
+    return {'table_bytes': table_bytes, 'index_bytes': index_bytes or 0}
+
+
+def benchmark_primary_keys(count=100_000) -> list:
+    """
+    Insert "count" rows into a table with a random UUID, a time-ordered UUID
+    or an auto increment integer primary key: Compare the throughput and the size of the index.
+    """
+    id_field = models.UUIDField()
+    dt_field = models.DateTimeField()
+    qn = connection.ops.quote_name
+
+    results = []
+    for key_type, get_key in KEY_TYPES.items():
+        base_dt = timezone.now()
+        with rollback():
+            create_table(key_type)
+            with Measurement(name=f'insert {key_type}', count=count, unit='row') as measurement:
+                with connection.cursor() as cursor:
+                    for start in range(0, count, BATCH_SIZE):
+                        batch_count = min(BATCH_SIZE, count - start)
+                        params = []
+                        for no in range(start, start + batch_count):
+                            create_dt = dt_field.get_db_prep_value(
+                                base_dt + datetime.timedelta(microseconds=no), connection
+                            )
+                            if get_key is None:
+                                params.append(create_dt)
+                            else:
+                                params += [id_field.get_db_prep_value(get_key(), connection), create_dt]
+                        if get_key is None:
+                            columns, placeholders = qn('create_dt'), '(%s)'
+                        else:
+                            columns, placeholders = f'{qn("id")}, {qn("create_dt")}', '(%s, %s)'
+                        cursor.execute(
+                            f'INSERT INTO {qn(TABLE_NAME)} ({columns})'
+                            f' VALUES {", ".join([placeholders] * batch_count)}',
+                            params,
+                        )
+            results.append(measurement.as_dict() | get_sizes())
+    return results
@@ -0,0 +1,36 @@
+import uuid
+
+from huey.api import Task
+
+from huey_monitor.models import TaskModel
+from huey_monitor.tqdm import ProcessInfo
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+
+
+VARIANTS = {
+    'unthrottled': {},
+    'miniters=1000': {'miniters': 1000},
+    'mininterval=0.1': {'mininterval': 0.1},
+    'writes_per_second=10': {'writes_per_second': 10},
+}
+
+
+def benchmark_progress_updates(count=1_000_000) -> list:
+    """
+    Call ProcessInfo.update() "count" times with different throttling options
+    and count the database writes.
+    """
+    results = []
+    for name, process_info_kwargs in VARIANTS.items():
+        task = Task(id=str(uuid.uuid4()))
+        with rollback():
+            TaskModel.objects.create(task_id=task.id, name='benchmark')
+            with Measurement(name=f'progress {name}', count=count, unit='update') as measurement:
+                with ProcessInfo(task, total=count, **process_info_kwargs) as process_info:
+                    for _ in range(count):
+                        process_info.update()
+
+        result = measurement.as_dict()
+        result['writes_per_1m_updates'] = round(result['queries'] / count * 1_000_000)
+        results.append(result)
+    return results
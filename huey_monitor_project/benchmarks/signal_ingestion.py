@@ -0,0 +1,34 @@
+from django.test import override_settings
+from huey.signals import SIGNAL_COMPLETE, SIGNAL_ENQUEUED, SIGNAL_EXECUTING
+
+from huey_monitor.tasks import store_signals
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+from huey_monitor_project.test_app.tasks import delay_task
+
+
+SIGNALS = (SIGNAL_ENQUEUED, SIGNAL_EXECUTING, SIGNAL_COMPLETE)
+
+VARIANTS = {
+    'store_signals': {},
+    'store_signals without instrumentation': {
+        'HUEY_MONITOR_INSTRUMENTATION': False,
+        'HUEY_MONITOR_RESOURCE_USAGE': False,
+    },
+}
+
+
+def benchmark_signal_ingestion(count=1000) -> list:
+    """
+    Send the signals of "count" tasks through the Huey signal handler store_signals(),
+    like a worker does: With and without the measurement of the monitor overhead and the resource usage.
+    """
+    results = []
+    for name, settings in VARIANTS.items():
+        tasks = [delay_task.s(name='benchmark', sleep=0) for _ in range(count)]
+        with rollback(), override_settings(**settings):
+            with Measurement(name=name, count=count * len(SIGNALS), unit='signal') as measurement:
+                for task in tasks:
+                    for signal in SIGNALS:
+                        store_signals(signal, task)
+        results.append(measurement.as_dict())
+    return results
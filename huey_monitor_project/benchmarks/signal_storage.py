@@ -0,0 +1,34 @@
+import uuid
+
+from huey_monitor.signal_store import store_signal_orm, upsert_signal_batch, upsert_supported
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+SIGNALS = ('enqueued', 'executing', 'complete')
+
+
+def benchmark_signal_storage(count=1000) -> list:
+    """
+    Store the signals of "count" tasks one by one:
+    Compare the ORM implementation with the "upsert" implementation.
+    """
+    implementations = {
+        'store_signal_orm': store_signal_orm,
+    }
+    if upsert_supported():
+        implementations['store_signal_upsert'] = lambda signal_info: upsert_signal_batch([signal_info])
+
+    results = []
+    for name, store_func in implementations.items():
+        signal_infos = []
+        for task_id in (uuid.uuid4() for _ in range(count)):
+            for offset, signal in enumerate(SIGNALS):
+                signal_infos.append(make_signal_info(signal, task_id, offset=offset))
+
+        with rollback():
+            with Measurement(name=name, count=len(signal_infos), unit='signal') as measurement:
+                for signal_info in signal_infos:
+                    store_func(signal_info)
+        results.append(measurement.as_dict())
+    return results
@@ -0,0 +1,54 @@
+import datetime
+import uuid
+
+from django.utils import timezone
+from huey.signals import SIGNAL_EXECUTING
+
+from huey_monitor.models import SignalInfoModel, TaskModel, WorkerIdentityModel
+from huey_monitor.tasks import startup_handler
+from huey_monitor.workers import SIGNAL_UNKNOWN, stop_heartbeat
+from huey_monitor_project.benchmarks.admin_queries import BATCH_SIZE
+from huey_monitor_project.benchmarks.utils import Measurement, rollback
+
+
+def create_executing_tasks(count):
+    """
+    Create "count" tasks in the "executing" state of a dead worker.
+    """
+    worker_id = WorkerIdentityModel.objects.create(hostname='dead-host', pid=1, thread='MainThread').pk
+    executing_dt = timezone.now() - datetime.timedelta(days=1)
+    for start in range(0, count, BATCH_SIZE):
+        tasks = []
+        signals = []
+        for no in range(start, min(start + BATCH_SIZE, count)):
+            signal = SignalInfoModel(
+                id=uuid.UUID(int=no + 1),
+                task_id=uuid.UUID(int=no + 1),
+                signal_name=SIGNAL_EXECUTING,
+                worker_id=worker_id,
+                create_dt=executing_dt,
+            )
+            task = TaskModel(task_id=signal.task_id, name='benchmark', state_id=signal.pk, create_dt=executing_dt)
+            task.update_times(SIGNAL_EXECUTING, executing_dt, False)
+            tasks.append(task)
+            signals.append(signal)
+        # Note: The foreign key constraints are checked at the end of the transaction.
+        TaskModel.objects.bulk_create(tasks)
+        SignalInfoModel.objects.bulk_create(signals)
+
+
+def benchmark_startup_handler(count=10_000) -> list:
+    """
+    Call the Huey startup hook with "count" "executing" tasks of a dead worker:
+    Registers the worker and marks all tasks as "unknown".
+    """
+    with rollback():
+        create_executing_tasks(count)
+        try:
+            with Measurement(name='startup_handler', count=count, unit='task') as measurement:
+                startup_handler()
+        finally:
+            stop_heartbeat()
+        unknown = TaskModel.objects.filter(state__signal_name=SIGNAL_UNKNOWN).count()
+        assert unknown == count, f'{unknown=} {count=}'
+    return [measurement.as_dict()]
@@ -0,0 +1,74 @@
+import contextlib
+import time
+
+from django.db import connection, transaction
+
+
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+class QueryCounter:
+    """
+    Count all executed SQL statements, without the transaction handling statements.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.upper().startswith(TRANSACTION_STATEMENTS):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def rollback():
+    """
+    Run the benchmark in a transaction that will be rolled back:
+    So no benchmark data will remain in the database.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+class Measurement:
+    """
+    Measure the duration and the number of SQL statements of a code block.
+    """
+
+    def __init__(self, name, count, unit='it'):
+        self.name = name
+        self.count = count
+        self.unit = unit
+        self.queries = QueryCounter()
+        self.duration = None
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self.queries)
+        self._wrapper.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self.start
+        self._wrapper.__exit__(exc_type, exc_val, exc_tb)
+
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'vendor': connection.vendor,
+            'count': self.count,
+            'unit': self.unit,
+            'duration_sec': round(self.duration, 6),
+            'per_sec': round(self.count / self.duration, 2) if self.duration else None,
+            'queries': self.queries.count,
+            'queries_per_unit': round(self.queries.count / self.count, 3) if self.count else None,
+        }
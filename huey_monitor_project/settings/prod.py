@@ -22,10 +22,21 @@ assert __Path(BASE_PATH, 'huey_monitor_project').is_dir()
 # ----------------------------------------------------------------------------
 
 # e.g.: override SignalInfoModelAdmin.list_filter:
-HUEY_MONITOR_SIGNAL_INFO_MODEL_LIST_FILTER = ('task__name', 'signal_name', 'thread', 'hostname')
+HUEY_MONITOR_SIGNAL_INFO_MODEL_LIST_FILTER = ('task__name', 'signal_name', 'worker__thread', 'worker__hostname')
 
 # e.g.: override TaskModelAdmin.list_filter:
-HUEY_MONITOR_TASK_MODEL_LIST_FILTER = ('name', 'state__signal_name', 'state__thread', 'state__hostname')
+HUEY_MONITOR_TASK_MODEL_LIST_FILTER = (
+    'name',
+    'state__signal_name',
+    'state__worker__thread',
+    'state__worker__hostname',
+)
+
+# Mark the "executing" tasks of dead workers periodically:
+HUEY_MONITOR_WATCHDOG = True
+
+# Store the queue depths every minute:
+HUEY_MONITOR_QUEUE_SAMPLER = True
 
 
 # Django settings
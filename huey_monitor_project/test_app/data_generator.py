@@ -0,0 +1,410 @@
+"""
+Synthesize realistic task histories directly in the database for load tests and benchmarks:
+Main tasks with sub tasks, retries, errors with tracebacks, progress and resource usage.
+
+All values are deterministic by the seed and the end time. The tasks are generated newest first,
+so every create() call adds older tasks: The same seed creates the same data, regardless of how
+the count is split into create() calls. The tasks are generated lazily and stored in batches
+via bulk_create(), so the memory usage doesn't grow with the count.
+
+Use the "generate_task_data" command, e.g.: ./manage.py generate_task_data --count 1000000
+"""
+
+import datetime
+import math
+import random
+import uuid
+from itertools import islice
+
+from django.db import transaction
+from huey.signals import (
+    SIGNAL_COMPLETE,
+    SIGNAL_ENQUEUED,
+    SIGNAL_ERROR,
+    SIGNAL_EXECUTING,
+    SIGNAL_RETRYING,
+    SIGNAL_REVOKED,
+)
+
+from huey_monitor.constants import ENDED_HUEY_SIGNALS
+from huey_monitor.exception_groups import ExceptionGroupUpdate, get_fingerprint
+from huey_monitor.models import SignalInfoModel, SubTaskProgressModel, TaskModel
+from huey_monitor.signal_store import get_worker_identity_ids
+from huey_monitor.sub_task_counts import get_progress_shard, sub_task_deltas
+from huey_monitor.uuid7 import uuid7
+
+
+BATCH_SIZE = 5000  # Number of tasks per bulk_create()
+MAIN_TASKS_PER_HOUR = 500  # Average number of new main tasks (The rate changes over the day)
+REVOKE_RATE = 0.005
+RETRY_DELAY = 10  # Seconds
+
+WORKER_HOSTS = 4
+WORKER_PROCESSES = 2  # per host
+WORKER_THREADS = 4  # per process
+WEB_HOSTS = 2  # The hosts, that enqueue the main tasks
+
+# The generated task types:
+#   weight: Frequency of the main tasks (zero: only started as sub task)
+#   duration: Median runtime in seconds (log-normal distributed)
+#   error_rate, retries, exception: Failed executions and their exception, see: EXCEPTIONS
+#   sub_task, sub_tasks: Name and min/max number of the sub tasks
+#   total, unit: Min/max number of the processed units, if the task reports the progress
+TASK_TYPES = {
+    'send_email': {'weight': 60, 'duration': 0.4, 'error_rate': 0.03, 'retries': 2, 'exception': 'smtp'},
+    'resize_image': {'weight': 25, 'duration': 1.2, 'error_rate': 0.01, 'exception': 'value'},
+    'sync_inventory': {
+        'weight': 8,
+        'duration': 25,
+        'error_rate': 0.06,
+        'retries': 3,
+        'exception': 'timeout',
+        'total': (100, 2000),
+        'unit': 'items',
+    },
+    'import_products': {'weight': 4, 'duration': 3, 'sub_task': 'import_products_chunk', 'sub_tasks': (2, 30)},
+    'import_products_chunk': {
+        'weight': 0,
+        'duration': 8,
+        'error_rate': 0.04,
+        'retries': 1,
+        'exception': 'integrity',
+        'total': (500, 5000),
+        'unit': 'products',
+    },
+    'generate_report': {'weight': 2, 'duration': 1, 'sub_task': 'render_report_page', 'sub_tasks': (1, 12)},
+    'render_report_page': {
+        'weight': 0,
+        'duration': 4,
+        'error_rate': 0.01,
+        'exception': 'memory',
+        'total': (10, 200),
+        'unit': 'rows',
+    },
+    'cleanup_sessions': {'weight': 1, 'duration': 90, 'total': (1000, 100_000), 'unit': 'sessions'},
+}
+
+# exception type, message, file, function, source line
+EXCEPTIONS = {
+    'smtp': (
+        'smtplib.SMTPServerDisconnected',
+        'Connection unexpectedly closed: mail{number}.example.com',
+        'mail/backends.py',
+        'send_messages',
+        'self.connection.sendmail(from_email, recipients, message.as_bytes())',
+    ),
+    'value': (
+        'ValueError',
+        'Invalid image dimensions: {number}x0',
+        'images/processing.py',
+        'resize',
+        'raise ValueError(f"Invalid image dimensions: {width}x{height}")',
+    ),
+    'timeout': (
+        'requests.exceptions.ReadTimeout',
+        "HTTPSConnectionPool(host='erp{number}.example.com', port=443): Read timed out. (read timeout=30)",
+        'inventory/client.py',
+        'fetch_stock',
+        'response = self.session.get(url, timeout=30)',
+    ),
+    'integrity': (
+        'django.db.utils.IntegrityError',
+        'duplicate key value violates unique constraint "products_sku_key" (sku)=({number}) already exists.',
+        'products/importer.py',
+        'import_row',
+        'Product.objects.create(**values)',
+    ),
+    'memory': ('MemoryError', '', 'reports/rendering.py', 'render_page', 'rows = list(queryset)'),
+}
+
+TRACEBACK = (
+    'Traceback (most recent call last):\n'
+    '  File "/venv/lib/python3.12/site-packages/huey/api.py", line 1045, in _execute\n'
+    '    task_value = task.execute()\n'
+    '  File "/app/{module}/tasks.py", line {task_line}, in {task_name}\n'
+    '    return {function}(*args, **kwargs)\n'
+    '  File "/app/{filename}", line {line}, in {function}\n'
+    '    {source}\n'
+    '{exception}\n'
+)
+
+
+def daily_factor(dt) -> float:
+    """
+    The relative task rate at the given time: Busy at noon, quiet at midnight.
+
+    >>> round(daily_factor(datetime.datetime(2024, 1, 1, 12)), 2)
+    1.8
+    >>> round(daily_factor(datetime.datetime(2024, 1, 1, 0)), 2)
+    0.2
+    """
+    hours = dt.hour + dt.minute / 60
+    return 1 + 0.8 * math.sin((hours - 6) * math.pi / 12)
+
+
+class TaskDataGenerator:
+    """
+    Generate task trees from "end_dt" backwards in time, see module docstring.
+    """
+
+    def __init__(self, *, end_dt, seed=0, main_tasks_per_hour=MAIN_TASKS_PER_HOUR):
+        self.end_dt = end_dt
+        self.random = random.Random(seed)
+        self.main_tasks_per_hour = main_tasks_per_hour
+
+        self.worker_identities = [
+            (f'worker-{host_no}', 100 + process_no, f'Worker-{thread_no}')
+            for host_no in range(1, WORKER_HOSTS + 1)
+            for process_no in range(WORKER_PROCESSES)
+            for thread_no in range(1, WORKER_THREADS + 1)
+        ]
+        self.web_identities = [(f'web-{host_no}', 10, 'MainThread') for host_no in range(1, WEB_HOSTS + 1)]
+        self.worker_ids = None
+        self.identities = None  # The worker identity keys by their ID
+        self.progress_shards = {}  # The SubTaskProgressModel entries of the generated main tasks
+
+        self.main_task_names = [name for name, options in TASK_TYPES.items() if options['weight']]
+        self.main_task_weights = [TASK_TYPES[name]['weight'] for name in self.main_task_names]
+
+        self.oldest_dt = end_dt
+        self._tasks = self._generate_tasks()
+
+    def make_uuid7(self, dt) -> uuid.UUID:
+        """
+        A time-ordered signal ID, with deterministic random bits.
+        """
+        return uuid.UUID(int=uuid7(dt).int & ~((1 << 62) - 1) | self.random.getrandbits(62))
+
+    def make_traceback(self, task_name, exception) -> tuple:
+        """
+        Returns the exception line and the traceback: Same traceback structure with different messages.
+        """
+        exception_type, message, filename, function, source = EXCEPTIONS[exception]
+        exception_line = message.format(number=self.random.randint(1, 999))
+        return exception_line, TRACEBACK.format(
+            module=filename.split('/')[0],
+            task_line=self.random.choice((23, 24, 57)),
+            task_name=task_name,
+            function=function,
+            filename=filename,
+            line=self.random.randint(10, 400),
+            source=source,
+            exception=f'{exception_type}: {exception_line}' if exception_line else exception_type,
+        )
+
+    def _next_main_task_dt(self, dt) -> datetime.datetime:
+        """
+        The start of the previous main task: Poisson process with a daily changing rate (via thinning)
+        """
+        max_rate = self.main_tasks_per_hour * 1.8 / 3600
+        while True:
+            dt -= datetime.timedelta(seconds=self.random.expovariate(max_rate))
+            if self.random.random() * 1.8 < daily_factor(dt):
+                return dt
+
+    def _executions(self, task_name, options, total, enqueued_dt, enqueue_identity) -> list:
+        """
+        Generate the signals of all executions of one task: List of (signal name, datetime,
+        worker identity, progress count, exception line, traceback, resource usage)
+        """
+        signals = [(SIGNAL_ENQUEUED, enqueued_dt, enqueue_identity, None, '', None, None)]
+        if self.random.random() < REVOKE_RATE:
+            revoked_dt = enqueued_dt + datetime.timedelta(seconds=1)
+            signals.append((SIGNAL_REVOKED, revoked_dt, enqueue_identity, None, '', None, None))
+            return signals
+
+        retries = options.get('retries', 0)
+        while True:
+            identity = self.random.choice(self.worker_identities)
+            executing_dt = enqueued_dt + datetime.timedelta(seconds=self.random.lognormvariate(math.log(0.05), 1.5))
+            duration = self.random.lognormvariate(math.log(options['duration']), 0.8)
+            ended_dt = executing_dt + datetime.timedelta(seconds=duration)
+            signals.append((SIGNAL_EXECUTING, executing_dt, identity, None, '', None, None))
+
+            resource_usage = {
+                'cpu_user_time': duration * self.random.uniform(0.05, 0.7),
+                'cpu_system_time': duration * self.random.uniform(0.01, 0.1),
+                'max_rss': int(self.random.lognormvariate(math.log(150 * 1024 * 1024), 0.3)),
+                'io_read_bytes': self.random.randrange(0, 10_000_000, 4096),
+                'io_write_bytes': self.random.randrange(0, 1_000_000, 4096),
+            }
+            if self.random.random() >= options.get('error_rate', 0):
+                signals.append((SIGNAL_COMPLETE, ended_dt, identity, total, '', None, resource_usage))
+                return signals
+
+            progress_count = None if total is None else self.random.randint(0, total)
+            exception_line, traceback = self.make_traceback(task_name, options['exception'])
+            signals.append(
+                (SIGNAL_ERROR, ended_dt, identity, progress_count, exception_line, traceback, resource_usage)
+            )
+            if not retries:
+                return signals
+            retries -= 1
+            retrying_dt = ended_dt + datetime.timedelta(milliseconds=1)
+            signals.append((SIGNAL_RETRYING, retrying_dt, identity, None, '', None, None))
+            enqueued_dt = ended_dt + datetime.timedelta(seconds=RETRY_DELAY)
+            signals.append((SIGNAL_ENQUEUED, enqueued_dt, identity, None, '', None, None))
+
+    def _make_task(self, task_name, options, enqueued_dt, enqueue_identity, parent_task_id=None):
+        """
+        Returns the TaskModel instance with its SignalInfoModel instances (without the signals after "end_dt")
+        or None if the task is enqueued after "end_dt"
+        """
+        task = TaskModel(
+            task_id=uuid.UUID(int=self.random.getrandbits(128), version=4),
+            parent_task_id=parent_task_id,
+            name=task_name,
+            unit=options.get('unit', 'it'),
+        )
+        if 'total' in options:
+            task.total = self.random.randint(*options['total'])
+        executions = self._executions(task_name, options, task.total, enqueued_dt, enqueue_identity)
+
+        signals = []
+        for signal_name, signal_dt, identity, progress_count, exception_line, traceback, usage in executions:
+            if signal_dt > self.end_dt:
+                # Still waiting or running: A partial progress, if the task is running
+                if progress_count is not None and signals[-1].signal_name == SIGNAL_EXECUTING:
+                    elapsed = (self.end_dt - signals[-1].create_dt) / (signal_dt - signals[-1].create_dt)
+                    task.progress_count = int(progress_count * elapsed)
+                break
+
+            signal = SignalInfoModel(
+                id=self.make_uuid7(signal_dt),
+                task_id=task.task_id,
+                signal_name=signal_name,
+                worker_id=self.worker_ids[identity],
+                progress_count=progress_count,
+                exception_line=exception_line,
+                exception=traceback,
+                create_dt=signal_dt,
+            )
+            signals.append(signal)
+
+            task_finished = signal_name in ENDED_HUEY_SIGNALS
+            task.finished = task.finished or task_finished
+            task.update_times(signal_name, signal_dt, task_finished)
+            task.update_resource_usage(signal_name, usage)
+            if progress_count is not None:
+                task.progress_count = progress_count
+
+        if not signals:
+            return None
+        task.state_id = signals[-1].pk
+        task.create_dt = signals[0].create_dt
+        task.update_dt = signals[-1].create_dt
+        return task, signals
+
+    def _generate_tree(self, enqueued_dt) -> list:
+        """
+        Returns the main task and its sub tasks: [(TaskModel, [SignalInfoModel, ...]), ...]
+        """
+        task_name = self.random.choices(self.main_task_names, self.main_task_weights)[0]
+        options = TASK_TYPES[task_name]
+        main_task, main_signals = self._make_task(
+            task_name, options, enqueued_dt, enqueue_identity=self.random.choice(self.web_identities)
+        )
+        tree = [(main_task, main_signals)]
+
+        executing = [signal for signal in main_signals if signal.signal_name == SIGNAL_EXECUTING]
+        if 'sub_task' not in options or not executing:
+            return tree
+
+        # The main task enqueues the sub tasks at the start of its last execution:
+        identity = self.identities[executing[-1].worker_id]
+        sub_task_name = options['sub_task']
+        sub_progress = []
+        progress_shards = {}
+        for no in range(self.random.randint(*options['sub_tasks'])):
+            sub_enqueued_dt = executing[-1].create_dt + datetime.timedelta(milliseconds=10 * (no + 1))
+            sub_task = self._make_task(
+                sub_task_name,
+                TASK_TYPES[sub_task_name],
+                sub_enqueued_dt,
+                enqueue_identity=identity,
+                parent_task_id=main_task.task_id,
+            )
+            if sub_task is not None:
+                tree.append(sub_task)
+                sub_task_instance, sub_task_signals = sub_task
+                # The sub task counters and progress shards of the main task, see: huey_monitor.sub_task_counts
+                deltas = sub_task_deltas(sub_task_signals[-1].signal_name)
+                for field_name, delta in deltas.items():
+                    setattr(main_task, field_name, getattr(main_task, field_name) + delta)
+                if sub_task_instance.progress_count:
+                    shard = get_progress_shard(sub_task_instance.task_id)
+                    progress_shards[shard] = progress_shards.get(shard, 0) + sub_task_instance.progress_count
+                if sub_task_instance.ended_dt is not None and main_task.ended_dt is not None:
+                    if sub_task_instance.ended_dt <= main_task.ended_dt:
+                        sub_progress.append(sub_task_instance.progress_count or 0)
+
+        if sub_progress:
+            # The progress of the ended sub tasks is added up, if the main task ends, see: signal_store
+            main_task.progress_count = sum(sub_progress)
+        if progress_shards:
+            self.progress_shards[main_task.task_id] = [
+                SubTaskProgressModel(main_task_id=main_task.task_id, shard=shard, progress=progress)
+                for shard, progress in progress_shards.items()
+            ]
+        return tree
+
+    def _generate_tasks(self):
+        dt = self.end_dt
+        while True:
+            dt = self._next_main_task_dt(dt)
+            self.oldest_dt = dt
+            yield from self._generate_tree(dt)
+
+    def create(self, count, batch_size=BATCH_SIZE) -> tuple:
+        """
+        Store the next "count" tasks (older than all previous ones)
+        Every batch is stored in a transaction.
+        Note: The last main task may be counted with sub tasks, that are stored by the next call.
+        Returns the number of created tasks and signals.
+        """
+        if self.worker_ids is None:
+            with transaction.atomic():
+                self.worker_ids = get_worker_identity_ids(self.worker_identities + self.web_identities)
+            self.identities = {pk: key for key, pk in self.worker_ids.items()}
+
+        task_count = signal_count = 0
+        while task_count < count:
+            batch = list(islice(self._tasks, min(batch_size, count - task_count)))
+            tasks = [task for task, signals in batch]
+            signals = [signal for task, task_signals in batch for signal in task_signals]
+
+            with transaction.atomic():
+                self._save_exception_groups(batch)
+                # Note: The foreign key constraints are checked at the end of the transaction.
+                TaskModel.objects.bulk_create(tasks)
+                SignalInfoModel.objects.bulk_create(signals)
+                SubTaskProgressModel.objects.bulk_create(
+                    [shard for task in tasks for shard in self.progress_shards.pop(task.task_id, ())]
+                )
+
+            task_count += len(tasks)
+            signal_count += len(signals)
+        return task_count, signal_count
+
+    def _save_exception_groups(self, batch):
+        """
+        Group the exceptions, like the signal storage: The traceback is only stored in the group.
+        """
+        exception_groups = ExceptionGroupUpdate()
+        for task, signals in batch:
+            for signal in signals:
+                if signal.exception:
+                    exception_groups.add(
+                        {
+                            'exception': signal.exception,
+                            'exception_line': signal.exception_line,
+                            'create_dt': signal.create_dt,
+                        },
+                        task_name=task.name,
+                    )
+        group_ids = exception_groups.save()
+        for _task, signals in batch:
+            for signal in signals:
+                if signal.exception:
+                    signal.exception_group_id = group_ids[get_fingerprint(signal.exception)[0]]
+                    signal.exception = None
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from huey_monitor.statistics import rebuild_statistics
+from huey_monitor_project.test_app.data_generator import BATCH_SIZE, MAIN_TASKS_PER_HOUR, TaskDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Synthesize realistic task histories directly in the database (e.g.: to load test the admin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            default=10_000,
+            type=int,
+            help='Number of tasks to create (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--seed',
+            default=0,
+            type=int,
+            help='Seed of the random values: Same seed and end time creates the same data (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--end',
+            default=None,
+            help='Time of the newest signals as ISO 8601 (default: now) The tasks are created backwards from here.',
+        )
+        parser.add_argument(
+            '--per-hour',
+            default=MAIN_TASKS_PER_HOUR,
+            type=int,
+            help='Average number of main tasks per hour (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=BATCH_SIZE,
+            type=int,
+            help='Number of tasks per bulk insert (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--statistics',
+            action='store_true',
+            help='Rebuild the task statistics after the tasks are created',
+        )
+
+    def handle(self, *args, count, seed, end, per_hour, batch_size, statistics, **options):
+        if end is None:
+            end_dt = timezone.now()
+        else:
+            end_dt = parse_datetime(end)
+            if end_dt is None:
+                raise CommandError(f'Invalid end time: {end!r}')
+            if timezone.is_naive(end_dt):
+                end_dt = timezone.make_aware(end_dt)
+
+        generator = TaskDataGenerator(end_dt=end_dt, seed=seed, main_tasks_per_hour=per_hour)
+        start = time.monotonic()
+        task_count = signal_count = 0
+        while task_count < count:
+            # Report the progress after every ten batches:
+            tasks, signals = generator.create(min(batch_size * 10, count - task_count), batch_size=batch_size)
+            task_count += tasks
+            signal_count += signals
+            self.stdout.write(f'{task_count} tasks with {signal_count} signals created...')
+
+        self.stdout.write(
+            f'Created {task_count} tasks with {signal_count} signals between {generator.oldest_dt:%Y-%m-%d %H:%M}'
+            f' and {end_dt:%Y-%m-%d %H:%M} in {time.monotonic() - start:.1f} sec.'
+        )
+
+        if statistics:
+            signals = rebuild_statistics()
+            self.stdout.write(f'Statistics of {signals} signals rebuild.')
@@ -0,0 +1,131 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+import huey_monitor
+from huey_monitor_project.benchmarks.admin_queries import benchmark_admin_queries
+from huey_monitor_project.benchmarks.admin_render import benchmark_admin_render
+from huey_monitor_project.benchmarks.primary_keys import benchmark_primary_keys
+from huey_monitor_project.benchmarks.progress_updates import benchmark_progress_updates
+from huey_monitor_project.benchmarks.signal_ingestion import benchmark_signal_ingestion
+from huey_monitor_project.benchmarks.signal_storage import benchmark_signal_storage
+from huey_monitor_project.benchmarks.startup_handler import benchmark_startup_handler
+
+
+BENCHMARKS = {
+    'admin_queries': benchmark_admin_queries,
+    'admin_render': benchmark_admin_render,
+    'primary_keys': benchmark_primary_keys,
+    'progress_updates': benchmark_progress_updates,
+    'signal_ingestion': benchmark_signal_ingestion,
+    'signal_storage': benchmark_signal_storage,
+    'startup_handler': benchmark_startup_handler,
+}
+
+
+def get_environment() -> dict:
+    """
+    Information about the benchmark run, so that results of different runs are comparable.
+    """
+    connection.ensure_connection()
+    return {
+        'date': timezone.now().isoformat(),
+        'huey_monitor': huey_monitor.__version__,
+        'django': django.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'vendor': connection.vendor,
+        'database_version': '.'.join(str(part) for part in connection.get_database_version()),
+    }
+
+
+def compare_results(previous, results) -> list:
+    """
+    >>> compare_results(
+    ...     [{'name': 'foo', 'per_sec': 100}, {'name': 'bar', 'per_sec': 5}],
+    ...     [{'name': 'foo', 'per_sec': 150, 'unit': 'signal'}, {'name': 'new', 'per_sec': 1, 'unit': 'task'}],
+    ... )
+    ['foo: 100 -> 150 signal/sec (+50.0%)']
+    """
+    previous_per_sec = {result['name']: result['per_sec'] for result in previous}
+    lines = []
+    for result in results:
+        old, new = previous_per_sec.get(result['name']), result['per_sec']
+        if old and new:
+            lines.append(f'{result["name"]}: {old} -> {new} {result["unit"]}/sec ({(new - old) * 100 / old:+.1f}%)')
+    return lines
+
+
+class Command(BaseCommand):
+    help = 'Run huey monitor benchmarks against the configured database (all data will be rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help=f'Benchmarks to run (default: all): {", ".join(sorted(BENCHMARKS))}',
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=None,
+            help='Number of work items per benchmark (default: benchmark specific)',
+        )
+        parser.add_argument(
+            '--json',
+            dest='json_path',
+            default=None,
+            help='Write all results as JSON into this file',
+        )
+        parser.add_argument(
+            '--compare',
+            dest='compare_path',
+            default=None,
+            help='Compare the results with a JSON file of a previous run',
+        )
+
+    def handle(self, *args, names, count, json_path, compare_path, **options):
+        previous = None
+        if compare_path:
+            try:
+                previous = json.loads(Path(compare_path).read_text())['results']
+            except (OSError, ValueError, KeyError) as err:
+                raise CommandError(f'Can not read results from {compare_path}: {err}')
+
+        kwargs = {}
+        if count is not None:
+            kwargs['count'] = count
+
+        unknown = sorted(set(names) - set(BENCHMARKS))
+        if unknown:
+            raise CommandError(f'Unknown benchmarks: {", ".join(unknown)}')
+
+        results = []
+        for name in names or sorted(BENCHMARKS):
+            self.stdout.write(f'Run benchmark {name!r}...')
+            for result in BENCHMARKS[name](**kwargs):
+                unit = result['unit']
+                self.stdout.write(
+                    f'  {result["name"]}: {result["count"]} x {unit} in {result["duration_sec"]:.3f} sec.'
+                    f' ({result["per_sec"]} {unit}/sec, {result["queries_per_unit"]} queries/{unit})'
+                )
+                if 'index_bytes' in result:
+                    self.stdout.write(
+                        f'    table: {result["table_bytes"]} bytes, indexes: {result["index_bytes"]} bytes'
+                    )
+                results.append(result)
+
+        if previous is not None:
+            self.stdout.write(f'Compared with {compare_path}:')
+            for line in compare_results(previous, results):
+                self.stdout.write(f'  {line}')
+
+        if json_path:
+            data = {'environment': get_environment(), 'results': results}
+            Path(json_path).write_text(json.dumps(data, indent=2))
+            self.stdout.write(f'Results written to {json_path}')
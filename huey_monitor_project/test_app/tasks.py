@@ -82,6 +82,16 @@ def linear_processing_task(task, desc=None, total=2000, no_total=False):
         process_info.update(n=1)
 
 
+@task(context=True)
+def progress_error_task(task, total=10):
+    process_info = ProcessInfo(task, desc='Raise an error in the middle', total=total)
+    for no in range(total):
+        if no == total // 2:
+            raise RuntimeError(f'Error after {no} items')
+        time.sleep(0.1)
+        process_info.update(n=1)
+
+
 @task(context=True)
 def parallel_sub_task(task, parent_task_id, item_chunk, **info_kwargs):
     """
@@ -1,8 +1,13 @@
+import uuid
+
 from bx_django_utils.test_utils.html_assertion import HtmlAssertionMixin
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from model_bakery import baker
 
+from huey_monitor.signal_store import store_signal
+from huey_monitor_project.tests.utils import make_signal_info
+
 
 class AdminAnonymousTests(HtmlAssertionMixin, TestCase):
     def test_login(self):
@@ -42,3 +47,61 @@ class AdminLoggedinTests(HtmlAssertionMixin, TestCase):
             ),
         )
         self.assertTemplateUsed(response, template_name='admin/index.html')
+
+    @override_settings(HUEY_MONITOR_TASK_MODEL_LIST_FILTER=None)  # Use the default list filter
+    def test_task_duration_filter(self):
+        superuser = baker.make(User, username='superuser', is_staff=True, is_active=True, is_superuser=True)
+        self.client.force_login(superuser)
+
+        fast_task_id, slow_task_id = uuid.uuid4(), uuid.uuid4()
+        for task_id, task_name, runtime in ((fast_task_id, 'fast_task', 0.5), (slow_task_id, 'slow_task', 90)):
+            store_signal(make_signal_info('executing', task_id, task_name=task_name, offset=0))
+            store_signal(make_signal_info('complete', task_id, task_name=task_name, offset=runtime))
+
+        response = self.client.get('/admin/huey_monitor/taskmodel/?duration=lt1h', HTTP_ACCEPT_LANGUAGE='en')
+        self.assert_html_parts(response, parts=('<p class="paginator">1 Task</p>', '1.5\xa0minutes'))
+        self.assertEqual([task.name for task in response.context['cl'].result_list], ['slow_task'])
+
+    def test_statistics_view(self):
+        superuser = baker.make(User, username='superuser', is_staff=True, is_active=True, is_superuser=True)
+        self.client.force_login(superuser)
+
+        for offset, signal_name in enumerate(('complete', 'complete', 'error')):
+            task_id = uuid.uuid4()
+            store_signal(make_signal_info('enqueued', task_id, task_name='foo_task', offset=-90))
+            store_signal(make_signal_info('executing', task_id, task_name='foo_task', offset=0))
+            store_signal(make_signal_info(signal_name, task_id, task_name='foo_task', offset=offset + 1))
+
+        response = self.client.get('/admin/huey_monitor/taskmodel/statistics/', HTTP_ACCEPT_LANGUAGE='en')
+        self.assert_html_parts(
+            response,
+            parts=(
+                '<title>Task statistics | Django site admin</title>',
+                '<a href="?days=7&amp;name=foo_task">foo_task</a>',
+                '<td>33%</td>',
+            ),
+        )
+        self.assertTemplateUsed(response, template_name='admin/huey_monitor/taskmodel/statistics.html')
+        [statistics] = response.context['statistics']
+        self.assertEqual(
+            (statistics.ended_count, statistics.complete_count, statistics.error_count),
+            (3, 2, 1),
+        )
+        self.assertEqual(statistics.latency_count, 3)
+        [host_statistics] = response.context['host_statistics']
+        self.assertEqual(host_statistics.latency_count, 3)
+        self.assertContains(response, 'Queue latency per worker host')
+        self.assertContains(response, '1.5\xa0minutes')
+
+        response = self.client.get(
+            '/admin/huey_monitor/taskmodel/statistics/?days=1&name=foo_task', HTTP_ACCEPT_LANGUAGE='en'
+        )
+        self.assertEqual(response.status_code, 200)
+        hourly = response.context['statistics']
+        self.assertEqual({statistics.name for statistics in hourly}, {'foo_task'})
+        self.assertEqual(sum(statistics.ended_count for statistics in hourly), 3)
+
+        staffuser = baker.make(User, username='staff_test_user', is_staff=True, is_active=True, is_superuser=False)
+        self.client.force_login(staffuser)
+        response = self.client.get('/admin/huey_monitor/taskmodel/statistics/', HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response.status_code, 403)
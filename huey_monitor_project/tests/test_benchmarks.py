@@ -0,0 +1,57 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from huey_monitor.models import SignalInfoModel, TaskModel
+
+
+class BenchmarksTestCase(TestCase):
+    def test_run_all_benchmarks(self):
+        stdout = StringIO()
+        call_command('run_benchmarks', '--count', '20', stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn("Run benchmark 'admin_queries'...", output)
+        self.assertIn('changelist (with indexes): 3 x request', output)
+        self.assertIn("Run benchmark 'progress_updates'...", output)
+        self.assertIn("Run benchmark 'signal_storage'...", output)
+        self.assertIn('  store_signals: 60 x signal in ', output)
+        self.assertIn('  startup_handler: 20 x task in ', output)
+        self.assertIn('  changelist (2 tasks): 3 x request in ', output)
+        self.assertIn('  detail view (20 tasks): 3 x request in ', output)
+
+        # All benchmark data are rolled back:
+        self.assertEqual(TaskModel.objects.count(), 0)
+        self.assertEqual(SignalInfoModel.objects.count(), 0)
+
+        # The dropped indexes are restored, too:
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, TaskModel._meta.db_table)
+        self.assertIn('huey_task_main_update_idx', constraints)
+
+    def test_json_and_compare(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = Path(temp_dir) / 'results.json'
+            stdout = StringIO()
+            call_command('run_benchmarks', 'signal_ingestion', '--count', '5', '--json', json_path, stdout=stdout)
+            self.assertIn(f'Results written to {json_path}', stdout.getvalue())
+
+            data = json.loads(json_path.read_text())
+            self.assertEqual(data['environment']['vendor'], 'sqlite')
+            self.assertEqual(
+                [result['name'] for result in data['results']],
+                ['store_signals', 'store_signals without instrumentation'],
+            )
+            self.assertEqual(data['results'][0]['count'], 15)
+
+            stdout = StringIO()
+            call_command('run_benchmarks', 'signal_ingestion', '--count', '5', '--compare', json_path, stdout=stdout)
+            output = stdout.getvalue()
+            self.assertIn(f'Compared with {json_path}:\n  store_signals: ', output)
+            self.assertIn(' signal/sec (', output)
+
+        self.assertEqual(TaskModel.objects.count(), 0)
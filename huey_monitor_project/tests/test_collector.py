@@ -0,0 +1,178 @@
+import time
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from huey_monitor.collector import (
+    EventWriter,
+    decode_event,
+    encode_event,
+    get_collector_storage,
+    pop_events,
+    push_parent_task,
+    push_signal,
+    push_task_update,
+    queue_size,
+    store_events,
+)
+from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor_project.test_app.tasks import delay_task, main_task, parallel_task
+from huey_monitor_project.tests.utils import cache_worker_identity, make_signal_info
+
+
+class CollectorTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(get_collector_storage().flush_queue)
+
+    def call_collector(self):
+        stdout = StringIO()
+        call_command('huey_monitor_collector', '--once', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_encode_decode(self):
+        signal_info = make_signal_info('error', uuid.uuid4())
+        signal_info['exception_line'] = 'Error'
+        signal_info['exception'] = 'Traceback...'
+        self.assertEqual(decode_event(encode_event(signal_info)), signal_info)
+
+    def test_delay_task(self):
+        with override_settings(HUEY_MONITOR_SIGNAL_COLLECTOR=True):
+            delay_task(name='test-delay', sleep=0.001)
+
+        # The worker didn't touch the database:
+        self.assertEqual(TaskModel.objects.count(), 0)
+        self.assertEqual(queue_size(), 3)
+
+        output = self.call_collector()
+        self.assertIn('3 events stored.', output)
+        self.assertEqual(queue_size(), 0)
+
+        task_model_instance = TaskModel.objects.get()
+        self.assertEqual(task_model_instance.name, 'delay_task')
+        self.assertIs(task_model_instance.finished, True)
+        self.assertEqual(
+            list(SignalInfoModel.objects.order_by('create_dt').values_list('signal_name', flat=True)),
+            ['enqueued', 'executing', 'complete'],
+        )
+
+    def test_main_sub_tasks(self):
+        with override_settings(HUEY_MONITOR_SIGNAL_COLLECTOR=True):
+            main_task()
+        self.assertEqual(TaskModel.objects.count(), 0)
+
+        self.call_collector()
+
+        main_task_instance = TaskModel.objects.get(name='main_task')
+        self.assertEqual(main_task_instance.state.signal_name, 'complete')
+        self.assertEqual(main_task_instance.sub_tasks.count(), 3)
+        self.assertEqual(TaskModel.objects.filter(finished=True).count(), 4)
+
+    def test_parallel_task(self):
+        with override_settings(HUEY_MONITOR_SIGNAL_COLLECTOR=True), mock.patch.object(time, 'sleep'):
+            parallel_task(total=6, task_num=2)
+        self.assertEqual(TaskModel.objects.count(), 0)
+
+        self.call_collector()
+
+        main_task_instance = TaskModel.objects.get(name='parallel_task')
+        self.assertEqual(main_task_instance.total, 6)
+        self.assertEqual(main_task_instance.progress_count, 6)
+        self.assertEqual((main_task_instance.sub_tasks_total, main_task_instance.sub_tasks_complete), (2, 2))
+        self.assertEqual(main_task_instance.sub_tasks_progress, 6)
+        self.assertEqual(
+            sorted(main_task_instance.sub_tasks.values_list('total', 'progress_count')),
+            [(3, 3), (3, 3)],
+        )
+
+    def test_coalesce_updates(self):
+        task_id = uuid.uuid4()
+        push_signal(make_signal_info('executing', task_id, offset=0))
+        for progress_count in range(1, 101):
+            push_task_update(task_id, progress_count=progress_count)
+        push_signal(make_signal_info('complete', task_id, offset=1))
+
+        events = pop_events(max_count=1000)
+        self.assertEqual(len(events), 102)
+
+        cache_worker_identity(self)
+        # SAVEPOINT + 4 x store signal + 1 x update (not a sub task: no progress shard)
+        # + 4 x store signal + 2 x statistics + RELEASE SAVEPOINT
+        with self.assertNumQueries(13):
+            store_events(events)
+
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.progress_count, 100)
+        self.assertEqual(
+            list(SignalInfoModel.objects.order_by('create_dt').values_list('signal_name', 'progress_count')),
+            [('executing', None), ('complete', 100)],
+        )
+
+    def test_skip_failing_event(self):
+        task_id, unknown_task_id = uuid.uuid4(), uuid.uuid4()
+        push_signal(make_signal_info('executing', task_id, offset=0))
+        # The sub task doesn't exist:
+        push_parent_task(main_task_id=task_id, sub_task_id=unknown_task_id)
+        push_signal(make_signal_info('complete', task_id, offset=1))
+
+        with self.assertLogs('huey_monitor.management.commands.huey_monitor_collector', level='ERROR') as logs:
+            output = self.call_collector()
+        self.assertIn('3 events stored.', output)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('Failed to store 3 events: Store them one by one', logs.output[0])
+        self.assertIn(f"Skip monitor event {{'event': 'parent', 'task_id': {unknown_task_id!r}", logs.output[1])
+
+        # The other events are stored:
+        self.assertEqual(TaskModel.objects.get().state.signal_name, 'complete')
+        self.assertEqual(SignalInfoModel.objects.count(), 2)
+
+    def test_retry_statement_error(self):
+        task_ids = [uuid.uuid4(), uuid.uuid4()]
+        for task_id in task_ids:
+            push_signal(make_signal_info('complete', task_id))
+
+        def store_events_mock(events):
+            if len(events) > 1:
+                raise OperationalError('lock timeout')
+            store_events(events)
+
+        command = 'huey_monitor.management.commands.huey_monitor_collector'
+        with mock.patch(f'{command}.store_events', store_events_mock), mock.patch.object(time, 'sleep'):
+            with self.assertLogs(command, level='ERROR') as logs:
+                output = self.call_collector()
+        self.assertIn('2 events stored.', output)
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            [
+                'Failed to store 2 events (retry 1/3 in 1.0 sec.): lock timeout',
+                'Failed to store 2 events (retry 2/3 in 1.0 sec.): lock timeout',
+                'Failed to store 2 events (retry 3/3 in 1.0 sec.): lock timeout',
+                'Failed to store 2 events: Store them one by one',
+            ],
+        )
+        self.assertEqual(set(TaskModel.objects.values_list('pk', flat=True)), set(task_ids))
+
+    def test_retry_connection_lost(self):
+        task_id = uuid.uuid4()
+        push_signal(make_signal_info('complete', task_id))
+
+        command = 'huey_monitor.management.commands.huey_monitor_collector'
+        errors = [OperationalError('server closed the connection')] * 5
+        with mock.patch(f'{command}.connection_lost', return_value=True), mock.patch.object(time, 'sleep'):
+            with mock.patch(f'{command}.store_events', side_effect=[*errors, None]) as store_events_mock:
+                with self.assertLogs(command, level='ERROR') as logs:
+                    output = self.call_collector()
+        self.assertIn('1 events stored.', output)
+        # Retried until stored:
+        self.assertEqual(store_events_mock.call_count, 6)
+        self.assertEqual(len(logs.records), 5)
+        self.assertIn('retry in 1.0 sec.', logs.output[0])
+
+    def test_unknown_event(self):
+        with self.assertLogs('huey_monitor.collector', level='ERROR') as logs:
+            EventWriter().write([{'event': 'foo'}])
+        self.assertEqual(logs.output, ["ERROR:huey_monitor.collector:Skip unknown monitor event type 'foo'"])
@@ -0,0 +1,94 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase
+
+from huey_monitor.models import SignalInfoModel, TaskModel, TaskStatisticsModel
+from huey_monitor_project.test_app.data_generator import TaskDataGenerator
+
+
+END_DT = datetime.datetime(2024, 1, 2, 12, 4, 5, tzinfo=datetime.timezone.utc)
+
+
+def get_task_values():
+    return list(
+        TaskModel.objects.order_by('-create_dt', 'task_id').values_list(
+            'task_id', 'parent_task_id', 'name', 'state__signal_name', 'progress_count', 'create_dt', 'duration'
+        )
+    )
+
+
+class DataGeneratorTestCase(TestCase):
+    def test_deterministic(self):
+        generator = TaskDataGenerator(end_dt=END_DT, seed=1)
+        self.assertEqual(generator.create(300, batch_size=70)[0], 300)
+        values = get_task_values()
+        self.assertEqual(len(values), 300)
+        self.assertEqual(TaskModel.objects.filter(update_dt__gt=END_DT).count(), 0)
+
+        # Same seed: Same data, regardless of the number of calls and the batch size:
+        TaskModel.objects.all().delete()
+        generator = TaskDataGenerator(end_dt=END_DT, seed=1)
+        generator.create(100)
+        generator.create(200, batch_size=33)
+        self.assertEqual(get_task_values(), values)
+
+        TaskModel.objects.all().delete()
+        TaskDataGenerator(end_dt=END_DT, seed=2).create(300)
+        self.assertNotEqual(get_task_values(), values)
+
+    def test_realistic_data(self):
+        generator = TaskDataGenerator(end_dt=END_DT, seed=3)
+        task_count, signal_count = generator.create(2000)
+        self.assertEqual(TaskModel.objects.count(), task_count)
+        self.assertEqual(SignalInfoModel.objects.count(), signal_count)
+        self.assertGreater(signal_count, task_count * 3)
+
+        # Main tasks with sub tasks:
+        self.assertTrue(TaskModel.objects.filter(name='import_products_chunk', parent_task__isnull=False).exists())
+        self.assertFalse(TaskModel.objects.filter(name='import_products_chunk', parent_task__isnull=True).exists())
+
+        # The state is the last signal of the task:
+        last_signals = TaskModel.objects.annotate(last_dt=Max('signals__create_dt'))
+        for task in last_signals.select_related('state')[:200]:
+            self.assertEqual(task.state.create_dt, task.last_dt)
+            self.assertEqual(task.update_dt, task.last_dt)
+
+        # Retries and errors, grouped by the exception fingerprint:
+        self.assertTrue(SignalInfoModel.objects.filter(signal_name='retrying').exists())
+        errors = SignalInfoModel.objects.filter(signal_name='error')
+        self.assertGreater(errors.count(), 10)
+        self.assertFalse(errors.filter(exception_group__isnull=True).exists())
+        error = errors.select_related('exception_group').first()
+        self.assertIn('Traceback (most recent call last):\n', error.traceback)
+        self.assertLess(errors.values('exception_group').distinct().count(), 10)
+
+        # Ended tasks with duration and resource usage:
+        complete = TaskModel.objects.filter(state__signal_name='complete')
+        self.assertFalse(complete.filter(duration__isnull=True).exists())
+        self.assertFalse(complete.filter(max_rss__isnull=True).exists())
+        self.assertFalse(complete.filter(name='sync_inventory', progress_count__isnull=True).exists())
+
+        # The newest tasks are still waiting or running:
+        self.assertTrue(TaskModel.objects.filter(state__signal_name='executing').exists())
+
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        response = self.client.get('/admin/huey_monitor/taskmodel/')
+        self.assertContains(response, 'send_email')
+        task = TaskModel.objects.filter(parent_task__isnull=True, name='import_products').first()
+        response = self.client.get(f'/admin/huey_monitor/taskmodel/{task.pk}/change/')
+        self.assertContains(response, 'import_products_chunk')
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command(
+            'generate_task_data', '--count', '50', '--end', '2024-01-02T03:04:05', '--statistics', stdout=stdout
+        )
+        output = stdout.getvalue()
+        self.assertIn('Created 50 tasks with ', output)
+        self.assertIn(' and 2024-01-02 03:04 in ', output)
+        self.assertEqual(TaskModel.objects.count(), 50)
+        self.assertTrue(TaskStatisticsModel.objects.exists())
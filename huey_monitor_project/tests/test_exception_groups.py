@@ -0,0 +1,103 @@
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from huey_monitor.exception_groups import get_fingerprint
+from huey_monitor.models import ExceptionGroupModel, SignalInfoModel
+from huey_monitor.signal_store import store_signal_batch, store_signal_batch_orm, store_signal_orm
+from huey_monitor_project.test_app.tasks import raise_error_task
+from huey_monitor_project.tests.utils import cache_worker_identity, make_signal_info
+
+
+TRACEBACK = '''Traceback (most recent call last):
+  File "/venv/lib/python3.12/site-packages/huey/api.py", line {line}, in _execute
+    task_value = task.execute()
+  File "/app/my_project/tasks.py", line 12, in my_task
+    raise ValueError(f"Bad {{value}}")
+ValueError: Bad {value}
+'''
+
+
+def make_error_signal_info(line=1, value=1, offset=0):
+    signal_info = make_signal_info('error', uuid.uuid4(), task_name='error_task', offset=offset)
+    signal_info['exception_line'] = f'Bad {value}'
+    signal_info['exception'] = TRACEBACK.format(line=line, value=value)
+    return signal_info
+
+
+class ExceptionGroupTestCase(TestCase):
+    def test_fingerprint(self):
+        fingerprint, exception_type = get_fingerprint(TRACEBACK.format(line=1, value=1))
+        self.assertEqual(exception_type, 'ValueError')
+        self.assertEqual(get_fingerprint(TRACEBACK.format(line=2, value='other'))[0], fingerprint)
+
+        other_frame = TRACEBACK.format(line=1, value=1).replace('my_task', 'other_task')
+        self.assertNotEqual(get_fingerprint(other_frame)[0], fingerprint)
+        other_type = TRACEBACK.format(line=1, value=1).replace('ValueError: ', 'TypeError: ')
+        self.assertNotEqual(get_fingerprint(other_type)[0], fingerprint)
+
+    def test_raise_error_task(self):
+        raise_error_task(error_class_name='AssertionError', msg='First')
+        raise_error_task(error_class_name='AssertionError', msg='Second')
+        raise_error_task(error_class_name='KeyError', msg='Other')
+
+        self.assertEqual(ExceptionGroupModel.objects.count(), 2)
+        group = ExceptionGroupModel.objects.get(exception_type='AssertionError')
+        self.assertEqual(group.occurrence_count, 2)
+        self.assertEqual(group.exception_line, 'Second')
+        self.assertEqual(group.task_name, 'raise_error_task')
+        self.assertIn('AssertionError: First', group.traceback)
+
+        signals = SignalInfoModel.objects.filter(exception_group=group).order_by('create_dt')
+        self.assertEqual([signal.exception_line for signal in signals], ['First', 'Second'])
+        self.assertEqual(group.first_seen_dt, signals[0].create_dt)
+        self.assertEqual(group.last_seen_dt, signals[1].create_dt)
+        for signal in signals:
+            # The traceback is only stored once:
+            self.assertIsNone(signal.exception)
+            self.assertEqual(signal.traceback, group.traceback)
+
+    def test_store_paths(self):
+        for upsert in (True, False):
+            with self.subTest(upsert=upsert), mock.patch(
+                'huey_monitor.signal_store.upsert_supported', return_value=upsert
+            ):
+                ExceptionGroupModel.objects.all().delete()
+                store_signal_orm(make_error_signal_info(line=1, value=1))
+                store_signal_batch_orm(
+                    [make_error_signal_info(line=2, value=2), make_error_signal_info(line=3, value=3)]
+                )
+                store_signal_batch([make_error_signal_info(line=4, value=4, offset=-60)])
+
+                group = ExceptionGroupModel.objects.get()
+                self.assertEqual(group.occurrence_count, 4)
+                self.assertEqual(group.exception_type, 'ValueError')
+                self.assertEqual(group.exception_line, 'Bad 3')  # The last occurrence
+                self.assertEqual(group.signals.count(), 4)
+                self.assertEqual(
+                    group.first_seen_dt,
+                    group.signals.order_by('create_dt').values_list('create_dt', flat=True)[0],
+                )
+
+    def test_batch_query_count(self):
+        cache_worker_identity(self)
+        signal_infos = [make_error_signal_info(line=index, value=index) for index in range(10)]
+        # SAVEPOINT + upsert the exception groups + upsert tasks + create signals
+        # + upsert the statistics (no histogram buckets without durations) + RELEASE:
+        with self.assertNumQueries(6):
+            store_signal_batch(signal_infos)
+        self.assertEqual(ExceptionGroupModel.objects.get().occurrence_count, 10)
+
+    def test_admin(self):
+        raise_error_task(error_class_name='AssertionError', msg='This is a test exception')
+        group = ExceptionGroupModel.objects.get()
+
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        response = self.client.get('/admin/huey_monitor/exceptiongroupmodel/')
+        self.assertContains(response, 'This is a test exception')
+        self.assertContains(response, f'/admin/huey_monitor/signalinfomodel/?exception_group={group.pk}')
+
+        response = self.client.get(f'/admin/huey_monitor/signalinfomodel/?exception_group={group.pk}')
+        self.assertContains(response, 'error - This is a test exception')
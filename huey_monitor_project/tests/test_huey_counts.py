@@ -0,0 +1,101 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from huey import MemoryHuey
+
+from huey_monitor import huey_counts
+from huey_monitor.huey_counts import get_huey_counts
+from huey_monitor.templatetags.huey_monitor import huey_counts_info
+
+
+class SlowHuey(MemoryHuey):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self.release = threading.Event()
+
+    def pending_count(self):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        return super().pending_count()
+
+
+class HueyCountsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def tearDown(self):
+        if huey_counts._refresh_thread is not None:
+            huey_counts._refresh_thread.join(timeout=5)
+        super().tearDown()
+
+    @override_settings(HUEY_MONITOR_HUEY_COUNTS_TTL=60)
+    def test_cached(self):
+        huey = SlowHuey()
+        huey.release.set()
+        with patch('huey_monitor.huey_counts.HUEY', huey):
+            counts = get_huey_counts()
+            self.assertEqual(counts['pending'], 0)
+            self.assertIs(counts['stale'], False)
+            self.assertIsNone(counts['error'])
+
+            # Served from the cache:
+            get_huey_counts()
+            huey_counts_info()
+        self.assertEqual(huey.calls, 1)
+
+    @override_settings(HUEY_MONITOR_HUEY_COUNTS_TTL=60, HUEY_MONITOR_HUEY_COUNTS_TIMEOUT=0.1)
+    def test_stale_while_revalidate(self):
+        huey = SlowHuey()
+        huey.release.set()
+        with patch('huey_monitor.huey_counts.HUEY', huey):
+            get_huey_counts()
+            self.assertEqual(huey.calls, 1)
+
+            # Let the counts become stale:
+            counts = cache.get(huey_counts.CACHE_KEY)
+            counts['timestamp'] -= 61
+            cache.set(huey_counts.CACHE_KEY, counts)
+
+            # The Huey storage hangs: The stale counts are returned without waiting
+            huey.release.clear()
+            counts = get_huey_counts()
+            self.assertIs(counts['stale'], True)
+            self.assertEqual(counts['pending'], 0)
+            html = huey_counts_info()
+            self.assertIn('Pending: 0', html)
+            self.assertIn('ago)', html)
+            self.assertEqual(huey.calls, 2)  # Only one refresh runs at a time
+
+            huey.release.set()
+            huey_counts._refresh_thread.join()
+        self.assertEqual(huey.calls, 2)
+
+    @override_settings(HUEY_MONITOR_HUEY_COUNTS_TIMEOUT=0.1)
+    def test_timeout(self):
+        huey = SlowHuey()
+        with patch('huey_monitor.huey_counts.HUEY', huey), self.assertLogs('huey_monitor') as logs:
+            html = huey_counts_info()
+            huey.release.set()
+        self.assertHTMLEqual(html, '<p>Huey counts: (Timeout)</p>')
+        self.assertEqual(logs.output, ['WARNING:huey_monitor.huey_counts:Timeout while getting counts from HUEY'])
+
+    def test_json_view(self):
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        with patch('huey_monitor.huey_counts.HUEY', MemoryHuey()):
+            response = self.client.get('/admin/huey_monitor/taskmodel/huey_counts/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            {key: value for key, value in data.items() if key != 'update_dt'},
+            {'pending': 0, 'scheduled': 0, 'result': 0, 'error': None, 'stale': False},
+        )
+        self.assertIsNotNone(data['update_dt'])
+
+        self.client.logout()
+        response = self.client.get('/admin/huey_monitor/taskmodel/huey_counts/')
+        self.assertEqual(response.status_code, 302)
@@ -1,7 +1,14 @@
+import importlib
+import uuid
+from unittest import mock
+
+from django.apps import apps
 from django.test import TestCase
 from model_bakery import baker
 
 from huey_monitor.models import TaskModel
+from huey_monitor.signal_store import store_signal
+from huey_monitor_project.tests.utils import make_signal_info
 
 
 class HueyMonitorModelsTestCase(TestCase):
@@ -10,3 +17,29 @@ class HueyMonitorModelsTestCase(TestCase):
         self.assertIs(instance.human_percentage(), None)
         instance.total = 100
         self.assertEqual(instance.human_percentage(), '10%')
+
+    def test_backfill_execution_times(self):
+        migration = importlib.import_module('huey_monitor.migrations.0016_taskmodel_execution_times')
+
+        task_id = uuid.uuid4()
+        for offset, signal in enumerate(('enqueued', 'executing', 'error', 'retrying', 'executing', 'complete')):
+            store_signal(make_signal_info(signal, task_id, offset=offset))
+        running_task_id = uuid.uuid4()
+        for offset, signal in enumerate(('enqueued', 'executing', 'error', 'retrying', 'executing')):
+            store_signal(make_signal_info(signal, running_task_id, offset=offset))
+        TaskModel.objects.update(executing_dt=None, ended_dt=None, duration=None)
+
+        with mock.patch.object(migration, 'CHUNK_SIZE', 1):
+            migration.backfill_execution_times(apps, schema_editor=None)
+
+        instance = TaskModel.objects.get(pk=task_id)
+        signal_dts = list(instance.signals.order_by('create_dt').values_list('create_dt', flat=True))
+        self.assertEqual(instance.executing_dt, signal_dts[4])
+        self.assertEqual(instance.ended_dt, signal_dts[5])
+        self.assertEqual(instance.duration, signal_dts[5] - signal_dts[4])
+
+        instance = TaskModel.objects.get(pk=running_task_id)
+        signal_dts = list(instance.signals.order_by('create_dt').values_list('create_dt', flat=True))
+        self.assertEqual(instance.executing_dt, signal_dts[4])
+        self.assertIsNone(instance.ended_dt)
+        self.assertIsNone(instance.duration)
@@ -0,0 +1,123 @@
+import json
+import os
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from huey_monitor.collector import get_collector_storage
+from huey_monitor.instrumentation import instrumentation, measure
+from huey_monitor.models import WorkerModel
+from huey_monitor.signal_store import get_hostname
+from huey_monitor.tasks import shutdown_handler
+from huey_monitor.workers import WorkerHeartbeat, start_heartbeat, stop_heartbeat
+from huey_monitor_project.test_app.tasks import delay_task, linear_processing_task, main_task
+from huey_monitor_project.tests.utils import cache_worker_identity
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache_worker_identity(self)
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+
+    def test_tasks(self):
+        delay_task(name='test', sleep=0.001)
+        operations = instrumentation.snapshot()
+        self.assertEqual(set(operations), {'signal'})
+        signal = operations['signal']
+        self.assertEqual(signal['count'], 3)  # enqueued, executing, complete
+        self.assertGreater(signal['queries'], 3)
+        self.assertGreater(signal['total'], 0)
+        self.assertLessEqual(signal['max'], signal['total'])
+
+        linear_processing_task(total=2)
+        main_task()
+        operations = instrumentation.snapshot()
+        self.assertEqual(set(operations), {'signal', 'progress', 'parent_task'})
+        self.assertGreaterEqual(operations['progress']['count'], 1)
+        self.assertEqual(operations['parent_task']['count'], 4)  # Three sub tasks, one with a retry
+        # Three links (SELECT FOR UPDATE, UPDATE, sub task counters and SAVEPOINT/RELEASE)
+        # and the retry links again (SAVEPOINT, SELECT FOR UPDATE, RELEASE):
+        self.assertEqual(operations['parent_task']['queries'], 3 * 5 + 3)
+        self.assertEqual(instrumentation.tasks, {})
+
+        stdout = StringIO()
+        call_command('huey_monitor_overhead', stdout=stdout)
+        self.assertIn('No overhead stored.', stdout.getvalue())
+
+        with self.assertLogs('huey_monitor.instrumentation', 'INFO') as logs:
+            shutdown_handler()
+        self.assertIn('\nparent_task: 4 calls, total ', '\n'.join(logs.output))
+
+    def test_measure(self):
+        with measure('foo'):
+            WorkerModel.objects.count()
+            with measure('bar'):
+                WorkerModel.objects.count()
+        operations = instrumentation.snapshot()
+        self.assertEqual(operations['foo']['queries'], 2)
+        self.assertEqual(operations['bar']['queries'], 1)
+        self.assertGreaterEqual(operations['foo']['total'], operations['bar']['total'])
+
+        with override_settings(HUEY_MONITOR_INSTRUMENTATION=False):
+            with measure('foo'):
+                pass
+        self.assertEqual(instrumentation.snapshot()['foo']['count'], 1)
+
+    @override_settings(HUEY_MONITOR_OVERHEAD_WARNING_FRACTION=1e-9, HUEY_MONITOR_OVERHEAD_WARNING_MIN_RUNTIME=0)
+    def test_warning(self):
+        with self.assertLogs('huey_monitor.instrumentation', 'WARNING') as logs:
+            delay_task(name='test', sleep=0.001)
+        self.assertIn('Monitor overhead of task delay_task ', logs.output[0])
+
+    def test_heartbeat_and_command(self):
+        delay_task(name='test', sleep=0.001)
+
+        heartbeat = WorkerHeartbeat(interval=60, log_interval=1e-9)
+        now = timezone.now()
+        WorkerModel.objects.create(hostname=heartbeat.hostname, pid=heartbeat.pid, started_dt=now, heartbeat_dt=now)
+        with self.assertLogs('huey_monitor.instrumentation', 'INFO'), self.assertNumQueries(1):
+            heartbeat.beat()
+        worker = WorkerModel.objects.get()
+        self.assertEqual(worker.overhead['signal']['count'], 3)
+
+        stdout = StringIO()
+        call_command('huey_monitor_overhead', stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn(f'{get_hostname()} (PID: {os.getpid()}):\n    signal: 3 calls, total ', output)
+        self.assertIn('Total of 1 workers:\n    signal: 3 calls, ', output)
+
+        stdout = StringIO()
+        call_command('huey_monitor_overhead', '--json', stdout=stdout)
+        data = json.loads(stdout.getvalue())
+        self.assertEqual(data['total']['signal']['count'], 3)
+        self.assertEqual(data['workers'][0]['pid'], os.getpid())
+
+        # Only for staff users:
+        response = self.client.get('/huey_monitor/metrics/')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('/admin/login/'))
+
+        self.client.force_login(User.objects.create_user(username='staff', is_staff=True))
+        response = self.client.get('/huey_monitor/metrics/')
+        self.assertEqual(response.status_code, 200)
+        labels = f'hostname="{get_hostname()}",pid="{os.getpid()}",operation="signal"'
+        self.assertIn(f'huey_monitor_overhead_calls_total{{{labels}}} 3\n', response.content.decode())
+
+    @override_settings(HUEY_MONITOR_SIGNAL_COLLECTOR=True)
+    def test_collector(self):
+        self.addCleanup(stop_heartbeat)
+        self.addCleanup(get_collector_storage().flush_queue)
+
+        # No heartbeat: The workers don't touch the database
+        with self.assertNumQueries(0):
+            self.assertIs(start_heartbeat(), False)
+            delay_task(name='test', sleep=0.001)
+            with self.assertLogs('huey_monitor.instrumentation', 'INFO') as logs:
+                shutdown_handler()
+        self.assertIn('signal: 3 calls', '\n'.join(logs.output))
+        self.assertFalse(WorkerModel.objects.exists())
@@ -0,0 +1,201 @@
+import datetime
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from model_bakery import baker
+
+from huey_monitor.live import encode_cursor, get_changes, latest_key
+from huey_monitor.models import SubTaskProgressModel, TaskModel
+
+
+BASE_DT = datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+CHANGES_URL = '/admin/huey_monitor/taskmodel/live/changes/'
+
+
+def make_task(offset, **kwargs):
+    task = TaskModel.objects.create(task_id=uuid.UUID(int=offset + 1), name=f'task{offset}', **kwargs)
+    update_dt = BASE_DT + datetime.timedelta(seconds=offset)
+    TaskModel.objects.filter(pk=task.pk).update(update_dt=update_dt)
+    task.update_dt = update_dt
+    return task
+
+
+class LiveTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [make_task(offset) for offset in range(3)]
+        # Sub tasks are not listed:
+        make_task(10, parent_task=self.tasks[0])
+
+    @override_settings(HUEY_MONITOR_LIVE_SAFETY_WINDOW=0)
+    def test_get_changes(self):
+        data = get_changes()
+        self.assertEqual([task['name'] for task in data['tasks']], ['task0', 'task1', 'task2'])
+        self.assertEqual(data['cursor'], encode_cursor(latest_key()))
+        self.assertIs(data['more'], False)
+        self.assertEqual(data['tasks'][0]['url'], f'/admin/huey_monitor/taskmodel/{self.tasks[0].pk}/change/')
+
+        # Keyset paging:
+        data = get_changes(cursor=((BASE_DT - datetime.timedelta(seconds=1), self.tasks[0].pk), None), limit=2)
+        self.assertEqual([task['name'] for task in data['tasks']], ['task0', 'task1'])
+        self.assertIs(data['more'], True)
+        self.assertEqual(data['cursor'], encode_cursor(((self.tasks[1].update_dt, self.tasks[1].pk), None)))
+
+        # Tasks with the same update_dt are paged via the task_id:
+        TaskModel.objects.filter(pk=self.tasks[2].pk).update(update_dt=self.tasks[1].update_dt)
+        data = get_changes(cursor=((self.tasks[1].update_dt, self.tasks[1].pk), None), limit=2)
+        self.assertEqual([task['name'] for task in data['tasks']], ['task2'])
+        self.assertIs(data['more'], False)
+
+        cursor = ((self.tasks[1].update_dt, self.tasks[2].pk), None)
+        data = get_changes(cursor=cursor)
+        self.assertEqual(data['tasks'], [])
+        self.assertEqual(data['cursor'], encode_cursor(cursor))
+
+    def test_safety_window(self):
+        cursor = ((self.tasks[2].update_dt, self.tasks[2].pk), None)
+
+        # task1 and task2 are in the safety window before the cursor:
+        with override_settings(HUEY_MONITOR_LIVE_SAFETY_WINDOW=1.5):
+            data = get_changes(cursor=cursor)
+        self.assertEqual([task['name'] for task in data['tasks']], ['task1', 'task2'])
+        self.assertEqual(data['cursor'], encode_cursor(cursor))
+
+        # A change committed after newer changes: Its "update_dt" is before the cursor
+        TaskModel.objects.filter(pk=self.tasks[0].pk).update(update_dt=BASE_DT + datetime.timedelta(seconds=1.5))
+        make_task(3)
+        data = get_changes(cursor=cursor)
+        self.assertEqual([task['name'] for task in data['tasks']], ['task1', 'task0', 'task2', 'task3'])
+        # The cursor is not moved back by the safety window:
+        self.assertEqual(
+            data['cursor'], encode_cursor(((BASE_DT + datetime.timedelta(seconds=3), uuid.UUID(int=4)), None))
+        )
+
+        # The safety window doesn't change the paging after the cursor (max. "limit" tasks of both):
+        make_task(4)
+        data = get_changes(cursor=cursor, limit=1)
+        self.assertEqual([task['name'] for task in data['tasks']], ['task2', 'task3'])
+        self.assertIs(data['more'], True)
+        self.assertEqual(
+            data['cursor'], encode_cursor(((BASE_DT + datetime.timedelta(seconds=3), uuid.UUID(int=4)), None))
+        )
+
+    @override_settings(HUEY_MONITOR_LIVE_SAFETY_WINDOW=0)
+    def test_sub_tasks_progress(self):
+        main_task = self.tasks[0]
+        TaskModel.objects.filter(pk=main_task.pk).update(cumulate_progress=True, executing_dt=BASE_DT)
+        sub_task = TaskModel.objects.get(parent_task=main_task)
+        data = get_changes()
+        cursor = data['cursor']
+        self.assertEqual(cursor, encode_cursor(latest_key()))
+
+        # The progress of a sub task doesn't change the main task...
+        TaskModel.objects.update_task(sub_task.pk, parent_task_id=main_task.pk, progress_count=5)
+        self.assertEqual(TaskModel.objects.get(pk=main_task.pk).update_dt, main_task.update_dt)
+        task_key, progress_key = latest_key()
+        self.assertEqual(task_key, (self.tasks[2].update_dt, self.tasks[2].pk))
+        self.assertEqual(progress_key[1], SubTaskProgressModel.objects.get().pk)
+
+        # ...but the live dashboard gets it via the changed shard:
+        data = get_changes(cursor=(task_key, None))
+        self.assertEqual([task['name'] for task in data['tasks']], ['task0'])
+        self.assertTrue(data['tasks'][0]['progress'].startswith('5it'))
+        self.assertEqual(data['tasks'][0]['update_dt'], progress_key[0].isoformat())
+        self.assertEqual(data['cursor'], encode_cursor((task_key, progress_key)))
+
+        # Every progress change is a new change:
+        TaskModel.objects.update_task(sub_task.pk, parent_task_id=main_task.pk, progress_count=7)
+        new_progress_key = latest_key()[1]
+        self.assertGreater(new_progress_key, progress_key)
+        data = get_changes(cursor=(task_key, progress_key))
+        self.assertEqual([task['name'] for task in data['tasks']], ['task0'])
+        self.assertTrue(data['tasks'][0]['progress'].startswith('7it'))
+        self.assertEqual(data['cursor'], encode_cursor((task_key, new_progress_key)))
+
+        # The progress of the sub tasks of all main tasks is selected with the tasks:
+        make_task(11, parent_task=self.tasks[1])
+        with self.assertNumQueries(2):
+            data = get_changes()
+        self.assertEqual([task['name'] for task in data['tasks']], ['task0', 'task1', 'task2'])
+        self.assertTrue(data['tasks'][0]['progress'].startswith('7it'))
+
+    @override_settings(HUEY_MONITOR_LIVE_SAFETY_WINDOW=0)
+    def test_changes_view(self):
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+
+        response = self.client.get(CHANGES_URL)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['tasks']), 3)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # No changes after the cursor:
+        headers = {'If-None-Match': response['ETag']}
+        response = self.client.get(CHANGES_URL, {'cursor': data['cursor']}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'cursor': data['cursor'], 'more': False, 'tasks': []})
+        etag = response['ETag']
+
+        # Still nothing changed: The safety window and the changes after the cursor of the tasks,
+        # the progress shards after the cursor (No shards: No safety window) + session and user
+        with self.assertNumQueries(5):
+            response = self.client.get(CHANGES_URL, {'cursor': data['cursor']}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # A changed task:
+        TaskModel.objects.filter(pk=self.tasks[0].pk).update(update_dt=BASE_DT + datetime.timedelta(minutes=1))
+        response = self.client.get(CHANGES_URL, {'cursor': data['cursor']}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([task['name'] for task in response.json()['tasks']], ['task0'])
+
+        response = self.client.get(CHANGES_URL, {'cursor': 'foo'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, b"Invalid cursor: 'foo'")
+        response = self.client.get(CHANGES_URL, {'wait': 'foo'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(
+        HUEY_MONITOR_LIVE_POLL_INTERVAL=0.01, HUEY_MONITOR_LIVE_MAX_WAIT=0.05, HUEY_MONITOR_LIVE_SAFETY_WINDOW=0
+    )
+    def test_long_polling(self):
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        cursor = encode_cursor(latest_key())
+
+        # Nothing changed: Wait max. HUEY_MONITOR_LIVE_MAX_WAIT seconds
+        with mock.patch('huey_monitor.live.time.sleep') as sleep:
+            response = self.client.get(CHANGES_URL, {'cursor': cursor, 'wait': '10'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'cursor': cursor, 'more': False, 'tasks': []})
+        self.assertGreaterEqual(sleep.call_count, 1)
+        for call in sleep.call_args_list:
+            self.assertLessEqual(call.args[0], 0.01)
+
+        # A task changed while waiting:
+        def change_task(seconds):
+            TaskModel.objects.filter(pk=self.tasks[1].pk).update(update_dt=BASE_DT + datetime.timedelta(minutes=1))
+
+        with mock.patch('huey_monitor.live.time.sleep', side_effect=change_task) as sleep:
+            response = self.client.get(CHANGES_URL, {'cursor': cursor, 'wait': '10'})
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual([task['name'] for task in response.json()['tasks']], ['task1'])
+
+    def test_live_view(self):
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        response = self.client.get('/admin/huey_monitor/taskmodel/live/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, CHANGES_URL)
+        self.assertTemplateUsed(response, 'admin/huey_monitor/taskmodel/live.html')
+
+        response = self.client.get('/admin/huey_monitor/taskmodel/')
+        self.assertContains(response, '/admin/huey_monitor/taskmodel/live/')
+
+    def test_permission(self):
+        staffuser = baker.make(User, username='staff', is_staff=True, is_active=True, is_superuser=False)
+        self.client.force_login(staffuser)
+        for url in ('/admin/huey_monitor/taskmodel/live/', CHANGES_URL):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 403)
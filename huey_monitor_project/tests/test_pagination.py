@@ -0,0 +1,105 @@
+import datetime
+import uuid
+from unittest import mock
+
+from bx_django_utils.test_utils.html_assertion import HtmlAssertionMixin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from model_bakery import baker
+
+from huey_monitor.admin import SignalInfoModelAdmin, TaskModelAdmin
+from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.signal_store import store_signal_batch
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+class KeysetPaginationTestCase(HtmlAssertionMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        superuser = baker.make(User, username='superuser', is_staff=True, is_active=True, is_superuser=True)
+        self.client.force_login(superuser)
+        self.addCleanup(cache.clear)
+
+        task_ids = [uuid.UUID(int=no) for no in range(1, 8)]
+        store_signal_batch(
+            [make_signal_info('complete', task_id, task_name=f'task_{task_id.int}') for task_id in task_ids]
+        )
+
+        # Three tasks with the same "update_dt": The task ID decides the order
+        base_dt = timezone.now()
+        for no, task_id in enumerate(task_ids):
+            TaskModel.objects.filter(pk=task_id).update(update_dt=base_dt + datetime.timedelta(seconds=min(no, 3)))
+
+        # Newest first:
+        self.expected_names = ['task_7', 'task_6', 'task_5', 'task_4', 'task_3', 'task_2', 'task_1']
+
+    def get_changelist(self, url):
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    @mock.patch.object(TaskModelAdmin, 'list_per_page', 3)
+    def test_task_pages(self):
+        url = '/admin/huey_monitor/taskmodel/'
+        pages = []
+        cl = self.get_changelist(url)
+        self.assertIsNone(cl.previous_url)
+        while True:
+            pages.append([task.name for task in cl.result_list])
+            self.assertEqual(cl.result_count, 7)
+            if not cl.next_url:
+                break
+            cl = self.get_changelist(url + cl.next_url)
+        self.assertEqual(pages, [self.expected_names[:3], self.expected_names[3:6], self.expected_names[6:]])
+
+        # ...and back:
+        cl = self.get_changelist(url + cl.previous_url)
+        self.assertEqual([task.name for task in cl.result_list], self.expected_names[3:6])
+        cl = self.get_changelist(url + cl.previous_url)
+        self.assertEqual([task.name for task in cl.result_list], self.expected_names[:3])
+        self.assertIsNone(cl.previous_url)
+
+        # The filter links start on the first page:
+        self.assertNotIn('before', cl.get_query_string({'name': 'task_1'}))
+
+        # Sorted by another column: The normal pagination is used:
+        cl = self.get_changelist(url + '?o=2')
+        self.assertIs(cl.keyset_active, False)
+        self.assertEqual(cl.paginator.num_pages, 3)
+
+        # Invalid cursors:
+        response = self.client.get(url + '?after=foo', HTTP_ACCEPT_LANGUAGE='en')
+        self.assertRedirects(response, url + '?e=1', fetch_redirect_response=False)
+
+    @mock.patch.object(SignalInfoModelAdmin, 'list_per_page', 4)
+    def test_signal_pages(self):
+        url = '/admin/huey_monitor/signalinfomodel/'
+        cl = self.get_changelist(url)
+        first_page = list(cl.result_list)
+        self.assertEqual(len(first_page), 4)
+        cl = self.get_changelist(url + cl.next_url)
+        second_page = list(cl.result_list)
+        self.assertEqual(len(second_page), 3)
+        self.assertIsNone(cl.next_url)
+        self.assertEqual(
+            [signal.pk for signal in first_page + second_page],
+            list(SignalInfoModel.objects.order_by('-create_dt', '-id').values_list('pk', flat=True)),
+        )
+
+    @mock.patch('huey_monitor.pagination.ESTIMATED_COUNT_THRESHOLD', 5)
+    def test_estimated_count(self):
+        url = '/admin/huey_monitor/taskmodel/'
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assert_html_parts(response, parts=('~7 Tasks', '(count exactly)'))
+        self.assertIs(response.context['cl'].paginator.estimated, True)
+
+        # The count is cached:
+        TaskModel.objects.filter(name='task_1').delete()
+        self.assertEqual(self.get_changelist(url).result_count, 7)
+
+        # ...until the exact count is requested:
+        cl = self.get_changelist(url + '?exact_count=1')
+        self.assertEqual(cl.result_count, 6)
+        self.assertIs(cl.paginator.estimated, False)
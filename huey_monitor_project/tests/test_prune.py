@@ -0,0 +1,89 @@
+import datetime
+import uuid
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from huey_monitor.models import SignalInfoModel, SubTaskProgressModel, TaskModel
+from huey_monitor.prune import RetentionRules, prune
+from huey_monitor.signal_store import store_signal_batch
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+class PruneTestCase(TestCase):
+    def create_task(self, task_name, signal_names, days_ago, parent_task_id=None):
+        task_id = uuid.uuid4()
+        signal_infos = [
+            make_signal_info(signal_name, task_id, task_name=task_name, offset=offset)
+            for offset, signal_name in enumerate(signal_names)
+        ]
+        for signal_info in signal_infos:
+            signal_info['create_dt'] -= datetime.timedelta(days=days_ago)
+        store_signal_batch(signal_infos)
+        if parent_task_id:
+            TaskModel.objects.store_parent_task(main_task_id=parent_task_id, sub_task_id=task_id)
+        return task_id
+
+    def test_prune(self):
+        old_main_id = self.create_task('main', ('executing', 'complete'), days_ago=40)
+        for _ in range(5):
+            sub_task_id = self.create_task('sub', ('executing', 'complete'), days_ago=40, parent_task_id=old_main_id)
+            TaskModel.objects.update_task(sub_task_id, parent_task_id=old_main_id, progress_count=3)
+        self.assertTrue(SubTaskProgressModel.objects.filter(main_task_id=old_main_id).exists())
+        new_main_id = self.create_task('main', ('executing', 'complete'), days_ago=1)
+        old_error_id = self.create_task('main', ('executing', 'error'), days_ago=40)
+        running_id = self.create_task('main', ('executing',), days_ago=40)
+        kept_name_id = self.create_task('important', ('executing', 'complete'), days_ago=40)
+        self.assertEqual(TaskModel.objects.count(), 10)
+        self.assertEqual(SignalInfoModel.objects.count(), 19)
+
+        rules = RetentionRules(default_days=30, state_days={'error': 60}, task_name_days={'important': 365})
+        result = prune(rules, chunk_size=2)
+        self.assertEqual(result.task_count, 6)
+        self.assertEqual(result.signal_count, 12)
+        self.assertIn('6 tasks and 12 signals deleted', str(result))
+
+        self.assertEqual(
+            set(TaskModel.objects.values_list('pk', flat=True)),
+            {new_main_id, old_error_id, running_id, kept_name_id},
+        )
+        self.assertEqual(SignalInfoModel.objects.count(), 7)
+        self.assertFalse(SubTaskProgressModel.objects.exists())
+
+        # Other rules:
+        result = prune(RetentionRules(state_days={'error': 10}))
+        self.assertEqual(result.task_count, 1)
+        self.assertFalse(TaskModel.objects.filter(pk=old_error_id).exists())
+
+        # No rules -> nothing to do:
+        self.assertEqual(prune(RetentionRules()).row_count, 0)
+
+    def test_chunk_queries(self):
+        main_task_id = self.create_task('main', ('executing', 'complete'), days_ago=40)
+        for _ in range(3):
+            self.create_task('sub', ('executing', 'complete'), days_ago=40, parent_task_id=main_task_id)
+
+        # SELECT main tasks, SELECT sub tasks, SELECT sub tasks of the sub tasks,
+        # delete sub tasks (SAVEPOINT, DELETE signals, DELETE progress shards, DELETE tasks, RELEASE SAVEPOINT),
+        # SELECT sub tasks, delete main tasks (5 queries), SELECT main tasks:
+        with self.assertNumQueries(15):
+            prune(RetentionRules(default_days=1), now=timezone.now())
+        self.assertEqual(TaskModel.objects.count(), 0)
+
+    def test_command(self):
+        self.create_task('main', ('executing', 'complete'), days_ago=10)
+        self.create_task('foo', ('executing', 'complete'), days_ago=10)
+
+        stdout = StringIO()
+        call_command('huey_monitor_prune', '--days', '100', '--task-name', 'foo=5', stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn("Prune with <RetentionRules default=100 states={} task_names={'foo': 5}>...", output)
+        self.assertIn('1 tasks and 2 signals deleted', output)
+        self.assertEqual(list(TaskModel.objects.values_list('name', flat=True)), ['main'])
+
+        with self.assertRaisesMessage(CommandError, 'No retention rules given'):
+            call_command('huey_monitor_prune')
+        with self.assertRaisesMessage(CommandError, "Invalid rule 'foo' (expected: \"<name>=<days>\")"):
+            call_command('huey_monitor_prune', '--state', 'foo')
@@ -0,0 +1,163 @@
+"""
+    Query budgets of the admin pages: The number of queries of a page must not grow
+    with the number of tasks and signals. On SQLite: The main queries must use indexes.
+"""
+
+import datetime
+import re
+import unittest
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from huey_monitor.admin import SignalInfoModelAdmin, TaskModelAdmin
+from huey_monitor.models import TaskModel
+from huey_monitor_project.test_app.data_generator import TaskDataGenerator
+
+
+END_DT = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+
+# The pages are measured after each step with this number of generated tasks:
+ROW_COUNTS = (50, 500)
+
+# Maximum number of queries per page, incl. the session and user lookup:
+QUERY_BUDGETS = {
+    'task changelist': 10,
+    'task changelist next page': 10,
+    'main task detail': 7,
+    'sub task detail': 9,
+    'signal changelist': 10,
+    'signal changelist next page': 10,
+    'sub task signal detail': 6,
+}
+
+# Not counted: e.g.: Django versions differ in the use of savepoints in the admin views
+TRANSACTION_RE = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT|BEGIN|COMMIT|ROLLBACK)\b')
+
+# Tables that grow with the number of tasks:
+LARGE_TABLES = ('huey_monitor_taskmodel', 'huey_monitor_signalinfomodel')
+
+# e.g.: "SCAN huey_monitor_taskmodel", but not "SCAN huey_monitor_taskmodel USING INDEX ..."
+FULL_SCAN_RE = re.compile(rf'^SCAN ({"|".join(LARGE_TABLES)})$')
+
+
+def count_queries(queries) -> int:
+    """
+    Number of captured queries, without the transaction control statements
+
+    >>> count_queries([{'sql': 'SAVEPOINT "s1"'}, {'sql': 'SELECT 1'}, {'sql': 'RELEASE SAVEPOINT "s1"'}])
+    1
+    """
+    return sum(1 for query in queries if not TRANSACTION_RE.match(query['sql']))
+
+
+def get_query_plan(sql) -> list:
+    """
+    The details of the SQLite "EXPLAIN QUERY PLAN" output of a captured query
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[3] for row in cursor.fetchall()]
+
+
+def get_plan_problems(sql, plan) -> list:
+    """
+    Full scans of the large tables, and paged queries that sort all rows instead of using an index.
+
+    >>> get_plan_problems('SELECT ...', ['SCAN huey_monitor_taskmodel'])
+    ['Full scan: SCAN huey_monitor_taskmodel']
+    >>> get_plan_problems('SELECT ...', ['SCAN huey_monitor_signalinfomodel USING COVERING INDEX foo'])
+    []
+    >>> get_plan_problems('SELECT ... LIMIT 101', ['SEARCH foo USING INDEX bar', 'USE TEMP B-TREE FOR ORDER BY'])
+    ['Sorted without index: USE TEMP B-TREE FOR ORDER BY']
+    """
+    problems = [f'Full scan: {detail}' for detail in plan if FULL_SCAN_RE.match(detail)]
+    if ' LIMIT ' in sql and 'USE TEMP B-TREE FOR ORDER BY' in plan:
+        problems.append('Sorted without index: USE TEMP B-TREE FOR ORDER BY')
+    return problems
+
+
+@mock.patch.object(TaskModelAdmin, 'list_per_page', 10)
+@mock.patch.object(SignalInfoModelAdmin, 'list_per_page', 10)
+class QueryBudgetsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        superuser = User.objects.create_superuser(username='superuser', email='', password='unused')
+        self.client.force_login(superuser)
+        self.addCleanup(cache.clear)
+
+    def get(self, url):
+        # Every request should be measured like the first one:
+        cache.clear()  # e.g.: The cached change list count
+        ContentType.objects.clear_cache()  # Used by the admin "change" view
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def get_urls(self) -> dict:
+        # The newest main task with sub tasks and its newest sub task:
+        main_task = (
+            TaskModel.objects.filter(parent_task__isnull=True, sub_tasks__isnull=False).order_by('-update_dt').first()
+        )
+        self.assertIsNotNone(main_task)
+        sub_task = main_task.sub_tasks.order_by('-create_dt').first()
+        signal = sub_task.signals.order_by('-create_dt').first()
+
+        task_changelist = '/admin/huey_monitor/taskmodel/'
+        signal_changelist = '/admin/huey_monitor/signalinfomodel/'
+        return {
+            'task changelist': task_changelist,
+            'task changelist next page': task_changelist + self.get(task_changelist).context['cl'].next_url,
+            'main task detail': f'/admin/huey_monitor/taskmodel/{main_task.pk}/change/',
+            'sub task detail': f'/admin/huey_monitor/taskmodel/{sub_task.pk}/change/',
+            'signal changelist': signal_changelist,
+            'signal changelist next page': signal_changelist + self.get(signal_changelist).context['cl'].next_url,
+            'sub task signal detail': f'/admin/huey_monitor/signalinfomodel/{signal.pk}/change/',
+        }
+
+    def capture_pages(self):
+        """
+        Generate the tasks step by step and yield the captured queries of all pages after each step.
+        """
+        generator = TaskDataGenerator(end_dt=END_DT, seed=1)
+        populated = 0
+        for row_count in ROW_COUNTS:
+            generator.create(row_count - populated)
+            populated = row_count
+
+            for name, url in self.get_urls().items():
+                with CaptureQueriesContext(connection) as context:
+                    self.get(url)
+                yield row_count, name, context.captured_queries
+
+    def test_query_budgets(self):
+        query_counts = {row_count: {} for row_count in ROW_COUNTS}
+        for row_count, name, queries in self.capture_pages():
+            query_counts[row_count][name] = count_queries(queries)
+
+        # The number of queries doesn't grow with the number of tasks:
+        for row_count in ROW_COUNTS[1:]:
+            self.assertEqual(query_counts[row_count], query_counts[ROW_COUNTS[0]])
+
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(name):
+                self.assertLessEqual(query_counts[ROW_COUNTS[0]][name], budget)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Checks the SQLite query plans')
+    def test_query_plans(self):
+        problems = []
+        for row_count, name, queries in self.capture_pages():
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT '):
+                    continue  # e.g.: SAVEPOINT
+                for problem in get_plan_problems(sql, get_query_plan(sql)):
+                    problems.append(f'{name} ({row_count} tasks): {problem}\n\t{sql}')
+
+        if problems:
+            self.fail('\n'.join(problems))
@@ -0,0 +1,120 @@
+import datetime
+import uuid
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from huey import MemoryHuey
+
+from huey_monitor.models import QueueSampleModel
+from huey_monitor.queue_samples import QueueSummary, sample_queues, take_sample
+from huey_monitor.signal_store import store_signal_batch
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+class FakeRedis:
+    def info(self, section):
+        assert section == 'memory'
+        return {'used_memory': 1024}
+
+    def dbsize(self):
+        return 5
+
+
+class QueueSamplesTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.huey = MemoryHuey(immediate=False)
+        self.now = datetime.datetime(2024, 1, 2, 3, 4, 30, tzinfo=datetime.timezone.utc)
+
+        @self.huey.task()
+        def noop():
+            pass
+
+        self.noop = noop
+
+    def enqueue(self, count):
+        for _ in range(count):
+            self.noop()
+
+    def test_take_sample(self):
+        self.enqueue(3)
+        first = take_sample(huey=self.huey, now=self.now)
+        self.assertEqual((first.pending, first.pending_max, first.scheduled, first.result), (3, 3, 0, 0))
+        self.assertEqual((first.duration, first.enqueued_count, first.executed_count), (0, 0, 0))
+        self.assertIsNone(first.redis_memory)
+
+        # The signals since the previous sample are counted:
+        task_id = uuid.uuid4()
+        store_signal_batch(
+            [
+                make_signal_info('enqueued', task_id),
+                make_signal_info('executing', task_id, offset=1),
+                make_signal_info('enqueued', uuid.uuid4(), offset=2),
+            ]
+        )
+        self.huey.storage.conn = FakeRedis()
+        now = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(seconds=10)
+        second = take_sample(huey=self.huey, now=now)
+        self.assertEqual((second.enqueued_count, second.executed_count), (2, 1))
+        self.assertEqual((second.redis_memory, second.redis_keys), (1024, 5))
+
+    def test_huey_error(self):
+        class HueyError:
+            def __getattribute__(self, item):
+                raise OSError('Redis down!')
+
+        with self.assertLogs('huey_monitor', 'ERROR'):
+            self.assertIsNone(take_sample(huey=HueyError(), now=self.now))
+        self.assertFalse(QueueSampleModel.objects.exists())
+
+    def test_downsampling(self):
+        for minute in range(0, 125):
+            self.enqueue(1)
+            with self.assertLogs('huey_monitor.queue_samples', 'INFO'):
+                sample_queues(huey=self.huey, now=self.now + datetime.timedelta(minutes=minute))
+
+        # Raw samples are kept 2 hours:
+        raw_samples = QueueSampleModel.objects.filter(resolution=QueueSampleModel.RESOLUTION_RAW)
+        self.assertEqual(raw_samples.count(), 121)
+
+        minutes = QueueSampleModel.objects.filter(resolution=QueueSampleModel.RESOLUTION_MINUTE)
+        self.assertEqual(minutes.count(), 124)  # The last minute is not complete
+        first_minute = minutes.order_by('sample_dt').first()
+        self.assertEqual(first_minute.sample_dt, datetime.datetime(2024, 1, 2, 3, 4, tzinfo=datetime.timezone.utc))
+        self.assertEqual((first_minute.sample_count, first_minute.pending), (1, 1))
+
+        hours = QueueSampleModel.objects.filter(resolution=QueueSampleModel.RESOLUTION_HOUR).order_by('sample_dt')
+        self.assertEqual(
+            [(hour.sample_dt.hour, hour.sample_count, hour.pending, hour.pending_max) for hour in hours],
+            [(3, 56, 28.5, 56), (4, 60, 86.5, 116)],
+        )
+
+    def test_summary(self):
+        samples = [
+            QueueSampleModel(pending=100, duration=60, enqueued_count=10, executed_count=30),
+            QueueSampleModel(pending=80, duration=60, enqueued_count=10, executed_count=30),
+        ]
+        summary = QueueSummary(samples)
+        self.assertEqual(summary.enqueued_per_minute, 10)
+        self.assertEqual(summary.executed_per_minute, 30)
+        self.assertEqual(summary.growth_per_minute, -20)
+        self.assertEqual(summary.drain_time, datetime.timedelta(minutes=4))
+
+        self.assertEqual(summary.human_drain_time, '4.0\xa0minutes')
+        self.assertEqual(QueueSummary([]).human_drain_time, '-')
+
+    def test_admin(self):
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        response = self.client.get('/admin/huey_monitor/taskmodel/queues/')
+        self.assertContains(response, 'No queue samples in this period.')
+
+        self.enqueue(2)
+        take_sample(huey=self.huey)
+        self.enqueue(2)
+        take_sample(huey=self.huey)
+        response = self.client.get('/admin/huey_monitor/taskmodel/queues/?hours=1')
+        self.assertContains(response, '<polyline class="pending" points="0.0,60.0 600.0,0.0"/>', html=True)
+        self.assertContains(response, '2 samples (Raw)')
+
+        response = self.client.get('/admin/huey_monitor/taskmodel/')
+        self.assertContains(response, '/admin/huey_monitor/taskmodel/queues/')
@@ -0,0 +1,56 @@
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.rekey import rekey_signals
+from huey_monitor.signal_store import store_signal_batch
+from huey_monitor.uuid7 import is_uuid7, uuid7_datetime
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+class RekeyTestCase(TestCase):
+    def store_signals(self, count):
+        signal_infos = []
+        for _ in range(count):
+            task_id = uuid.uuid4()
+            for offset, signal_name in enumerate(('enqueued', 'executing', 'complete')):
+                signal_infos.append(make_signal_info(signal_name, task_id, offset=offset))
+        store_signal_batch(signal_infos)
+
+    def test_new_signals(self):
+        self.store_signals(count=2)
+        for signal in SignalInfoModel.objects.all():
+            self.assertIs(is_uuid7(signal.pk), True)
+            # The key contains the signal time:
+            create_dt = signal.create_dt.replace(microsecond=signal.create_dt.microsecond // 1000 * 1000)
+            self.assertEqual(uuid7_datetime(signal.pk), create_dt)
+
+    def test_rekey_signals(self):
+        # Signals of a previous version with random keys:
+        with mock.patch('huey_monitor.signal_store.uuid7', lambda dt: uuid.uuid4()):
+            self.store_signals(count=3)
+        # ...and new signals:
+        self.store_signals(count=1)
+
+        old_states = dict(TaskModel.objects.values_list('task_id', 'state__create_dt'))
+        self.assertEqual(sum(not is_uuid7(pk) for pk in SignalInfoModel.objects.values_list('pk', flat=True)), 9)
+
+        with self.assertLogs('huey_monitor.rekey', 'INFO'):
+            self.assertEqual(rekey_signals(chunk_size=4), 9)
+
+        self.assertEqual(SignalInfoModel.objects.count(), 12)
+        self.assertIs(all(is_uuid7(pk) for pk in SignalInfoModel.objects.values_list('pk', flat=True)), True)
+        for instance in TaskModel.objects.select_related('state'):
+            self.assertEqual(instance.state.signal_name, 'complete')
+            self.assertEqual(instance.state.create_dt, old_states[instance.task_id])
+            self.assertEqual(instance.signals.count(), 3)
+
+        # Nothing to do anymore:
+        stdout = StringIO()
+        with self.assertLogs('huey_monitor.rekey', 'INFO'):
+            call_command('huey_monitor_rekey_signals', stdout=stdout)
+        self.assertIn('0 signals changed.', stdout.getvalue())
@@ -0,0 +1,138 @@
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from huey_monitor import resource_usage
+from huey_monitor.models import TaskModel, TaskStatisticsModel
+from huey_monitor.resource_usage import RESOURCE_USAGE_FIELDS, end_execution, start_execution
+from huey_monitor.signal_store import store_signal_batch_orm, store_signal_orm, upsert_signal_batch
+from huey_monitor.statistics import merge_statistics, rebuild_statistics
+from huey_monitor_project.test_app.tasks import delay_task
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+def make_usage(cpu_time, max_rss, io_bytes=None):
+    return {
+        'cpu_user_time': cpu_time * 0.75,
+        'cpu_system_time': cpu_time * 0.25,
+        'max_rss': max_rss,
+        'io_read_bytes': io_bytes,
+        'io_write_bytes': None if io_bytes is None else io_bytes * 2,
+    }
+
+
+def get_usage_values(task_id):
+    return TaskModel.objects.filter(pk=task_id).values(*RESOURCE_USAGE_FIELDS).get()
+
+
+class ResourceUsageTestCase(TestCase):
+    def test_measure(self):
+        start_execution('foo')
+        sum(range(100_000))
+        usage = end_execution('foo')
+        self.assertEqual(set(usage), set(RESOURCE_USAGE_FIELDS))
+        self.assertGreaterEqual(usage['cpu_user_time'], 0)
+        self.assertGreaterEqual(usage['cpu_system_time'], 0)
+        self.assertGreater(usage['max_rss'], 1024 * 1024)
+
+        # Already ended or never started:
+        self.assertIsNone(end_execution('foo'))
+
+        with mock.patch.object(resource_usage, 'PROC_IO_PATH', '/does/not/exist'):
+            start_execution('foo')
+            self.assertEqual(end_execution('foo')['io_read_bytes'], None)
+
+        with override_settings(HUEY_MONITOR_RESOURCE_USAGE=False):
+            start_execution('foo')
+        self.assertIsNone(end_execution('foo'))
+
+    def test_tasks(self):
+        delay_task(name='test', sleep=0.001)
+        instance = TaskModel.objects.get()
+        self.assertIsNotNone(instance.cpu_user_time)
+        self.assertIsNotNone(instance.cpu_system_time)
+        self.assertGreater(instance.max_rss, 0)
+
+        statistics = TaskStatisticsModel.objects.get()
+        self.assertEqual(statistics.usage_count, 1)
+        self.assertEqual(statistics.max_rss_max, instance.max_rss)
+
+        self.client.force_login(User.objects.create_superuser(username='test', email='', password='t'))
+        response = self.client.get(f'/admin/huey_monitor/taskmodel/{instance.pk}/change/')
+        self.assertContains(response, 'Resource usage')
+        self.assertContains(response, '(user: ')
+        response = self.client.get('/admin/huey_monitor/taskmodel/statistics/')
+        self.assertContains(response, 'RSS max')
+
+    def assert_resource_usage(self, store_func):
+        task_ids = [uuid.uuid4() for _ in range(3)]
+        store_func([make_signal_info('executing', task_id, offset=0) for task_id in task_ids])
+
+        complete = make_signal_info('complete', task_ids[0], offset=1)
+        complete['resource_usage'] = make_usage(cpu_time=2, max_rss=100, io_bytes=10)
+        error = make_signal_info('error', task_ids[1], offset=2)
+        error['resource_usage'] = make_usage(cpu_time=4, max_rss=300)
+        retry = make_signal_info('executing', task_ids[1], offset=3)
+        store_func([complete, error, retry, make_signal_info('revoked', task_ids[2], offset=3)])
+
+        self.assertEqual(
+            get_usage_values(task_ids[0]),
+            {
+                'cpu_user_time': 1.5,
+                'cpu_system_time': 0.5,
+                'max_rss': 100,
+                'io_read_bytes': 10,
+                'io_write_bytes': 20,
+            },
+        )
+        # The retry removes the values of the previous execution:
+        self.assertEqual(get_usage_values(task_ids[1]), dict.fromkeys(RESOURCE_USAGE_FIELDS))
+        self.assertEqual(get_usage_values(task_ids[2]), dict.fromkeys(RESOURCE_USAGE_FIELDS))
+
+        complete = make_signal_info('complete', task_ids[1], offset=4)
+        complete['resource_usage'] = make_usage(cpu_time=1, max_rss=200)
+        store_func([complete])
+        self.assertEqual(get_usage_values(task_ids[1])['max_rss'], 200)
+        self.assertEqual(get_usage_values(task_ids[0])['max_rss'], 100)
+
+        [statistics] = merge_statistics(TaskStatisticsModel.objects.all())
+        self.assertEqual(statistics.ended_count, 4)
+        self.assertEqual(statistics.usage_count, 3)
+        self.assertAlmostEqual(statistics.cpu_time_sum, 7)
+        self.assertAlmostEqual(statistics.cpu_time_max, 4)
+        self.assertEqual(statistics.max_rss_sum, 600)
+        self.assertEqual(statistics.max_rss_max, 300)
+        self.assertEqual((statistics.io_count, statistics.io_read_sum, statistics.io_write_sum), (1, 10, 20))
+        self.assertEqual(
+            statistics.human_resource_usage(),
+            {
+                'cpu_avg': '2.3\xa0seconds',
+                'cpu_max': '4.0\xa0seconds',
+                'rss_avg': '200B',
+                'rss_max': '300B',
+                'read_avg': '10.0B',
+                'write_avg': '20.0B',
+            },
+        )
+
+        # Only the last executions of the tasks are stored:
+        rebuild_statistics()
+        [statistics] = merge_statistics(TaskStatisticsModel.objects.all())
+        self.assertEqual(statistics.ended_count, 4)
+        self.assertEqual(statistics.usage_count, 2)
+        self.assertEqual(statistics.max_rss_sum, 300)
+
+    def test_upsert_signal_batch(self):
+        self.assert_resource_usage(upsert_signal_batch)
+
+    def test_store_signal_batch_orm(self):
+        self.assert_resource_usage(store_signal_batch_orm)
+
+    def test_store_signal_orm(self):
+        def store_func(signal_infos):
+            for signal_info in signal_infos:
+                store_signal_orm(signal_info)
+
+        self.assert_resource_usage(store_func)
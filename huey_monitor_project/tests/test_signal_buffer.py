@@ -0,0 +1,117 @@
+import uuid
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from huey_monitor import signal_buffer
+from huey_monitor.collector import EVENT_PARENT, EVENT_SIGNAL
+from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.signal_buffer import SignalBuffer, flush_signal_buffer, stop_signal_buffer
+from huey_monitor_project.test_app.tasks import delay_task, main_task
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+class SignalBufferTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(stop_signal_buffer)
+
+    def test_buffered_signals(self):
+        with override_settings(HUEY_MONITOR_SIGNAL_BUFFER=True, HUEY_MONITOR_SIGNAL_BUFFER_INTERVAL=60):
+            delay_task(name='test-delay', sleep=0.001)
+
+        # Nothing stored, yet:
+        self.assertEqual(TaskModel.objects.count(), 0)
+        self.assertEqual(SignalInfoModel.objects.count(), 0)
+
+        flush_signal_buffer()
+
+        task_model_instance = TaskModel.objects.get()
+        self.assertEqual(task_model_instance.name, 'delay_task')
+        self.assertIs(task_model_instance.finished, True)
+        self.assertEqual(task_model_instance.state.signal_name, 'complete')
+        self.assertEqual(
+            list(SignalInfoModel.objects.order_by('create_dt').values_list('signal_name', flat=True)),
+            ['enqueued', 'executing', 'complete'],
+        )
+
+    def test_buffered_main_sub_tasks(self):
+        with override_settings(HUEY_MONITOR_SIGNAL_BUFFER=True, HUEY_MONITOR_SIGNAL_BUFFER_INTERVAL=60):
+            main_task()
+
+        # The progress information and the task relationships are buffered, too:
+        self.assertEqual(TaskModel.objects.count(), 0)
+
+        # The sub tasks call set_parent_task() before their signals are stored:
+        stop_signal_buffer()
+
+        self.assertEqual(TaskModel.objects.count(), 4)
+        self.assertEqual(TaskModel.objects.filter(finished=True).count(), 4)
+        main_task_instance = TaskModel.objects.get(name='main_task')
+        self.assertEqual(main_task_instance.state.signal_name, 'complete')
+
+    def test_stop_flushes(self):
+        buffer = SignalBuffer(max_size=100, flush_interval=60)
+        buffer.add({'event': EVENT_SIGNAL, **make_signal_info('enqueued', uuid.uuid4())})
+        self.assertEqual(SignalInfoModel.objects.count(), 0)
+
+        buffer.stop()
+        self.assertEqual(SignalInfoModel.objects.count(), 1)
+        self.assertIs(buffer._thread.is_alive(), False)
+
+    def test_skip_failing_event(self):
+        task_id, unknown_task_id = uuid.uuid4(), uuid.uuid4()
+        buffer = SignalBuffer(max_size=100, flush_interval=60)
+        buffer.add({'event': EVENT_SIGNAL, **make_signal_info('executing', task_id, offset=0)})
+        # The sub task doesn't exist:
+        buffer.add({'event': EVENT_PARENT, 'task_id': unknown_task_id, 'parent_task_id': task_id})
+        buffer.add({'event': EVENT_SIGNAL, **make_signal_info('complete', task_id, offset=1)})
+
+        with self.assertLogs('huey_monitor.signal_buffer', level='ERROR') as logs:
+            buffer.stop()
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('Failed to store 3 monitor events: Store them one by one', logs.output[0])
+        self.assertIn(f"Skip monitor event {{'event': 'parent', 'task_id': {unknown_task_id!r}", logs.output[1])
+
+        # The other signals are stored:
+        self.assertEqual(TaskModel.objects.get().state.signal_name, 'complete')
+        self.assertEqual(SignalInfoModel.objects.count(), 2)
+
+    def test_retry(self):
+        buffer = SignalBuffer(max_size=100, flush_interval=60, retries=1)
+        buffer.add({'event': EVENT_SIGNAL, **make_signal_info('enqueued', uuid.uuid4())})
+
+        with mock.patch.object(signal_buffer, 'store_events', side_effect=OperationalError('lock timeout')):
+            with self.assertLogs('huey_monitor.signal_buffer', level='ERROR') as logs:
+                buffer.flush()
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            ['Failed to store 1 monitor events (retry in 60 sec.): lock timeout'],
+        )
+
+        # The events are kept for the next flush, before the new events:
+        buffer.add({'event': EVENT_SIGNAL, **make_signal_info('enqueued', uuid.uuid4())})
+        self.assertEqual(SignalInfoModel.objects.count(), 0)
+        buffer.stop()
+        self.assertEqual(SignalInfoModel.objects.count(), 2)
+
+    def test_retry_connection_lost(self):
+        buffer = SignalBuffer(max_size=100, flush_interval=60, retries=0)
+        buffer.add({'event': EVENT_SIGNAL, **make_signal_info('enqueued', uuid.uuid4())})
+
+        with mock.patch.object(signal_buffer, 'connection_lost', return_value=True):
+            with mock.patch.object(signal_buffer, 'store_events', side_effect=OperationalError('connection closed')):
+                with self.assertLogs('huey_monitor.signal_buffer', level='ERROR'):
+                    for _ in range(3):
+                        buffer.flush()
+
+        buffer.stop()
+        self.assertEqual(SignalInfoModel.objects.count(), 1)
+
+    def test_new_buffer_after_stop(self):
+        with override_settings(HUEY_MONITOR_SIGNAL_BUFFER_INTERVAL=60):
+            first_buffer = signal_buffer.get_signal_buffer()
+            self.assertIs(signal_buffer.get_signal_buffer(), first_buffer)
+            stop_signal_buffer()
+            self.assertIsNot(signal_buffer.get_signal_buffer(), first_buffer)
@@ -0,0 +1,241 @@
+import uuid
+
+from django.db.models import Sum
+from django.test import TestCase
+
+from huey_monitor.models import SignalInfoModel, TaskModel, TaskStatisticsModel, WorkerIdentityModel
+from huey_monitor import signal_store
+from huey_monitor.signal_store import (
+    store_signal,
+    store_signal_batch_orm,
+    store_signal_orm,
+    upsert_signal_batch,
+    upsert_supported,
+)
+from huey_monitor.statistics import rebuild_statistics
+from huey_monitor_project.tests.utils import cache_worker_identity, make_signal_info
+
+
+class StoreSignalTestCase(TestCase):
+    def test_upsert_supported(self):
+        # The tests run with SQLite -> The upsert path is used
+        self.assertIs(upsert_supported(), True)
+
+    def assert_task_lifecycle(self, store_func):
+        task_id = uuid.uuid4()
+        store_func(make_signal_info('enqueued', task_id, task_name='foo', offset=0))
+        store_func(make_signal_info('executing', task_id, task_name='foo', offset=1))
+        TaskModel.objects.filter(pk=task_id).update(progress_count=3)
+        store_func(make_signal_info('complete', task_id, task_name='foo', offset=2))
+
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.name, 'foo')
+        self.assertEqual(instance.state.signal_name, 'complete')
+        self.assertIs(instance.finished, True)
+        self.assertIsNotNone(instance.create_dt)
+        self.assertIsNotNone(instance.update_dt)
+        self.assertEqual(
+            list(SignalInfoModel.objects.order_by('create_dt').values_list('signal_name', 'progress_count')),
+            [('enqueued', None), ('executing', None), ('complete', 3)],
+        )
+
+        executing_dt = SignalInfoModel.objects.get(signal_name='executing').create_dt
+        self.assertEqual(instance.executing_dt, executing_dt)
+        self.assertEqual(instance.ended_dt, instance.state.create_dt)
+        self.assertAlmostEqual(instance.duration.total_seconds(), 1, delta=0.5)
+
+        # "finished" will not be reset, e.g.: by a retry:
+        store_func(make_signal_info('retrying', task_id, task_name='foo', offset=3))
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.state.signal_name, 'retrying')
+        self.assertIs(instance.finished, True)
+        self.assertAlmostEqual(instance.duration.total_seconds(), 1, delta=0.5)
+
+        # A new execution resets the end and duration:
+        store_func(make_signal_info('executing', task_id, task_name='foo', offset=4))
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.executing_dt, instance.state.create_dt)
+        self.assertIsNone(instance.ended_dt)
+        self.assertIsNone(instance.duration)
+
+        store_func(make_signal_info('error', task_id, task_name='foo', offset=6.5))
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.ended_dt, instance.state.create_dt)
+        self.assertAlmostEqual(instance.duration.total_seconds(), 2.5, delta=0.5)
+
+    def test_store_signal(self):
+        self.assert_task_lifecycle(store_signal)
+
+    def test_worker_identity(self):
+        signal_info = make_signal_info('enqueued', uuid.uuid4())
+        signal_info['thread'] = 'Worker-1'
+
+        # Unknown identity: + create and select the identity
+        with self.assertNumQueries(6), self.captureOnCommitCallbacks(execute=True):
+            store_signal(signal_info)
+        self.addCleanup(signal_store._worker_identity_ids.clear)
+
+        # The ID is cached in the process:
+        with self.assertNumQueries(4):
+            store_signal(make_signal_info('executing', signal_info['task_id']) | {'thread': 'Worker-1'})
+
+        identity = WorkerIdentityModel.objects.get()
+        self.assertEqual(identity.thread, 'Worker-1')
+        signals = SignalInfoModel.objects.select_related('worker').order_by('create_dt')
+        self.assertEqual(
+            [(signal.signal_name, signal.hostname, signal.thread) for signal in signals],
+            [('enqueued', identity.hostname, 'Worker-1'), ('executing', identity.hostname, 'Worker-1')],
+        )
+        # The signal names are stored as small integers:
+        self.assertEqual(
+            list(SignalInfoModel.objects.order_by('create_dt').values_list('signal_name', flat=True)),
+            ['enqueued', 'executing'],
+        )
+        self.assertEqual(SignalInfoModel.objects.filter(signal_name__in=('executing', 'complete')).count(), 1)
+        with self.assertRaisesMessage(ValueError, "Unknown signal name: 'foo'"):
+            SignalInfoModel.objects.filter(signal_name='foo').count()
+
+    def test_store_signal_orm(self):
+        self.assert_task_lifecycle(store_signal_orm)
+
+    def test_statements_per_signal(self):
+        cache_worker_identity(self)
+        task_id = uuid.uuid4()
+        store_signal(make_signal_info('enqueued', task_id))
+
+        # SAVEPOINT + upsert of the task + insert of the signal + RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            store_signal(make_signal_info('executing', task_id))
+
+        # The previous implementation needs more queries
+        # (+2 for the statistics of the ended task, see: huey_monitor.statistics):
+        with self.assertNumQueries(8):
+            store_signal_orm(make_signal_info('complete', task_id))
+
+
+class StoreSignalBatchTestCase(TestCase):
+    def assert_store_signal_batch(self, store_func):
+        main_task_id = uuid.uuid4()
+        sub_task_id = uuid.uuid4()
+
+        store_func(
+            [
+                make_signal_info('enqueued', main_task_id, task_name='main', offset=0),
+                make_signal_info('executing', main_task_id, task_name='main', offset=1),
+                make_signal_info('enqueued', sub_task_id, task_name='sub', offset=2),
+            ]
+        )
+        TaskModel.objects.filter(pk=sub_task_id).update(parent_task_id=main_task_id, progress_count=5)
+
+        store_func(
+            [
+                make_signal_info('executing', sub_task_id, task_name='sub', offset=3),
+                make_signal_info('complete', sub_task_id, task_name='sub', offset=4),
+                make_signal_info('complete', main_task_id, task_name='main', offset=5),
+            ]
+        )
+
+        main_instance = TaskModel.objects.get(pk=main_task_id)
+        self.assertEqual(main_instance.name, 'main')
+        self.assertEqual(main_instance.state.signal_name, 'complete')
+        self.assertIs(main_instance.finished, True)
+        self.assertEqual(main_instance.progress_count, 5)  # cumulated from the sub task
+        self.assertAlmostEqual(main_instance.duration.total_seconds(), 4, delta=0.5)  # executing in the first batch
+
+        sub_instance = TaskModel.objects.get(pk=sub_task_id)
+        self.assertAlmostEqual(sub_instance.duration.total_seconds(), 1, delta=0.5)  # both in the second batch
+        self.assertEqual(sub_instance.state.signal_name, 'complete')
+        self.assertEqual(
+            list(sub_instance.signals.order_by('create_dt').values_list('signal_name', 'progress_count')),
+            [('enqueued', None), ('executing', 5), ('complete', 5)],
+        )
+
+    def test_upsert_signal_batch(self):
+        self.assert_store_signal_batch(upsert_signal_batch)
+
+    def test_store_signal_batch_orm(self):
+        self.assert_store_signal_batch(store_signal_batch_orm)
+
+    def get_statistics(self):
+        # The signals may be stored in two hours
+        return TaskStatisticsModel.objects.aggregate(
+            ended_count=Sum('ended_count'),
+            error_count=Sum('error_count'),
+            duration_count=Sum('duration_count'),
+            duration_sum=Sum('duration_sum'),
+        )
+
+    def assert_second_end(self, store_func):
+        task_id = uuid.uuid4()
+        store_func(make_signal_info('executing', task_id, task_name='foo', offset=0))
+        store_func(make_signal_info('error', task_id, task_name='foo', offset=2))
+        store_func(make_signal_info('retrying', task_id, task_name='foo', offset=3))
+        store_func(make_signal_info('revoked', task_id, task_name='foo', offset=10))
+
+        # "revoked" doesn't end the execution a second time:
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.state.signal_name, 'revoked')
+        self.assertEqual(instance.ended_dt, SignalInfoModel.objects.get(signal_name='error').create_dt)
+        self.assertAlmostEqual(instance.duration.total_seconds(), 2, delta=0.5)
+
+        statistics = self.get_statistics()
+        self.assertEqual(statistics['ended_count'], 2)
+        self.assertEqual(statistics['error_count'], 1)
+        self.assertEqual(statistics['duration_count'], 1)
+        self.assertAlmostEqual(statistics['duration_sum'], 2, delta=0.5)
+
+        # The same, if the signals are stored in one batch:
+        TaskModel.objects.all().delete()
+        TaskStatisticsModel.objects.all().delete()
+        task_id = uuid.uuid4()
+        batch_func = upsert_signal_batch if store_func is store_signal else store_signal_batch_orm
+        batch_func([make_signal_info('executing', task_id, task_name='foo', offset=0)])
+        batch_func(
+            [
+                make_signal_info('error', task_id, task_name='foo', offset=2),
+                make_signal_info('retrying', task_id, task_name='foo', offset=3),
+                make_signal_info('revoked', task_id, task_name='foo', offset=10),
+            ]
+        )
+        batch_func([make_signal_info('expired', task_id, task_name='foo', offset=11)])
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.state.signal_name, 'expired')
+        self.assertEqual(instance.ended_dt, SignalInfoModel.objects.get(signal_name='error').create_dt)
+        self.assertAlmostEqual(instance.duration.total_seconds(), 2, delta=0.5)
+        statistics = self.get_statistics()
+        self.assertEqual(statistics['ended_count'], 3)
+        self.assertEqual(statistics['duration_count'], 1)
+        self.assertAlmostEqual(statistics['duration_sum'], 2, delta=0.5)
+
+        # The rebuild counts the duration only once, too:
+        rebuild_statistics()
+        statistics = self.get_statistics()
+        self.assertEqual(statistics['ended_count'], 3)
+        self.assertEqual(statistics['duration_count'], 1)
+        self.assertAlmostEqual(statistics['duration_sum'], 2, delta=0.5)
+
+    def test_second_end(self):
+        self.assert_second_end(store_signal)
+
+    def test_second_end_orm(self):
+        self.assert_second_end(store_signal_orm)
+
+    def test_query_count_is_constant(self):
+        def get_signal_infos():
+            task_ids = [uuid.uuid4() for _ in range(20)]
+            signal_infos = []
+            for offset, signal in enumerate(('enqueued', 'executing', 'complete')):
+                for task_id in task_ids:
+                    signal_infos.append(make_signal_info(signal, task_id, offset=offset))
+            return signal_infos
+
+        cache_worker_identity(self)
+        # The statistics of the ended tasks need 2 queries, see: huey_monitor.statistics
+        with self.assertNumQueries(6):
+            upsert_signal_batch(get_signal_infos())
+
+        with self.assertNumQueries(9):
+            store_signal_batch_orm(get_signal_infos())
+
+        self.assertEqual(TaskModel.objects.filter(finished=True).count(), 40)
+        self.assertEqual(SignalInfoModel.objects.count(), 120)
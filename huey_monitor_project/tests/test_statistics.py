@@ -0,0 +1,230 @@
+import datetime
+import uuid
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from huey_monitor.models import TaskModel, TaskStatisticsModel
+from huey_monitor.signal_store import store_signal_batch_orm, store_signal_orm, upsert_signal_batch
+from huey_monitor.statistics import get_day, merge_statistics, rebuild_statistics
+from huey_monitor_project.test_app.tasks import delay_task, raise_error_task
+from huey_monitor_project.tests.utils import make_signal_info
+
+
+def get_values():
+    return list(
+        TaskStatisticsModel.objects.order_by('name', 'hour').values_list(
+            'name', 'ended_count', 'complete_count', 'error_count', 'duration_count'
+        )
+    )
+
+
+def get_latency_values():
+    return list(
+        TaskStatisticsModel.objects.order_by('name', 'hostname', 'hour').values_list(
+            'name', 'hostname', 'latency_count', 'latency_sum', 'latency_max'
+        )
+    )
+
+
+class TaskStatisticsTestCase(TestCase):
+    def test_tasks(self):
+        delay_task(name='test', sleep=0.001)
+        delay_task(name='test', sleep=0.001)
+        raise_error_task(error_class_name='ValueError', msg='test')
+
+        self.assertEqual(
+            get_values(),
+            [('delay_task', 2, 2, 0, 2), ('raise_error_task', 1, 0, 1, 1)],
+        )
+        instance = TaskStatisticsModel.objects.get(name='delay_task')
+        duration_histogram, latency_histogram = instance.get_histograms()
+        self.assertEqual(sum(duration_histogram.values()), 2)
+        self.assertLess(instance.duration_max, 1)
+
+        # Rebuild from the signals results in the same values:
+        values = get_values()
+        with self.assertLogs('huey_monitor.statistics'):
+            self.assertEqual(rebuild_statistics(chunk_size=2), 3)
+        self.assertEqual(get_values(), values)
+
+    def assert_durations(self, store_func):
+        task_ids = [uuid.uuid4() for _ in range(3)]
+        store_func([make_signal_info('executing', task_id, offset=0) for task_id in task_ids])
+        store_func(
+            [
+                make_signal_info('complete', task_ids[0], offset=1),
+                make_signal_info('error', task_ids[1], offset=2),
+                # A retry in the same batch:
+                make_signal_info('executing', task_ids[1], offset=3),
+                make_signal_info('complete', task_ids[1], offset=7),
+                # Never executed:
+                make_signal_info('revoked', uuid.uuid4(), offset=1),
+            ]
+        )
+        [statistics] = merge_statistics(TaskStatisticsModel.objects.all())
+        self.assertEqual(statistics.ended_count, 4)
+        self.assertEqual(statistics.complete_count, 2)
+        self.assertEqual(statistics.error_count, 1)
+        self.assertEqual(statistics.duration_count, 3)
+        self.assertAlmostEqual(statistics.duration_sum, 7, delta=0.5)
+        self.assertAlmostEqual(statistics.duration_max, 4, delta=0.5)
+        self.assertEqual(statistics.error_rate(), '25%')
+
+        values = get_values()
+        rebuild_statistics()
+        self.assertEqual(get_values(), values)
+
+    def test_upsert_signal_batch(self):
+        self.assert_durations(upsert_signal_batch)
+
+    def test_store_signal_batch_orm(self):
+        self.assert_durations(store_signal_batch_orm)
+
+    def test_store_signal_orm(self):
+        def store_func(signal_infos):
+            for signal_info in signal_infos:
+                store_signal_orm(signal_info)
+
+        self.assert_durations(store_func)
+
+    @mock.patch('huey_monitor.signal_store.upsert_supported', return_value=False)
+    def test_without_upsert(self, _):
+        # The values are added via UPDATE ... SET x = x + ...:
+        self.assert_durations(store_signal_batch_orm)
+
+    @mock.patch('huey_monitor.signal_store.upsert_supported', return_value=False)
+    def test_latencies_without_upsert(self, _):
+        self.assert_latencies(store_signal_batch_orm)
+
+    def assert_latencies(self, store_func):
+        task_ids = {name: uuid.uuid4() for name in 'ABCDE'}
+        now = timezone.now()
+
+        def make_signal_infos(*signals):
+            signal_infos = []
+            for name, signal, offset in signals:
+                signal_info = make_signal_info(signal, task_ids[name], task_name='latency')
+                signal_info['create_dt'] = now + datetime.timedelta(seconds=offset)
+                if name == 'D':
+                    signal_info['hostname'] = 'worker-2'
+                signal_infos.append(signal_info)
+            return sorted(signal_infos, key=lambda signal_info: signal_info['create_dt'])
+
+        store_func(
+            make_signal_infos(
+                ('A', 'enqueued', 0),
+                ('B', 'enqueued', 0),
+                ('C', 'enqueued', 0),
+                ('E', 'enqueued', 0),
+                ('B', 'executing', 1),
+                ('E', 'executing', 4),
+            )
+        )
+        store_func(
+            make_signal_infos(
+                # Enqueued before this batch:
+                ('A', 'executing', 2),
+                ('A', 'complete', 3),
+                # Executed before this batch and retried:
+                ('B', 'error', 4),
+                ('B', 'enqueued', 5),
+                ('B', 'executing', 6),
+                ('B', 'complete', 8),
+                # Enqueued before this batch and retried:
+                ('C', 'executing', 3),
+                ('C', 'error', 4),
+                ('C', 'enqueued', 5),
+                # All in this batch:
+                ('D', 'enqueued', 0),
+                ('D', 'executing', 1),
+                ('D', 'complete', 2),
+                # Executed before this batch:
+                ('E', 'complete', 5),
+            )
+        )
+        latencies = dict(TaskModel.objects.values_list('task_id', 'queue_latency'))
+        self.assertEqual(
+            {name: latencies[task_id] for name, task_id in task_ids.items()},
+            {
+                'A': datetime.timedelta(seconds=2),
+                'B': datetime.timedelta(seconds=1),
+                'C': None,  # Waits for the next execution
+                'D': datetime.timedelta(seconds=1),
+                'E': datetime.timedelta(seconds=4),
+            },
+        )
+
+        [statistics] = merge_statistics(TaskStatisticsModel.objects.all())
+        self.assertEqual(statistics.latency_count, 6)
+        self.assertAlmostEqual(statistics.latency_sum, 12, places=3)
+        self.assertAlmostEqual(statistics.latency_max, 4, places=3)
+        self.assertAlmostEqual(statistics.latency_percentile(0.5), 1, delta=0.2)
+
+        hosts = merge_statistics(TaskStatisticsModel.objects.all(), key_field='hostname')
+        self.assertEqual([(host.name, host.latency_count) for host in hosts if host.name == 'worker-2'], [
+            ('worker-2', 1)
+        ])
+
+        values = get_latency_values()
+        rebuild_statistics()
+        self.assertEqual(get_latency_values(), values)
+
+    def test_latencies_upsert_signal_batch(self):
+        self.assert_latencies(upsert_signal_batch)
+
+    def test_latencies_store_signal_batch_orm(self):
+        self.assert_latencies(store_signal_batch_orm)
+
+    def test_latencies_store_signal_orm(self):
+        def store_func(signal_infos):
+            for signal_info in signal_infos:
+                store_signal_orm(signal_info)
+
+        self.assert_latencies(store_func)
+
+    def test_merge_hours_into_days(self):
+        task_id = uuid.uuid4()
+        signal_infos = []
+        for hours in (0, 1, 25):
+            signal_infos.append(make_signal_info('executing', task_id, task_name='foo', offset=hours * 3600))
+            signal_infos.append(make_signal_info('complete', task_id, task_name='foo', offset=hours * 3600 + 2))
+        upsert_signal_batch(signal_infos)
+        self.assertIn(TaskStatisticsModel.objects.count(), (3, 4))  # May be crossing the hour
+
+        days = merge_statistics(TaskStatisticsModel.objects.all(), get_start=get_day)
+        self.assertIn(len(days), (2, 3))  # May be crossing midnight
+        self.assertEqual(sum(day.ended_count for day in days), 3)
+
+        [total] = merge_statistics(TaskStatisticsModel.objects.all())
+        self.assertEqual(total.ended_count, 3)
+        self.assertAlmostEqual(total.duration_percentile(0.5), 2, delta=0.2)
+
+    @override_settings(HUEY_MONITOR_STATISTICS=False)
+    def test_disabled(self):
+        delay_task(name='test', sleep=0.001)
+        self.assertEqual(TaskStatisticsModel.objects.count(), 0)
+
+    def test_command(self):
+        task_id = uuid.uuid4()
+        old_signal = make_signal_info('complete', task_id, task_name='old')
+        old_signal['create_dt'] -= datetime.timedelta(days=10)
+        upsert_signal_batch([old_signal, make_signal_info('complete', uuid.uuid4(), task_name='new')])
+        TaskStatisticsModel.objects.all().delete()
+
+        start = (old_signal['create_dt'] + datetime.timedelta(days=1)).date().isoformat()
+        stdout = StringIO()
+        with self.assertLogs('huey_monitor.statistics'):
+            call_command('huey_monitor_rebuild_statistics', '--start', start, stdout=stdout)
+        self.assertIn('1 ended task signals processed.', stdout.getvalue())
+        self.assertEqual(get_values(), [('new', 1, 1, 0, 0)])
+
+    def test_migration_histograms(self):
+        migration = import_module('huey_monitor.migrations.0031_statistics_buckets')
+        self.assertEqual(migration.pack_histogram({40: 3, 1: 0}).hex(), '28000300000000000000')
+        self.assertEqual(migration.unpack_histogram(migration.pack_histogram({40: 3, 1: 2})), {1: 2, 40: 3})
+        self.assertEqual(migration.unpack_histogram(None), {})
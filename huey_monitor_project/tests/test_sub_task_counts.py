@@ -0,0 +1,244 @@
+import datetime
+import time
+from io import StringIO
+import uuid
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase
+
+from huey_monitor.constants import SUB_TASKS_PREVIEW
+from huey_monitor.models import SubTaskProgressModel, TaskModel
+from huey_monitor.signal_store import store_signal_batch, store_signal_batch_orm, store_signal_orm, upsert_signal_batch
+from huey_monitor.sub_task_counts import recount_sub_tasks
+from huey_monitor.workers import reap_orphaned_tasks
+from huey_monitor_project.test_app.data_generator import TaskDataGenerator
+from huey_monitor_project.test_app.tasks import main_task, parallel_task
+from huey_monitor_project.tests.utils import cache_worker_identity, make_signal_info
+
+
+COUNTER_FIELDS = (
+    'sub_tasks_total',
+    'sub_tasks_running',
+    'sub_tasks_complete',
+    'sub_tasks_error',
+)
+
+
+def get_counts(main_task_id) -> dict:
+    counts = TaskModel.objects.filter(task_id=main_task_id).values(*COUNTER_FIELDS).get()
+    counts['sub_tasks_progress'] = TaskModel.objects.get(task_id=main_task_id).sub_tasks_progress or 0
+    return counts
+
+
+def count_sub_tasks(main_task_id) -> dict:
+    """
+    The expected counters: Counted from the current sub tasks
+    """
+    sub_tasks = TaskModel.objects.filter(parent_task_id=main_task_id)
+    return {
+        'sub_tasks_total': sub_tasks.count(),
+        'sub_tasks_running': sub_tasks.filter(state__signal_name='executing').count(),
+        'sub_tasks_complete': sub_tasks.filter(state__signal_name='complete').count(),
+        'sub_tasks_error': sub_tasks.filter(state__signal_name='error').count(),
+        'sub_tasks_progress': sub_tasks.aggregate(progress=Sum('progress_count'))['progress'] or 0,
+    }
+
+
+def store_signals_orm(signal_infos):
+    for signal_info in signal_infos:
+        store_signal_orm(signal_info)
+
+
+class SubTaskCountsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache_worker_identity(self)
+
+    def assert_counts(self, main_task_id, **expected):
+        counts = get_counts(main_task_id)
+        self.assertEqual(counts, count_sub_tasks(main_task_id))
+        self.assertEqual({name: counts[f'sub_tasks_{name}'] for name in expected}, expected)
+
+    def test_main_task(self):
+        main_task()
+        main_task_instance = TaskModel.objects.get(name='main_task')
+        # The second sub task raise an error after its retry:
+        self.assert_counts(main_task_instance.pk, total=3, running=0, complete=2, error=1, progress=0)
+
+    def test_parallel_task(self):
+        with mock.patch.object(time, 'sleep'):
+            parallel_task(total=10, task_num=2)
+        main_task_instance = TaskModel.objects.get(name='parallel_task')
+        self.assert_counts(main_task_instance.pk, total=2, running=0, complete=2, error=0, progress=10)
+
+    def test_storage_backends(self):
+        backends = (
+            (upsert_signal_batch, True),
+            (store_signal_batch_orm, True),
+            (store_signals_orm, True),
+            (store_signals_orm, False),  # The progress shards are updated without "INSERT ... ON CONFLICT"
+        )
+        for store_signals, upsert in backends:
+            with self.subTest(store_signals.__name__, upsert=upsert), mock.patch(
+                'huey_monitor.signal_store.upsert_supported', return_value=upsert
+            ):
+                TaskModel.objects.all().delete()
+                main_id, sub_id1, sub_id2, sub_id3, other_main_id = (uuid.uuid4() for _ in range(5))
+
+                store_signals(
+                    [
+                        make_signal_info('executing', main_id, task_name='main'),
+                        make_signal_info('executing', other_main_id, task_name='main'),
+                        make_signal_info('executing', sub_id1),
+                        make_signal_info('executing', sub_id2),
+                        make_signal_info('enqueued', sub_id3),
+                    ]
+                )
+                TaskModel.objects.store_parent_task(main_task_id=main_id, sub_task_id=sub_id1)
+                TaskModel.objects.store_parent_task(main_task_id=str(main_id), sub_task_id=sub_id2)
+                TaskModel.objects.store_parent_task(main_task_id=main_id, sub_task_id=sub_id3)
+                TaskModel.objects.store_parent_task(main_task_id=str(main_id), sub_task_id=sub_id3)  # no change
+                TaskModel.objects.update_task(sub_id1, parent_task_id=main_id, progress_count=5)
+                TaskModel.objects.update_task(sub_id2, parent_task_id=main_id, progress_count=7)
+                self.assert_counts(main_id, total=3, running=2, complete=0, error=0, progress=12)
+
+                # A retry in the same batch:
+                store_signals(
+                    [
+                        make_signal_info('complete', sub_id1, offset=1),
+                        make_signal_info('error', sub_id2, offset=1),
+                        make_signal_info('retrying', sub_id2, offset=2),
+                        make_signal_info('executing', sub_id2, offset=3),
+                        make_signal_info('executing', sub_id3, offset=3),
+                    ]
+                )
+                self.assert_counts(main_id, total=3, running=2, complete=1, error=0, progress=12)
+
+                # The retry starts again:
+                TaskModel.objects.update_task(sub_id2, parent_task_id=main_id, progress_count=0)
+                store_signals(
+                    [
+                        make_signal_info('complete', sub_id2, offset=4),
+                        make_signal_info('error', sub_id3, offset=4),
+                    ]
+                )
+                self.assert_counts(main_id, total=3, running=0, complete=2, error=1, progress=5)
+
+                # Move a sub task to another main task:
+                TaskModel.objects.update_task(sub_id1, parent_task_id=main_id, progress_count=6)
+                TaskModel.objects.store_parent_task(main_task_id=other_main_id, sub_task_id=sub_id1)
+                self.assert_counts(main_id, total=2, running=0, complete=1, error=1, progress=0)
+                self.assert_counts(other_main_id, total=1, running=0, complete=1, error=0, progress=6)
+
+                # Every sub task changes only its own shard:
+                self.assertFalse(SubTaskProgressModel.objects.filter(progress__lt=0).exists())
+
+    def test_reap_orphaned_tasks(self):
+        main_id, sub_id = uuid.uuid4(), uuid.uuid4()
+        store_signal_batch([make_signal_info('executing', main_id), make_signal_info('executing', sub_id)])
+        TaskModel.objects.store_parent_task(main_task_id=main_id, sub_task_id=sub_id)
+        self.assert_counts(main_id, total=1, running=1)
+
+        # No worker is registered: All "executing" tasks are orphaned
+        with self.assertLogs('huey_monitor.workers', 'WARNING'):
+            self.assertEqual(reap_orphaned_tasks(), 2)
+        self.assert_counts(main_id, total=1, running=0)
+
+    def test_data_generator_and_backfill(self):
+        end_dt = datetime.datetime(2024, 1, 2, 12, tzinfo=datetime.timezone.utc)
+        TaskDataGenerator(end_dt=end_dt, seed=1).create(300)
+        # The sub tasks of the oldest main task may be stored by the next create() call:
+        main_tasks = TaskModel.objects.filter(parent_task__isnull=True).order_by('create_dt')
+        main_task_ids = set(main_tasks.values_list('pk', flat=True)[1:])
+        self.assertTrue(TaskModel.objects.filter(sub_tasks_total__gt=1, sub_tasks_running__gt=0).exists())
+        expected = {main_task_id: count_sub_tasks(main_task_id) for main_task_id in main_task_ids}
+        self.assertEqual({main_task_id: get_counts(main_task_id) for main_task_id in main_task_ids}, expected)
+
+        # The migrations count the sub tasks of existing main tasks and add up their progress:
+        TaskModel.objects.update(**dict.fromkeys(COUNTER_FIELDS, 0))
+        SubTaskProgressModel.objects.all().delete()
+        migration = import_module('huey_monitor.migrations.0029_sub_task_counts')
+        migration.backfill_sub_task_counts(apps, schema_editor=None)
+        migration = import_module('huey_monitor.migrations.0030_sub_task_progress_shards')
+        migration.backfill_progress_shards(apps, schema_editor=None)
+        self.assertEqual({main_task_id: get_counts(main_task_id) for main_task_id in main_task_ids}, expected)
+
+    def test_recount_sub_tasks(self):
+        end_dt = datetime.datetime(2024, 1, 2, 12, tzinfo=datetime.timezone.utc)
+        TaskDataGenerator(end_dt=end_dt, seed=1).create(100)
+        main_task_ids = set(TaskModel.objects.filter(parent_task__isnull=False).values_list('parent_task', flat=True))
+        expected = {main_task_id: count_sub_tasks(main_task_id) for main_task_id in main_task_ids}
+
+        # The counters of the newest generated main task include sub tasks beyond the requested number:
+        with self.assertLogs('huey_monitor.sub_task_counts', 'WARNING'):
+            self.assertEqual(recount_sub_tasks(chunk_size=3), 1)
+        self.assertEqual({main_task_id: get_counts(main_task_id) for main_task_id in main_task_ids}, expected)
+        self.assertEqual(recount_sub_tasks(chunk_size=3), 0)
+
+        # e.g.: Lost changes by a crash:
+        main_task_id1, main_task_id2 = sorted(main_task_ids)[:2]
+        TaskModel.objects.filter(pk=main_task_id1).update(sub_tasks_total=F('sub_tasks_total') + 2)
+        SubTaskProgressModel.objects.filter(main_task_id=main_task_id2).delete()
+        SubTaskProgressModel.objects.create(main_task_id=main_task_id2, shard=1, progress=-3)
+
+        with self.assertLogs('huey_monitor.sub_task_counts', 'WARNING'):
+            call_command('huey_monitor_recount_sub_tasks', '--chunk-size', '3', stdout=StringIO())
+        self.assertEqual({main_task_id: get_counts(main_task_id) for main_task_id in main_task_ids}, expected)
+
+    def test_admin_change_list(self):
+        main_id = uuid.uuid4()
+        sub_ids = [uuid.uuid4() for _ in range(SUB_TASKS_PREVIEW + 2)]
+        store_signal_batch(
+            [make_signal_info('executing', main_id, task_name='main')]
+            + [make_signal_info('executing', sub_id, task_name='chunk') for sub_id in sub_ids]
+        )
+        for sub_id in sub_ids:
+            TaskModel.objects.store_parent_task(main_task_id=main_id, sub_task_id=sub_id)
+            TaskModel.objects.update_task(sub_id, parent_task_id=main_id, progress_count=3)
+        store_signal_batch([make_signal_info('complete', sub_id, task_name='chunk', offset=1) for sub_id in sub_ids])
+
+        self.client.force_login(User.objects.create_superuser(username='superuser', email='', password='unused'))
+        response = self.client.get('/admin/huey_monitor/taskmodel/', HTTP_ACCEPT_LANGUAGE='en')
+        self.assertContains(response, '7 sub tasks: 0 running, 7 complete, 0 error\n    - 21.0it')
+        main_task_link = f'href="/admin/huey_monitor/taskmodel/{main_id}/change/"'
+        self.assertContains(response, f'{main_task_link}>show all 7 sub tasks</a>')
+        # Only the newest sub tasks are loaded:
+        self.assertEqual(response.content.decode().count('/change/">chunk</a>'), SUB_TASKS_PREVIEW)
+
+    def test_live_progress(self):
+        main_id, sub_id1, sub_id2 = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        store_signal_batch([make_signal_info('executing', task_id) for task_id in (main_id, sub_id1, sub_id2)])
+        # A task without parent task doesn't change any shard:
+        with self.assertNumQueries(1):
+            TaskModel.objects.update_task(main_id, total=20, progress_count=0)
+        TaskModel.objects.store_parent_task(main_task_id=main_id, sub_task_id=sub_id1)
+        TaskModel.objects.store_parent_task(main_task_id=main_id, sub_task_id=sub_id2)
+
+        # Add the change to the shard (The main task is not changed) and store the progress:
+        main_update_dt = TaskModel.objects.get(pk=main_id).update_dt
+        with self.assertNumQueries(2):
+            TaskModel.objects.update_task(sub_id1, parent_task_id=main_id, progress_count=4)
+        TaskModel.objects.update_task(sub_id2, parent_task_id=main_id, progress_count=6)
+
+        main_task_instance = TaskModel.objects.get(pk=main_id)
+        self.assertEqual(main_task_instance.update_dt, main_update_dt)
+        self.assertIs(main_task_instance.live_progress, True)
+        self.assertEqual(main_task_instance.progress_count, 0)
+        self.assertTrue(main_task_instance.human_progress_string().startswith('10/20it 50% '))
+
+        # A retry starts again:
+        TaskModel.objects.update_task(sub_id2, parent_task_id=main_id, progress_count=0)
+        self.assertEqual(TaskModel.objects.get(pk=main_id).human_percentage(), '20%')
+
+        # The ended main task stores the cumulated progress:
+        store_signal_batch([make_signal_info('complete', main_id, offset=1)])
+        main_task_instance = TaskModel.objects.get(pk=main_id)
+        self.assertIs(main_task_instance.live_progress, False)
+        self.assertEqual(main_task_instance.progress_count, 4)
+        self.assertEqual(main_task_instance.sub_tasks_progress, 4)
+        self.assertEqual(main_task_instance.human_percentage(), '20%')
@@ -1,7 +1,8 @@
 from django.test import TestCase
 from huey.api import Result
 
-from huey_monitor.models import SignalInfoModel, TaskModel
+from huey_monitor.models import QueueSampleModel, SignalInfoModel, TaskModel
+from huey_monitor.tasks import monitor_watchdog, queue_sampler
 from huey_monitor_project.test_app.tasks import main_task
 
 
@@ -26,3 +27,13 @@ class TasksTestCase(TestCase):
         assert values == [('sub_task', 'complete'), ('sub_task', 'error'), ('sub_task', 'complete')]
         errored_sub_task = sub_tasks[1]
         assert errored_sub_task.state.exception_line == 'This sub task should be raise an error ;)'
+
+    def test_monitor_tasks(self):
+        # The periodic tasks of the monitor are executed, but their signals are not stored:
+        with self.assertLogs('huey_monitor.tasks', 'INFO') as logs:
+            monitor_watchdog()
+        self.assertIn('Watchdog: 0 tasks of dead workers marked', logs.output[-1])
+        queue_sampler()
+        self.assertTrue(QueueSampleModel.objects.exists())
+        self.assertFalse(TaskModel.objects.exists())
+        self.assertFalse(SignalInfoModel.objects.exists())
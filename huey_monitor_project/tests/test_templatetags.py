@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.test import SimpleTestCase
 from huey import MemoryHuey
 
@@ -7,8 +8,12 @@ from huey_monitor.templatetags.huey_monitor import huey_counts_info
 
 
 class HueyMonitorTemplateTagsTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
     def test_huey_counts_info(self):
-        with patch('huey_monitor.templatetags.huey_monitor.HUEY', MemoryHuey()):
+        with patch('huey_monitor.huey_counts.HUEY', MemoryHuey()):
             html = huey_counts_info()
         self.assertHTMLEqual(html, '<p>Huey counts: Pending: 0, Scheduled: 0, Result: 0</p>')
 
@@ -17,9 +22,7 @@ class HueyMonitorTemplateTagsTestCase(SimpleTestCase):
             def __getattribute__(self, item):
                 raise OSError('Redis down!')
 
-        with patch('huey_monitor.templatetags.huey_monitor.HUEY', HueyError()), self.assertLogs(
-            'huey_monitor'
-        ) as logs:
+        with patch('huey_monitor.huey_counts.HUEY', HueyError()), self.assertLogs('huey_monitor') as logs:
             html = huey_counts_info()
 
         self.assertHTMLEqual(html, '<p>Huey counts: (OSError: Redis down!)</p>')
@@ -6,15 +6,15 @@ from unittest import mock
 
 from bx_django_utils.test_utils.datetime import MockDatetimeGenerator
 from bx_py_utils.test_utils.datetime import parse_dt
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from huey.api import Result, Task
 
 import huey_monitor
 from huey_monitor.constants import TASK_MODEL_DESC_MAX_LENGTH
 from huey_monitor.models import SignalInfoModel, TaskModel
-from huey_monitor.tqdm import ProcessInfo
-from huey_monitor_project.test_app.tasks import linear_processing_task, parallel_task
+from huey_monitor.tqdm import ProcessInfo, _process_infos, flush_process_info
+from huey_monitor_project.test_app.tasks import linear_processing_task, parallel_task, progress_error_task
 
 
 BASE_PATH = Path(huey_monitor.__file__).parent
@@ -33,7 +33,7 @@ class SleepMock:
         instance = TaskModel.objects.all().first()
 
         executing_dt = instance.executing_dt
-        assert executing_dt == parse_dt('2000-01-01T00:00:04+0000'), f'{executing_dt.isoformat()=}'
+        assert executing_dt == parse_dt('2000-01-01T00:00:03+0000'), f'{executing_dt.isoformat()=}'
 
         self.progress_info.append([self.count, instance.elapsed_sec, str(instance)])
 
@@ -50,7 +50,7 @@ class ProcessInfoTestCase(TestCase):
         ):
             linear_processing_task(desc='Foo Bar', total=10)
 
-        signals = list(SignalInfoModel.objects.values_list('signal_name', flat=True))
+        signals = list(SignalInfoModel.objects.order_by('create_dt').values_list('signal_name', flat=True))
         self.assertEqual(signals, ['enqueued', 'executing', 'complete'])
 
         # Add the last entry, executed after time.sleep() so not captured, yet:
@@ -130,8 +130,8 @@ class ProcessInfoTestCase(TestCase):
         main_task_id = task_result.task.id
 
         main_task_instance = TaskModel.objects.get(pk=main_task_id)
-        self.assertEqual(main_task_instance.human_progress_string(), '10/10it 100% 2.9 seconds/it finished')
-        assert str(main_task_instance) == ('parallel_task: 10/10it 100% 2.9 seconds/it finished (Main task)')
+        self.assertEqual(main_task_instance.human_progress_string(), '10/10it 100% 3.7 seconds/it finished')
+        assert str(main_task_instance) == ('parallel_task: 10/10it 100% 3.7 seconds/it finished (Main task)')
 
         sub_tasks = TaskModel.objects.filter(parent_task=main_task_instance).order_by('update_dt')
         values = list(sub_tasks.values_list('name', 'state__signal_name'))
@@ -140,12 +140,12 @@ class ProcessInfoTestCase(TestCase):
         # Note: Huey is in immediate mode, so the tasks executes synchronously!
 
         sub_tasks1 = sub_tasks[0]
-        assert sub_tasks1.human_progress_string() == '5/5it 100% 1.8 seconds/it finished'
-        assert str(sub_tasks1) == ('parallel_sub_task: 5/5it 100% 1.8 seconds/it finished (Sub task of parallel_task)')
+        assert sub_tasks1.human_progress_string() == '5/5it 100% 2.8 seconds/it finished'
+        assert str(sub_tasks1) == ('parallel_sub_task: 5/5it 100% 2.8 seconds/it finished (Sub task of parallel_task)')
 
         sub_tasks2 = sub_tasks[1]
-        assert sub_tasks2.human_progress_string() == '5/5it 100% 1.8 seconds/it finished'
-        assert str(sub_tasks2) == ('parallel_sub_task: 5/5it 100% 1.8 seconds/it finished (Sub task of parallel_task)')
+        assert sub_tasks2.human_progress_string() == '5/5it 100% 2.8 seconds/it finished'
+        assert str(sub_tasks2) == ('parallel_sub_task: 5/5it 100% 2.8 seconds/it finished (Sub task of parallel_task)')
 
     def test_process_description_overlong(self):
         TaskModel.objects.create(task_id='00000000-0000-0000-0000-000000000001')
@@ -178,3 +178,112 @@ class ProcessInfoTestCase(TestCase):
         assert len(logs.output) == 1
         log_line = logs.output[0]
         assert "YYYYY…' has been cropped maximum allowed 128 characters" in log_line
+
+    def test_throttled_progress_update(self):
+        task = Task(id='00000000-0000-0000-0000-000000000001')
+        TaskModel.objects.create(task_id=task.id)
+
+        def get_progress_count():
+            return TaskModel.objects.get().progress_count
+
+        process_info = ProcessInfo(task, total=20, miniters=3)
+        counts = []
+        for _ in range(10):
+            process_info.update()
+            counts.append(get_progress_count())
+        self.assertEqual(counts, [0, 0, 3, 3, 3, 6, 6, 6, 9, 9])
+
+        process_info.flush()
+        self.assertEqual(get_progress_count(), 10)
+
+        # The completed progress is stored at once and the instance is no longer needed by the task end:
+        process_info = ProcessInfo(task, total=10, miniters=3)
+        self.assertIs(_process_infos[task.id], process_info)
+        process_info.update(n=10)
+        self.assertEqual(get_progress_count(), 10)
+        self.assertNotIn(task.id, _process_infos)
+
+        # Overshooting the total: Throttled again and stored by the task end:
+        counts = []
+        for _ in range(5):
+            process_info.update()
+            counts.append(get_progress_count())
+        self.assertEqual(counts, [10, 10, 13, 13, 13])
+        self.assertIs(_process_infos[task.id], process_info)
+        flush_process_info(task.id)
+        self.assertEqual(get_progress_count(), 15)
+
+        # Store only the progress if "mininterval" is elapsed:
+        with mock.patch.object(time, 'monotonic', return_value=100):
+            process_info = ProcessInfo(task, total=10, mininterval=2)
+        counts = []
+        for now in (100, 101, 102, 103, 104.5):
+            with mock.patch.object(time, 'monotonic', return_value=now):
+                process_info.update()
+            counts.append(get_progress_count())
+        self.assertEqual(counts, [0, 0, 3, 3, 5])
+
+        # Adjust "miniters" dynamically:
+        with mock.patch.object(time, 'monotonic', return_value=100):
+            process_info = ProcessInfo(task, total=1000, writes_per_second=10)
+        with mock.patch.object(time, 'monotonic', return_value=100.5):
+            process_info.update(n=100)
+        self.assertEqual(get_progress_count(), 100)
+        self.assertEqual(process_info.miniters, 20)  # 100 iterations in 0.5 sec -> 20 per 0.1 sec
+
+        # Flush via context manager:
+        with ProcessInfo(task, total=10, miniters=100) as process_info:
+            process_info.update(n=5)
+            self.assertEqual(get_progress_count(), 0)
+        self.assertEqual(get_progress_count(), 5)
+        self.assertEqual(_process_infos, {})
+
+    def test_flush_progress_on_task_end(self):
+        with override_settings(HUEY_MONITOR_PROGRESS_MININTERVAL=60), mock.patch.object(time, 'sleep'):
+            task_result = parallel_task(total=10, task_num=2)
+
+        main_task_instance = TaskModel.objects.get(pk=task_result.task.id)
+        self.assertEqual(main_task_instance.progress_count, 10)
+        self.assertEqual(
+            list(main_task_instance.sub_tasks.values_list('progress_count', 'state__signal_name')),
+            [(5, 'complete'), (5, 'complete')],
+        )
+
+        # Flushed before the "error" signal, too:
+        with override_settings(HUEY_MONITOR_PROGRESS_MINITERS=100), mock.patch.object(time, 'sleep'):
+            progress_error_task(total=10)
+        instance = TaskModel.objects.get(name='progress_error_task')
+        self.assertEqual(instance.state.signal_name, 'error')
+        self.assertEqual(instance.state.progress_count, 5)
+        self.assertEqual(instance.progress_count, 5)
+        self.assertEqual(_process_infos, {})
+
+    def test_progress_samples(self):
+        task = Task(id='00000000-0000-0000-0000-000000000001')
+        TaskModel.objects.create(task_id=task.id)
+
+        with mock.patch.object(time, 'time', return_value=100):
+            process_info = ProcessInfo(task, total=100)
+        for timestamp in range(101, 106):
+            with mock.patch.object(time, 'time', return_value=timestamp):
+                process_info.update(n=timestamp - 100)  # accelerate: 1, 2, 3, 4, 5 items per second
+
+        instance = TaskModel.objects.get()
+        self.assertEqual(instance.progress_count, 15)
+        self.assertEqual(
+            instance.progress_sample_list,
+            [(100.0, 0), (101.0, 1), (102.0, 3), (103.0, 6), (104.0, 10), (105.0, 15)],
+        )
+        self.assertEqual(instance.progress_sparkline(), '▂▄▅▇█')
+        self.assertEqual(instance.human_current_throughput(), '3.23it/s')
+        self.assertEqual(instance.human_eta(), '26.3\xa0seconds')  # (100 - 15) / 3.2269
+
+        # No ETA for finished tasks:
+        instance.finished = True
+        self.assertIsNone(instance.human_eta())
+
+        # Without samples:
+        instance = TaskModel(task_id=task.id)
+        self.assertIsNone(instance.human_current_throughput())
+        self.assertIsNone(instance.human_eta())
+        self.assertIsNone(instance.progress_sparkline())
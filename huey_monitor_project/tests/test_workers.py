@@ -0,0 +1,111 @@
+import datetime
+import os
+import uuid
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from huey_monitor.models import SignalInfoModel, TaskModel, WorkerModel
+from huey_monitor.signal_store import get_hostname, store_signal_batch
+from huey_monitor.tasks import startup_handler
+from huey_monitor.workers import delete_old_workers, reap_orphaned_tasks, stop_heartbeat
+from huey_monitor_project.tests.utils import cache_worker_identity, make_signal_info
+
+
+class WorkerRegistryTestCase(TestCase):
+    def create_executing_task(self, hostname, pid, offset=0):
+        task_id = uuid.uuid4()
+        signal_info = make_signal_info('executing', task_id, task_name=f'{hostname}-{pid}', offset=offset)
+        signal_info['hostname'] = hostname
+        signal_info['pid'] = pid
+        store_signal_batch([signal_info])
+        return task_id
+
+    def make_worker(self, hostname, pid, heartbeat_age=0, stopped=False):
+        now = timezone.now()
+        return WorkerModel.objects.create(
+            hostname=hostname,
+            pid=pid,
+            started_dt=now - datetime.timedelta(hours=1),
+            heartbeat_dt=now - datetime.timedelta(seconds=heartbeat_age),
+            stopped_dt=now if stopped else None,
+        )
+
+    def test_reap_orphaned_tasks(self):
+        self.make_worker('alive', 1)
+        self.make_worker('dead', 1, heartbeat_age=3600)
+        self.make_worker('stopped', 1, stopped=True)
+
+        alive_id = self.create_executing_task('alive', 1)
+        orphaned_ids = {
+            self.create_executing_task('dead', 1),
+            self.create_executing_task('stopped', 1),
+            self.create_executing_task('unknown', 1),
+            # Started by a previous process with the same PID:
+            self.create_executing_task('alive', 1, offset=-7200),
+        }
+        TaskModel.objects.update(progress_count=5)
+        cache_worker_identity(self)
+
+        # (SAVEPOINT + select + create all signals + update all tasks + RELEASE)
+        # and (SAVEPOINT + select + RELEASE) to find no more tasks:
+        with self.assertNumQueries(8), self.assertLogs('huey_monitor.workers', 'WARNING'):
+            self.assertEqual(reap_orphaned_tasks(chunk_size=10), 4)
+
+        self.assertEqual(TaskModel.objects.get(pk=alive_id).state.signal_name, 'executing')
+        for instance in TaskModel.objects.filter(pk__in=orphaned_ids).select_related('state'):
+            self.assertEqual(instance.state.signal_name, 'unknown')
+            self.assertEqual(instance.state.progress_count, 5)
+            self.assertIs(instance.finished, True)
+            self.assertEqual(instance.ended_dt, instance.state.create_dt)
+            self.assertEqual(instance.duration, instance.ended_dt - instance.executing_dt)
+        self.assertEqual(SignalInfoModel.objects.filter(signal_name='unknown').count(), 4)
+
+        # Nothing to do anymore:
+        self.assertEqual(reap_orphaned_tasks(), 0)
+
+    @override_settings(HUEY_MONITOR_WORKER_HEARTBEAT_INTERVAL=60)
+    def test_startup_handler(self):
+        self.addCleanup(stop_heartbeat)
+        task_id = self.create_executing_task(get_hostname(), os.getpid(), offset=-10)
+
+        with self.assertLogs('huey_monitor', 'INFO') as logs:
+            startup_handler()
+        self.assertIn('Mark "executing" task', '\n'.join(logs.output))
+        self.assertEqual(TaskModel.objects.get(pk=task_id).state.signal_name, 'unknown')
+
+        worker = WorkerModel.objects.get()
+        self.assertEqual((worker.hostname, worker.pid), (get_hostname(), os.getpid()))
+        self.assertIsNone(worker.stopped_dt)
+
+        # The tasks of the current process will not be touched:
+        task_id = self.create_executing_task(get_hostname(), os.getpid(), offset=1)
+        self.assertEqual(reap_orphaned_tasks(), 0)
+
+        # Every worker thread calls the startup handler: Only the first call registers the process
+        with self.assertNumQueries(0):
+            startup_handler()
+
+        stop_heartbeat()
+        worker.refresh_from_db()
+        self.assertIsNotNone(worker.stopped_dt)
+
+        with self.assertLogs('huey_monitor.workers', 'WARNING'):
+            self.assertEqual(reap_orphaned_tasks(), 1)
+
+    @override_settings(HUEY_MONITOR_SIGNAL_COLLECTOR=True)
+    def test_startup_handler_collector(self):
+        self.addCleanup(stop_heartbeat)
+        task_id = self.create_executing_task(get_hostname(), os.getpid(), offset=-10)
+
+        # The workers don't touch the database, if the collector stores the signals:
+        with self.assertNumQueries(0):
+            startup_handler()
+        self.assertFalse(WorkerModel.objects.exists())
+        self.assertEqual(TaskModel.objects.get(pk=task_id).state.signal_name, 'executing')
+
+    def test_delete_old_workers(self):
+        self.make_worker('alive', 1)
+        self.make_worker('old', 1, heartbeat_age=8 * 24 * 3600)
+        self.assertEqual(delete_old_workers(), 1)
+        self.assertEqual(list(WorkerModel.objects.values_list('hostname', flat=True)), ['alive'])
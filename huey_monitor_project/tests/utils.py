@@ -1,9 +1,35 @@
+import datetime
+import os
 import shutil
+import threading
 from pathlib import Path
 from unittest import TestCase
 
 # https://github.com/jedie/django-tools
 from django_tools.unittest_utils.django_command import DjangoCommandMixin
+from huey.api import Task
+
+from huey_monitor import signal_store
+from huey_monitor.signal_store import get_hostname, get_signal_info, get_worker_identity_ids
+
+
+def cache_worker_identity(test_case):
+    """
+    Create the worker identity of the current thread and cache its ID, like in a running worker process.
+    """
+    with test_case.captureOnCommitCallbacks(execute=True):
+        get_worker_identity_ids([(get_hostname(), os.getpid(), threading.current_thread().name)])
+    test_case.addCleanup(signal_store._worker_identity_ids.clear)
+
+
+def make_signal_info(signal, task_id, task_name='batch_task', offset=0):
+    """
+    Create a signal info dict, like the Huey signal handler does.
+    """
+    signal_info = get_signal_info(signal, Task(id=str(task_id)))
+    signal_info['task_name'] = task_name
+    signal_info['create_dt'] += datetime.timedelta(seconds=offset)
+    return signal_info
 
 
 class ForRunnersCommandTestCase(DjangoCommandMixin, TestCase):
@@ -1,9 +1,12 @@
 from django.conf import settings
 from django.conf.urls import include, static
 from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import path
 from django.views.generic import RedirectView
 
+from huey_monitor.views import overhead_metrics
+
 
 admin.autodiscover()
 
@@ -11,6 +14,8 @@ admin.autodiscover()
 urlpatterns = [
     path('', RedirectView.as_view(url="/admin/")),
     path("admin/", admin.site.urls),
+    # The view has no own permission checks:
+    path('huey_monitor/metrics/', staff_member_required(overhead_metrics)),
 ]
 
 